@@ -1,85 +1,294 @@
-
+import argparse
+import hashlib
+import mimetypes
+import mmap
 import os
-import time
-import json
+import sys
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge import metrics
+from ai_bridge.state_store import ProcessedStore
+from ai_bridge.watcher import Watcher
+
 # --- Configuration ---
 FINANCIAL_DIR = 'cloud_discovery/financial'
 EVIDENCE_DIR = 'cloud_discovery/evidence'
 OUTPUT_DIR = 'ai_bridge/from_jules'
-STATE_FILE = 'ai_bridge/logs/index_cloud_discovery.state'
+STATE_FILE = 'ai_bridge/logs/index_cloud_discovery.sqlite'
+# JSON list of paths used before the sqlite store; imported on first start.
+LEGACY_STATE_FILE = 'ai_bridge/logs/index_cloud_discovery.state'
+# Characters shown from the start and the end of a text file.
+SNIPPET_CHARS = 500
+# Bytes read for each snippet; enough for SNIPPET_CHARS of 4-byte UTF-8.
+SNIPPET_BYTES = 4 * SNIPPET_CHARS
+# Bytes inspected to decide whether a file is text.
+SNIFF_BYTES = 8192
+CHUNK_BYTES = 1024 * 1024
+# Files at least this big are hashed through mmap on the worker pool, so the
+# watcher loop keeps dispatching while they are read.
+LARGE_FILE_BYTES = 32 * 1024 * 1024
+HASH_WORKERS = 2
 
+# Leading bytes of common binary formats, for files without a known extension.
+MAGIC_NUMBERS = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF8', 'image/gif'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\x1f\x8b', 'application/gzip'),
+]
+# Control bytes that do not occur in text (everything below 0x20 except
+# \t \n \f \r and ESC).
+_BINARY_BYTES = bytes(set(range(32)) - {9, 10, 12, 13, 27})
+
+
+def load_state():
+    """Opens the persistent set of already-summarized file paths."""
+    return ProcessedStore(STATE_FILE, legacy_path=LEGACY_STATE_FILE)
+
+
+def save_state(processed_files):
+    try:
+        processed_files.commit()
+        print("State file updated.")
+    except sqlite3.Error as e:
+        print(f"Error writing to state file {STATE_FILE}: {e}")
+
+
+# --- Describing files ---
+
+def is_binary(head):
+    """Sniffs the first bytes of a file: binary if they hold a NUL, are not
+    UTF-8, or are more than 10% control bytes."""
+    if not head:
+        return False
+    if b'\0' in head:
+        return True
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the sniff window is still text.
+        if e.start < len(head) - 3:
+            return True
+    return len(head.translate(None, _BINARY_BYTES)) < 0.9 * len(head)
+
+
+def mime_type(filepath, head, binary):
+    guessed, _ = mimetypes.guess_type(filepath)
+    if guessed:
+        return guessed
+    for magic, mime in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return mime
+    return 'application/octet-stream' if binary else 'text/plain'
+
+
+def _scan_stream(f):
+    """One sequential pass: SHA-256, newline count and the last SNIPPET_BYTES."""
+    sha256 = hashlib.sha256()
+    lines = 0
+    tail = b''
+    while True:
+        chunk = f.read(CHUNK_BYTES)
+        if not chunk:
+            break
+        sha256.update(chunk)
+        lines += chunk.count(b'\n')
+        tail = chunk[-SNIPPET_BYTES:] if len(chunk) >= SNIPPET_BYTES else (tail + chunk)[-SNIPPET_BYTES:]
+    return sha256.hexdigest(), lines, tail
+
+
+def _scan_mmap(f, size):
+    """Same as _scan_stream, through a read-only mapping of the file.
+
+    hashlib releases the GIL while hashing each window, so several of these
+    run in parallel on the worker threads.
+    """
+    sha256 = hashlib.sha256()
+    lines = 0
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, 'madvise'):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        for start in range(0, size, CHUNK_BYTES):
+            window = mapped[start:start + CHUNK_BYTES]
+            sha256.update(window)
+            lines += window.count(b'\n')
+        tail = mapped[max(0, size - SNIPPET_BYTES):size]
+    return sha256.hexdigest(), lines, tail
+
+
+def describe_file(filepath):
+    """Summarizes a file in constant memory.
+
+    Returns a dict with its size and mtime (from stat), MIME type, whether it
+    is binary, SHA-256, line count (text only) and head/tail snippets (text
+    only). Only SNIPPET_BYTES at either end are kept while the file is read.
+    """
+    with metrics.stage('describe_file'), open(filepath, 'rb') as f:
+        st = os.fstat(f.fileno())
+        head = f.read(max(SNIFF_BYTES, SNIPPET_BYTES))
+        f.seek(0)
+        if st.st_size >= LARGE_FILE_BYTES:
+            sha256, lines, tail = _scan_mmap(f, st.st_size)
+        else:
+            sha256, lines, tail = _scan_stream(f)
+    metrics.count('files_read')
+    metrics.count('bytes_read', st.st_size)
+    binary = is_binary(head[:SNIFF_BYTES])
+    info = {
+        'path': filepath,
+        'size': st.st_size,
+        'modified': datetime.fromtimestamp(st.st_mtime).isoformat(),
+        'mime_type': mime_type(filepath, head, binary),
+        'binary': binary,
+        'sha256': sha256,
+        'lines': None,
+        'head': None,
+        'tail': None,
+    }
+    if not binary:
+        info['lines'] = lines + (1 if st.st_size and not tail.endswith(b'\n') else 0)
+        info['head'] = head[:SNIPPET_BYTES].decode('utf-8', errors='ignore')[:SNIPPET_CHARS]
+        rest = st.st_size - len(info['head'].encode('utf-8'))
+        if rest > 0:
+            # The end of the file, without repeating any of the head.
+            info['tail'] = tail[-rest:].decode('utf-8', errors='ignore')[-SNIPPET_CHARS:]
+    return info
+
+
+def format_summary(info):
+    summary = f"File '{info['path']}' was added at {datetime.now().isoformat()}.\n\n"
+    summary += f"Size: {info['size']} bytes\n"
+    summary += f"Modified: {info['modified']}\n"
+    summary += f"Type: {info['mime_type']} ({'binary' if info['binary'] else 'text'})\n"
+    summary += f"SHA-256: {info['sha256']}\n"
+    if info['binary']:
+        summary += "\nBinary content; no snippet.\n"
+        return summary
+    summary += f"Lines: {info['lines']}\n\n"
+    summary += "Content Snippet:\n"
+    summary += info['head'] + ('...' if info['tail'] is not None else '')
+    if info['tail'] is not None:
+        summary += "\n\nEnd of File:\n..." + info['tail']
+    return summary
 
-def index_cloud_discovery():
-    """Monitors directories for new files and creates summaries."""
 
-    # --- State Management ---
-    processed_files = set()
-    if os.path.exists(STATE_FILE):
+def summarize_file(filepath):
+    """Writes a summary of `filepath` to the from_jules directory."""
+    summary = format_summary(describe_file(filepath))
+
+    # Write the summary to a new file in from_jules
+    summary_filename = f"summary-{os.path.basename(filepath)}-{datetime.now().strftime('%Y%m%d%H%M%S')}.txt"
+    summary_filepath = os.path.join(OUTPUT_DIR, summary_filename)
+    with open(summary_filepath, 'w') as f_out:
+        f_out.write(summary)
+
+
+# --- Watching ---
+
+class CloudIndexer:
+    """Summarizes new cloud_discovery files as the watcher reports them.
+
+    Small files are summarized inline. Files of LARGE_FILE_BYTES or more go
+    to a thread pool, and collect() (run on every watcher tick) marks them
+    processed once their summary is written, so the state store is only
+    touched from the watcher's thread.
+    """
+
+    def __init__(self, processed_files, workers=HASH_WORKERS):
+        self.processed_files = processed_files
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='cloud-hash')
+        self.in_flight = {}  # path -> future
+
+    def handle(self, event):
+        filepath = event.path
+        if filepath in self.in_flight or filepath in self.processed_files:
+            metrics.count('dedup_hits')
+            return
+        print(f"Processing new file: {filepath}")
         try:
-            with open(STATE_FILE, 'r') as f:
-                processed_files = set(json.load(f))
-        except (IOError, json.JSONDecodeError):
-            print(f"Warning: Could not load state file. Starting fresh.")
-            processed_files = set()
+            large = os.path.getsize(filepath) >= LARGE_FILE_BYTES
+            if large:
+                self.in_flight[filepath] = self.executor.submit(summarize_file, filepath)
+                return
+            summarize_file(filepath)
+            # Mark the file as processed
+            self.processed_files.add(filepath)
+        except IOError as e:
+            print(f"Error processing file {filepath}: {e}")
+
+    def collect(self):
+        """Marks finished background summaries processed and saves the state."""
+        for filepath, future in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[filepath]
+            try:
+                future.result()
+                self.processed_files.add(filepath)
+            except IOError as e:
+                print(f"Error processing file {filepath}: {e}")
+        if self.processed_files.pending:
+            save_state(self.processed_files)
+
+    def close(self):
+        """Waits for background summaries, saves the state and closes the store."""
+        self.executor.shutdown(wait=True)
+        self.collect()
+        self.processed_files.close()
+
+
+def register(watcher):
+    """Registers the cloud discovery indexer as a handler on `watcher`.
 
-    # --- Monitoring Loop ---
+    Returns the CloudIndexer; close() it when the watcher stops.
+    """
+    indexer = CloudIndexer(load_state())
+    for directory in [FINANCIAL_DIR, EVIDENCE_DIR]:
+        watcher.add_handler(directory, indexer.handle)
+    watcher.add_batch_callback(indexer.collect)
+    watcher.add_tick_callback(indexer.collect)
+    return indexer
+
+
+def index_cloud_discovery(watcher=None):
+    """Monitors directories for new files and creates summaries."""
+    watcher = watcher or Watcher()
+    indexer = register(watcher)
+    watcher.add_tick_callback(metrics.export_if_due)
     try:
-        while True:
-            new_files_processed = False
-            for directory in [FINANCIAL_DIR, EVIDENCE_DIR]:
-                try:
-                    if not os.path.exists(directory):
-                        print(f"Warning: Directory not found: {directory}")
-                        continue
-                    for filename in os.listdir(directory):
-                        filepath = os.path.join(directory, filename)
-                        if filepath not in processed_files:
-                            print(f"Processing new file: {filepath}")
-                            try:
-                                # Summarize the file content
-                                with open(filepath, 'r', errors='ignore') as f:
-                                    content = f.read()
-                                    summary = f"File '{filepath}' was added at {datetime.now().isoformat()}.\n\n"
-                                    summary += "Content Snippet:\n"
-                                    summary += content[:500] + ('...' if len(content) > 500 else '')
-
-                                # Write the summary to a new file in from_jules
-                                summary_filename = f"summary-{os.path.basename(filepath)}-{datetime.now().strftime('%Y%m%d%H%M%S')}.txt"
-                                summary_filepath = os.path.join(OUTPUT_DIR, summary_filename)
-                                with open(summary_filepath, 'w') as f_out:
-                                    f_out.write(summary)
-
-                                # Mark the file as processed
-                                processed_files.add(filepath)
-                                new_files_processed = True
-                            except IOError as e:
-                                print(f"Error processing file {filepath}: {e}")
-                except OSError as e:
-                    print(f"Error accessing directory {directory}: {e}")
-
-            # --- Update State File ---
-            if new_files_processed:
-                try:
-                    with open(STATE_FILE, 'w') as f:
-                        json.dump(list(processed_files), f)
-                    print("State file updated.")
-                except IOError as e:
-                    print(f"Error writing to state file {STATE_FILE}: {e}")
-
-            time.sleep(10)
+        watcher.run()
     except KeyboardInterrupt:
         print("\nIndexer stopped by user. Saving final state.")
-        try:
-            with open(STATE_FILE, 'w') as f:
-                json.dump(list(processed_files), f)
-            print("Final state saved.")
-        except IOError as e:
-            print(f"Error writing to state file on exit: {e}")
+    finally:
+        indexer.close()
+
+
+def index_once(watcher=None):
+    """Summarizes the files that arrived since the last run, then returns.
+
+    For cron and the bridge CLI; index_cloud_discovery() is the daemon.
+    """
+    watcher = watcher or Watcher(force_polling=True)
+    indexer = register(watcher)
+    try:
+        watcher.scan_existing()
+    finally:
+        indexer.close()
+        watcher.backend.close()
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Summarize new cloud_discovery files into from_jules.")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
     # Ensure output directory exists
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
-    index_cloud_discovery()
+    with metrics.session('index_cloud_discovery', profile=args.profile):
+        index_cloud_discovery()
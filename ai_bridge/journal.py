@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+# --- Configuration ---
+INTENT = 'intent'
+DONE = 'done'
+COMMITTED = 'committed'
+ABORTED = 'aborted'
+# Rewrite the journal without finished items once it grows past this size.
+COMPACT_BYTES = 1024 * 1024
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# Fault injection: with BRIDGE_CRASH_AT=<point>, crash_point(<point>) kills the
+# process on the spot (like kill -9) so tests can check recovery at every step.
+CRASH_ENV = 'BRIDGE_CRASH_AT'
+CRASH_EXIT_CODE = 137
+_CRASH_AT = os.environ.get(CRASH_ENV)
+
+
+def crash_point(name):
+    if _CRASH_AT == name:
+        os._exit(CRASH_EXIT_CODE)
+
+
+def content_key(prefix, name, data=None, digest=None):
+    """Idempotency key for one version of a file: prefix, name and content hash.
+
+    Pass the file's SHA-256 hex `digest` instead of `data` for files too
+    large to read into memory (see file_digest()).
+    """
+    if digest is None:
+        digest = hashlib.sha256(data).hexdigest()
+    return f"{prefix}:{name}:{digest[:16]}"
+
+
+def file_digest(path):
+    """SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fsync_directory(path):
+    fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    """Write-ahead journal for work items that touch more than one store.
+
+    Each item, named by an idempotency key, moves through three records:
+    `intent` before its side effect (ledger rows, a LegalCodex update),
+    `done` once the side effect has happened, and `committed` once the
+    caller's own state (processed-file store, processed/ directory)
+    reflects it. Every record is fsync'd before the next step starts, so
+    after a crash `in_flight()` lists exactly the items to finish. Intent
+    items may or may not have had their side effect and are replayed with
+    the same key; done items only need their state committed. Finished
+    items are dropped when the journal is compacted, so completion itself
+    is remembered by the caller's state, not here. That happens on open and
+    whenever a commit or abort leaves the file past `compact_bytes`, so a
+    long-running daemon's journal stays small too.
+    """
+
+    def __init__(self, path, compact_bytes=COMPACT_BYTES):
+        self.path = path
+        self.compact_bytes = compact_bytes
+        self.compact_at = compact_bytes
+        self.items = {}  # key -> (state, data), in first-intent order
+        self.file = None
+        self._batch_depth = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._load()
+        if os.path.exists(path) and os.path.getsize(path) > compact_bytes:
+            self.compact()
+        self.file = open(path, 'ab')
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        good_offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line) if line.endswith(b'\n') else None
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    record = None
+                if record is None:
+                    break  # Torn final record from a crash mid-append
+                self._apply(record['key'], record['state'], record.get('data'))
+                good_offset += len(line)
+        if good_offset < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_offset)
+                os.fsync(f.fileno())
+
+    def _apply(self, key, state, data):
+        if state in (COMMITTED, ABORTED):
+            self.items.pop(key, None)
+            return
+        merged = dict(self.items[key][1]) if key in self.items else {}
+        merged.update(data or {})
+        self.items[key] = (state, merged)
+
+    def _append(self, key, state, data=None):
+        record = {'key': key, 'state': state}
+        if data:
+            record['data'] = data
+        self.file.write((json.dumps(record) + '\n').encode())
+        self._apply(key, state, data)
+        if not self._batch_depth:
+            self._sync()
+            if state in (COMMITTED, ABORTED):
+                self._compact_if_large()
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    @contextmanager
+    def batch(self):
+        """Groups several records under one fsync, made on leaving the block.
+
+        Use it for a step applied to many items at once (all their intents
+        before one bulk update): none of them is durable until the block
+        ends, so the next step must not start inside it.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._sync()
+                self._compact_if_large()
+
+    # --- Steps ---
+
+    def state(self, key):
+        """Returns INTENT or DONE for an in-flight item, otherwise None."""
+        item = self.items.get(key)
+        return item[0] if item else None
+
+    def intent(self, key, **data):
+        self._append(key, INTENT, data)
+
+    def done(self, key, **data):
+        self._append(key, DONE, data)
+
+    def commit(self, key):
+        self._append(key, COMMITTED)
+
+    def abort(self, key):
+        """Drops an item whose side effect never happened."""
+        self._append(key, ABORTED)
+
+    def in_flight(self):
+        """Lists (key, state, data) of items that were started but not finished."""
+        return [(key, state, data) for key, (state, data) in self.items.items()]
+
+    # --- Maintenance ---
+
+    def _compact_if_large(self):
+        if self.file.tell() > self.compact_at:
+            self.compact()
+            # Many items still in flight would otherwise have every commit compact again.
+            self.compact_at = max(self.compact_bytes, 2 * self.file.tell())
+
+    def compact(self):
+        """Rewrites the journal with only the in-flight items."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            for key, state, data in self.in_flight():
+                f.write((json.dumps({'key': key, 'state': state, 'data': data}) + '\n').encode())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        _fsync_directory(self.path)
+        if self.file is not None:
+            self.file.close()
+            self.file = open(self.path, 'ab')
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,216 @@
+import http.client
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge import metrics
+
+# --- Configuration ---
+# Base URL of the LegalCodex API, e.g. http://127.0.0.1:8765. Unset means no
+# client: update_legal_codex only logs what it would send.
+URL_ENV = 'LEGAL_CODEX_URL'
+BULK_PATH = '/v1/updates/bulk'
+# A batch is sent once it holds MAX_BATCH updates or its oldest update has
+# waited MAX_DELAY seconds, whichever comes first.
+MAX_BATCH = 100
+MAX_DELAY = 0.02
+# Bulk requests on the wire at once; further batches wait for a slot.
+MAX_IN_FLIGHT = 4
+# Persistent (keep-alive) connections kept open to the server.
+POOL_SIZE = MAX_IN_FLIGHT
+TIMEOUT = 10.0
+# Connection errors, 429 and 5xx are retried up to RETRIES times, waiting
+# BACKOFF * 2**attempt seconds (with jitter, at most BACKOFF_MAX) in between.
+RETRIES = 5
+BACKOFF = 0.1
+BACKOFF_MAX = 5.0
+
+
+class LegalCodexError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Keeps up to `size` HTTP/1.1 keep-alive connections to one server."""
+
+    def __init__(self, url, size=POOL_SIZE, timeout=TIMEOUT):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+
+    def request(self, method, path, body=None, headers=None):
+        """Sends one request and returns (status, response body).
+
+        A connection that fails is closed rather than returned to the pool.
+        """
+        self.slots.acquire()
+        try:
+            try:
+                connection = self.idle.get_nowait()
+            except queue.Empty:
+                connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+            try:
+                connection.request(method, self.base_path + path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                data = response.read()
+            except BaseException:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self.idle.put(connection)
+            return response.status, data
+        finally:
+            self.slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class LegalCodexClient:
+    """Sends LegalCodex updates as bulk requests over pooled connections.
+
+    submit() queues one update and returns a Future. A batcher thread
+    coalesces queued updates into bulk requests of up to `max_batch`,
+    waiting at most `max_delay` for a batch to fill, and hands them to at
+    most `max_in_flight` sender threads. Each update carries its
+    idempotency key, so a bulk request retried after a lost response, or
+    an update replayed from the journal, is applied only once; its Future
+    resolves to 'applied' or 'duplicate'.
+    """
+
+    _STOP = object()
+
+    def __init__(self, url, max_batch=MAX_BATCH, max_delay=MAX_DELAY, max_in_flight=MAX_IN_FLIGHT,
+                 pool_size=POOL_SIZE, retries=RETRIES, backoff=BACKOFF):
+        self.pool = ConnectionPool(url, pool_size)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.retries = retries
+        self.backoff = backoff
+        self.pending = queue.Queue()
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.senders = ThreadPoolExecutor(max_in_flight, thread_name_prefix='legal-codex')
+        self.requests_sent = 0
+        self.batcher = threading.Thread(target=self._batch_loop, name='legal-codex-batcher', daemon=True)
+        self.batcher.start()
+
+    # --- API ---
+
+    def submit(self, data, idempotency_key):
+        future = Future()
+        self.pending.put((idempotency_key, data, future))
+        return future
+
+    def update(self, data, idempotency_key):
+        """Sends one update and waits for it to be acknowledged."""
+        return self.submit(data, idempotency_key).result()
+
+    def update_many(self, items):
+        """Sends (idempotency_key, data) pairs and waits for all of them.
+
+        Returns their statuses in order; raises LegalCodexError if any failed.
+        """
+        futures = [self.submit(data, key) for key, data in items]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Sends everything still queued, then closes the connections."""
+        self.pending.put(self._STOP)
+        self.batcher.join()
+        self.senders.shutdown(wait=True)
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- Batching ---
+
+    def _batch_loop(self):
+        while True:
+            item = self.pending.get()
+            if item is self._STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self.pending.get(timeout=timeout) if timeout > 0 else self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            # Blocks the batcher (and so grows the next batch) while
+            # max_in_flight requests are outstanding.
+            self.in_flight.acquire()
+            self.senders.submit(self._send, batch)
+            if stop:
+                return
+
+    def _send(self, batch):
+        try:
+            body = json.dumps({'updates': [{'idempotency_key': key, 'data': data}
+                                           for key, data, _ in batch]}).encode()
+            statuses = self._post(body, len(batch))
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e if isinstance(e, LegalCodexError) else LegalCodexError(str(e)))
+            return
+        finally:
+            self.in_flight.release()
+        for (_, _, future), status in zip(batch, statuses):
+            future.set_result(status)
+
+    def _post(self, body, count):
+        headers = {'Content-Type': 'application/json'}
+        for attempt in range(self.retries + 1):
+            try:
+                self.requests_sent += 1
+                with metrics.stage('legal_codex_request'):
+                    status, data = self.pool.request('POST', BULK_PATH, body, headers)
+            except (OSError, http.client.HTTPException) as e:
+                error = f"connection failed: {e}"
+            else:
+                if status == 200:
+                    results = json.loads(data)['results']
+                    if len(results) != count:
+                        raise LegalCodexError(f"LegalCodex answered {len(results)} of {count} updates.")
+                    return [result['status'] for result in results]
+                error = f"HTTP {status}: {data[:200].decode(errors='replace')}"
+                if status != 429 and status < 500:
+                    raise LegalCodexError(error)
+            if attempt < self.retries:
+                metrics.count('legal_codex_retries')
+                delay = min(BACKOFF_MAX, self.backoff * 2 ** attempt)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+        raise LegalCodexError(f"Giving up after {self.retries + 1} attempts: {error}")
+
+
+def client_from_env():
+    """A LegalCodexClient for $LEGAL_CODEX_URL, or None if it is not set."""
+    url = os.environ.get(URL_ENV)
+    return LegalCodexClient(url) if url else None
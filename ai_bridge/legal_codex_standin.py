@@ -0,0 +1,142 @@
+"""Local stand-in for the LegalCodex bulk update API.
+
+Run from the repository root, then point the bridge at it:
+
+    python ai_bridge/legal_codex_standin.py --port 8765 --latency-ms 5
+    LEGAL_CODEX_URL=http://127.0.0.1:8765 python ai_bridge/router.py
+
+POST /v1/updates/bulk applies each update once per idempotency key and
+answers 'applied' or 'duplicate' for each, in order. GET /v1/stats reports
+request and update counts. --latency-ms adds a fixed delay to each bulk
+request (a network round trip plus server work); --fail-rate answers that
+share of bulk requests with 503 so retries can be exercised.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge.legal_codex_client import BULK_PATH
+
+# --- Configuration ---
+HOST = '127.0.0.1'
+PORT = 8765
+STATS_PATH = '/v1/stats'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests. Headers and body go
+    # out in separate writes, so Nagle's algorithm would hold the body back
+    # for the client's delayed ACK on every reused connection.
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != STATS_PATH:
+            self._reply(404, {'error': 'not found'})
+            return
+        self._reply(200, self.server.stats())
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path != BULK_PATH:
+            self._reply(404, {'error': 'not found'})
+            return
+        try:
+            updates = json.loads(body)['updates']
+            keys = [update['idempotency_key'] for update in updates]
+        except (ValueError, KeyError, TypeError):
+            self._reply(400, {'error': 'expected {"updates": [{"idempotency_key": ..., "data": ...}]}'})
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.should_fail():
+            self._reply(503, {'error': 'unavailable'})
+            return
+        self._reply(200, {'results': self.server.apply(keys, updates)})
+
+
+class LegalCodexStandIn(ThreadingHTTPServer):
+    """In-memory LegalCodex: remembers every applied idempotency key."""
+
+    daemon_threads = True
+
+    def __init__(self, host=HOST, port=0, latency=0.0, fail_rate=0.0):
+        super().__init__((host, port), StandInHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        # Bulk requests to answer with 503 before fail_rate applies.
+        self.fail_next = 0
+        self.applied = {}  # idempotency key -> data
+        self.requests = 0
+        self.updates = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def should_fail(self):
+        with self.lock:
+            self.requests += 1
+            if self.fail_next:
+                self.fail_next -= 1
+                return True
+        return self.fail_rate > 0 and random.random() < self.fail_rate
+
+    def apply(self, keys, updates):
+        results = []
+        with self.lock:
+            for key, update in zip(keys, updates):
+                self.updates += 1
+                if key in self.applied:
+                    results.append({'idempotency_key': key, 'status': 'duplicate'})
+                else:
+                    self.applied[key] = update.get('data')
+                    results.append({'idempotency_key': key, 'status': 'applied'})
+        return results
+
+    def stats(self):
+        with self.lock:
+            return {'requests': self.requests, 'updates': self.updates, 'applied': len(self.applied)}
+
+
+def start_standin(port=0, latency=0.0, fail_rate=0.0):
+    """Serves a stand-in on a background thread; shutdown() it when done."""
+    server = LegalCodexStandIn(port=port, latency=latency, fail_rate=fail_rate)
+    threading.Thread(target=server.serve_forever, name='legal-codex-standin', daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = LegalCodexStandIn(port=args.port, latency=args.latency_ms / 1000, fail_rate=args.fail_rate)
+    print(f"LegalCodex stand-in listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStopped. {json.dumps(server.stats())}")
+    finally:
+        server.server_close()
@@ -0,0 +1,319 @@
+"""Hot-path timers, counters and profiling for the bridge and ingestion scripts.
+
+Instrumented code records into one process-wide registry:
+
+    with metrics.stage('pdf_extract'):     # latency histogram per stage
+        ...
+    metrics.count('rows_written', len(rows))
+
+and each entry point wraps its run in a session, which writes the results to
+METRICS_DIR when it ends (and, via export_if_due, periodically for daemons):
+
+    with metrics.session('ingest_csv', profile=args.profile):
+        ingest_csv_files()
+
+<script>.json holds counters and per-stage latency summaries; <script>.prom
+holds the same in Prometheus text format for a textfile scraper. With
+profile=True the run is also profiled with cProfile and tracemalloc, written
+to PROFILE_DIR.
+"""
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# --- Configuration ---
+METRICS_DIR = 'ai_bridge/logs/metrics'
+PROFILE_DIR = 'ai_bridge/logs/profiles'
+# Upper bounds, in seconds, of the stage latency histogram buckets.
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0, 30.0, 60.0)
+# How often daemons rewrite their metrics files.
+EXPORT_INTERVAL = 15.0
+# Frames kept per tracemalloc allocation, and rows in the profile reports.
+TRACE_FRAMES = 10
+REPORT_ROWS = 30
+PROMETHEUS_PREFIX = 'bridge'
+
+
+class Histogram:
+    """Counts observations into LATENCY_BUCKETS, plus their sum."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': self.sum, 'buckets': list(self.counts)}
+
+    def merge(self, data):
+        for i, count in enumerate(data['buckets']):
+            self.counts[i] += count
+        self.count += data['count']
+        self.sum += data['sum']
+
+
+class _StageTimer:
+    # A plain class rather than @contextmanager: stages wrap hot loops.
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+
+
+class Registry:
+    """Named counters and stage histograms, safe to update from threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.stages = {}
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.stages.get(name)
+            if histogram is None:
+                histogram = self.stages[name] = Histogram()
+            histogram.observe(seconds)
+
+    def stage(self, name):
+        return _StageTimer(self, name)
+
+    def snapshot(self):
+        """Plain-dict copy of everything recorded (picklable, JSON-able)."""
+        with self.lock:
+            return {'counters': dict(self.counters),
+                    'stages': {name: h.to_dict() for name, h in self.stages.items()}}
+
+    def merge(self, snapshot):
+        """Adds a snapshot taken elsewhere, e.g. in a worker process."""
+        with self.lock:
+            for name, n in snapshot['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            for name, data in snapshot['stages'].items():
+                self.stages.setdefault(name, Histogram()).merge(data)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.stages.clear()
+
+
+_registry = Registry()
+_session = None  # {'script', 'started', 'start', 'last_export', 'directory'}
+
+
+# --- Recording ---
+
+def count(name, n=1):
+    _registry.count(name, n)
+
+
+def observe(name, seconds):
+    _registry.observe(name, seconds)
+
+
+def stage(name):
+    """Context manager timing one pass through a stage."""
+    return _registry.stage(name)
+
+
+def snapshot():
+    return _registry.snapshot()
+
+
+def merge(data):
+    _registry.merge(data)
+
+
+def reset():
+    _registry.reset()
+
+
+def call_collecting(fn, *args):
+    """Runs fn(*args) in a worker process and returns (result, metrics it recorded).
+
+    The parent merge()s the metrics, so work done in process pools shows up
+    in the parent's totals.
+    """
+    # A forked or reused worker still holds earlier recordings.
+    _registry.reset()
+    result = fn(*args)
+    return result, _registry.snapshot()
+
+
+# --- Output ---
+
+def summarize(data):
+    """Counters plus count/total/mean/p50/p99 per stage (p50/p99 are bucket bounds)."""
+    stages = {}
+    for name, raw in sorted(data['stages'].items()):
+        histogram = Histogram()
+        histogram.merge(raw)
+        stages[name] = {
+            'count': histogram.count,
+            'total_seconds': round(histogram.sum, 6),
+            'mean_seconds': round(histogram.sum / histogram.count, 6) if histogram.count else None,
+            'p50_seconds': histogram.quantile(0.5),
+            'p99_seconds': histogram.quantile(0.99),
+            'buckets': dict(zip([str(b) for b in LATENCY_BUCKETS] + ['+Inf'], raw['buckets'])),
+        }
+    return {'counters': dict(sorted(data['counters'].items())), 'stages': stages}
+
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def to_prometheus(script, data):
+    """Renders a snapshot in the Prometheus text exposition format."""
+    labels = f'script="{script}"'
+    lines = []
+    for name, value in sorted(data['counters'].items()):
+        metric = f"{PROMETHEUS_PREFIX}_{_metric_name(name)}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{{{labels}}} {value}")
+    metric = f"{PROMETHEUS_PREFIX}_stage_seconds"
+    if data['stages']:
+        lines.append(f"# TYPE {metric} histogram")
+    for name, raw in sorted(data['stages'].items()):
+        stage_labels = f'{labels},stage="{_metric_name(name)}"'
+        cumulative = 0
+        for bound, n in zip(list(LATENCY_BUCKETS) + ['+Inf'], raw['buckets']):
+            cumulative += n
+            lines.append(f'{metric}_bucket{{{stage_labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{metric}_sum{{{stage_labels}}} {raw['sum']}")
+        lines.append(f"{metric}_count{{{stage_labels}}} {raw['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+def _write_atomic(path, text):
+    # Scrapers may read at any moment, so never expose a half-written file.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def export(script, directory=METRICS_DIR, started=None, elapsed=None):
+    """Writes <script>.json and <script>.prom to `directory`; returns the JSON path."""
+    os.makedirs(directory, exist_ok=True)
+    data = snapshot()
+    report = {'script': script, 'pid': os.getpid(), 'started': started,
+              'elapsed_seconds': round(elapsed, 6) if elapsed is not None else None}
+    report.update(summarize(data))
+    json_path = os.path.join(directory, f"{script}.json")
+    _write_atomic(json_path, json.dumps(report, indent=2) + '\n')
+    _write_atomic(os.path.join(directory, f"{script}.prom"), to_prometheus(script, data))
+    return json_path
+
+
+def export_if_due():
+    """Rewrites the current session's metrics if EXPORT_INTERVAL has passed.
+
+    Long-running watchers call this from a tick callback.
+    """
+    if _session is None or time.monotonic() - _session['last_export'] < EXPORT_INTERVAL:
+        return
+    _session['last_export'] = time.monotonic()
+    export(_session['script'], _session['directory'], _session['started'],
+           time.perf_counter() - _session['start'])
+
+
+# --- Profiling ---
+
+def _write_profile(script, profiler, directory):
+    import io
+    import pstats
+    import tracemalloc
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"{script}-{datetime.now().strftime('%Y%m%d%H%M%S')}")
+    profiler.dump_stats(base + '.prof')
+    memory = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    memory.dump(base + '.tracemalloc')
+
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(REPORT_ROWS)
+    report.write(f"\nPeak traced memory: {peak / 2**20:.1f} MiB\nTop allocations by line:\n")
+    for stat in memory.statistics('lineno')[:REPORT_ROWS]:
+        report.write(f"{stat}\n")
+    with open(base + '.txt', 'w') as f:
+        f.write(report.getvalue())
+    return base
+
+
+@contextmanager
+def session(script, profile=False, directory=METRICS_DIR, profile_directory=PROFILE_DIR):
+    """Records one run of an entry point and writes its metrics at the end.
+
+    With `profile`, the main thread is profiled with cProfile and
+    allocations are traced with tracemalloc; <script>-<time>.prof (for
+    pstats or snakeviz), .tracemalloc (a tracemalloc.Snapshot dump) and a
+    .txt report of both are written to `profile_directory`.
+    """
+    global _session
+    reset()
+    started = datetime.now(timezone.utc).isoformat()
+    start = time.perf_counter()
+    _session = {'script': script, 'started': started, 'start': start,
+                'last_export': time.monotonic(), 'directory': directory}
+    profiler = None
+    if profile:
+        # Imported here: pstats alone costs a no-op cron run ~25 ms at startup.
+        import cProfile
+        import tracemalloc
+        tracemalloc.start(TRACE_FRAMES)
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield _registry
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            base = _write_profile(script, profiler, profile_directory)
+            tracemalloc.stop()
+            print(f"Profile written to {base}.txt")
+        path = export(script, directory, started, time.perf_counter() - start)
+        _session = None
+        print(f"Metrics written to {path}")
+
+
+def add_arguments(parser):
+    """Adds the --profile flag every instrumented entry point accepts."""
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Profile the run with cProfile and tracemalloc (written to {PROFILE_DIR}).")
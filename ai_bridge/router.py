@@ -0,0 +1,359 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge import index_cloud_discovery, metrics, summarize_activity
+from ai_bridge.scripts import update_legal_codex
+from ai_bridge.journal import content_key
+from ai_bridge.session_log import SessionLog
+from ai_bridge.watcher import Watcher
+
+# --- Configuration ---
+TO_COMET_DIR = 'ai_bridge/to_comet'
+TO_CODEX_DIR = 'ai_bridge/to_codex'
+FROM_JULES_DIR = 'ai_bridge/from_jules'
+# Messages buffered per queue before the stage feeding it has to wait.
+QUEUE_SIZE = 1000
+# File reads in flight between the watcher and the routes.
+READERS = 8
+IO_THREADS = 8
+SESSION_LOG_BATCH = 500
+LEGAL_CODEX_BATCH = 100
+CLOUD_SUMMARY_BATCH = 100
+# How often periodic tasks, such as retrying failed LegalCodex updates, check
+# whether they are due.
+TICK_SECONDS = 1
+
+# `raw`, `digest` and `data` are only filled for directories whose routes read
+# content; `data` is the parsed JSON of `.json` files.
+BridgeMessage = namedtuple('BridgeMessage', 'path kind stat_key raw digest data')
+
+
+def load_message(event, read):
+    """Stats (and optionally reads and parses) one bridge file; runs in the thread pool."""
+    try:
+        st = os.stat(event.path)
+        raw = digest = data = None
+        if read:
+            with open(event.path, 'rb') as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            if event.path.endswith('.json'):
+                try:
+                    data = json.loads(raw)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    print(f"Error: Could not decode JSON from {event.path}")
+    except OSError as e:
+        print(f"Error reading file {event.path}: {e}")
+        return None
+    return BridgeMessage(event.path, event.kind, (st.st_size, st.st_mtime_ns, st.st_ino), raw, digest, data)
+
+
+class Route:
+    """One handler with its own bounded queue and worker tasks."""
+
+    def __init__(self, name, handler, concurrency, batch_size):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.queue = None
+        self.handled = 0
+
+
+class Router:
+    """Routes new bridge files to async handlers on one asyncio event loop.
+
+    A Watcher thread feeds file events, one batch at a time, into a bounded
+    intake queue. Reader
+    tasks load each file in the thread pool and put it on the queue of every
+    route registered for its directory. Each route drains its queue with a
+    fixed number of worker tasks, handing its handler up to `batch_size`
+    messages at a time. A full queue blocks the stage that feeds it, so a
+    slow handler throttles intake instead of buffering without limit.
+    Handlers are coroutines taking a list of BridgeMessage and should do
+    blocking work through `run_blocking`.
+    """
+
+    def __init__(self, watcher=None, queue_size=QUEUE_SIZE, readers=READERS, io_threads=IO_THREADS):
+        self.watcher = watcher or Watcher()
+        self.queue_size = queue_size
+        self.readers = readers
+        self.executor = ThreadPoolExecutor(io_threads, thread_name_prefix='bridge-io')
+        self.routes = []
+        self.directories = {}  # directory -> [(route, suffix)]
+        self.read_directories = set()
+        self.close_callbacks = []
+        self.tick_callbacks = []
+        self.loop = None
+        self.intake = None
+        self.arrivals = []
+        self.watcher.add_batch_callback(self._hand_over)
+
+    def add_route(self, name, handler, directories, suffix=None, concurrency=1, batch_size=1, read=True):
+        """Registers `handler` for new files in `directories`.
+
+        `suffix` is a string or tuple of strings filtering file names. Set
+        `read` to False for handlers that only need the path (e.g. large
+        cloud_discovery files).
+        """
+        route = Route(name, handler, concurrency, batch_size)
+        self.routes.append(route)
+        for directory in directories:
+            directory = os.path.normpath(directory)
+            if directory not in self.directories:
+                self.directories[directory] = []
+                self.watcher.add_handler(directory, self._on_event)
+            self.directories[directory].append((route, suffix))
+            if read:
+                self.read_directories.add(directory)
+        return route
+
+    def on_close(self, callback):
+        self.close_callbacks.append(callback)
+
+    def on_tick(self, callback):
+        """Runs coroutine function `callback` every TICK_SECONDS while the router runs."""
+        self.tick_callbacks.append(callback)
+
+    def run_blocking(self, fn, *args):
+        """Runs blocking I/O in the router's thread pool."""
+        return self.loop.run_in_executor(self.executor, fn, *args)
+
+    # --- Pipeline ---
+
+    def _on_event(self, event):
+        self.arrivals.append(event)  # watcher thread
+
+    def _hand_over(self):
+        """Passes the watcher's latest batch of events to the event loop.
+
+        Runs on the watcher thread once per batch and blocks while the
+        intake queue is full.
+        """
+        events, self.arrivals = self.arrivals, []
+        if events:
+            asyncio.run_coroutine_threadsafe(self._enqueue(events), self.loop).result()
+
+    async def _enqueue(self, events):
+        for event in events:
+            await self.intake.put(event)
+
+    async def _reader(self):
+        while True:
+            event = await self.intake.get()
+            try:
+                directory = os.path.dirname(event.path)
+                message = await self.run_blocking(load_message, event, directory in self.read_directories)
+                if message is not None:
+                    for route, suffix in self.directories.get(directory, []):
+                        if not suffix or event.path.endswith(suffix):
+                            await route.queue.put(message)
+            finally:
+                self.intake.task_done()
+
+    async def _worker(self, route):
+        while True:
+            batch = [await route.queue.get()]
+            while len(batch) < route.batch_size and not route.queue.empty():
+                batch.append(route.queue.get_nowait())
+            try:
+                await route.handler(batch)
+                route.handled += len(batch)
+            except Exception as e:
+                print(f"Route {route.name} error: {e}")
+            finally:
+                for _ in batch:
+                    route.queue.task_done()
+
+    async def _ticker(self):
+        while True:
+            await asyncio.sleep(TICK_SECONDS)
+            for callback in self.tick_callbacks:
+                # Shielded, so stopping the router waits for a callback that
+                # is running before the close callbacks run.
+                tick = asyncio.ensure_future(self._tick(callback))
+                try:
+                    await asyncio.shield(tick)
+                except asyncio.CancelledError:
+                    await tick
+                    raise
+
+    async def _tick(self, callback):
+        try:
+            await callback()
+        except Exception as e:
+            print(f"Tick callback error: {e}")
+
+    async def drain(self):
+        """Waits until every message read so far has been handled."""
+        await self.intake.join()
+        for route in self.routes:
+            await route.queue.join()
+
+    async def run(self, until=None):
+        """Runs until `until` (an awaitable) completes, or forever."""
+        self.loop = asyncio.get_running_loop()
+        self.intake = asyncio.Queue(self.queue_size)
+        for route in self.routes:
+            route.queue = asyncio.Queue(self.queue_size)
+        tasks = [asyncio.create_task(self._reader()) for _ in range(self.readers)]
+        for route in self.routes:
+            tasks += [asyncio.create_task(self._worker(route)) for _ in range(route.concurrency)]
+        if self.tick_callbacks:
+            tasks.append(asyncio.create_task(self._ticker()))
+        watching = self.loop.run_in_executor(None, self.watcher.run)
+        try:
+            await (until if until is not None else asyncio.shield(watching))
+        finally:
+            # Stop intake first; the pipeline keeps draining so a watcher
+            # blocked on a full queue can finish.
+            self.watcher.stop()
+            await watching
+            await self.drain()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for callback in self.close_callbacks:
+                await self.run_blocking(callback)
+            self.executor.shutdown()
+
+
+# --- Handlers ---
+
+def session_log_handler(router):
+    """Logs each new bridge message (or summary) once to the session log.
+
+    Shares summarize_activity's file manifest, so files logged here are not
+    logged again by a summarize_activity run and vice versa.
+    """
+    log = SessionLog()
+    manifest = summarize_activity.FileManifest()
+    router.on_close(manifest.close)
+
+    def log_batch(messages):
+        entries = []
+        for message in messages:
+            known = manifest.lookup(message.path)
+            if known is not None and message.digest == known[1]:
+                continue
+            manifest.update(message.path, message.stat_key, message.digest)
+            if message.path.endswith('.json'):
+                if message.data is not None:
+                    entries.append(message.data)
+            else:
+                entries.append({
+                    "type": "jules_summary",
+                    "filepath": message.path,
+                    "content": message.raw.decode(errors='ignore')[:summarize_activity.SNIPPET_CHARS],
+                })
+        log.append(entries)
+        manifest.commit()
+
+    async def handle(messages):
+        await router.run_blocking(log_batch, messages)
+    return handle
+
+
+def legal_codex_handler(router):
+    """Pushes each new to_codex response into LegalCodex exactly once.
+
+    A failed push stays in the journal. The watcher does not deliver its files
+    again, so a tick callback retries it with backoff (see RetrySchedule).
+    """
+    processed_files = update_legal_codex.get_processed_files()
+    journal = update_legal_codex.get_journal()
+    update_legal_codex.recover_journal(processed_files, journal)
+    retry = update_legal_codex.RetrySchedule(processed_files, journal)
+    # Batches and retries share the journal, so they take turns.
+    busy = asyncio.Lock()
+    router.on_close(update_legal_codex.close_client)
+    router.on_close(processed_files.close)
+    router.on_close(journal.close)
+
+    def update(messages):
+        items = []
+        for message in messages:
+            filename = os.path.basename(message.path)
+            if filename in processed_files or message.data is None:
+                continue
+            items.append((filename, message.data, content_key('legal_codex', filename, message.raw)))
+        # One journal step and one bulk request for the whole batch.
+        if items:
+            try:
+                update_legal_codex.push_many_to_legal_codex(items, processed_files, journal)
+            except Exception:
+                retry.failed()
+                raise
+
+    async def handle(messages):
+        async with busy:
+            await router.run_blocking(update, messages)
+
+    async def retry_failed():
+        async with busy:
+            await router.run_blocking(retry.run_if_due)
+
+    router.on_tick(retry_failed)
+    return handle
+
+
+def cloud_summary_handler(router):
+    """Writes a from_jules summary for each new cloud_discovery file."""
+    processed_files = index_cloud_discovery.load_state()
+    router.on_close(processed_files.close)
+
+    def summarize(messages):
+        for message in messages:
+            if message.path in processed_files:
+                continue
+            try:
+                index_cloud_discovery.summarize_file(message.path)
+                processed_files.add(message.path)
+            except IOError as e:
+                print(f"Error processing file {message.path}: {e}")
+        if processed_files.pending:
+            index_cloud_discovery.save_state(processed_files)
+
+    async def handle(messages):
+        await router.run_blocking(summarize, messages)
+    return handle
+
+
+def build_router(watcher=None):
+    """Creates a router with the bridge's standard routes."""
+    router = Router(watcher)
+    # One route (and so one writer) for everything that goes to the session log.
+    router.add_route('session_log', session_log_handler(router),
+                     [TO_COMET_DIR, TO_CODEX_DIR, FROM_JULES_DIR], suffix=('.json', '.txt'),
+                     batch_size=SESSION_LOG_BATCH)
+    router.add_route('legal_codex', legal_codex_handler(router),
+                     [TO_CODEX_DIR], suffix='.json', batch_size=LEGAL_CODEX_BATCH)
+    router.add_route('cloud_summaries', cloud_summary_handler(router),
+                     [index_cloud_discovery.FINANCIAL_DIR, index_cloud_discovery.EVIDENCE_DIR],
+                     batch_size=CLOUD_SUMMARY_BATCH, read=False)
+    return router
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the bridge router daemon.")
+    parser.add_argument('--polling', action='store_true', help="Use snapshot polling instead of inotify.")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    os.makedirs(index_cloud_discovery.OUTPUT_DIR, exist_ok=True)
+    os.makedirs("ai_bridge/logs", exist_ok=True)
+    with metrics.session('router', profile=args.profile):
+        router = build_router(Watcher(force_polling=args.polling))
+        router.watcher.add_tick_callback(metrics.export_if_due)
+        print(f"Routing bridge messages using the {router.watcher.backend.name} backend.")
+        try:
+            asyncio.run(router.run())
+        except KeyboardInterrupt:
+            print("\nRouter stopped by user.")
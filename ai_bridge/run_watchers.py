@@ -0,0 +1,38 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge import index_cloud_discovery, metrics
+from ai_bridge.scripts import update_legal_codex
+from ai_bridge.watcher import Watcher
+
+
+def run_watchers(force_polling=False):
+    """Runs the cloud discovery indexer and the LegalCodex updater on one watcher."""
+    os.makedirs(index_cloud_discovery.OUTPUT_DIR, exist_ok=True)
+    os.makedirs("ai_bridge/logs", exist_ok=True)
+
+    watcher = Watcher(force_polling=force_polling)
+    indexer = index_cloud_discovery.register(watcher)
+    codex_files, codex_journal = update_legal_codex.register(watcher)
+    watcher.add_tick_callback(metrics.export_if_due)
+    print(f"Watching for bridge activity using the {watcher.backend.name} backend.")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("\nWatchers stopped by user. Saving final state.")
+    finally:
+        indexer.close()
+        update_legal_codex.close_client()
+        codex_files.close()
+        codex_journal.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the bridge watcher daemons in one process.")
+    parser.add_argument('--polling', action='store_true', help="Use snapshot polling instead of inotify.")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    with metrics.session('run_watchers', profile=args.profile):
+        run_watchers(force_polling=args.polling)
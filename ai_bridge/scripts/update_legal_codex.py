@@ -1,51 +1,273 @@
+import argparse
 import os
+import sys
 import json
 import time
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from ai_bridge import metrics
+from ai_bridge.journal import DONE, Journal, content_key, crash_point
+from ai_bridge.state_store import ProcessedStore
+from ai_bridge.watcher import Watcher
+
 TO_CODEX_DIR = "ai_bridge/to_codex"
-PROCESSED_FILES_LOG = "ai_bridge/logs/processed_comet_files.json"
+PROCESSED_FILES_LOG = "ai_bridge/logs/processed_comet_files.sqlite"
+# JSON list of filenames used before the sqlite store; imported on first start.
+LEGACY_PROCESSED_FILES_LOG = "ai_bridge/logs/processed_comet_files.json"
+# Write-ahead journal of updates in flight (see journal.py).
+JOURNAL_FILE = "ai_bridge/logs/legal_codex.journal"
+
+# Updates that failed are retried from the journal after this many seconds,
+# doubling after each failed retry up to RETRY_MAX_SECONDS.
+RETRY_INITIAL_SECONDS = 5
+RETRY_MAX_SECONDS = 300
+
+# legal_codex_client.URL_ENV, checked here without importing the client.
+LEGAL_CODEX_URL_ENV = "LEGAL_CODEX_URL"
+
+# Created on first use from $LEGAL_CODEX_URL (see legal_codex_client.py).
+_client = None
 
 def get_processed_files():
-    if not os.path.exists(PROCESSED_FILES_LOG):
-        return set()
-    with open(PROCESSED_FILES_LOG, "r") as f:
-        return set(json.load(f))
+    return ProcessedStore(PROCESSED_FILES_LOG, legacy_path=LEGACY_PROCESSED_FILES_LOG)
 
 def save_processed_files(processed_files):
-    if not os.path.exists("ai_bridge/logs"):
-        os.makedirs("ai_bridge/logs")
-    with open(PROCESSED_FILES_LOG, "w") as f:
-        json.dump(list(processed_files), f)
+    # Only writes the filenames added since the last save.
+    processed_files.commit()
+
+def get_journal():
+    return Journal(JOURNAL_FILE)
+
+def get_client():
+    """The shared bulk client, or None while $LEGAL_CODEX_URL is unset."""
+    global _client
+    if _client is None and os.environ.get(LEGAL_CODEX_URL_ENV):
+        # Imported only when there is somewhere to send to: http.client and
+        # the thread pool are most of this script's startup time.
+        from ai_bridge.legal_codex_client import client_from_env
+        _client = client_from_env()
+    return _client
+
+def close_client():
+    """Sends any queued updates and closes the client's connections."""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+def update_legal_codex_many(updates):
+    """Sends (data, idempotency_key) pairs to LegalCodex.
+
+    With $LEGAL_CODEX_URL set they go out as bulk requests through the shared
+    client, which raises LegalCodexError if any of them could not be
+    delivered. LegalCodex ignores an update whose key it has already applied,
+    so a replayed update is harmless.
+    """
+    for data, idempotency_key in updates:
+        print(f"Updating LegalCodex with data from: {data.get('response_id')} (key {idempotency_key})")
+    metrics.count('updates_sent', len(updates))
+    client = get_client()
+    if client is None:
+        # Placeholder until LegalCodex is configured: nothing is sent.
+        print("LegalCodex update successful.")
+        return
+    with metrics.stage('legal_codex_update'):
+        statuses = client.update_many([(key, data) for data, key in updates])
+    metrics.count('updates_applied', statuses.count('applied'))
+    metrics.count('updates_duplicate', statuses.count('duplicate'))
+    print(f"LegalCodex update successful ({statuses.count('applied')} applied, "
+          f"{statuses.count('duplicate')} already applied).")
+
+def update_legal_codex(data, idempotency_key=None):
+    update_legal_codex_many([(data, idempotency_key)])
+
+def push_many_to_legal_codex(items, processed_files, journal):
+    """Updates LegalCodex with (filename, data, key) responses exactly once.
+
+    All updates not yet done are journaled as intent, sent together, then
+    journaled as done; the files are recorded as processed before their
+    journal entries are committed. Each step is one fsync for the whole
+    batch. An update already done is not sent again.
+    """
+    items = list({key: (filename, data, key) for filename, data, key in items}.values())
+    pending = [(filename, data, key) for filename, data, key in items if journal.state(key) != DONE]
+    if pending:
+        with journal.batch():
+            for filename, _, key in pending:
+                journal.intent(key, filename=filename)
+        crash_point('legal_codex.intent')
+        update_legal_codex_many([(data, key) for _, data, key in pending])
+        crash_point('legal_codex.updated')
+        with journal.batch():
+            for _, _, key in pending:
+                journal.done(key)
+        crash_point('legal_codex.done')
+    for filename, _, _ in items:
+        processed_files.add(filename)
+    save_processed_files(processed_files)
+    crash_point('legal_codex.recorded')
+    with journal.batch():
+        for _, _, key in items:
+            journal.commit(key)
+
+def push_to_legal_codex(filename, data, key, processed_files, journal):
+    """Updates LegalCodex with one response exactly once."""
+    push_many_to_legal_codex([(filename, data, key)], processed_files, journal)
 
-def update_legal_codex(data):
-    # Placeholder for LegalCodex update logic
-    print(f"Updating LegalCodex with data from: {data.get('response_id')}")
-    # In a real implementation, this would involve API calls or other interactions
-    # with the LegalCodex system.
-    print("LegalCodex update successful.")
+def recover_journal(processed_files, journal):
+    """Finishes updates a crashed run left in flight.
 
-def monitor_to_codex_directory():
+    Updates that may not have reached LegalCodex are replayed with their
+    original idempotency key; ones whose file is gone are dropped.
+    """
+    replay = []
+    for key, state, data in journal.in_flight():
+        filename = data['filename']
+        if filename in processed_files:
+            journal.commit(key)
+            continue
+        if state != DONE:
+            try:
+                with open(os.path.join(TO_CODEX_DIR, filename), "rb") as f:
+                    raw = f.read()
+            except IOError:
+                raw = None
+            if raw is None or content_key('legal_codex', filename, raw) != key:
+                print(f"Dropping interrupted LegalCodex update for {filename}: file missing or changed.")
+                journal.abort(key)
+                continue
+            data = json.loads(raw)
+        print(f"Finishing interrupted LegalCodex update for {filename}.")
+        replay.append((filename, data, key))
+    if replay:
+        push_many_to_legal_codex(replay, processed_files, journal)
+
+class RetrySchedule:
+    """Retries the updates a failed push left in the journal, with backoff.
+
+    Call failed() after a push fails and run_if_due() periodically: once the
+    wait is over it replays the journal with recover_journal(). Each failed
+    retry doubles the wait, up to RETRY_MAX_SECONDS; a successful one resets
+    it to RETRY_INITIAL_SECONDS.
+    """
+
+    def __init__(self, processed_files, journal):
+        self.processed_files = processed_files
+        self.journal = journal
+        self.at = None
+        self.delay = RETRY_INITIAL_SECONDS
+
+    def failed(self):
+        if self.at is not None:
+            return
+        print(f"Retrying failed LegalCodex updates in {self.delay} s.")
+        self.at = time.monotonic() + self.delay
+        self.delay = min(self.delay * 2, RETRY_MAX_SECONDS)
+
+    def run_if_due(self):
+        if self.at is None or time.monotonic() < self.at:
+            return
+        self.at = None
+        try:
+            recover_journal(self.processed_files, self.journal)
+        except Exception as e:
+            print(f"Retrying LegalCodex updates failed: {e}")
+            metrics.count('update_retries_failed')
+            self.failed()
+            return
+        self.delay = RETRY_INITIAL_SECONDS
+
+def process_codex_files(filepaths, processed_files, journal):
+    """Pushes to_codex responses into LegalCodex together and records them as processed.
+
+    Returns False if the push failed; the updates stay journaled for
+    recover_journal() to retry.
+    """
+    items = []
+    for filepath in filepaths:
+        filename = os.path.basename(filepath)
+        if filename in processed_files:
+            metrics.count('dedup_hits')
+            continue
+        try:
+            with open(filepath, "rb") as f:
+                raw = f.read()
+            metrics.count('files_read')
+            metrics.count('bytes_read', len(raw))
+            with metrics.stage('json_decode'):
+                data = json.loads(raw)
+            items.append((filename, data, content_key('legal_codex', filename, raw)))
+        except json.JSONDecodeError:
+            print(f"Error decoding JSON from file: {filename}")
+        except IOError as e:
+            print(f"Error reading {filename}: {e}")
+    if not items:
+        return True
+    try:
+        push_many_to_legal_codex(items, processed_files, journal)
+    except Exception as e:
+        print(f"An unexpected error occurred updating LegalCodex with {len(items)} file(s): {e}")
+        return False
+    return True
+
+def process_codex_file(filepath, processed_files, journal):
+    """Pushes one to_codex response into LegalCodex and records it as processed."""
+    process_codex_files([filepath], processed_files, journal)
+
+def register(watcher):
+    """Registers the LegalCodex updater as a handler on `watcher`.
+
+    Returns the processed-file store and journal for the caller to close.
+    Updates that fail are retried from the journal on a later tick, with
+    exponential backoff, since the watcher does not deliver their files again.
+    """
     processed_files = get_processed_files()
-    while True:
-        for filename in os.listdir(TO_CODEX_DIR):
-            if filename.endswith(".json") and filename not in processed_files:
-                filepath = os.path.join(TO_CODEX_DIR, filename)
-                try:
-                    with open(filepath, "r") as f:
-                        data = json.load(f)
-                    
-                    update_legal_codex(data)
-                    
-                    processed_files.add(filename)
-                    save_processed_files(processed_files)
-                except json.JSONDecodeError:
-                    print(f"Error decoding JSON from file: {filename}")
-                except Exception as e:
-                    print(f"An unexpected error occurred processing {filename}: {e}")
-        
-        time.sleep(10) # Check for new files every 10 seconds
+    journal = get_journal()
+    recover_journal(processed_files, journal)
+    # Files from one round of events are sent to LegalCodex together.
+    arrived = []
+    retry = RetrySchedule(processed_files, journal)
+
+    def flush():
+        paths = list(dict.fromkeys(arrived))
+        arrived.clear()
+        if not process_codex_files(paths, processed_files, journal):
+            retry.failed()
+
+    watcher.add_handler(TO_CODEX_DIR, lambda event: arrived.append(event.path), suffix=".json")
+    watcher.add_batch_callback(flush)
+    watcher.add_tick_callback(retry.run_if_due)
+    return processed_files, journal
+
+def monitor_to_codex_directory(watcher=None):
+    watcher = watcher or Watcher()
+    processed_files, journal = register(watcher)
+    watcher.add_tick_callback(metrics.export_if_due)
+    try:
+        watcher.run()
+    finally:
+        close_client()
+        processed_files.close()
+        journal.close()
+
+def update_once(watcher=None):
+    """Pushes the responses that arrived since the last run, then returns."""
+    watcher = watcher or Watcher(force_polling=True)
+    processed_files, journal = register(watcher)
+    try:
+        watcher.scan_existing()
+    finally:
+        close_client()
+        processed_files.close()
+        journal.close()
+        watcher.backend.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Push to_codex responses into LegalCodex as they arrive.")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
     if not os.path.exists("ai_bridge/logs"):
         os.makedirs("ai_bridge/logs")
-    monitor_to_codex_directory()
+    with metrics.session("update_legal_codex", profile=args.profile):
+        monitor_to_codex_directory()
@@ -0,0 +1,231 @@
+import argparse
+import gzip
+import io
+import json
+import os
+import shutil
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# --- Configuration ---
+LOG_DIR = 'ai_bridge/logs/session'
+LEGACY_LOG_FILE = 'ai_bridge/logs/session.json'
+MANIFEST_FILE = 'manifest.json'
+# The active segment is closed (and compressed) once it grows past this size.
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+# Compression for closed segments: 'zstd' (needs the zstandard package), 'gzip' or None.
+COMPRESSION = 'gzip'
+COMPRESSED_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+PARTICIPANTS = ["codex", "comet", "jules"]
+
+
+def _fsync_write(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SessionLog:
+    """Append-only session history stored as JSONL segments plus a manifest.
+
+    Messages are appended to the active segment of the latest session, so a
+    write costs O(new messages) however long the history is. The manifest
+    lists the sessions and their segments, with the committed byte size of
+    the active one; anything past it (an interrupted append) is truncated on
+    open. Closed segments are compressed. `sessions()` and `export()` still
+    produce the old `session.json` view.
+    """
+
+    def __init__(self, log_dir=LOG_DIR, segment_max_bytes=SEGMENT_MAX_BYTES,
+                 compression=COMPRESSION, legacy_path=LEGACY_LOG_FILE):
+        if compression == 'zstd' and zstandard is None:
+            print("Warning: zstandard is not installed. Compressing session log segments with gzip.")
+            compression = 'gzip'
+        self.log_dir = log_dir
+        self.segment_max_bytes = segment_max_bytes
+        self.compression = compression
+        os.makedirs(log_dir, exist_ok=True)
+        self.manifest = self._load_manifest()
+        if self.manifest is None:
+            self.manifest = {'sessions': [], 'segments': []}
+            if legacy_path and os.path.exists(legacy_path) and os.path.getsize(legacy_path) > 0:
+                self.migrate_legacy(legacy_path)
+            self._save_manifest()
+        self._recover()
+
+    # --- Manifest ---
+
+    def _path(self, filename):
+        return os.path.join(self.log_dir, filename)
+
+    def _load_manifest(self):
+        try:
+            with open(self._path(MANIFEST_FILE), 'r') as f:
+                return json.load(f)
+        except (IOError, json.JSONDecodeError):
+            return None
+
+    def _save_manifest(self):
+        _fsync_write(self._path(MANIFEST_FILE), json.dumps(self.manifest, indent=2) + '\n')
+
+    def _recover(self):
+        """Drops uncommitted appends and leftovers of an interrupted rotation."""
+        for segment in self.manifest['segments']:
+            raw_path = self._path(segment['raw_file'])
+            if segment['closed']:
+                if segment['file'] != segment['raw_file'] and os.path.exists(raw_path):
+                    os.remove(raw_path)
+            elif os.path.exists(raw_path):
+                with open(raw_path, 'ab') as f:
+                    f.truncate(segment['bytes'])
+
+    # --- Writing ---
+
+    def start_session(self, session_id=None, created=None, participants=None):
+        """Begins a new session; later appends go to it."""
+        now = datetime.now()
+        session = {
+            "session_id": session_id or f"session-{now.strftime('%Y%m%d%H%M%S')}",
+            "created": created or now.isoformat(),
+            "participants": participants or list(PARTICIPANTS),
+            "status": "active",
+        }
+        active = self._active_segment()
+        if active is not None:
+            self._close_segment(active)
+        self.manifest['sessions'].append(session)
+        self._save_manifest()
+        return session
+
+    def append(self, messages):
+        """Appends messages to the latest session, creating one if there is none."""
+        if not messages:
+            return
+        if not self.manifest['sessions']:
+            self.start_session()
+        session_id = self.manifest['sessions'][-1]['session_id']
+        lines = [(json.dumps(message) + '\n').encode() for message in messages]
+        start = 0
+        while start < len(lines):
+            segment = self._active_segment() or self._open_segment(session_id)
+            # Fill the segment up to the size limit (always at least one line).
+            stop = start + 1
+            size = segment['bytes'] + len(lines[start])
+            while stop < len(lines) and size + len(lines[stop]) <= self.segment_max_bytes:
+                size += len(lines[stop])
+                stop += 1
+            with open(self._path(segment['raw_file']), 'ab') as f:
+                f.write(b''.join(lines[start:stop]))
+                f.flush()
+                os.fsync(f.fileno())
+            segment['bytes'] = size
+            segment['messages'] += stop - start
+            start = stop
+            if size >= self.segment_max_bytes:
+                self._close_segment(segment)
+            else:
+                self._save_manifest()
+
+    def _active_segment(self):
+        segments = self.manifest['segments']
+        if segments and not segments[-1]['closed']:
+            return segments[-1]
+        return None
+
+    def _open_segment(self, session_id):
+        name = f"segment-{len(self.manifest['segments']) + 1:06d}.jsonl"
+        segment = {'file': name, 'raw_file': name, 'session_id': session_id,
+                   'messages': 0, 'bytes': 0, 'closed': False, 'compression': None}
+        self.manifest['segments'].append(segment)
+        open(self._path(name), 'wb').close()  # discard an uncommitted leftover
+        return segment
+
+    def _close_segment(self, segment):
+        """Marks the segment read-only and compresses it."""
+        raw_path = self._path(segment['raw_file'])
+        if self.compression:
+            compressed = segment['raw_file'] + COMPRESSED_SUFFIXES[self.compression]
+            tmp_path = self._path(compressed) + '.tmp'
+            with open(raw_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                if self.compression == 'zstd':
+                    zstandard.ZstdCompressor().copy_stream(src, dst)
+                else:
+                    with gzip.GzipFile(fileobj=dst, mode='wb') as gz:
+                        shutil.copyfileobj(src, gz)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp_path, self._path(compressed))
+            segment['file'] = compressed
+            segment['compression'] = self.compression
+        segment['closed'] = True
+        self._save_manifest()
+        if segment['file'] != segment['raw_file']:
+            os.remove(raw_path)
+
+    # --- Reading ---
+
+    def _open_for_reading(self, segment):
+        path = self._path(segment['file'])
+        if segment['compression'] == 'gzip':
+            return gzip.open(path, 'rt')
+        if segment['compression'] == 'zstd':
+            if zstandard is None:
+                raise RuntimeError(f"zstandard is required to read {path}")
+            return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb')))
+        return open(path, 'r')
+
+    def iter_messages(self, session_id=None):
+        """Yields committed messages in order, optionally for one session only."""
+        for segment in self.manifest['segments']:
+            if session_id is not None and segment['session_id'] != session_id:
+                continue
+            with self._open_for_reading(segment) as f:
+                for _, line in zip(range(segment['messages']), f):
+                    yield json.loads(line)
+
+    def sessions(self):
+        """Materializes the legacy `session.json` structure."""
+        sessions = []
+        for session in self.manifest['sessions']:
+            view = {key: session[key] for key in ('session_id', 'created', 'participants')}
+            view['messages'] = list(self.iter_messages(session['session_id']))
+            view['status'] = session['status']
+            sessions.append(view)
+        return sessions
+
+    def export(self, path=LEGACY_LOG_FILE):
+        _fsync_write(path, json.dumps(self.sessions(), indent=2) + '\n')
+
+    def migrate_legacy(self, path=LEGACY_LOG_FILE):
+        """Imports the sessions of an old `session.json` file."""
+        with open(path, 'r') as f:
+            sessions = json.load(f)
+        for session in sessions:
+            self.start_session(session.get('session_id'), session.get('created'), session.get('participants'))
+            self.manifest['sessions'][-1]['status'] = session.get('status', 'active')
+            self.append(session.get('messages', []))
+        print(f"Migrated {len(sessions)} session(s) from {path} to {self.log_dir}.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect the segmented session log.")
+    parser.add_argument('--export', metavar='PATH', nargs='?', const=LEGACY_LOG_FILE,
+                        help=f"Write the legacy session.json view (default: {LEGACY_LOG_FILE}).")
+    args = parser.parse_args()
+
+    log = SessionLog()
+    if args.export:
+        log.export(args.export)
+        print(f"Exported {len(log.manifest['sessions'])} session(s) to {args.export}.")
+    else:
+        for session in log.manifest['sessions']:
+            segments = [s for s in log.manifest['segments'] if s['session_id'] == session['session_id']]
+            print(f"{session['session_id']}: {sum(s['messages'] for s in segments)} message(s) "
+                  f"in {len(segments)} segment(s)")
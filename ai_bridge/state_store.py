@@ -0,0 +1,71 @@
+import json
+import os
+import sqlite3
+
+
+class ProcessedStore:
+    """Persistent set of processed keys (file paths or names) for the bridge daemons.
+
+    Replaces the JSON lists the daemons used to load into a Python set and
+    rewrite in full on every save. Keys live in a sqlite table (WAL mode), so
+    membership is an indexed lookup, `commit` only writes the keys added since
+    the last commit, and memory does not grow with the number of keys.
+    Behaves like a set for `in`, `add` and `len`.
+    """
+
+    def __init__(self, path, legacy_path=None):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        # The router uses stores from its thread pool, one call at a time.
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS processed (key TEXT PRIMARY KEY) WITHOUT ROWID')
+        self.conn.commit()
+        self.pending = set()
+        if legacy_path and os.path.exists(legacy_path):
+            self.migrate_legacy(legacy_path)
+
+    def _stored(self, key):
+        return self.conn.execute('SELECT 1 FROM processed WHERE key = ?', (key,)).fetchone() is not None
+
+    def __contains__(self, key):
+        return key in self.pending or self._stored(key)
+
+    def __len__(self):
+        stored = self.conn.execute('SELECT COUNT(*) FROM processed').fetchone()[0]
+        return stored + sum(1 for key in self.pending if not self._stored(key))
+
+    def __iter__(self):
+        self.commit()
+        for (key,) in self.conn.execute('SELECT key FROM processed'):
+            yield key
+
+    def add(self, key):
+        self.pending.add(key)
+
+    def commit(self):
+        """Persists the keys added since the last commit."""
+        if not self.pending:
+            return
+        with self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO processed (key) VALUES (?)',
+                                  [(key,) for key in self.pending])
+        self.pending.clear()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def migrate_legacy(self, legacy_path):
+        """Imports a JSON list of keys written by the old state files, then retires it."""
+        try:
+            with open(legacy_path, 'r') as f:
+                keys = json.load(f)
+        except (IOError, json.JSONDecodeError):
+            print(f"Warning: Could not load legacy state file {legacy_path}. Skipping migration.")
+            return
+        self.pending.update(keys)
+        self.commit()
+        os.replace(legacy_path, legacy_path + '.migrated')
+        print(f"Migrated {len(keys)} processed file(s) from {legacy_path} to {self.path}.")
@@ -1,121 +1,320 @@
-
+import argparse
 import os
+import sys
 import json
-from datetime import datetime
+import hashlib
+import sqlite3
+import zlib
 
-def summarize_activity():
-    # Directories to scan
-    to_comet_dir = 'ai_bridge/to_comet'
-    to_codex_dir = 'ai_bridge/to_codex'
-    cloud_discovery_dir = 'cloud_discovery'
-    log_file = 'ai_bridge/logs/session.json'
-    state_file = 'ai_bridge/logs/summarize_activity.state'
-
-    # --- State Management ---
-    last_run_timestamp = 0
-    if os.path.exists(state_file):
-        with open(state_file, 'r') as f:
-            try:
-                last_run_timestamp = float(f.read())
-            except (ValueError, TypeError):
-                print(f"Warning: Invalid state file content. Reprocessing all files.")
-                last_run_timestamp = 0
-
-    current_run_timestamp = datetime.now().timestamp()
-
-    # --- Collect New Messages ---
-    new_messages = []
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge import metrics
+from ai_bridge.session_log import SessionLog
+
+# --- Configuration ---
+TO_COMET_DIR = 'ai_bridge/to_comet'
+TO_CODEX_DIR = 'ai_bridge/to_codex'
+CLOUD_DISCOVERY_DIR = 'cloud_discovery'
+# Per-file state: path -> size, mtime_ns, inode, sha256.
+MANIFEST_FILE = 'ai_bridge/logs/summarize_activity.manifest.sqlite'
+# Single last-run timestamp used before the manifest existed.
+LEGACY_STATE_FILE = 'ai_bridge/logs/summarize_activity.state'
+SNIPPET_CHARS = 5000
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+# --- State Management ---
+
+class FileManifest:
+    """Per-file state of the scanned trees, kept in sqlite.
+
+    Rows are clustered by directory, so a scan reads the stored state of one
+    directory at a time (`directory_state`) instead of loading the whole
+    manifest up front, and `commit` writes just the rows that were updated
+    or removed. Each directory also has a fingerprint of its last listing
+    (see directory_fingerprint), so an unchanged directory needs no rows
+    read at all.
+    """
+
+    def __init__(self, path=MANIFEST_FILE):
+        self.created = not os.path.exists(path)
+        # The router uses the manifest from its thread pool, one call at a time.
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'directory TEXT, name TEXT, size INTEGER, mtime_ns INTEGER, inode INTEGER, sha256 BLOB, '
+            'PRIMARY KEY (directory, name)) WITHOUT ROWID')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS directories (directory TEXT PRIMARY KEY, fingerprint TEXT) WITHOUT ROWID')
+        self._migrate()
+        self.conn.commit()
+        self.updates = {}
+        self.removed = []
+        self.fingerprints = {}
+
+    def _migrate(self):
+        """Moves rows of the first manifest format, keyed by full path, into `entries`."""
+        if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'files'").fetchone():
+            return
+        self.conn.create_function('dirname', 1, os.path.dirname)
+        self.conn.create_function('basename', 1, os.path.basename)
+        self.conn.execute('INSERT OR REPLACE INTO entries SELECT dirname(path), basename(path), '
+                          'size, mtime_ns, inode, sha256 FROM files')
+        self.conn.execute('DROP TABLE files')
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def directory_state(self, directory):
+        """Returns {name: (size, mtime_ns, inode, sha256 bytes)} for one directory."""
+        return {row[0]: row[1:] for row in self.conn.execute(
+            'SELECT name, size, mtime_ns, inode, sha256 FROM entries WHERE directory = ?', (directory,))}
+
+    def directories(self):
+        """Yields every directory with manifest rows, seeking from one to the next."""
+        directory = self.conn.execute('SELECT MIN(directory) FROM entries').fetchone()[0]
+        while directory is not None:
+            yield directory
+            directory = self.conn.execute(
+                'SELECT MIN(directory) FROM entries WHERE directory > ?', (directory,)).fetchone()[0]
+
+    def fingerprint(self, directory):
+        row = self.conn.execute('SELECT fingerprint FROM directories WHERE directory = ?', (directory,)).fetchone()
+        return row[0] if row else None
+
+    def set_fingerprint(self, directory, fingerprint):
+        """Records a directory's listing fingerprint; None forgets it."""
+        self.fingerprints[directory] = fingerprint
+
+    def lookup(self, path):
+        """Returns the stored ((size, mtime_ns, inode), sha256) of one file, or None."""
+        row = self.conn.execute(
+            'SELECT size, mtime_ns, inode, sha256 FROM entries WHERE directory = ? AND name = ?',
+            os.path.split(path)).fetchone()
+        return (row[:3], row[3].hex()) if row else None
+
+    def digest(self, path):
+        known = self.lookup(path)
+        return known[1] if known else None
+
+    def update(self, path, stat_key, digest):
+        key = os.path.split(path)
+        self.updates[key] = key + stat_key + (bytes.fromhex(digest),)
+
+    def remove(self, path):
+        key = os.path.split(path)
+        self.updates.pop(key, None)
+        self.removed.append(key)
+
+    def commit(self):
+        with self.conn:
+            self.conn.executemany('DELETE FROM entries WHERE directory = ? AND name = ?', self.removed)
+            self.conn.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                                  self.updates.values())
+            self.conn.executemany('DELETE FROM directories WHERE directory = ?',
+                                  [(d,) for d, fingerprint in self.fingerprints.items() if fingerprint is None])
+            self.conn.executemany('INSERT OR REPLACE INTO directories VALUES (?, ?)',
+                                  [item for item in self.fingerprints.items() if item[1] is not None])
+        self.updates.clear()
+        self.removed.clear()
+        self.fingerprints.clear()
+
+    def close(self):
+        self.conn.close()
+
+
+def load_legacy_timestamp():
+    """Returns the last run time recorded by the old state file, or 0."""
+    try:
+        with open(LEGACY_STATE_FILE, 'r') as f:
+            return float(f.read())
+    except (IOError, ValueError):
+        return 0
+
+
+# --- Scanning ---
 
-    def scan_directory(directory_path):
-        """Scans a directory for new JSON files and adds them to new_messages."""
+def scan_directory(directory_path, suffix=None):
+    """Returns ([(name, stat)], [subdirectory path]) for one directory, one stat per file.
+
+    Returns None if the directory cannot be read.
+    """
+    try:
+        entries = list(os.scandir(directory_path))
+    except OSError as e:
+        print(f"Error accessing directory {directory_path}: {e}")
+        return None
+    files = []
+    directories = []
+    for entry in entries:
         try:
-            if not os.path.exists(directory_path):
-                print(f"Warning: Directory not found: {directory_path}")
-                return
-            for filename in os.listdir(directory_path):
-                filepath = os.path.join(directory_path, filename)
-                if filename.endswith('.json') and os.path.getmtime(filepath) > last_run_timestamp:
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(entry.path)
+            elif entry.is_file() and (suffix is None or entry.name.endswith(suffix)):
+                files.append((entry.name, entry.stat()))
+        except OSError as e:
+            print(f"Error reading file {entry.path}: {e}")
+    return files, directories
+
+
+def directory_fingerprint(files):
+    """A summary of a directory listing from scan_directory.
+
+    It changes whenever a file is created, deleted or renamed, or its size,
+    mtime or inode changes. Per-file hashes are summed, so it takes one pass
+    and no sorting; ints hash the same in every process.
+    """
+    crc32 = zlib.crc32
+    return repr((len(files), sum(hash((crc32(os.fsencode(name)), st.st_size, st.st_mtime_ns, st.st_ino))
+                                 for name, st in files)))
+
+
+def read_and_hash(filepath, keep_bytes=None):
+    """Returns (sha256 hex digest, leading bytes) of a file, reading it once.
+
+    Keeps the whole content if `keep_bytes` is None.
+    """
+    digest = hashlib.sha256()
+    kept = []
+    kept_size = 0
+    with metrics.stage('hash_file'), open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            metrics.count('bytes_read', len(chunk))
+            digest.update(chunk)
+            if keep_bytes is None or kept_size < keep_bytes:
+                kept.append(chunk)
+                kept_size += len(chunk)
+    return digest.hexdigest(), b''.join(kept)
+
+
+def collect_changes(manifest, baseline_timestamp=0):
+    """Compares the bridge and cloud_discovery trees against `manifest`.
+
+    Each directory is listed once. If its fingerprint matches the one
+    recorded, nothing in it changed; otherwise it is compared with its
+    manifest rows, and files whose size, mtime and inode match are skipped
+    without being opened.
+    Others are hashed and only logged if their content actually changed;
+    files that vanished are logged as deletions. Files not modified since
+    `baseline_timestamp` (the legacy last-run time) are only recorded.
+    Returns the new messages; call `manifest.commit()` to persist.
+    """
+    new_messages = []
+    deleted = []
+    visited = set()
+    scanned_roots = []
+    scanned = stat_hits = files_read = dedup_hits = 0
+    roots = [(TO_COMET_DIR, '.json', False), (TO_CODEX_DIR, '.json', False), (CLOUD_DISCOVERY_DIR, None, True)]
+    for directory_path, suffix, recursive in roots:
+        if not os.path.exists(directory_path):
+            print(f"Warning: Directory not found: {directory_path}")
+            continue
+        scanned_roots.append((directory_path, recursive))
+        is_message_dir = suffix is not None
+        pending = [directory_path]
+        while pending:
+            current = pending.pop()
+            # An unreadable directory counts as visited, so its files are not taken as deleted.
+            visited.add(current)
+            listing = scan_directory(current, suffix)
+            if listing is None:
+                continue
+            files, directories = listing
+            if recursive:
+                pending.extend(directories)
+            scanned += len(files)
+            fingerprint = directory_fingerprint(files)
+            if fingerprint == manifest.fingerprint(current):
+                stat_hits += len(files)
+                continue
+            known_files = manifest.directory_state(current)
+            complete = True
+            for name, st in files:
+                known = known_files.pop(name, None)
+                stat_key = (st.st_size, st.st_mtime_ns, st.st_ino)
+                if known is not None and known[:3] == stat_key:
+                    stat_hits += 1
+                    continue
+                filepath = os.path.join(current, name)
+                try:
+                    # Cloud discovery files only need enough bytes for the snippet.
+                    digest, data = read_and_hash(filepath, None if is_message_dir else SNIPPET_CHARS * 4)
+                except IOError as e:
+                    print(f"Error reading file {filepath}: {e}")
+                    complete = False
+                    continue
+                manifest.update(filepath, stat_key, digest)
+                files_read += 1
+                if known is not None and known[3].hex() == digest:
+                    dedup_hits += 1
+                    continue  # Touched, not changed
+                if known is None and st.st_mtime <= baseline_timestamp:
+                    continue  # Logged by a run that predates the manifest
+                if is_message_dir:
                     try:
-                        with open(filepath, 'r') as f:
-                            new_messages.append(json.load(f))
-                    except json.JSONDecodeError:
+                        with metrics.stage('json_decode'):
+                            new_messages.append(json.loads(data))
+                    except (json.JSONDecodeError, UnicodeDecodeError):
                         print(f"Error: Could not decode JSON from {filepath}")
-                    except IOError as e:
-                        print(f"Error reading file {filepath}: {e}")
-        except OSError as e:
-            print(f"Error accessing directory {directory_path}: {e}")
+                else:
+                    new_messages.append({
+                        "type": "cloud_discovery_file",
+                        "filepath": filepath,
+                        "change": "created" if known is None else "modified",
+                        "content": data.decode(errors='ignore')[:SNIPPET_CHARS],
+                    })
+            # Rows left over are files this listing no longer has.
+            deleted.extend(os.path.join(current, name) for name in known_files)
+            # Only once the rows match the listing; an unreadable file is retried next run.
+            manifest.set_fingerprint(current, fingerprint if complete and files else None)
 
-    def scan_cloud_discovery(directory_path):
-        """Recursively scans cloud_discovery for new files."""
-        try:
-            if not os.path.exists(directory_path):
-                print(f"Warning: Directory not found: {directory_path}")
-                return
-            for root, _, files in os.walk(directory_path):
-                for filename in files:
-                    filepath = os.path.join(root, filename)
-                    if os.path.getmtime(filepath) > last_run_timestamp:
-                        try:
-                            with open(filepath, 'r', errors='ignore') as f:
-                                new_messages.append({
-                                    "type": "cloud_discovery_file",
-                                    "filepath": filepath,
-                                    "content": f.read(5000)  # Read up to 5000 chars
-                                })
-                        except IOError as e:
-                            print(f"Error reading file {filepath}: {e}")
-        except OSError as e:
-            print(f"Error accessing directory {directory_path}: {e}")
+    # Whole directories that vanished from under a scanned root.
+    for directory in manifest.directories():
+        if directory in visited:
+            continue
+        for root, recursive in scanned_roots:
+            if directory == root or (recursive and directory.startswith(os.path.join(root, ''))):
+                deleted.extend(os.path.join(directory, name) for name in manifest.directory_state(directory))
+                manifest.set_fingerprint(directory, None)
+                break
 
-    scan_directory(to_comet_dir)
-    scan_directory(to_codex_dir)
-    scan_cloud_discovery(cloud_discovery_dir)
+    for filepath in sorted(deleted):
+        manifest.remove(filepath)
+        new_messages.append({"type": "file_deleted", "filepath": filepath})
+    metrics.count('files_scanned', scanned)
+    metrics.count('stat_hits', stat_hits)
+    metrics.count('files_read', files_read)
+    metrics.count('dedup_hits', dedup_hits)
+    return new_messages
 
-    # --- Update Log File ---
-    if not new_messages:
-        print("No new activity found.")
-        # Update state file even if no new messages to avoid reprocessing
-        with open(state_file, 'w') as f:
-            f.write(str(current_run_timestamp))
-        return
 
+def summarize_activity():
+    manifest = FileManifest()
+    baseline_timestamp = load_legacy_timestamp() if manifest.created else 0
+    with metrics.stage('collect_changes'):
+        new_messages = collect_changes(manifest, baseline_timestamp)
+
+    # --- Update Log File ---
     try:
-        if not os.path.exists(log_file) or os.path.getsize(log_file) == 0:
-            sessions = [{
-                "session_id": f"session-{datetime.now().strftime('%Y%m%d%H%M%S')}",
-                "created": datetime.now().isoformat(),
-                "participants": ["codex", "comet", "jules"],
-                "messages": new_messages,
-                "status": "active"
-            }]
+        if new_messages:
+            # Appends to the latest session in the segmented log (see session_log.py);
+            # the cost no longer grows with the length of the history.
+            with metrics.stage('session_log_append'):
+                SessionLog().append(new_messages)
+            print(f"Successfully processed {len(new_messages)} new item(s).")
         else:
-            with open(log_file, 'r') as f:
-                sessions = json.load(f)
-            # Append to the latest session
-            if sessions:
-                sessions[-1]['messages'].extend(new_messages)
-            else: # If the file exists but is empty or contains an empty list
-                 sessions = [{
-                    "session_id": f"session-{datetime.now().strftime('%Y%m%d%H%M%S')}",
-                    "created": datetime.now().isoformat(),
-                    "participants": ["codex", "comet", "jules"],
-                    "messages": new_messages,
-                    "status": "active"
-                }]
-
-        with open(log_file, 'w') as f:
-            json.dump(sessions, f, indent=2)
-            f.write('\n') # Add trailing newline
-
-        # --- Update State File ---
-        with open(state_file, 'w') as f:
-            f.write(str(current_run_timestamp))
-
-        print(f"Successfully processed {len(new_messages)} new item(s).")
-
-    except (IOError, json.JSONDecodeError) as e:
-        print(f"Error updating log file {log_file}: {e}")
+            print("No new activity found.")
+        # Also records touched-but-unchanged files so they are not rehashed next time
+        manifest.commit()
+    except IOError as e:
+        print(f"Error updating session log: {e}")
+    finally:
+        manifest.close()
 
 
 if __name__ == '__main__':
-    summarize_activity()
+    parser = argparse.ArgumentParser(description="Log new bridge and cloud_discovery activity to the session log.")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    with metrics.session('summarize_activity', profile=args.profile):
+        summarize_activity()
@@ -0,0 +1,71 @@
+import unittest
+import os
+import hashlib
+import shutil
+import tempfile
+from ai_bridge import index_cloud_discovery
+from ai_bridge.index_cloud_discovery import CloudIndexer, describe_file
+from ai_bridge.state_store import ProcessedStore
+from ai_bridge.watcher import CREATED, FileEvent
+
+class TestIndexCloudDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.original = (index_cloud_discovery.OUTPUT_DIR, index_cloud_discovery.LARGE_FILE_BYTES)
+        index_cloud_discovery.OUTPUT_DIR = os.path.join(self.tmp_dir, 'from_jules')
+        os.makedirs(index_cloud_discovery.OUTPUT_DIR)
+
+    def tearDown(self):
+        index_cloud_discovery.OUTPUT_DIR, index_cloud_discovery.LARGE_FILE_BYTES = self.original
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_describes_text_and_binary_files(self):
+        data = ''.join(f"row {i}, café\n" for i in range(5000)).encode()
+        path = self.write('dump.log', data)
+        info = describe_file(path)
+        self.assertEqual(info['size'], len(data))
+        self.assertEqual(info['sha256'], hashlib.sha256(data).hexdigest())
+        self.assertEqual(info['lines'], 5000)
+        self.assertFalse(info['binary'])
+        self.assertTrue(info['head'].startswith("row 0, café\n"))
+        self.assertTrue(info['tail'].endswith("row 4999, café\n"))
+
+        # The mmap path for large files gives the same description.
+        index_cloud_discovery.LARGE_FILE_BYTES = 1024
+        self.assertEqual(describe_file(path), info)
+
+        short = describe_file(self.write('note', b'no newline'))
+        self.assertEqual((short['lines'], short['head'], short['tail'], short['mime_type']),
+                         (1, 'no newline', None, 'text/plain'))
+
+        binary = describe_file(self.write('scan', b'%PDF-1.4\n' + bytes(range(256)) * 50))
+        self.assertTrue(binary['binary'])
+        self.assertEqual(binary['mime_type'], 'application/pdf')
+        self.assertIsNone(binary['head'])
+
+    def test_large_files_are_summarized_in_the_background(self):
+        index_cloud_discovery.LARGE_FILE_BYTES = 1024
+        small = self.write('small.txt', b'hello\n')
+        large = self.write('large.txt', b'x' * 4096)
+        indexer = CloudIndexer(ProcessedStore(os.path.join(self.tmp_dir, 'state.sqlite')))
+        indexer.handle(FileEvent(CREATED, small))
+        indexer.handle(FileEvent(CREATED, large))
+        self.assertIn(small, indexer.processed_files)
+        self.assertIn(large, indexer.in_flight)
+        indexer.handle(FileEvent(CREATED, large))  # Not submitted twice.
+
+        indexer.close()
+        store = ProcessedStore(os.path.join(self.tmp_dir, 'state.sqlite'))
+        self.assertEqual(sorted(store), [large, small])
+        store.close()
+        self.assertEqual(len(os.listdir(index_cloud_discovery.OUTPUT_DIR)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
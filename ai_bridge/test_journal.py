@@ -0,0 +1,116 @@
+import unittest
+import os
+import re
+import sys
+import json
+import shutil
+import subprocess
+import tempfile
+from ai_bridge.journal import DONE, INTENT, Journal, content_key, file_digest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Processes every to_codex file in a scratch tree in a fresh process, so a
+# crash point can kill it outright.
+RUN_UPDATER = '''
+import os, sys
+from ai_bridge.scripts import update_legal_codex as u
+root = sys.argv[1]
+u.TO_CODEX_DIR = os.path.join(root, 'to_codex')
+u.PROCESSED_FILES_LOG = os.path.join(root, 'processed.sqlite')
+u.LEGACY_PROCESSED_FILES_LOG = os.path.join(root, 'processed.json')
+u.JOURNAL_FILE = os.path.join(root, 'legal_codex.journal')
+processed_files, journal = u.get_processed_files(), u.get_journal()
+u.recover_journal(processed_files, journal)
+for name in sorted(os.listdir(u.TO_CODEX_DIR)):
+    u.process_codex_file(os.path.join(u.TO_CODEX_DIR, name), processed_files, journal)
+'''
+
+CRASH_POINTS = ['legal_codex.intent', 'legal_codex.updated', 'legal_codex.done', 'legal_codex.recorded']
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'test.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_in_flight_survives_reopen_and_torn_tail(self):
+        journal = Journal(self.path)
+        journal.intent('a', source='a.csv')
+        journal.intent('b', source='b.csv')
+        journal.done('a', rows=2)
+        journal.intent('c')
+        journal.commit('c')
+        journal.close()
+        with open(self.path, 'ab') as f:
+            f.write(b'{"key": "b", "sta')
+
+        journal = Journal(self.path, compact_bytes=0)
+        self.assertEqual(journal.in_flight(), [('a', DONE, {'source': 'a.csv', 'rows': 2}),
+                                               ('b', INTENT, {'source': 'b.csv'})])
+        journal.abort('b')
+        journal.close()
+        self.assertEqual(Journal(self.path).in_flight(), [('a', DONE, {'source': 'a.csv', 'rows': 2})])
+
+    def test_a_long_running_journal_compacts_itself(self):
+        journal = Journal(self.path, compact_bytes=4096)
+        for n in range(1000):
+            journal.intent(f"item-{n}", source=f"{n}.json")
+            if n % 100:
+                journal.commit(f"item-{n}")
+            self.assertLess(os.path.getsize(self.path), 4096 + 1024)
+        with journal.batch():
+            for n in range(1000, 1100):
+                journal.intent(f"item-{n}")
+                journal.commit(f"item-{n}")
+        self.assertLess(os.path.getsize(self.path), 4096)
+        journal.close()
+        self.assertEqual([key for key, _, _ in Journal(self.path).in_flight()],
+                         [f"item-{n}" for n in range(0, 1000, 100)])
+
+    def test_keys_from_a_chunked_digest_match_keys_from_the_content(self):
+        path = os.path.join(self.tmp_dir, 'statement.csv')
+        data = b'Date,Amount\n' + b'2024-01-02,1.00\n' * 200000
+        with open(path, 'wb') as f:
+            f.write(data)
+        self.assertEqual(content_key('statement', 'statement.csv', digest=file_digest(path)),
+                         content_key('statement', 'statement.csv', data))
+
+    def run_updater(self, root, crash_at=None):
+        env = dict(os.environ)
+        env.pop('BRIDGE_CRASH_AT', None)
+        if crash_at:
+            env['BRIDGE_CRASH_AT'] = crash_at
+        result = subprocess.run([sys.executable, '-c', RUN_UPDATER, root], cwd=REPO_ROOT, env=env,
+                                capture_output=True, text=True)
+        return result.returncode, re.findall(r'\(key (\S+)\)', result.stdout)
+
+    def test_legal_codex_crash_at_every_step_updates_each_file_once(self):
+        for point in CRASH_POINTS:
+            with self.subTest(point=point):
+                root = os.path.join(self.tmp_dir, point)
+                os.makedirs(os.path.join(root, 'to_codex'))
+                for n in range(3):
+                    with open(os.path.join(root, 'to_codex', f'codex-{n:04d}.json'), 'w') as f:
+                        json.dump({'response_id': f'codex-{n:04d}'}, f)
+
+                returncode, first_keys = self.run_updater(root, crash_at=point)
+                self.assertEqual(returncode, 137)
+                returncode, second_keys = self.run_updater(root)
+                self.assertEqual(returncode, 0)
+
+                keys = first_keys + second_keys
+                self.assertEqual(len(set(keys)), 3)
+                if point != 'legal_codex.updated':
+                    # Only an update sent but not yet journaled as done is replayed.
+                    self.assertEqual(len(keys), 3)
+                self.assertEqual(self.run_updater(root), (0, []))
+                journal = Journal(os.path.join(root, 'legal_codex.journal'))
+                self.assertEqual(journal.in_flight(), [])
+                journal.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import asyncio
+import os
+import json
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from ai_bridge import router as router_module
+from ai_bridge.journal import Journal
+from ai_bridge.legal_codex_client import LegalCodexClient, LegalCodexError
+from ai_bridge.legal_codex_standin import start_standin
+from ai_bridge.router import Router, legal_codex_handler
+from ai_bridge.scripts import update_legal_codex
+from ai_bridge.state_store import ProcessedStore
+from ai_bridge.watcher import Watcher
+
+class TestLegalCodexClient(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.server = start_standin()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_concurrent_updates_are_coalesced_into_bulk_requests(self):
+        with LegalCodexClient(self.server.url, max_batch=100, max_delay=0.05) as client:
+            futures = [client.submit({'n': n}, f'key-{n}') for n in range(250)]
+            self.assertEqual([future.result() for future in futures], ['applied'] * 250)
+            self.assertLessEqual(self.server.stats()['requests'], 4)
+            self.assertEqual(self.server.applied['key-7'], {'n': 7})
+
+            # Blocking callers on several threads share requests too.
+            with ThreadPoolExecutor(8) as senders:
+                statuses = list(senders.map(lambda n: client.update({}, f'thread-{n}'), range(80)))
+            self.assertEqual(statuses, ['applied'] * 80)
+            self.assertLessEqual(self.server.stats()['requests'], 4 + 40)
+
+            # A replayed key is acknowledged but not applied again.
+            self.assertEqual(client.update_many([('key-7', {'n': 7}), ('key-new', {})]),
+                             ['duplicate', 'applied'])
+        self.assertEqual(self.server.stats()['applied'], 331)
+
+    def test_retries_with_backoff_then_gives_up(self):
+        with LegalCodexClient(self.server.url, max_delay=0, retries=3, backoff=0.001) as client:
+            self.server.fail_next = 2
+            self.assertEqual(client.update({}, 'a'), 'applied')
+            self.assertEqual(client.requests_sent, 3)
+
+            self.server.fail_next = 4
+            with self.assertRaises(LegalCodexError):
+                client.update({}, 'b')
+            self.assertNotIn('b', self.server.applied)
+
+    def test_updater_sends_a_burst_of_files_as_one_request(self):
+        to_codex = os.path.join(self.tmp_dir, 'to_codex')
+        os.makedirs(to_codex)
+        paths = []
+        for n in range(5):
+            paths.append(os.path.join(to_codex, f'codex-{n:04d}.json'))
+            with open(paths[-1], 'w') as f:
+                json.dump({'response_id': f'codex-{n:04d}'}, f)
+        processed_files = ProcessedStore(os.path.join(self.tmp_dir, 'processed.sqlite'))
+        journal = Journal(os.path.join(self.tmp_dir, 'legal_codex.journal'))
+        update_legal_codex._client = LegalCodexClient(self.server.url, max_delay=0)
+        try:
+            update_legal_codex.process_codex_files(paths + paths[:1], processed_files, journal)
+            update_legal_codex.process_codex_files(paths, processed_files, journal)
+        finally:
+            update_legal_codex.close_client()
+        self.assertEqual(self.server.stats(), {'requests': 1, 'updates': 5, 'applied': 5})
+        self.assertEqual(sorted(processed_files), [os.path.basename(p) for p in paths])
+        self.assertEqual(journal.in_flight(), [])
+        processed_files.close()
+        journal.close()
+
+    def test_watcher_retries_failed_updates_with_backoff(self):
+        to_codex = os.path.join(self.tmp_dir, 'to_codex')
+        os.makedirs(to_codex)
+        patcher = mock.patch.multiple(update_legal_codex, TO_CODEX_DIR=to_codex, RETRY_INITIAL_SECONDS=0.05,
+                                      PROCESSED_FILES_LOG=os.path.join(self.tmp_dir, 'processed.sqlite'),
+                                      JOURNAL_FILE=os.path.join(self.tmp_dir, 'legal_codex.journal'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        watcher = Watcher(debounce=0.01, force_polling=True, poll_interval=0.01)
+        processed_files, journal = update_legal_codex.register(watcher)
+        update_legal_codex._client = LegalCodexClient(self.server.url, max_delay=0, retries=0)
+        try:
+            # The first push and the first retry fail; the file is not delivered again.
+            self.server.fail_next = 2
+            with open(os.path.join(to_codex, 'codex-0001.json'), 'w') as f:
+                json.dump({'response_id': 'codex-0001'}, f)
+            deadline = time.monotonic() + 5
+            while 'codex-0001.json' not in processed_files and time.monotonic() < deadline:
+                watcher.run_once(timeout=0.01)
+        finally:
+            update_legal_codex.close_client()
+            watcher.backend.close()
+        self.assertEqual(self.server.stats(), {'requests': 3, 'updates': 1, 'applied': 1})
+        self.assertEqual(sorted(processed_files), ['codex-0001.json'])
+        self.assertEqual(journal.in_flight(), [])
+        processed_files.close()
+        journal.close()
+
+    def test_router_retries_failed_updates_with_backoff(self):
+        to_codex = os.path.join(self.tmp_dir, 'to_codex')
+        os.makedirs(to_codex)
+        patcher = mock.patch.multiple(update_legal_codex, TO_CODEX_DIR=to_codex, RETRY_INITIAL_SECONDS=0.05,
+                                      PROCESSED_FILES_LOG=os.path.join(self.tmp_dir, 'processed.sqlite'),
+                                      JOURNAL_FILE=os.path.join(self.tmp_dir, 'legal_codex.journal'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        router = Router(Watcher(debounce=0.01, force_polling=True, poll_interval=0.01))
+        route = router.add_route('legal_codex', legal_codex_handler(router), [to_codex], suffix='.json')
+        update_legal_codex._client = LegalCodexClient(self.server.url, max_delay=0, retries=0)
+
+        async def until_applied():
+            # The first push and the first retry fail; the file is not delivered again.
+            self.server.fail_next = 2
+            with open(os.path.join(to_codex, 'codex-0001.json'), 'w') as f:
+                json.dump({'response_id': 'codex-0001'}, f)
+            while not self.server.stats()['applied']:
+                await asyncio.sleep(0.01)
+
+        with mock.patch.object(router_module, 'TICK_SECONDS', 0.01):
+            asyncio.run(asyncio.wait_for(router.run(until_applied()), timeout=10))
+        self.assertEqual(route.handled, 0)
+        self.assertEqual(self.server.stats(), {'requests': 3, 'updates': 1, 'applied': 1})
+        journal = update_legal_codex.get_journal()
+        self.assertEqual(journal.in_flight(), [])
+        journal.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from ai_bridge import metrics
+from financial_discovery.scripts.parallel_ingest import map_statements
+
+def parse(n):
+    with metrics.stage('parse_rows'):
+        metrics.count('rows', n)
+    return n * 2
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        metrics.reset()
+
+    def tearDown(self):
+        metrics.reset()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_session_writes_json_and_prometheus(self):
+        with metrics.session('ingest_test', directory=self.tmp_dir):
+            metrics.count('files_read')
+            metrics.count('bytes_read', 2048)
+            for seconds in [0.0002, 0.003, 0.003, 7.0]:
+                metrics.observe('pdf_extract_page', seconds)
+
+        with open(os.path.join(self.tmp_dir, 'ingest_test.json')) as f:
+            report = json.load(f)
+        self.assertEqual(report['counters'], {'bytes_read': 2048, 'files_read': 1})
+        stage = report['stages']['pdf_extract_page']
+        self.assertEqual((stage['count'], stage['p50_seconds'], stage['p99_seconds']), (4, 0.005, 10.0))
+        self.assertAlmostEqual(stage['total_seconds'], 7.0062)
+
+        with open(os.path.join(self.tmp_dir, 'ingest_test.prom')) as f:
+            prom = f.read().splitlines()
+        self.assertIn('bridge_files_read_total{script="ingest_test"} 1', prom)
+        self.assertIn('bridge_stage_seconds_bucket{script="ingest_test",stage="pdf_extract_page",le="0.005"} 3', prom)
+        self.assertIn('bridge_stage_seconds_bucket{script="ingest_test",stage="pdf_extract_page",le="+Inf"} 4', prom)
+        self.assertIn('bridge_stage_seconds_count{script="ingest_test",stage="pdf_extract_page"} 4', prom)
+
+    def test_worker_process_metrics_are_merged(self):
+        jobs = [(n, parse, (n,)) for n in range(5)]
+        serial = [result for _, result, _ in map_statements(jobs)]
+        expected = metrics.snapshot()
+        metrics.reset()
+        parallel = [result for _, result, _ in map_statements(jobs, workers=2)]
+        self.assertEqual(parallel, serial)
+        recorded = metrics.snapshot()
+        self.assertEqual(recorded['counters'], expected['counters'])
+        for name in ['parse_rows', 'parse_statement']:
+            self.assertEqual(recorded['stages'][name]['count'], 5)
+
+    def test_profile_mode_writes_reports(self):
+        profiles = os.path.join(self.tmp_dir, 'profiles')
+        with metrics.session('profiled', profile=True, directory=self.tmp_dir, profile_directory=profiles):
+            sorted(str(n) for n in range(10000))
+        suffixes = sorted(os.path.splitext(name)[1] for name in os.listdir(profiles))
+        self.assertEqual(suffixes, ['.prof', '.tracemalloc', '.txt'])
+
+if __name__ == '__main__':
+    unittest.main()
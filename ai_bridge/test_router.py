@@ -0,0 +1,47 @@
+import unittest
+import os
+import json
+import asyncio
+import shutil
+import tempfile
+from ai_bridge.router import Router
+from ai_bridge.watcher import Watcher
+
+class TestRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.to_codex = os.path.join(self.tmp_dir, 'to_codex')
+        os.makedirs(self.to_codex)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_delivers_every_message_through_small_queues(self):
+        for n in range(3):
+            with open(os.path.join(self.to_codex, f"comet-{n:04d}.json"), 'w') as f:
+                json.dump({'message_id': f"comet-{n:04d}"}, f)
+        router = Router(Watcher(debounce=0.01), queue_size=1, readers=2)
+        received, batches = [], []
+
+        async def slow_handler(messages):
+            batches.append(len(messages))
+            await asyncio.sleep(0.01)
+            received.extend(message.data['message_id'] for message in messages)
+
+        route = router.add_route('test', slow_handler, [self.to_codex], suffix='.json', batch_size=2)
+
+        async def until_done():
+            await asyncio.sleep(0.1)
+            for n in range(3, 8):
+                with open(os.path.join(self.to_codex, f"comet-{n:04d}.json"), 'w') as f:
+                    json.dump({'message_id': f"comet-{n:04d}"}, f)
+            while route.handled < 8:
+                await asyncio.sleep(0.01)
+
+        asyncio.run(asyncio.wait_for(router.run(until_done()), timeout=10))
+        self.assertEqual(sorted(received), [f"comet-{n:04d}" for n in range(8)])
+        self.assertLessEqual(max(batches), 2)
+
+if __name__ == '__main__':
+    unittest.main()
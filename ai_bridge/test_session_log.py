@@ -0,0 +1,51 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from ai_bridge.session_log import SessionLog
+
+class TestSessionLog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.tmp_dir, 'session')
+        self.legacy_file = os.path.join(self.tmp_dir, 'session.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def open_log(self, **kwargs):
+        return SessionLog(self.log_dir, legacy_path=self.legacy_file, **kwargs)
+
+    def test_migrates_legacy_file_and_rotates_segments(self):
+        legacy = [{"session_id": "session-001", "created": "2025-01-15T12:00:00Z",
+                   "participants": ["codex", "comet"], "messages": [{"message_id": "codex-0001"}],
+                   "status": "active"}]
+        with open(self.legacy_file, 'w') as f:
+            json.dump(legacy, f)
+
+        log = self.open_log(segment_max_bytes=64)
+        log.append([{"message_id": f"comet-{n:04d}", "content": "x" * 20} for n in range(5)])
+        self.assertGreater(len(log.manifest['segments']), 1)
+        self.assertTrue(log.manifest['segments'][0]['file'].endswith('.gz'))
+
+        sessions = self.open_log().sessions()
+        self.assertEqual(len(sessions), 1)
+        self.assertEqual(sessions[0]['participants'], ["codex", "comet"])
+        self.assertEqual([m['message_id'] for m in sessions[0]['messages']],
+                         ['codex-0001'] + [f"comet-{n:04d}" for n in range(5)])
+
+    def test_discards_uncommitted_append(self):
+        log = self.open_log()
+        log.append([{"message_id": "codex-0001"}])
+        segment = log.manifest['segments'][-1]
+        with open(os.path.join(self.log_dir, segment['raw_file']), 'a') as f:
+            f.write('{"message_id": "torn')
+
+        log = self.open_log()
+        log.append([{"message_id": "codex-0002"}])
+        self.assertEqual([m['message_id'] for m in log.iter_messages()], ['codex-0001', 'codex-0002'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from ai_bridge.state_store import ProcessedStore
+
+class TestProcessedStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store_file = os.path.join(self.tmp_dir, 'state.sqlite')
+        self.legacy_file = os.path.join(self.tmp_dir, 'state.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_migrates_legacy_list_and_persists_commits(self):
+        with open(self.legacy_file, 'w') as f:
+            json.dump(['cloud_discovery/financial/a.csv'], f)
+
+        store = ProcessedStore(self.store_file, legacy_path=self.legacy_file)
+        self.assertFalse(os.path.exists(self.legacy_file))
+        store.add('cloud_discovery/financial/b.csv')
+        self.assertIn('cloud_discovery/financial/b.csv', store)
+        self.assertEqual(len(store), 2)
+        store.commit()
+        store.add('cloud_discovery/financial/uncommitted.csv')
+        store.conn.close()
+
+        store = ProcessedStore(self.store_file, legacy_path=self.legacy_file)
+        self.assertEqual(sorted(store), ['cloud_discovery/financial/a.csv', 'cloud_discovery/financial/b.csv'])
+        self.assertNotIn('cloud_discovery/financial/uncommitted.csv', store)
+        store.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import os
+import json
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+from ai_bridge import summarize_activity
+
+class TestSummarizeActivity(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cloud_dir = os.path.join(self.tmp_dir, 'cloud_discovery')
+        self.to_comet = os.path.join(self.tmp_dir, 'to_comet')
+        os.makedirs(os.path.join(self.cloud_dir, 'financial'))
+        os.makedirs(self.to_comet)
+        patcher = mock.patch.multiple(
+            summarize_activity,
+            TO_COMET_DIR=self.to_comet,
+            TO_CODEX_DIR=os.path.join(self.tmp_dir, 'to_codex'),
+            CLOUD_DISCOVERY_DIR=self.cloud_dir,
+            MANIFEST_FILE=os.path.join(self.tmp_dir, 'manifest.sqlite'),
+            LEGACY_STATE_FILE=os.path.join(self.tmp_dir, 'missing.state'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write(self, path, content):
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def changes(self):
+        manifest = summarize_activity.FileManifest(summarize_activity.MANIFEST_FILE)
+        messages = summarize_activity.collect_changes(manifest)
+        manifest.commit()
+        manifest.close()
+        return messages
+
+    def test_logs_only_genuine_deltas(self):
+        statement = os.path.join(self.cloud_dir, 'financial', 'statement.csv')
+        self.write(statement, 'date,amount\n')
+        self.write(os.path.join(self.to_comet, 'codex-0001.json'), json.dumps({'message_id': 'codex-0001'}))
+        self.assertEqual(len(self.changes()), 2)
+        self.assertEqual(self.changes(), [])
+
+        # Rewriting identical content bumps the mtime but is not a change.
+        stat = os.stat(statement)
+        self.write(statement, 'date,amount\n')
+        os.utime(statement, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(self.changes(), [])
+
+        self.write(statement, 'date,amount\n2022-08-14,1400.00\n')
+        [modified] = self.changes()
+        self.assertEqual(modified['change'], 'modified')
+
+        os.remove(statement)
+        self.assertEqual(self.changes(), [{'type': 'file_deleted', 'filepath': statement}])
+
+        # Two files swapped by renames keep every name, size and mtime.
+        first, second = (os.path.join(self.cloud_dir, 'financial', name) for name in ('a.csv', 'b.csv'))
+        self.write(first, 'a')
+        self.write(second, 'b')
+        self.assertEqual(len(self.changes()), 2)
+        os.rename(first, first + '.tmp')
+        os.rename(second, first)
+        os.rename(first + '.tmp', second)
+        self.assertEqual(sorted((m['filepath'], m['change']) for m in self.changes()),
+                         [(first, 'modified'), (second, 'modified')])
+        os.remove(first)
+        os.remove(second)
+        self.assertEqual(len(self.changes()), 2)
+
+        # A whole directory that vanished is noticed without listing it.
+        nested = os.path.join(self.cloud_dir, 'evidence', 'photos')
+        os.makedirs(nested)
+        self.write(os.path.join(nested, 'a.txt'), 'a')
+        self.assertEqual(len(self.changes()), 1)
+        shutil.rmtree(os.path.join(self.cloud_dir, 'evidence'))
+        self.assertEqual(self.changes(), [{'type': 'file_deleted', 'filepath': os.path.join(nested, 'a.txt')}])
+
+    def test_manifests_keyed_by_full_path_are_migrated(self):
+        statement = os.path.join(self.cloud_dir, 'financial', 'statement.csv')
+        self.write(statement, 'date,amount\n')
+        self.assertEqual(len(self.changes()), 1)
+        conn = sqlite3.connect(summarize_activity.MANIFEST_FILE)
+        conn.execute('CREATE TABLE files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, '
+                     'inode INTEGER, sha256 BLOB) WITHOUT ROWID')
+        conn.execute("INSERT INTO files SELECT directory || '/' || name, size, mtime_ns, inode, sha256 FROM entries")
+        conn.execute('DELETE FROM entries')
+        conn.execute('DROP TABLE directories')
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(self.changes(), [])
+        manifest = summarize_activity.FileManifest(summarize_activity.MANIFEST_FILE)
+        self.assertEqual(len(manifest), 1)
+        self.assertIsNotNone(manifest.lookup(statement))
+        manifest.close()
+
+if __name__ == '__main__':
+    unittest.main()
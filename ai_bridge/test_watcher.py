@@ -0,0 +1,96 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from ai_bridge.watcher import CREATED, EXISTING, Watcher
+
+BACKENDS = {'inotify': False, 'polling': True}
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.inbox = os.path.join(self.tmp_dir, 'inbox')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def watcher(self, force_polling, debounce=0.05):
+        watcher = Watcher(debounce=debounce, force_polling=force_polling, poll_interval=0.02)
+        self.addCleanup(watcher.backend.close)
+        return watcher
+
+    def run_until(self, watcher, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            watcher.run_once(timeout=0.02)
+        return condition()
+
+    def test_files_are_delivered_once_they_stop_changing(self):
+        for backend, force_polling in BACKENDS.items():
+            with self.subTest(backend=backend):
+                shutil.rmtree(self.inbox, ignore_errors=True)
+                os.makedirs(self.inbox)
+                path = os.path.join(self.inbox, f"{backend}.json")
+                watcher = self.watcher(force_polling, debounce=0.3)
+                received = []
+                watcher.add_handler(self.inbox, lambda event: received.append((event, open(event.path).read())))
+                watcher.scan_existing()
+                with open(path, 'w') as f:
+                    f.write('{"part": ')
+                    f.flush()
+                    self.run_until(watcher, lambda: received, timeout=0.2)
+                    f.write('1}')
+                written = time.monotonic()
+                self.run_until(watcher, lambda: received, timeout=0.2)
+                self.assertEqual(received, [])
+                self.assertTrue(self.run_until(watcher, lambda: received))
+                self.assertGreaterEqual(time.monotonic() - written, 0.3)
+                self.assertEqual(received, [((CREATED, path), '{"part": 1}')])
+
+    def test_handlers_only_see_files_with_their_suffix(self):
+        for backend, force_polling in BACKENDS.items():
+            with self.subTest(backend=backend):
+                shutil.rmtree(self.inbox, ignore_errors=True)
+                os.makedirs(self.inbox)
+                with open(os.path.join(self.inbox, 'old.json'), 'w') as f:
+                    f.write('{}')
+                watcher = self.watcher(force_polling)
+                every, json_only = [], []
+                watcher.add_handler(self.inbox, lambda event: every.append(os.path.basename(event.path)))
+                watcher.add_handler(self.inbox, lambda event: json_only.append(event), suffix='.json')
+                watcher.scan_existing()
+                self.assertEqual(json_only, [(EXISTING, os.path.join(self.inbox, 'old.json'))])
+                for name in (f"{backend}.txt", f"{backend}.json"):
+                    with open(os.path.join(self.inbox, name), 'w') as f:
+                        f.write('{}')
+                self.assertTrue(self.run_until(watcher, lambda: len(every) == 3))
+                self.assertEqual(sorted(every), sorted(['old.json', f"{backend}.txt", f"{backend}.json"]))
+                self.assertEqual([os.path.basename(event.path) for event in json_only],
+                                 ['old.json', f"{backend}.json"])
+
+    def test_directories_created_after_startup_are_watched(self):
+        for backend, force_polling in BACKENDS.items():
+            with self.subTest(backend=backend):
+                shutil.rmtree(self.inbox, ignore_errors=True)
+                watcher = self.watcher(force_polling)
+                received = []
+                watcher.add_handler(self.inbox, lambda event: received.append(os.path.basename(event.path)))
+                watcher.scan_existing()
+                watcher.run_once(timeout=0.02)
+                os.makedirs(self.inbox)
+                with open(os.path.join(self.inbox, 'first.json'), 'w') as f:
+                    f.write('{}')
+                self.assertTrue(self.run_until(watcher, lambda: received == ['first.json']))
+
+                # Deleted and created again, it is picked up again.
+                shutil.rmtree(self.inbox)
+                watcher.run_once(timeout=0.02)
+                os.makedirs(self.inbox)
+                with open(os.path.join(self.inbox, 'second.json'), 'w') as f:
+                    f.write('{}')
+                self.assertTrue(self.run_until(watcher, lambda: received == ['first.json', 'second.json']))
+
+if __name__ == '__main__':
+    unittest.main()
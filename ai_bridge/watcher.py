@@ -0,0 +1,358 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from collections import namedtuple
+
+# --- Configuration ---
+# How long a file must stay quiet after its last write before handlers see it.
+DEBOUNCE_SECONDS = 0.5
+# Interval between snapshot diffs when inotify is not available.
+POLL_INTERVAL = 1.0
+# A directory whose mtime is this recent is rescanned even if the mtime did not
+# change, to cover filesystems with coarse timestamp granularity.
+MTIME_SLACK_NS = 2 * 10**9
+
+# --- inotify constants (see inotify(7)) ---
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+# Event kinds delivered to handlers.
+EXISTING = 'existing'  # present when the watcher started
+CREATED = 'created'    # appeared while watching and has finished being written
+MODIFIED = 'modified'  # a previously seen file was rewritten
+
+FileEvent = namedtuple('FileEvent', ['kind', 'path'])
+
+
+def _load_libc():
+    """Returns libc with the inotify entry points, or None if unavailable."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class InotifyBackend:
+    """Reports changed paths using the Linux inotify API."""
+
+    name = 'inotify'
+
+    def __init__(self, libc):
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watches = {}
+        self.lost = []  # watched directories that were deleted or moved away
+
+    def add_directory(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.watches[wd] = directory
+
+    def poll(self, timeout):
+        """Waits up to `timeout` seconds and returns (changes, overflowed).
+
+        `changes` is a list of (path, settled) pairs; `settled` is True when the
+        writer closed the file or moved it into place.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return [], False
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+        changes = []
+        overflowed = False
+        pos = 0
+        while pos + EVENT_HEADER.size <= len(buf):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(buf, pos)
+            pos += EVENT_HEADER.size
+            name = buf[pos:pos + name_len].rstrip(b'\0')
+            pos += name_len
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF):
+                directory = self.watches.pop(wd, None)
+                if directory is not None:
+                    self.lost.append(directory)
+                continue
+            if mask & IN_ISDIR or not name or wd not in self.watches:
+                continue
+            path = os.path.join(self.watches[wd], os.fsdecode(name))
+            changes.append((path, bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO))))
+        return changes, overflowed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """Reports changed paths by diffing mtime/size snapshots of each directory."""
+
+    name = 'polling'
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.directories = {}  # directory -> (dir mtime_ns, {name: (size, mtime_ns)})
+        self.lost = []  # never filled: a deleted directory is simply skipped until it returns
+
+    def add_directory(self, directory):
+        self.directories[directory] = (None, {})
+
+    def prime(self, directory, snapshot, dir_mtime_ns):
+        self.directories[directory] = (dir_mtime_ns, snapshot)
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        changes = []
+        now_ns = time.time_ns()
+        for directory, (last_mtime_ns, snapshot) in list(self.directories.items()):
+            try:
+                dir_mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            # Creating or renaming an entry bumps the directory mtime, so an
+            # unchanged directory only needs its in-flight files re-checked.
+            # In-place rewrites of old files are picked up on the next change
+            # to the directory; the bridge only cares about new files.
+            if dir_mtime_ns == last_mtime_ns and now_ns - dir_mtime_ns > MTIME_SLACK_NS:
+                continue
+            current = snapshot_directory(directory)
+            for name, signature in current.items():
+                if snapshot.get(name) != signature:
+                    changes.append((os.path.join(directory, name), False))
+            self.directories[directory] = (dir_mtime_ns, current)
+        return changes, False
+
+    def close(self):
+        pass
+
+
+def snapshot_directory(directory):
+    """Returns {name: (size, mtime_ns)} for the regular files in `directory`."""
+    snapshot = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        st = entry.stat()
+                        snapshot[entry.name] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    continue
+    except OSError as e:
+        print(f"Error accessing directory {directory}: {e}")
+    return snapshot
+
+
+class Watcher:
+    """Watches directories and pushes settled file events to registered handlers.
+
+    Handlers are plain callables taking a FileEvent. Several handlers (and
+    therefore several daemons) can share one watcher and one process.
+    """
+
+    def __init__(self, debounce=DEBOUNCE_SECONDS, force_polling=False, poll_interval=POLL_INTERVAL):
+        self.debounce = debounce
+        self.handlers = {}  # directory -> [(handler, suffix)]
+        self.batch_callbacks = []
+        self.tick_callbacks = []
+        self.pending = {}   # path -> (deadline or None while still open, signature)
+        self.seen = set()
+        self.missing = set()  # registered directories that do not exist (yet)
+        self.running = False
+        libc = None if force_polling else _load_libc()
+        self.backend = None
+        if libc is not None:
+            try:
+                self.backend = InotifyBackend(libc)
+            except OSError as e:
+                print(f"Warning: inotify unavailable ({e}); falling back to polling.")
+        if self.backend is None:
+            self.backend = PollingBackend(poll_interval)
+
+    def add_handler(self, directory, handler, suffix=None):
+        """Registers `handler` for files in `directory`, optionally filtered by suffix."""
+        directory = os.path.normpath(directory)
+        if directory not in self.handlers:
+            self.handlers[directory] = []
+            if os.path.isdir(directory):
+                self.backend.add_directory(directory)
+            else:
+                print(f"Warning: Directory not found: {directory}; watching for it to be created.")
+                self.missing.add(directory)
+        self.handlers[directory].append((handler, suffix))
+
+    def add_batch_callback(self, callback):
+        """Registers `callback()` to run after each round of dispatched events.
+
+        Handlers use this to persist state once per burst instead of per file.
+        """
+        self.batch_callbacks.append(callback)
+
+    def add_tick_callback(self, callback):
+        """Registers `callback()` to run once per loop iteration (at least every
+        second), e.g. to collect the results of work handed to a thread pool.
+        """
+        self.tick_callbacks.append(callback)
+
+    def end_batch(self):
+        for callback in self.batch_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Batch callback error: {e}")
+
+    def dispatch(self, event):
+        directory = os.path.dirname(event.path)
+        for handler, suffix in self.handlers.get(directory, []):
+            if suffix and not event.path.endswith(suffix):
+                continue
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"Handler error for {event.path}: {e}")
+
+    def scan_existing(self):
+        """Delivers an EXISTING event for every file already present."""
+        for directory in self.handlers:
+            if not os.path.isdir(directory):
+                continue
+            snapshot = snapshot_directory(directory)
+            if isinstance(self.backend, PollingBackend):
+                self.backend.prime(directory, snapshot, os.stat(directory).st_mtime_ns)
+            for name in sorted(snapshot):
+                path = os.path.join(directory, name)
+                self.seen.add(path)
+                self.dispatch(FileEvent(EXISTING, path))
+        self.end_batch()
+
+    def process_changes(self, changes, now):
+        for path, settled in changes:
+            if settled or isinstance(self.backend, PollingBackend):
+                self.pending[path] = (now + self.debounce, self._signature(path))
+            else:
+                # Created or written but not yet closed: hold until it settles.
+                self.pending[path] = (None, None)
+
+    def flush_pending(self, now):
+        """Dispatches pending files whose debounce window has elapsed."""
+        dispatched = False
+        for path, (deadline, signature) in list(self.pending.items()):
+            if deadline is None or deadline > now:
+                continue
+            current = self._signature(path)
+            if current is None:
+                del self.pending[path]
+                continue
+            if current != signature:
+                # Still being written; give it another window.
+                self.pending[path] = (now + self.debounce, current)
+                continue
+            del self.pending[path]
+            kind = MODIFIED if path in self.seen else CREATED
+            self.seen.add(path)
+            self.dispatch(FileEvent(kind, path))
+            dispatched = True
+        if dispatched:
+            self.end_batch()
+
+    def _signature(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _next_timeout(self, now):
+        deadlines = [d for d, _ in self.pending.values() if d is not None]
+        if not deadlines:
+            return 1.0
+        return max(0.0, min(deadlines) - now)
+
+    def run_once(self, timeout=None):
+        """Waits for one round of changes and dispatches whatever has settled."""
+        now = time.monotonic()
+        if timeout is None:
+            timeout = self._next_timeout(now)
+        changes, overflowed = self.backend.poll(timeout)
+        now = time.monotonic()
+        while self.backend.lost:
+            self.missing.add(self.backend.lost.pop())
+        if self.missing:
+            self.watch_missing(now)
+        if overflowed:
+            print("Warning: inotify queue overflowed; rescanning watched directories.")
+            self.rescan(now)
+        self.process_changes(changes, now)
+        self.flush_pending(now)
+        for callback in self.tick_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Tick callback error: {e}")
+
+    def watch_missing(self, now):
+        """Starts watching registered directories that have appeared since the last tick.
+
+        Files already in such a directory arrived after the watcher started, so
+        they are queued like newly created files.
+        """
+        for directory in sorted(self.missing):
+            if not os.path.isdir(directory):
+                continue
+            try:
+                self.backend.add_directory(directory)
+            except OSError as e:
+                print(f"Warning: Could not watch {directory}: {e}")
+                continue
+            self.missing.discard(directory)
+            print(f"Watching {directory}")
+            for name in snapshot_directory(directory):
+                path = os.path.join(directory, name)
+                self.pending[path] = (now + self.debounce, self._signature(path))
+
+    def rescan(self, now):
+        for directory in self.handlers:
+            if directory in self.missing:
+                continue
+            for name in snapshot_directory(directory):
+                path = os.path.join(directory, name)
+                if path not in self.seen:
+                    self.pending[path] = (now + self.debounce, self._signature(path))
+
+    def run(self):
+        """Runs until stop() is called or the process is interrupted."""
+        self.running = True
+        self.scan_existing()
+        try:
+            while self.running:
+                self.run_once()
+        finally:
+            self.backend.close()
+
+    def stop(self):
+        self.running = False
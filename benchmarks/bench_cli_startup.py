@@ -0,0 +1,112 @@
+"""Benchmarks the wall time of a no-new-files run, from process start to exit.
+
+Run from the repository root:
+
+    python benchmarks/bench_cli_startup.py --runs 20
+
+A cron-driven run that finds nothing to do is almost all interpreter startup
+and imports. In a scratch tree with empty bridge, cloud_discovery and
+statement directories, each command is timed as:
+
+- `script, eager imports`: the old per-script invocation, with PyPDF2 and
+  the profiling modules imported up front as the scripts used to (index and
+  update had no one-shot mode, so they only have the bridge rows);
+- `script`: the same script now;
+- `bridge CLI`: `python -m bridge <command>`;
+- `bridge --worker`: the CLI client handing the command to a running
+  `python -m bridge worker` over its unix socket.
+"""
+import argparse
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_DIR = os.path.join(REPO_ROOT, 'financial_discovery', 'schema')
+TREE_DIRS = ['ai_bridge/to_comet', 'ai_bridge/to_codex', 'ai_bridge/from_jules', 'ai_bridge/logs',
+             'cloud_discovery/financial', 'cloud_discovery/evidence', 'financial_discovery/statements/raw',
+             'financial_discovery/statements/processed', 'financial_discovery/ledger']
+# What metrics.py (and so every script) imported at load time before it was made lazy.
+PROFILING_IMPORTS = 'cProfile, pstats, tracemalloc'
+
+# (label, script run the old way or None, its former eager imports, bridge CLI arguments)
+COMMANDS = [
+    ('summarize', 'ai_bridge/summarize_activity.py', PROFILING_IMPORTS, ['summarize']),
+    ('ingest csv', 'financial_discovery/scripts/ingest_csv.py', PROFILING_IMPORTS, ['ingest', 'csv']),
+    ('ingest pdf', 'financial_discovery/scripts/ingest_pdf.py', 'PyPDF2, ' + PROFILING_IMPORTS, ['ingest', 'pdf']),
+    ('index --once', None, None, ['index', '--once']),
+    ('update --once', None, None, ['update', '--once']),
+]
+
+
+def make_tree(root):
+    for directory in TREE_DIRS:
+        os.makedirs(os.path.join(root, directory), exist_ok=True)
+    shutil.copytree(SCHEMA_DIR, os.path.join(root, 'financial_discovery', 'schema'))
+
+
+def time_runs(argv, cwd, runs, env):
+    """Median and p90 wall time, in ms, of `runs` runs after one warm-up."""
+    timings = []
+    for n in range(runs + 1):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        if n:  # The first run creates state files and warms the page cache.
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.9) - 1]
+
+
+def start_worker(cwd, env, socket_path):
+    worker = subprocess.Popen([sys.executable, '-m', 'bridge', '--socket', socket_path, 'worker'],
+                              cwd=cwd, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(os.path.join(cwd, socket_path)):
+        if time.monotonic() > deadline or worker.poll() is not None:
+            raise RuntimeError("bridge worker did not start")
+        time.sleep(0.01)
+    return worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark no-op cold starts of the bridge scripts and CLI.")
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench_cli_startup_')
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    env.pop('BRIDGE_WORKER_SOCKET', None)
+    socket_path = 'ai_bridge/logs/bench.sock'
+    worker = None
+    try:
+        make_tree(root)
+        baseline, _ = time_runs([sys.executable, '-c', 'pass'], root, args.runs, env)
+        print(f"Bare interpreter: {baseline:.1f} ms\n")
+        worker = start_worker(root, env, socket_path)
+        print(f"{'command':<15} {'variant':<24} {'median ms':>10} {'p90 ms':>8}")
+        for label, script, eager_imports, cli_args in COMMANDS:
+            variants = []
+            if script:
+                path = os.path.join(REPO_ROOT, script)
+                eager = f"import {eager_imports}, runpy, sys; sys.argv = [{path!r}]; runpy.run_path({path!r}, run_name='__main__')"
+                variants.append(('script, eager imports', [sys.executable, '-c', eager]))
+                variants.append(('script', [sys.executable, path]))
+            variants.append(('bridge CLI', [sys.executable, '-m', 'bridge'] + cli_args))
+            variants.append(('bridge --worker', [sys.executable, '-m', 'bridge', '--socket', socket_path] + cli_args))
+            for name, argv in variants:
+                median, p90 = time_runs(argv, root, args.runs, env)
+                print(f"{label:<15} {name:<24} {median:>10.1f} {p90:>8.1f}")
+    finally:
+        if worker is not None:
+            worker.send_signal(signal.SIGTERM)
+            worker.wait()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
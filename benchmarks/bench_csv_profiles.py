@@ -0,0 +1,97 @@
+"""Compares CSV statement parsing: the per-row strptime cascade vs csv_profiles.
+
+Run from the repository root:
+
+    python benchmarks/bench_csv_profiles.py --rows 1000000
+
+Writes a BECU-style export (date,type,amount,name,memo) with about three
+years of dates. The cascade is what ingest_csv.parse_csv_file used to do,
+given the BECU column names so that it parses the rows at all. `--us-dates`
+writes MM/DD/YYYY dates, which the cascade only reaches on its second format.
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from financial_discovery.scripts.csv_profiles import parse_statement
+
+BECU_MAPPING = {"timestamp": "date", "description": "memo", "amount": "amount"}
+
+
+def write_statement(path, rows, us_dates):
+    start = date(2022, 1, 1)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['date', 'type', 'amount', 'name', 'memo'])
+        for i in range(rows):
+            day = start + timedelta(days=i * 1000 // rows)
+            amount = (i % 5000) / 100 - 25
+            writer.writerow([
+                day.strftime('%m/%d/%Y' if us_dates else '%Y-%m-%d'),
+                'CREDIT' if amount >= 0 else 'DEBIT',
+                f"{amount:.2f}",
+                f"Transfer {i % 97}",
+                f"Deposit Internet Transfer from {3621082704 + i % 97}",
+            ])
+
+
+def strptime_cascade(filepath):
+    with open(filepath, 'r', newline='') as csvfile:
+        transactions = []
+        for row in csv.DictReader(csvfile):
+            date_str = row[BECU_MAPPING["timestamp"]]
+            timestamp = ""
+            for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y"):
+                try:
+                    timestamp = datetime.strptime(date_str, fmt).isoformat()
+                    break
+                except ValueError:
+                    pass
+            transactions.append({
+                "timestamp": timestamp,
+                "description": row[BECU_MAPPING["description"]],
+                "amount": float(row[BECU_MAPPING["amount"]]),
+                "currency": "USD",
+            })
+    return transactions
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--us-dates', action='store_true', help="Write MM/DD/YYYY dates.")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-csv-profiles-')
+    try:
+        path = os.path.join(root, 'becu_3621082978.csv')
+        write_statement(path, args.rows, args.us_dates)
+        results = {"rows": args.rows, "us_dates": args.us_dates, "parsers": []}
+        cascade_elapsed, cascade = timed(strptime_cascade, path)
+        results["parsers"].append({"parser": "strptime_cascade", "seconds": round(cascade_elapsed, 2),
+                                   "rows_per_sec": round(args.rows / cascade_elapsed)})
+        profile_elapsed, profiled = timed(parse_statement, path)
+        results["parsers"].append({"parser": "csv_profiles", "seconds": round(profile_elapsed, 2),
+                                   "rows_per_sec": round(args.rows / profile_elapsed)})
+        assert [t["timestamp"] for t in cascade] == [t["timestamp"] for t in profiled]
+        results["speedup"] = round(cascade_elapsed / profile_elapsed, 1)
+        print(json.dumps(results, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
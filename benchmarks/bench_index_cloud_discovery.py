@@ -0,0 +1,89 @@
+"""Compares cloud discovery summaries: whole-file read vs the streaming summarizer.
+
+Run from the repository root:
+
+    python benchmarks/bench_index_cloud_discovery.py --megabytes 1024
+
+Writes a text evidence dump of --megabytes MB and summarizes it three ways:
+the old summarize_file body (read the whole file as text, then slice 500
+characters), describe_file reading in chunks, and describe_file through mmap.
+Peak Python heap is measured with tracemalloc. `handler_ms` is how long
+CloudIndexer.handle blocks the watcher loop for the same file, which is
+handed to the worker pool.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge import index_cloud_discovery
+from ai_bridge.index_cloud_discovery import CloudIndexer, describe_file
+from ai_bridge.state_store import ProcessedStore
+from ai_bridge.watcher import CREATED, FileEvent
+
+
+def write_dump(path, megabytes):
+    line = ''.join(f"2022-08-{1 + i % 28:02d} evidence record {i} " for i in range(8)) + '\n'
+    block = (line * (1024 * 1024 // len(line) + 1))[:1024 * 1024]
+    with open(path, 'w') as f:
+        for _ in range(megabytes):
+            f.write(block)
+
+
+def read_whole(filepath):
+    """What summarize_file used to do before writing the summary."""
+    with open(filepath, 'r', errors='ignore') as f:
+        content = f.read()
+        return content[:500] + ('...' if len(content) > 500 else '')
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(seconds, 2), "peak_heap_mb": round(peak / 2**20, 1)}
+
+
+def describe_with(threshold, filepath):
+    index_cloud_discovery.LARGE_FILE_BYTES = threshold
+    return describe_file(filepath)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--megabytes', type=int, default=1024)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-cloud-index-')
+    try:
+        dump = os.path.join(root, 'evidence.log')
+        write_dump(dump, args.megabytes)
+        results = {
+            "megabytes": args.megabytes,
+            "whole_read": measure(read_whole, dump),
+            "streaming": measure(describe_with, float('inf'), dump),
+            "mmap": measure(describe_with, 0, dump),
+        }
+
+        index_cloud_discovery.LARGE_FILE_BYTES = 0
+        index_cloud_discovery.OUTPUT_DIR = root
+        indexer = CloudIndexer(ProcessedStore(os.path.join(root, 'state.sqlite')))
+        start = time.perf_counter()
+        indexer.handle(FileEvent(CREATED, dump))
+        results["handler_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        indexer.close()
+        print(json.dumps(results, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Benchmarks account aggregate queries over the JSONL ledger vs the column store.
+
+Run from the repository root:
+
+    python benchmarks/bench_ledger_columns.py --rows 10000000
+
+A synthetic ledger is written to a scratch directory. The script times the
+per-account summary (count, time range, inflows, outflows, net) and the
+large-cash-deposit scan, once by json-parsing every JSONL row (what answering
+the codex-0002 questions costs today) and once over the memory-mapped column
+store. The one-off compaction cost and an incremental refresh are reported too.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from financial_discovery.scripts.ledger_columns import (
+    LedgerColumns, account_totals, parse_timestamp, refresh_columns, select_rows)
+
+LARGE_CASH_CENTS = 1000000
+CASH_PATTERN = re.compile(r'\bCASH\b', re.IGNORECASE)
+DESCRIPTIONS = [
+    'Deposit Internet Transfer from 3621082704', 'POS Deposit HAMPTON INN & SUITES',
+    'CASH DEPOSIT BRANCH 0042', 'ATM Withdrawal BECU 205 10TH ST', 'PAYPAL INST XFER',
+    'Withdrawal Internet Transfer to 3621083009', 'Check 1042', 'Mobile Deposit',
+]
+
+
+def write_ledger(path, rows, seed=42):
+    rng = random.Random(seed)
+    accounts = [f"36210{n:05d}" for n in range(50)]
+    start = datetime(2018, 1, 1)
+    with open(path, 'w') as f:
+        for i in range(rows):
+            f.write(json.dumps({
+                'transaction_id': f"{i:064x}",
+                'timestamp': (start + timedelta(minutes=rng.randrange(4_000_000))).isoformat(),
+                'account_number': rng.choice(accounts),
+                'amount': round(rng.uniform(-5000, 15000), 2),
+                'currency': 'USD',
+                'description': rng.choice(DESCRIPTIONS),
+                'source': 'LegalCodex',
+                'reconciliation_status': 'new',
+            }) + '\n')
+
+
+def jsonl_queries(path):
+    totals = {}
+    large_cash = 0
+    with open(path, 'r') as f:
+        for line in f:
+            row = json.loads(line)
+            cents = int(round(row['amount'] * 100))
+            ts = parse_timestamp(row['timestamp'])
+            summary = totals.setdefault(row['account_number'], [0, ts, ts, 0, 0])
+            summary[0] += 1
+            summary[1] = min(summary[1], ts)
+            summary[2] = max(summary[2], ts)
+            if cents > 0:
+                summary[3] += cents
+            else:
+                summary[4] -= cents
+            if cents >= LARGE_CASH_CENTS and CASH_PATTERN.search(row['description'] or ''):
+                large_cash += 1
+    return totals, large_cash
+
+
+def columnar_queries(columns_dir):
+    columns = LedgerColumns(columns_dir)
+    totals = account_totals(columns)
+    large_cash = select_rows(columns, LARGE_CASH_CENTS, CASH_PATTERN.search)
+    return totals, len(large_cash)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-ledger-columns-')
+    try:
+        ledger = os.path.join(root, 'unified_ledger.jsonl')
+        columns_dir = os.path.join(root, 'columns')
+        write_ledger(ledger, args.rows)
+
+        jsonl_seconds, (jsonl_totals, jsonl_cash) = timed(jsonl_queries, ledger)
+        compact_seconds, _ = timed(refresh_columns, ledger, columns_dir)
+        columnar_seconds, (column_totals, column_cash) = timed(columnar_queries, columns_dir)
+        with open(ledger, 'a') as f:
+            f.write(json.dumps({'transaction_id': 'x', 'timestamp': datetime.now(timezone.utc).isoformat(),
+                                'account_number': '3621000000', 'amount': 1.0}) + '\n')
+        incremental_seconds, added = timed(refresh_columns, ledger, columns_dir)
+
+        assert jsonl_cash == column_cash and len(jsonl_totals) == len(column_totals)
+        print(json.dumps({
+            'rows': args.rows,
+            'jsonl_query_seconds': round(jsonl_seconds, 3),
+            'columnar_query_seconds': round(columnar_seconds, 3),
+            'speedup': round(jsonl_seconds / columnar_seconds, 1),
+            'initial_compaction_seconds': round(compact_seconds, 3),
+            'incremental_refresh_seconds': round(incremental_seconds, 4),
+            'incremental_rows_added': added,
+            'large_cash_deposits': column_cash,
+        }, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
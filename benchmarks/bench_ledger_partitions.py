@@ -0,0 +1,152 @@
+"""Compares the single-file ledger with the partitioned layout (ledger_partitions.py).
+
+Run from the repository root:
+
+    python benchmarks/bench_ledger_partitions.py --rows 500000 --accounts 20 --writers 4
+
+Scenarios, on the same synthetic rows spread over `accounts` accounts and
+about 33 months:
+
+- read one account-month: a scan of the single file against a pruned read of
+  its partition;
+- dedup for one statement: opening LedgerIndex (cold, i.e. indexing the
+  whole ledger, and warm) against loading one partition's IDs;
+- write: one LedgerWriter against `writers` processes, each with its own
+  PartitionedLedgerWriter, writing the rows concurrently with no shared lock;
+- merge: rebuilding the ordered single file from the partitions.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from multiprocessing import Process
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import generators
+from financial_discovery.scripts import ledger_partitions
+from financial_discovery.scripts.ledger_index import LedgerIndex, discard_index
+from financial_discovery.scripts.ledger_writer import LedgerWriter
+from financial_discovery.scripts.transaction_ids import assign_ids
+
+STATEMENT_ROWS = 1000  # rows per statement, the unit writers commit
+
+
+def make_rows(count, accounts):
+    """Rows in date order, in statements of STATEMENT_ROWS rows dealt round-robin to the accounts."""
+    rows = []
+    for i, (day, cents, description) in enumerate(generators._statement_rows(count, generators.SEED)):
+        rows.append({
+            'transaction_id': None,
+            'timestamp': day.isoformat() + 'T00:00:00',
+            'account_number': str(generators.FIRST_ACCOUNT + i // STATEMENT_ROWS % accounts),
+            'amount': cents / 100,
+            'currency': 'USD',
+            'description': description,
+            'source': 'Bench',
+            'reconciliation_status': 'new',
+        })
+    return assign_ids(rows)
+
+
+def write_single(ledger, rows):
+    with LedgerWriter(ledger, batch_size=STATEMENT_ROWS, flush_interval=60) as writer:
+        for start in range(0, len(rows), STATEMENT_ROWS):
+            with writer.statement('bench'):
+                for row in rows[start:start + STATEMENT_ROWS]:
+                    writer.write(row)
+
+
+def write_partitioned(root, rows):
+    with ledger_partitions.PartitionedLedgerWriter(root, batch_size=STATEMENT_ROWS, flush_interval=60) as writer:
+        for start in range(0, len(rows), STATEMENT_ROWS):
+            with writer.statement('bench'):
+                for row in rows[start:start + STATEMENT_ROWS]:
+                    writer.write(row)
+
+
+def write_concurrently(root, rows, writers):
+    os.makedirs(os.path.join(root, ledger_partitions.MANIFEST_DIR), exist_ok=True)
+    statements = [rows[start:start + STATEMENT_ROWS] for start in range(0, len(rows), STATEMENT_ROWS)]
+    processes = [Process(target=write_partitioned, args=(root, sum(statements[n::writers], [])))
+                 for n in range(writers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def scan_single(ledger, account, month):
+    matched = 0
+    with open(ledger, 'rb') as f:
+        for line in f:
+            row = json.loads(line)
+            if row['account_number'] == account and row['timestamp'].startswith(month):
+                matched += 1
+    return matched
+
+
+def read_partition(root, account, month):
+    return sum(1 for _ in ledger_partitions.iter_merged(root, account, month, month))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--accounts', type=int, default=20)
+    parser.add_argument('--writers', type=int, default=4)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.accounts)
+    probe = rows[len(rows) // 2]
+    account, month = ledger_partitions.partition_of(probe)
+    tmp_dir = tempfile.mkdtemp(prefix='bench-ledger-partitions-')
+    try:
+        single = os.path.join(tmp_dir, 'single', 'unified_ledger.jsonl')
+        partitioned = os.path.join(tmp_dir, 'partitioned', 'unified_ledger.jsonl')
+        root = ledger_partitions.partition_root(partitioned)
+        results = {'rows': args.rows, 'accounts': args.accounts, 'scenarios': {}}
+        scenarios = results['scenarios']
+
+        seconds, _ = timed(write_single, single, rows)
+        scenarios['write_single_file_s'] = round(seconds, 3)
+        seconds, _ = timed(write_concurrently, root, rows, args.writers)
+        scenarios[f'write_partitioned_{args.writers}_writers_s'] = round(seconds, 3)
+        results['partitions'] = ledger_partitions.summarize_manifest(root)['partitions']
+
+        seconds, full = timed(scan_single, single, account, month)
+        scenarios['read_account_month_full_scan_s'] = round(seconds, 4)
+        seconds, pruned = timed(read_partition, root, account, month)
+        scenarios['read_account_month_pruned_s'] = round(seconds, 4)
+        assert full == pruned, (full, pruned)
+        results['rows_in_account_month'] = pruned
+
+        discard_index(single)
+        seconds, index = timed(LedgerIndex, single)
+        index.close()
+        scenarios['dedup_ledger_index_cold_s'] = round(seconds, 3)
+        seconds, index = timed(LedgerIndex, single)
+        index.close()
+        scenarios['dedup_ledger_index_warm_s'] = round(seconds, 4)
+        seconds, ids = timed(lambda: ledger_partitions.PartitionedIndex(root).scope(probe))
+        assert probe['transaction_id'] in ids
+        scenarios['dedup_one_partition_s'] = round(seconds, 4)
+
+        seconds, merged = timed(ledger_partitions.merge_ledger, partitioned)
+        assert merged == args.rows
+        scenarios['merge_s'] = round(seconds, 3)
+        print(json.dumps(results, indent=2))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Measures the cost of schema validation on the ledger write path.
+
+Run from the repository root:
+
+    python benchmarks/bench_ledger_schema.py --rows 1000000
+
+Parses a synthetic BECU CSV export with ingest_csv.parse_csv_file (profile
+parsing and ID hashing, as ingestion does) and writes the rows through
+LedgerWriter.write_all with and without the compiled validator. Also
+times the validator alone and a straightforward interpreted validator that
+walks the schema for every row, for comparison. `overhead_pct` is the
+validated ingest time over the unvalidated one.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from financial_discovery.scripts.ingest_csv import parse_csv_file
+from financial_discovery.scripts.ledger_schema import JSON_TYPES, SCHEMA_FILE, _is_date_time, load_validator
+from financial_discovery.scripts.ledger_writer import LedgerWriter
+
+
+def write_csv(path, rows):
+    with open(path, 'w') as f:
+        f.write('date,type,amount,name,memo\n')
+        for i in range(rows):
+            f.write(f'2022-{1 + i % 12:02d}-{1 + i % 28:02d},CREDIT,{(i % 5000) / 100:.2f},'
+                    f'Deposit Internet Transfer,Deposit Internet Transfer from {i % 97}\n')
+
+
+def interpreted(schema, rows):
+    """Walks the schema for every row; what an uncompiled validator does."""
+    rejects = []
+    for index, row in enumerate(rows):
+        errors = []
+        for name in schema.get('required', ()):
+            if name not in row:
+                errors.append(f"missing '{name}'")
+        for name, spec in schema['properties'].items():
+            if name not in row:
+                continue
+            value = row[name]
+            types = spec.get('type')
+            types = [types] if isinstance(types, str) else types or []
+            if types and not any(type(value) in JSON_TYPES[t] for t in types):
+                errors.append(f"'{name}': wrong type")
+            elif 'enum' in spec and value not in spec['enum']:
+                errors.append(f"'{name}': not in enum")
+            elif spec.get('format') == 'date-time' and isinstance(value, str) and not _is_date_time(value):
+                errors.append(f"'{name}': not a date-time")
+        if errors:
+            rejects.append((index, errors))
+    return rejects
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def ingest(csv_path, ledger_path, validator):
+    """Parse, hash and write one statement, as ingest_csv does."""
+    transactions = parse_csv_file(csv_path)
+    with LedgerWriter(ledger_path, batch_size=10000, flush_interval=60, validator=validator) as writer:
+        with writer.statement(csv_path):
+            return writer.write_all(transactions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-ledger-schema-')
+    try:
+        csv_path = os.path.join(root, 'becu_3621082978.csv')
+        write_csv(csv_path, args.rows)
+        validator = load_validator()
+        with open(SCHEMA_FILE, 'r') as f:
+            schema = json.load(f)
+        rows = list(parse_csv_file(csv_path))
+
+        compiled_seconds, rejects = timed(validator, rows)
+        assert not rejects, rejects[:3]
+        interpreted_seconds, _ = timed(interpreted, schema, rows)
+        del rows
+
+        best = {}
+        for _ in range(args.repeat):
+            for name, candidate in (('unvalidated', None), ('validated', validator)):
+                ledger = os.path.join(root, f"{name}.jsonl")
+                seconds, written = timed(ingest, csv_path, ledger, candidate)
+                assert written == args.rows
+                os.remove(ledger)
+                best[name] = min(best.get(name, seconds), seconds)
+        print(json.dumps({
+            "rows": args.rows,
+            "validate_only": {
+                "compiled_rows_per_sec": round(args.rows / compiled_seconds),
+                "interpreted_rows_per_sec": round(args.rows / interpreted_seconds),
+            },
+            "ingest_rows_per_sec": {name: round(args.rows / seconds) for name, seconds in best.items()},
+            "overhead_pct": round(100 * (best['validated'] / best['unvalidated'] - 1), 1),
+        }, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
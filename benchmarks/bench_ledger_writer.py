@@ -0,0 +1,81 @@
+"""Compares ledger append throughput: per-row open/append/close vs LedgerWriter.
+
+Run from the repository root:
+
+    python benchmarks/bench_ledger_writer.py --rows 50000
+
+The per-row path is what append_to_ledger used to do (and it never fsync'd).
+LedgerWriter is measured at several batch sizes with one fsync per batch and
+the whole run wrapped in a single statement.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from financial_discovery.scripts.ledger_writer import LedgerWriter
+
+
+def make_rows(count):
+    return [{
+        'transaction_id': f"{i:064x}",
+        'timestamp': '2022-08-14T00:00:00',
+        'account_number': '3621082978',
+        'amount': 1400.0,
+        'currency': 'USD',
+        'description': 'Deposit Internet Transfer from 3621082704',
+        'source': 'LegalCodex',
+        'reconciliation_status': 'new',
+    } for i in range(count)]
+
+
+def per_row(path, rows):
+    for row in rows:
+        with open(path, 'a') as f:
+            f.write(json.dumps(row) + '\n')
+
+
+def batched(path, rows, batch_size):
+    with LedgerWriter(path, batch_size=batch_size, flush_interval=60) as writer:
+        with writer.statement('bench'):
+            for row in rows:
+                writer.write(row)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    root = tempfile.mkdtemp(prefix='bench-ledger-writer-')
+    try:
+        results = {"rows": args.rows, "scenarios": []}
+        elapsed = timed(per_row, os.path.join(root, 'per_row.jsonl'), rows)
+        results["scenarios"].append({"writer": "per_row", "rows_per_sec": round(args.rows / elapsed)})
+        for batch_size in args.batch_sizes:
+            elapsed = timed(batched, os.path.join(root, f"batched_{batch_size}.jsonl"), rows, batch_size)
+            results["scenarios"].append({
+                "writer": "LedgerWriter",
+                "batch_size": batch_size,
+                "fsyncs": -(-args.rows // batch_size),
+                "rows_per_sec": round(args.rows / elapsed),
+            })
+        print(json.dumps(results, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
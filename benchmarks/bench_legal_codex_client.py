@@ -0,0 +1,124 @@
+"""Compares LegalCodex update throughput and latency: one request per update vs the bulk client.
+
+Run from the repository root:
+
+    python benchmarks/bench_legal_codex_client.py --updates 3000 --rate 2000 --latency-ms 2
+
+Starts the local stand-in server (ai_bridge/legal_codex_standin.py) with
+--latency-ms of delay per request and offers --updates updates at --rate
+per second, three ways:
+- per_request: one blocking POST per update on a new connection, the way a
+  per-file update_legal_codex call would;
+- pooled: LegalCodexClient with max_batch=1 (keep-alive connections and
+  MAX_IN_FLIGHT concurrent requests, no coalescing);
+- batched: LegalCodexClient with its defaults.
+Latency is measured from when an update was offered to when it was
+acknowledged. --fail-rate makes the server answer that share of requests
+with 503, so the client's retries are included.
+"""
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge.legal_codex_client import BULK_PATH, LegalCodexClient
+from ai_bridge.legal_codex_standin import start_standin
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def offer(updates, rate, send):
+    """Calls send(n, offered_at) for each update on schedule; returns the start time."""
+    start = time.perf_counter()
+    for n in range(updates):
+        offered_at = start + n / rate
+        delay = offered_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        send(n, offered_at)
+    return start
+
+
+def run_per_request(server, updates, rate, prefix):
+    latencies = []
+
+    def send(n, offered_at):
+        body = json.dumps({'updates': [{'idempotency_key': f'{prefix}-{n}', 'data': {'n': n}}]})
+        connection = http.client.HTTPConnection(*server.server_address[:2])
+        connection.request('POST', BULK_PATH, body=body, headers={'Content-Type': 'application/json'})
+        connection.getresponse().read()
+        connection.close()
+        latencies.append(time.perf_counter() - offered_at)
+
+    start = offer(updates, rate, send)
+    return start, time.perf_counter(), latencies
+
+
+def run_client(server, updates, rate, prefix, **options):
+    latencies = []
+    finished = threading.Event()
+    lock = threading.Lock()
+
+    def acknowledged(offered_at):
+        def callback(future):
+            with lock:
+                latencies.append(time.perf_counter() - offered_at)
+                if len(latencies) == updates:
+                    finished.set()
+        return callback
+
+    with LegalCodexClient(server.url, **options) as client:
+        def send(n, offered_at):
+            client.submit({'n': n}, f'{prefix}-{n}').add_done_callback(acknowledged(offered_at))
+        start = offer(updates, rate, send)
+        finished.wait()
+        end = time.perf_counter()
+    return start, end, latencies
+
+
+def summarize(server, run, *args, **options):
+    before = server.stats()['requests']
+    start, end, latencies = run(*args, **options)
+    return {
+        "updates_per_second": round(len(latencies) / (end - start)),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "requests": server.stats()['requests'] - before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=3000)
+    parser.add_argument('--rate', type=float, default=2000, help="Updates offered per second.")
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = start_standin(latency=args.latency_ms / 1000, fail_rate=args.fail_rate)
+    try:
+        results = {
+            "updates": args.updates,
+            "offered_per_second": args.rate,
+            "server_latency_ms": args.latency_ms,
+            "fail_rate": args.fail_rate,
+            "per_request": summarize(server, run_per_request, server, args.updates, args.rate, 'single'),
+            "pooled": summarize(server, run_client, server, args.updates, args.rate, 'pooled',
+                                max_batch=1, backoff=0.01),
+            "batched": summarize(server, run_client, server, args.updates, args.rate, 'batched', backoff=0.01),
+        }
+        print(json.dumps(results, indent=2))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Times indexed ledger queries against a full scan of the column store.
+
+Run from the repository root:
+
+    python benchmarks/bench_query_ledger.py --rows 10000000
+
+Writes a synthetic ledger of --rows rows over 2,000 accounts and three
+years, compacts it into the column store and builds the query indexes.
+Each query is then run once cold (fresh LedgerQuery, indexes not yet
+mapped) and --repeat times warm. `scan_ms` is the same filter computed as a
+vectorized mask over every row of the column store, which is what the
+query would cost without the indexes.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from financial_discovery.scripts.ledger_columns import LedgerColumns, parse_timestamp, to_cents
+from financial_discovery.scripts.query_ledger import LedgerQuery, refresh_indexes, tokenize
+
+SECONDS_PER_DAY = 86400
+START = 1640995200  # 2022-01-01
+ACCOUNTS = 2000
+MERCHANTS = ['Deposit Internet Transfer from', 'ATM Withdrawal BECU', 'Safeway Store', 'Amazon Marketplace',
+             'Puget Sound Energy', 'Seattle City Light', 'Transfer to Savings', 'Payroll Deposit ACME Corp']
+QUERIES = {
+    'account': {'account': '3621080007'},
+    'account_month': {'account': '3621080007', 'start': '2023-03-01', 'end': '2023-03-31'},
+    'one_day': {'start': '2023-06-15', 'end': '2023-06-15'},
+    'large_amounts': {'min_amount': 4999},
+    'text_rare': {'text': 'energy 4242'},
+    'text_and_amount': {'text': 'payroll', 'min_amount': 4000, 'start': '2024-01-01'},
+}
+
+
+def write_ledger(path, rows, seed=11):
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        for i in range(rows):
+            day = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(START + rng.randrange(1095) * SECONDS_PER_DAY))
+            f.write(f'{{"transaction_id": "t{i}", "timestamp": "{day}", '
+                    f'"account_number": "{3621080000 + rng.randrange(ACCOUNTS)}", '
+                    f'"amount": {rng.randrange(-500000, 500000) / 100}, "currency": "USD", '
+                    f'"description": "{MERCHANTS[i % len(MERCHANTS)]} {rng.randrange(10000)}", '
+                    f'"source": null, "source_file": "becu.csv", "reconciliation_status": "new"}}\n')
+
+
+def scan(columns, account=None, start=None, end=None, min_amount=None, max_amount=None, text=None):
+    """The same filter as LedgerQuery.rows, as masks over every row."""
+    mask = np.ones(columns.rows, dtype=bool)
+    if account is not None:
+        mask &= np.asarray(columns.column('account')) == columns.dictionary('account').index(account)
+    timestamps = np.asarray(columns.column('timestamp'))
+    if start is not None:
+        mask &= timestamps >= parse_timestamp(start)
+    if end is not None:
+        mask &= timestamps <= parse_timestamp(end) + SECONDS_PER_DAY - 1
+    if min_amount is not None:
+        mask &= np.asarray(columns.column('amount_cents')) >= to_cents(min_amount)
+    if max_amount is not None:
+        mask &= np.asarray(columns.column('amount_cents')) <= to_cents(max_amount)
+    if text is not None:
+        tokens = tokenize(text)
+        codes = np.flatnonzero([tokens <= tokenize(value) for value in columns.dictionary('description')])
+        mask &= np.isin(np.asarray(columns.column('description')), codes)
+    return np.flatnonzero(mask)
+
+
+def timed_ms(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return round((time.perf_counter() - start) * 1000, 2), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-query-')
+    try:
+        ledger = os.path.join(root, 'unified_ledger.jsonl')
+        columns_dir = os.path.join(root, 'columns')
+        start = time.perf_counter()
+        write_ledger(ledger, args.rows)
+        generate_seconds = time.perf_counter() - start
+        build_ms, _ = timed_ms(refresh_indexes, ledger, columns_dir)
+
+        columns = LedgerColumns(columns_dir)
+        columns.dictionary('description'), columns.dictionary('account')  # scan baseline loads these once
+        results = {}
+        for name, filters in QUERIES.items():
+            cold_ms, rows = timed_ms(lambda: LedgerQuery(ledger, columns_dir).rows(**filters))
+            query = LedgerQuery(ledger, columns_dir)
+            warm = [timed_ms(query.rows, **filters)[0] for _ in range(args.repeat)]
+            stream_ms, lines = timed_ms(lambda: sum(1 for _ in query.iter_lines(rows)))
+            scan_ms, expected = timed_ms(scan, columns, **filters)
+            assert np.array_equal(rows, expected), name
+            results[name] = {'filters': filters, 'matches': int(len(rows)), 'cold_ms': cold_ms,
+                             'median_ms': statistics.median(warm), 'stream_ms': stream_ms, 'scan_ms': scan_ms}
+        print(json.dumps({
+            'rows': args.rows,
+            'seconds': {'generate': round(generate_seconds, 2), 'build_columns_and_indexes': round(build_ms / 1000, 2)},
+            'queries': results,
+        }, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
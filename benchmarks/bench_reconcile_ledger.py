@@ -0,0 +1,119 @@
+"""Measures cross-source reconciliation on a synthetic ledger.
+
+Run from the repository root:
+
+    python benchmarks/bench_reconcile_ledger.py --per-source 1000000
+
+Each of --per-source underlying transactions is written three times: as a
+BECU CSV row, as a PDF row with an upper-cased, shortened description up to
+a day later, and as a Comet record with different wording up to two days
+later. A fifth of the transactions are also given a same-amount decoy in the
+same account a day away, with an unrelated description. Reports the time
+of each phase and how many of the true triples were grouped exactly.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from financial_discovery.scripts import reconcile_ledger
+from financial_discovery.scripts.ledger_columns import LedgerColumns, refresh_columns
+
+SECONDS_PER_DAY = 86400
+START = 1640995200  # 2022-01-01
+MERCHANTS = ['Deposit Internet Transfer from', 'ATM Withdrawal BECU', 'Safeway Store', 'Amazon Marketplace',
+             'Puget Sound Energy', 'Seattle City Light', 'Transfer to Savings', 'Payroll Deposit ACME Corp']
+
+
+def write_ledger(path, per_source, seed=7):
+    rng = random.Random(seed)
+    base = []
+    for i in range(per_source):
+        merchant = MERCHANTS[i % len(MERCHANTS)]
+        base.append((f"{3621080000 + rng.randrange(1000)}", START + rng.randrange(1000) * SECONDS_PER_DAY,
+                     rng.randrange(-500000, 500000) / 100, f"{merchant} {rng.randrange(100000)}"))
+
+    def iso(seconds):
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))
+
+    with open(path, 'w') as f:
+        for kind in ('csv', 'pdf', 'comet'):
+            for i, (account, day, amount, description) in enumerate(base):
+                if kind == 'csv':
+                    shift, text, source, source_file = 0, description, None, 'statements/raw/becu.csv'
+                elif kind == 'pdf':
+                    shift, text, source, source_file = i % 2, description.upper()[:28], None, 'statements/raw/becu.pdf'
+                else:
+                    shift, text, source, source_file = i % 3, f"{description.split()[-1]} {description.split()[0]}", 'Comet', None
+                f.write(json.dumps({
+                    'transaction_id': f"{kind}-{i}", 'timestamp': iso(day + shift * SECONDS_PER_DAY),
+                    'account_number': account, 'amount': amount, 'currency': 'USD', 'description': text,
+                    'source': source, 'source_file': source_file, 'reconciliation_status': 'new',
+                }) + '\n')
+        for i, (account, day, amount, description) in enumerate(base):
+            if i % 5 == 0:
+                f.write(json.dumps({
+                    'transaction_id': f"decoy-{i}", 'timestamp': iso(day + SECONDS_PER_DAY),
+                    'account_number': account, 'amount': amount, 'currency': 'USD', 'description': 'Unrelated',
+                    'source': None, 'source_file': 'statements/raw/other.pdf', 'reconciliation_status': 'new',
+                }) + '\n')
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return round(time.perf_counter() - start, 2), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--per-source', type=int, default=1000000)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-reconcile-')
+    try:
+        ledger = os.path.join(root, 'unified_ledger.jsonl')
+        columns_dir = os.path.join(root, 'columns')
+        generate_seconds, _ = timed(write_ledger, ledger, args.per_source)
+        refresh_seconds, _ = timed(refresh_columns, ledger, columns_dir)
+        columns = LedgerColumns(columns_dir)
+        pairs_seconds, pairs = timed(reconcile_ledger.candidate_pairs, columns,
+                                     reconcile_ledger._row_kinds(columns)[0])
+        match_seconds, groups = timed(reconcile_ledger.match_rows, columns)
+        write_seconds, changed = timed(reconcile_ledger.write_reconciliation, ledger,
+                                       np.asarray(columns.column('offset')), groups)
+
+        n = args.per_source
+        exact = sum(1 for group in groups
+                    if len(group) == 3 and group[0] < n and len({row % n for row in group}) == 1)
+        wrong = sum(1 for group in groups if len({row % n for row in group}) > 1 or group[-1] >= 3 * n)
+        print(json.dumps({
+            "per_source": n,
+            "ledger_rows": columns.rows,
+            "seconds": {
+                "generate": generate_seconds,
+                "refresh_columns": refresh_seconds,
+                "candidate_pairs": pairs_seconds,
+                "match_rows": match_seconds,
+                "write": write_seconds,
+            },
+            "candidate_pairs": int(len(pairs[0])),
+            "groups": len(groups),
+            "exact_triples": exact,
+            "recall": round(exact / n, 4),
+            "wrong_groups": wrong,
+            "rows_changed": changed,
+        }, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
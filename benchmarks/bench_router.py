@@ -0,0 +1,100 @@
+"""Benchmarks end-to-end throughput of the asyncio bridge router.
+
+Run from the repository root:
+
+    python benchmarks/bench_router.py --messages 20000
+
+A scratch bridge tree is created and the router is started with its standard
+routes (session log, LegalCodex, cloud summaries). A separate generator
+process then writes --messages JSON messages into to_comet/ and to_codex/,
+alternating between them. Each message is written to a temporary name and
+renamed into place, the way an agent would. The script reports messages per
+second from the first write until every message has been logged, and until
+every to_codex message has been pushed to LegalCodex.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import multiprocessing
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge import router as bridge_router
+from ai_bridge.session_log import SessionLog
+from ai_bridge.watcher import Watcher
+
+
+def generate_messages(count):
+    for n in range(count):
+        sender, directory = (('codex', bridge_router.TO_COMET_DIR) if n % 2 == 0
+                             else ('comet', bridge_router.TO_CODEX_DIR))
+        message = {"message_id": f"{sender}-{n:07d}", "sender": sender, "type": "update",
+                   "content": "synthetic bridge message " * 10, "status": "sent"}
+        path = os.path.join(directory, f"{sender}-{n:07d}-bench.json")
+        with open(path + '.tmp', 'w') as f:
+            json.dump(message, f)
+        os.replace(path + '.tmp', path)
+
+
+async def run(args):
+    router = bridge_router.build_router(Watcher(debounce=args.debounce, force_polling=args.polling))
+    routes = {route.name: route for route in router.routes}
+    started = []
+    finished = {}
+
+    async def until_done():
+        await asyncio.sleep(0.2)  # let the watcher finish its startup scan
+        # A separate process, like the agents writing messages, so the
+        # generator does not compete with the router for the GIL.
+        started.append(time.perf_counter())
+        generator = multiprocessing.Process(target=generate_messages, args=(args.messages,))
+        generator.start()
+        targets = {'session_log': args.messages, 'legal_codex': args.messages // 2}
+        while len(finished) < len(targets):
+            for name, target in targets.items():
+                if name not in finished and routes[name].handled >= target:
+                    finished[name] = time.perf_counter()
+            await asyncio.sleep(0.005)
+        generator.join()
+
+    await router.run(until_done())
+    return started[0], finished
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20_000)
+    parser.add_argument('--debounce', type=float, default=0.05)
+    parser.add_argument('--polling', action='store_true')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-router-')
+    cwd = os.getcwd()
+    try:
+        os.chdir(root)
+        for directory in ['ai_bridge/to_comet', 'ai_bridge/to_codex', 'ai_bridge/from_jules', 'ai_bridge/logs',
+                          'cloud_discovery/financial', 'cloud_discovery/evidence']:
+            os.makedirs(directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            started, finished = asyncio.run(run(args))
+        logged = sum(1 for _ in SessionLog().iter_messages())
+        print(json.dumps({
+            'messages': args.messages,
+            'debounce_seconds': args.debounce,
+            'session_log_messages_per_second': round(args.messages / (finished['session_log'] - started)),
+            'legal_codex_messages_per_second': round(args.messages / 2 / (finished['legal_codex'] - started)),
+            'messages_in_session_log': logged,
+        }, indent=2))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
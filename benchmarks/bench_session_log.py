@@ -0,0 +1,72 @@
+"""Benchmarks appending to the session history: session.json rewrite vs segmented log.
+
+Run from the repository root:
+
+    python benchmarks/bench_session_log.py --history 200000
+
+Both stores are preloaded with --history messages, then the script times
+appending a batch of --batch new messages, the way one summarize_activity run
+does. The legacy approach loads, extends and rewrites the whole session.json.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge.session_log import SessionLog
+
+
+def make_messages(count, start=0):
+    return [{"message_id": f"codex-{start + n:07d}", "sender": "codex", "recipient": "comet",
+             "type": "update", "content": "x" * 400} for n in range(count)]
+
+
+def legacy_append(path, messages):
+    with open(path, 'r') as f:
+        sessions = json.load(f)
+    sessions[-1]['messages'].extend(messages)
+    with open(path, 'w') as f:
+        json.dump(sessions, f, indent=2)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--history', type=int, default=200_000)
+    parser.add_argument('--batch', type=int, default=10)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-session-log-')
+    try:
+        legacy_file = os.path.join(root, 'session.json')
+        history = make_messages(args.history)
+        with open(legacy_file, 'w') as f:
+            json.dump([{"session_id": "session-bench", "messages": history}], f, indent=2)
+        log = SessionLog(os.path.join(root, 'session'), legacy_path=None)
+        log.append(history)
+        batch = make_messages(args.batch, start=args.history)
+
+        start = time.perf_counter()
+        legacy_append(legacy_file, batch)
+        legacy_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        SessionLog(os.path.join(root, 'session'), legacy_path=None).append(batch)
+        segmented_seconds = time.perf_counter() - start
+
+        print(json.dumps({
+            'history_messages': args.history,
+            'batch_messages': args.batch,
+            'legacy_rewrite_seconds': round(legacy_seconds, 4),
+            'segmented_append_seconds': round(segmented_seconds, 4),
+            'segments': len(log.manifest['segments']),
+        }, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
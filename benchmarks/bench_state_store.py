@@ -0,0 +1,87 @@
+"""Benchmarks the watcher daemons' processed-file state: JSON set vs ProcessedStore.
+
+Run from the repository root:
+
+    python benchmarks/bench_state_store.py --files 300000
+
+Both stores are preloaded with --files paths. The script then times
+recording --batch new files with a save after each one (what
+update_legal_codex did), and measures the Python heap held by each store.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge.state_store import ProcessedStore
+
+
+def make_paths(count, start=0):
+    return [f"cloud_discovery/financial/statements/2023/account_{n % 50:02d}/statement-{start + n:07d}.csv"
+            for n in range(count)]
+
+
+def heap_bytes(fn):
+    tracemalloc.start()
+    result = fn()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=300_000)
+    parser.add_argument('--batch', type=int, default=100)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-state-store-')
+    try:
+        json_path = os.path.join(root, 'processed.json')
+        store_path = os.path.join(root, 'processed.sqlite')
+        with open(json_path, 'w') as f:
+            json.dump(make_paths(args.files), f)
+        shutil.copy(json_path, json_path + '.legacy')
+        ProcessedStore(store_path, legacy_path=json_path + '.legacy').close()
+        new_paths = make_paths(args.batch, start=args.files)
+
+        def load_json():
+            with open(json_path, 'r') as f:
+                return set(json.load(f))
+
+        processed, json_heap = heap_bytes(load_json)
+        start = time.perf_counter()
+        for path in new_paths:
+            processed.add(path)
+            with open(json_path, 'w') as f:
+                json.dump(list(processed), f)
+        json_seconds = time.perf_counter() - start
+
+        store, store_heap = heap_bytes(lambda: ProcessedStore(store_path))
+        start = time.perf_counter()
+        for path in new_paths:
+            if path not in store:
+                store.add(path)
+                store.commit()
+        store_seconds = time.perf_counter() - start
+        store.close()
+
+        print(json.dumps({
+            'files': args.files,
+            'saves': args.batch,
+            'json_seconds_per_save': round(json_seconds / args.batch, 5),
+            'store_seconds_per_save': round(store_seconds / args.batch, 5),
+            'json_heap_bytes': json_heap,
+            'store_heap_bytes': store_heap,
+        }, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
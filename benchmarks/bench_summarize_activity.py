@@ -0,0 +1,121 @@
+"""Benchmarks summarize_activity change detection over a large cloud_discovery tree.
+
+Run from the repository root:
+
+    python benchmarks/bench_summarize_activity.py --files 500000
+
+A synthetic tree of --files small files (spread over 1000 directories) is
+written to a scratch directory. After an initial run, --touched files get a
+new mtime with unchanged content and --modified files get new content. The
+script times one run of the old mtime-watermark scan (os.walk + getmtime,
+rereading every touched file) and one run of the manifest scan, and reports
+how many items each would log.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge import summarize_activity
+
+
+def build_tree(root, files, directories=1000):
+    for d in range(directories):
+        os.makedirs(os.path.join(root, f"dir{d:04d}"))
+    paths = []
+    for n in range(files):
+        path = os.path.join(root, f"dir{n % directories:04d}", f"file{n:07d}.txt")
+        with open(path, 'w') as f:
+            f.write(f"record {n}\n")
+        paths.append(path)
+    return paths
+
+
+def legacy_scan(root, last_run_timestamp):
+    """The pre-manifest logic: stat everything, reread anything newer."""
+    new_messages = []
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            filepath = os.path.join(directory, filename)
+            if os.path.getmtime(filepath) > last_run_timestamp:
+                with open(filepath, 'r', errors='ignore') as f:
+                    new_messages.append({"filepath": filepath, "content": f.read(5000)})
+    return new_messages
+
+
+def run_manifest_scan(manifest_path):
+    manifest = summarize_activity.FileManifest(manifest_path)
+    messages = summarize_activity.collect_changes(manifest)
+    manifest.commit()
+    manifest.close()
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=500_000)
+    parser.add_argument('--touched', type=int, default=5000)
+    parser.add_argument('--modified', type=int, default=50)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-summarize-activity-')
+    try:
+        cloud_dir = os.path.join(root, 'cloud_discovery')
+        summarize_activity.TO_COMET_DIR = os.path.join(root, 'to_comet')
+        summarize_activity.TO_CODEX_DIR = os.path.join(root, 'to_codex')
+        summarize_activity.CLOUD_DISCOVERY_DIR = cloud_dir
+        os.makedirs(summarize_activity.TO_COMET_DIR)
+        os.makedirs(summarize_activity.TO_CODEX_DIR)
+        paths = build_tree(cloud_dir, args.files)
+
+        manifest_path = os.path.join(root, 'manifest.sqlite')
+        start = time.perf_counter()
+        run_manifest_scan(manifest_path)
+        initial_seconds = time.perf_counter() - start
+        last_run_timestamp = time.time()
+        time.sleep(0.05)
+
+        rng = random.Random(7)
+        sample = rng.sample(paths, args.touched + args.modified)
+        for path in sample[:args.touched]:
+            os.utime(path)
+        for path in sample[args.touched:]:
+            with open(path, 'a') as f:
+                f.write("amended\n")
+
+        start = time.perf_counter()
+        legacy_messages = legacy_scan(cloud_dir, last_run_timestamp)
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        messages = run_manifest_scan(manifest_path)
+        manifest_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        idle_messages = run_manifest_scan(manifest_path)
+        idle_seconds = time.perf_counter() - start
+
+        print(json.dumps({
+            'files': args.files,
+            'touched_files': args.touched,
+            'modified_files': args.modified,
+            'initial_hash_seconds': round(initial_seconds, 2),
+            'legacy_scan_seconds': round(legacy_seconds, 2),
+            'legacy_items_logged': len(legacy_messages),
+            'manifest_scan_seconds': round(manifest_seconds, 2),
+            'manifest_items_logged': len(messages),
+            'idle_manifest_scan_seconds': round(idle_seconds, 2),
+            'idle_items_logged': len(idle_messages),
+            'manifest_bytes': os.path.getsize(manifest_path),
+        }, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
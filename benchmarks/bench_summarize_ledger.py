@@ -0,0 +1,72 @@
+"""Benchmarks per-account summaries and anomaly flags over a large ledger.
+
+Run from the repository root:
+
+    python benchmarks/bench_summarize_ledger.py --rows 10000000
+
+A synthetic ledger is written to a scratch directory (see
+bench_ledger_columns.py). The script times a full summary run, which includes
+the initial column-store compaction, a second full run over an up-to-date
+store, and an incremental run after a few rows for one account are appended.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.bench_ledger_columns import write_ledger
+from financial_discovery.scripts import summarize_ledger
+from financial_discovery.scripts.ledger_columns import LedgerColumns
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-summarize-ledger-')
+    try:
+        ledger = os.path.join(root, 'unified_ledger.jsonl')
+        columns_dir = os.path.join(root, 'columns')
+        summarize_ledger.OUTPUT_DIR = os.path.join(root, 'financial')
+        summarize_ledger.STATE_FILE = os.path.join(root, 'state.json')
+        write_ledger(ledger, args.rows)
+
+        first_seconds, written = timed(summarize_ledger.summarize_ledger, ledger, columns_dir)
+        full_seconds, _ = timed(summarize_ledger.summarize_ledger, ledger, columns_dir, full=True)
+        transfer_seconds, (pairs, _) = timed(summarize_ledger.find_related_transfers, LedgerColumns(columns_dir))
+        with open(ledger, 'a') as f:
+            for amount in (12500.0, -40.0):
+                f.write(json.dumps({'transaction_id': f"new-{amount}",
+                                    'timestamp': datetime.now(timezone.utc).isoformat(),
+                                    'account_number': '3621000000', 'amount': amount,
+                                    'description': 'CASH DEPOSIT BRANCH 0042'}) + '\n')
+        incremental_seconds, rewritten = timed(summarize_ledger.summarize_ledger, ledger, columns_dir)
+
+        print(json.dumps({
+            'rows': args.rows,
+            'accounts': len(written),
+            'first_run_seconds': round(first_seconds, 3),
+            'full_run_seconds': round(full_seconds, 3),
+            'transfer_join_seconds': round(transfer_seconds, 3),
+            'transfer_pairs': int(len(pairs)),
+            'incremental_run_seconds': round(incremental_seconds, 3),
+            'incremental_accounts_rewritten': len(rewritten),
+        }, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
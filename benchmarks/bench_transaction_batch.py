@@ -0,0 +1,118 @@
+"""Compares the memory of a parsed statement held as dicts and as a TransactionBatch.
+
+Run from the repository root:
+
+    python benchmarks/bench_transaction_batch.py --rows 1000000 5000000
+
+For each size, one synthetic BECU statement is parsed the way
+ingest_statements parses it, under tracemalloc:
+
+- `dicts`: what parse_csv_statement used to build, a dict per row with a
+  copy of the raw CSV row in `metadata.original_row`;
+- `batch`: the TransactionBatch it builds now (transaction_batch.py).
+
+`parse_peak_mb` is the peak while parsing and hashing, and `held_mb` what the
+parsed statement still holds afterwards. `write_peak_mb` is the peak once the
+statement is also written to a scratch ledger with LedgerWriter. For dicts,
+that is every row plus the writer's buffer. For a batch, dicts are built a
+writer batch at a time. The dict form needs well over 1 GB per million rows,
+so by default it is only measured up to --dicts-max-rows and projected
+linearly above that. tracemalloc slows everything down several times over,
+so no timings are reported; bench_ledger_schema.py times the ingest path.
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import generators
+from financial_discovery.scripts.csv_profiles import parse_statement
+from financial_discovery.scripts.ingest_statements import parse_csv_statement
+from financial_discovery.scripts.ledger_writer import LedgerWriter
+from financial_discovery.scripts.transaction_ids import assign_ids
+
+MB = 1024 * 1024
+
+
+def parse_dicts(filepath, source):
+    """parse_csv_statement as it was before TransactionBatch."""
+    transactions = []
+    for fields in parse_statement(filepath, keep_rows=True):
+        transactions.append({
+            'transaction_id': None,
+            'timestamp': fields['timestamp'],
+            'account_number': fields['account_number'],
+            'amount': fields['amount'],
+            'currency': fields['currency'],
+            'description': fields['description'],
+            'source': source,
+            'source_file': filepath,
+            'reconciliation_status': 'new',
+            'metadata': {'original_row': fields['row']},
+        })
+    return assign_ids(transactions)
+
+
+def measure(parse, filepath, ledger):
+    gc.collect()
+    tracemalloc.start()
+    transactions = parse(filepath, 'LegalCodex')
+    held, parse_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    with LedgerWriter(ledger, batch_size=1000, flush_interval=60) as writer:
+        with writer.statement(filepath):
+            written = writer.write_all(transactions)
+    _, write_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert written == len(transactions)
+    del transactions
+    return {
+        'parse_peak_mb': round(parse_peak / MB, 1),
+        'held_mb': round(held / MB, 1),
+        'write_peak_mb': round(max(parse_peak, write_peak) / MB, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000, 5000000])
+    parser.add_argument('--dicts-max-rows', type=int, default=1000000,
+                        help="Largest statement to measure as dicts; larger ones are projected.")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='bench-transaction-batch-')
+    results = []
+    try:
+        measured_dicts = None
+        for rows in args.rows:
+            filepath = os.path.join(tmp_dir, f"becu_{generators.FIRST_ACCOUNT}.csv")
+            generators.write_becu_csv(filepath, rows)
+            result = {'rows': rows, 'csv_mb': round(os.path.getsize(filepath) / MB, 1)}
+            ledger = os.path.join(tmp_dir, 'ledger.jsonl')
+            result['batch'] = measure(parse_csv_statement, filepath, ledger)
+            batch_digest = generators.digest_files([ledger])
+            os.remove(ledger)
+            if rows <= args.dicts_max_rows:
+                result['dicts'] = measure(parse_dicts, filepath, ledger)
+                # Both forms must produce the same ledger.
+                assert generators.digest_files([ledger]) == batch_digest, "ledgers differ"
+                os.remove(ledger)
+                measured_dicts = (rows, result['dicts'])
+            elif measured_dicts is not None:
+                scale = rows / measured_dicts[0]
+                result['dicts_projected'] = {key: round(value * scale, 1) for key, value in measured_dicts[1].items()}
+            os.remove(filepath)
+            results.append(result)
+            print(json.dumps(result), flush=True)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
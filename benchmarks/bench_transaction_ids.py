@@ -0,0 +1,68 @@
+"""Compares transaction ID hashing: the old per-ingester schemes vs transaction_ids.
+
+Run from the repository root:
+
+    python benchmarks/bench_transaction_ids.py --rows 1000000
+
+`json_sorted` is what ingest_statements used to do (json.dumps of the raw
+row with sorted keys); `concat` is what ingest_csv and ingest_pdf used to do
+(the values joined with no separator). The canonical scheme normalizes the
+fields first, which the old schemes did not.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from financial_discovery.scripts.transaction_ids import transaction_id, transaction_ids
+
+
+def make_rows(count):
+    return [{
+        'timestamp': f"2022-{1 + i % 12:02d}-{1 + i % 28:02d}T00:00:00",
+        'description': f"Deposit Internet Transfer from {3621082704 + i % 97}",
+        'amount': (i % 5000) / 100 - 25,
+        'currency': 'USD',
+        'source_file': 'financial_discovery/statements/raw/becu_3621082978.csv',
+        'account_number': '3621082978',
+    } for i in range(count)]
+
+
+def json_sorted(rows):
+    return [hashlib.sha256(json.dumps(row, sort_keys=True).encode()).hexdigest() for row in rows]
+
+
+def concat(rows):
+    return [hashlib.sha256("".join(str(value) for value in row.values()).encode()).hexdigest() for row in rows]
+
+
+def canonical_per_row(rows):
+    return [transaction_id(row) for row in rows]
+
+
+def timed(fn, rows):
+    start = time.perf_counter()
+    fn(rows)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    results = {"rows": args.rows, "schemes": []}
+    for name, fn in (('json_sorted', json_sorted), ('concat', concat),
+                     ('canonical_per_row', canonical_per_row), ('canonical_bulk', transaction_ids)):
+        elapsed = timed(fn, rows)
+        results["schemes"].append({"scheme": name, "seconds": round(elapsed, 2),
+                                   "rows_per_sec": round(args.rows / elapsed)})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Benchmarks event-to-handler latency and idle CPU of ai_bridge.watcher.
+
+Run from the repository root:
+
+    python benchmarks/bench_watcher.py --files 100000
+
+Both watched directories are filled with `--files` files in total before the
+watcher starts. For each backend the script reports the CPU the watcher burns
+while nothing changes and the latency from a writer closing a new file to the
+handler being called. The cost of one tick of the old os.listdir polling loop
+is reported alongside for comparison.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge import watcher as watcher_module
+from ai_bridge.watcher import Watcher, EXISTING
+
+
+def populate(directories, total):
+    for i in range(total):
+        directory = directories[i % len(directories)]
+        with open(os.path.join(directory, f"existing-{i:07d}.json"), 'w') as f:
+            f.write('{}')
+
+
+def legacy_tick(directories, processed):
+    """One iteration of the old monitoring loop, minus the sleep."""
+    start = time.perf_counter()
+    for directory in directories:
+        for filename in os.listdir(directory):
+            filepath = os.path.join(directory, filename)
+            if filepath not in processed:
+                pass
+    return time.perf_counter() - start
+
+
+def bench_backend(directories, force_polling, idle_seconds, samples, debounce):
+    arrivals = {}
+    arrived = threading.Condition()
+
+    def handler(event):
+        if event.kind != EXISTING or event.path.endswith('sentinel.json'):
+            with arrived:
+                arrivals[event.path] = time.monotonic()
+                arrived.notify_all()
+
+    w = Watcher(debounce=debounce, force_polling=force_polling)
+    for directory in directories:
+        w.add_handler(directory, handler)
+
+    start = time.perf_counter()
+    thread = threading.Thread(target=w.run, daemon=True)
+    thread.start()
+    # Wait for the initial scan to finish by watching for a sentinel file in
+    # the directory that is scanned last.
+    sentinel = os.path.join(directories[-1], 'sentinel.json')
+    with open(sentinel, 'w') as f:
+        f.write('{}')
+    with arrived:
+        arrived.wait_for(lambda: sentinel in arrivals, timeout=600)
+    startup = time.perf_counter() - start
+    # Let recently touched directories age past the polling mtime slack.
+    time.sleep(watcher_module.MTIME_SLACK_NS / 1e9 + 0.5)
+
+    cpu_before = time.process_time()
+    time.sleep(idle_seconds)
+    idle_cpu = (time.process_time() - cpu_before) / idle_seconds
+
+    latencies = []
+    for i in range(samples):
+        path = os.path.join(directories[i % len(directories)], f"new-{w.backend.name}-{i:05d}.json")
+        with open(path, 'w') as f:
+            f.write(json.dumps({"sample": i}))
+        closed = time.monotonic()
+        with arrived:
+            if not arrived.wait_for(lambda: path in arrivals, timeout=30):
+                continue
+        latencies.append(arrivals[path] - closed)
+
+    w.stop()
+    thread.join(timeout=5)
+    latencies.sort()
+    return {
+        "backend": w.backend.name,
+        "startup_seconds": round(startup, 3),
+        "idle_cpu_percent": round(idle_cpu * 100, 3),
+        "latency_ms_p50": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "latency_ms_p99": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2) if latencies else None,
+        "latency_samples": len(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=100000, help="Files pre-populated across the watched directories.")
+    parser.add_argument('--idle-seconds', type=float, default=5.0)
+    parser.add_argument('--samples', type=int, default=50)
+    parser.add_argument('--debounce', type=float, default=watcher_module.DEBOUNCE_SECONDS)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-watcher-')
+    try:
+        directories = [os.path.join(root, 'financial'), os.path.join(root, 'to_codex')]
+        for directory in directories:
+            os.makedirs(directory)
+        populate(directories, args.files)
+        processed = {os.path.join(d, n) for d in directories for n in os.listdir(d)}
+
+        results = {
+            "files": args.files,
+            "debounce_seconds": args.debounce,
+            "legacy_listdir_tick_ms": round(legacy_tick(directories, processed) * 1000, 2),
+            "legacy_expected_latency_ms": 5000.0,
+            "backends": [],
+        }
+        modes = [True] if watcher_module._load_libc() is None else [False, True]
+        for force_polling in modes:
+            results["backends"].append(
+                bench_backend(directories, force_polling, args.idle_seconds, args.samples, args.debounce))
+        print(json.dumps(results, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""Deterministic synthetic inputs for the benchmarks.
+
+Run from the repository root to write a data set by hand:
+
+    python benchmarks/generators.py csv --rows 1000000 --out /tmp/raw
+    python benchmarks/generators.py pdf --rows 20000 --out /tmp/raw
+    python benchmarks/generators.py messages --count 100000 --out /tmp/ai_bridge
+    python benchmarks/generators.py evidence --count 1000 --out /tmp/evidence
+
+Every generator takes a seed and writes byte-identical output for the same
+arguments, so timings from different runs (and from the stored baseline)
+are for the same data. Rows are produced in a streaming fashion; 10M-row
+statements do not need 10M rows in memory.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+from datetime import date, timedelta
+
+# --- Configuration ---
+SEED = 20220814
+# First statement date; rows spread over DATE_SPAN_DAYS from there.
+START_DATE = date(2022, 1, 1)
+DATE_SPAN_DAYS = 1000
+FIRST_ACCOUNT = 3621082704
+COUNTERPARTIES = 97
+DESCRIPTIONS = [
+    "Deposit Internet Transfer from {account}",
+    "Withdrawal Internet Transfer to {account}",
+    "ATM Cash Deposit Branch {n}",
+    "POS Purchase Grocery Outlet {n}",
+    "ACH Payment Utility Co {n}",
+    "Check {n}",
+    "Wire Transfer Out Ref {n}",
+]
+PDF_LINES_PER_PAGE = 60
+WRITE_BATCH_ROWS = 10000
+
+
+def _statement_rows(rows, seed):
+    """Yields (date, amount_cents, description) in date order."""
+    rng = random.Random(seed)
+    for i in range(rows):
+        day = START_DATE + timedelta(days=i * DATE_SPAN_DAYS // max(rows, 1))
+        cents = rng.randint(1, 500000) * (1 if rng.random() < 0.4 else -1)
+        template = DESCRIPTIONS[rng.randrange(len(DESCRIPTIONS))]
+        description = template.format(account=FIRST_ACCOUNT + rng.randrange(COUNTERPARTIES),
+                                      n=rng.randrange(10000))
+        yield day, cents, description
+
+
+def statement_accounts(statements):
+    return [FIRST_ACCOUNT + 1000 + n for n in range(statements)]
+
+
+# --- Statements ---
+
+def write_becu_csv(path, rows, seed=SEED):
+    """Writes a BECU export (date,type,amount,name,memo) with MM/DD/YYYY dates."""
+    with open(path, 'w', newline='') as f:
+        f.write('date,type,amount,name,memo\n')
+        batch = []
+        for day, cents, description in _statement_rows(rows, seed):
+            kind = 'CREDIT' if cents > 0 else 'DEBIT'
+            sign = '-' if cents < 0 else ''
+            amount = f"{sign}{abs(cents) // 100}.{abs(cents) % 100:02d}"
+            batch.append(f"{day:%m/%d/%Y},{kind},{amount},{description.split(' ')[0]},{description}\n")
+            if len(batch) >= WRITE_BATCH_ROWS:
+                f.write(''.join(batch))
+                batch.clear()
+        f.write(''.join(batch))
+
+
+def write_becu_statements(directory, rows, statements, seed=SEED):
+    """Splits `rows` over `statements` BECU files, one account each
+    (becu_<account>.csv, the layout ingest expects). Returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for n, account in enumerate(statement_accounts(statements)):
+        count = rows // statements + (1 if n < rows % statements else 0)
+        path = os.path.join(directory, f"becu_{account}.csv")
+        write_becu_csv(path, count, seed + n)
+        paths.append(path)
+    return paths
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_text_pdf(path, rows, seed=SEED, lines_per_page=PDF_LINES_PER_PAGE):
+    """Writes a PDF with a text layer of "MM/DD/YYYY description 1,234.56"
+    lines, the shape ingest_pdf.TRANSACTION_REGEX matches.
+
+    The file is streamed page by page: catalog, page tree and font first,
+    then a page object and content stream per page, then the xref table.
+    """
+    pages = max(1, -(-rows // lines_per_page))
+    offsets = []
+    with open(path, 'wb') as f:
+        def add(body):
+            offsets.append(f.tell())
+            f.write(f"{len(offsets)} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        kids = ' '.join(f"{4 + 2 * n} 0 R" for n in range(pages))
+        add(b"<< /Type /Catalog /Pages 2 0 R >>")
+        add(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+        add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+        lines = _statement_rows(rows, seed)
+        for n in range(pages):
+            text = ["BT /F1 9 Tf 11 TL 36 756 Td"]
+            for day, cents, description in (line for _, line in zip(range(lines_per_page), lines)):
+                amount = f"{abs(cents) // 100:,}.{abs(cents) % 100:02d}"
+                text.append(f"({_pdf_escape(f'{day:%m/%d/%Y} {description} {amount}')}) Tj T*")
+            text.append("ET")
+            stream = '\n'.join(text).encode()
+            add(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * n} 0 R >>".encode())
+            add(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+
+        xref = f.tell()
+        f.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode())
+        f.writelines(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+        f.write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return pages
+
+
+def write_pdf_statements(directory, rows, statements, seed=SEED):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for n in range(statements):
+        count = rows // statements + (1 if n < rows % statements else 0)
+        path = os.path.join(directory, f"statement_{n:04d}.pdf")
+        write_text_pdf(path, count, seed + n)
+        paths.append(path)
+    return paths
+
+
+# --- Bridge traffic ---
+
+def write_message_flood(bridge_dir, count, seed=SEED):
+    """Writes `count` messages in the README format: codex-NNNN-*.json
+    initiations in to_comet/ and, for every other one, a comet response in
+    to_codex/. Returns the number of files written."""
+    rng = random.Random(seed)
+    to_comet = os.path.join(bridge_dir, 'to_comet')
+    to_codex = os.path.join(bridge_dir, 'to_codex')
+    os.makedirs(to_comet, exist_ok=True)
+    os.makedirs(to_codex, exist_ok=True)
+    written = 0
+    for n in range((count + 1) // 2):
+        message_id = f"codex-{n:07d}"
+        timestamp = f"2025-01-15T{n // 3600 % 24:02d}:{n // 60 % 60:02d}:{n % 60:02d}Z"
+        request = {
+            "message_id": message_id, "timestamp": timestamp, "sender": "codex", "recipient": "comet",
+            "type": "request", "content": f"Pull statements for account {FIRST_ACCOUNT + rng.randrange(97)}",
+            "protocol_version": "1.0", "metadata": {"context": "financial_discovery", "priority": "normal",
+                                                    "requires_response": True},
+            "status": "sent",
+        }
+        with open(os.path.join(to_comet, f"{message_id}-request.json"), 'w') as f:
+            json.dump(request, f)
+        written += 1
+        if written == count:
+            break
+        response = {
+            "message_id": f"comet-{n:07d}-response", "response_id": f"comet-{n:07d}-response",
+            "timestamp": timestamp, "sender": "comet", "recipient": "codex", "type": "response",
+            "original_message_id": message_id, "content": "x" * rng.randrange(100, 2000),
+            "metadata": {"status_code": 200, "response_time_ms": rng.randrange(50, 5000), "confirmed": True},
+            "status": "delivered",
+        }
+        with open(os.path.join(to_codex, f"comet-{n:07d}-response.json"), 'w') as f:
+            json.dump(response, f)
+        written += 1
+    return written
+
+
+def write_evidence_tree(directory, count, seed=SEED, max_bytes=256 * 1024):
+    """Writes `count` text evidence files of up to `max_bytes`, plus a few
+    binary (PDF-signature) ones. Returns the total bytes written."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    total = 0
+    for n in range(count):
+        size = rng.randrange(1024, max_bytes)
+        if n % 20 == 19:
+            data = b'%PDF-1.4\n' + rng.randbytes(size)
+            name = f"scan_{n:06d}.bin"
+        else:
+            line = f"2022-08-{1 + n % 28:02d} evidence record {n} account {FIRST_ACCOUNT + n % 97}\n".encode()
+            data = (line * (size // len(line) + 1))[:size]
+            name = f"evidence_{n:06d}.log"
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(data)
+        total += len(data)
+    return total
+
+
+def digest_files(paths):
+    """SHA-256 over the names and contents of `paths`, to tell data sets apart."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode() + b'\0')
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def digest_tree(directory):
+    paths = [os.path.join(root, name) for root, _, names in os.walk(directory) for name in names]
+    return digest_files(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('kind', choices=['csv', 'pdf', 'messages', 'evidence'])
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--rows', type=int, default=100_000, help="Statement rows (csv, pdf).")
+    parser.add_argument('--statements', type=int, default=1)
+    parser.add_argument('--count', type=int, default=10_000, help="Files (messages, evidence).")
+    parser.add_argument('--seed', type=int, default=SEED)
+    args = parser.parse_args()
+
+    if args.kind == 'csv':
+        paths = write_becu_statements(args.out, args.rows, args.statements, args.seed)
+    elif args.kind == 'pdf':
+        paths = write_pdf_statements(args.out, args.rows, args.statements, args.seed)
+    elif args.kind == 'messages':
+        write_message_flood(args.out, args.count, args.seed)
+        paths = None
+    else:
+        write_evidence_tree(args.out, args.count, args.seed)
+        paths = None
+    print(json.dumps({"kind": args.kind, "out": args.out,
+                      "sha256": digest_files(paths) if paths else digest_tree(args.out)}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+"""Runs the end-to-end benchmark scenarios and compares them with a stored baseline.
+
+Run from the repository root:
+
+    python benchmarks/run_suite.py --scale 100k
+    python benchmarks/run_suite.py --scale 1m --scenarios csv_ingest,dedup_load
+    python benchmarks/run_suite.py --scale 100k --save-baseline
+
+Each scenario runs the real entry-point code in a scratch tree (the scripts'
+relative paths resolve against it) on inputs from generators.py:
+- csv_ingest: ingest_statements over BECU CSV statements;
+- dedup_load: rebuilding and reopening the ledger ID index, then
+  re-ingesting a statement whose rows are all duplicates;
+- pdf_ingest: ingest_pdf over text-layer PDF statements, cold text cache;
+- session_summarization: summarize_activity over a to_comet/to_codex
+  message flood, cold and then with nothing changed;
+- directory_indexing: the cloud discovery indexer over an evidence tree.
+
+--scale picks the input sizes (see SCALES; --rows, --messages and friends
+override them). Results, with the per-stage totals recorded by
+ai_bridge/metrics.py, are written to benchmarks/results/ and compared
+with benchmarks/baseline.json when both ran on the same inputs: a timing
+more than --tolerance slower than the baseline is reported as a
+regression. Nothing needs network access.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_bridge import metrics
+from benchmarks import generators
+
+# --- Configuration ---
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+BASELINE_FILE = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+SCHEMA_DIR = 'financial_discovery/schema'
+SCALES = {
+    '1k': {'rows': 1_000, 'statements': 2, 'pdf_rows': 1_000, 'messages': 200, 'evidence_files': 50},
+    '100k': {'rows': 100_000, 'statements': 10, 'pdf_rows': 10_000, 'messages': 10_000, 'evidence_files': 1_000},
+    '1m': {'rows': 1_000_000, 'statements': 20, 'pdf_rows': 50_000, 'messages': 100_000,
+           'evidence_files': 5_000},
+    '10m': {'rows': 10_000_000, 'statements': 100, 'pdf_rows': 200_000, 'messages': 1_000_000,
+            'evidence_files': 20_000},
+}
+SCENARIOS = ['csv_ingest', 'dedup_load', 'pdf_ingest', 'session_summarization', 'directory_indexing']
+TOLERANCE = 0.25
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silences the scripts' per-file print()s while a scenario is timed."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    with quiet():
+        result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def stage_totals():
+    return {name: round(stage['total_seconds'], 4)
+            for name, stage in metrics.summarize(metrics.snapshot())['stages'].items()}
+
+
+# --- Scenarios ---
+# Each runs with the scratch tree as the working directory and returns a
+# dict: `inputs` (sizes and a digest of the generated data) plus results.
+# Keys ending in _seconds are what the baseline comparison looks at.
+
+def run_csv_ingest(sizes, seed):
+    from financial_discovery.scripts import ingest_statements
+    raw_dir = ingest_statements.RAW_STATEMENTS_DIR
+    paths = generators.write_becu_statements(raw_dir, sizes['rows'], sizes['statements'], seed)
+    inputs = {'rows': sizes['rows'], 'statements': sizes['statements'], 'sha256': generators.digest_files(paths)}
+    os.makedirs(ingest_statements.PROCESSED_STATEMENTS_DIR, exist_ok=True)
+    metrics.reset()
+    seconds, _ = timed(ingest_statements.ingest_statements)
+    recorded = metrics.snapshot()['counters']
+    return {
+        'inputs': inputs,
+        'ingest_seconds': round(seconds, 4),
+        'rows_per_second': round(sizes['rows'] / seconds),
+        'rows_written': recorded.get('rows_written', 0),
+        'ledger_bytes': os.path.getsize(ingest_statements.UNIFIED_LEDGER_FILE),
+        'stages': stage_totals(),
+    }
+
+
+def run_dedup_load(sizes, seed):
+    from financial_discovery.scripts import ingest_statements
+    from financial_discovery.scripts.ledger_index import INDEX_SUFFIX, LedgerIndex
+    ledger = ingest_statements.UNIFIED_LEDGER_FILE
+    if not os.path.exists(ledger):
+        with quiet():
+            run_csv_ingest(sizes, seed)
+    inputs = {'rows': sizes['rows'], 'statements': sizes['statements'],
+              'sha256': generators.digest_files(os.path.join(ingest_statements.PROCESSED_STATEMENTS_DIR, name)
+                                                for name in os.listdir(ingest_statements.PROCESSED_STATEMENTS_DIR))}
+
+    os.remove(ledger + INDEX_SUFFIX)
+    rebuild_seconds, index = timed(LedgerIndex, ledger)
+    index.close()
+    open_seconds, index = timed(LedgerIndex, ledger)
+    index.close()
+
+    # The first statement arrives again: every row is a duplicate.
+    first = sorted(os.listdir(ingest_statements.PROCESSED_STATEMENTS_DIR))[0]
+    shutil.copy(os.path.join(ingest_statements.PROCESSED_STATEMENTS_DIR, first),
+                os.path.join(ingest_statements.RAW_STATEMENTS_DIR, first))
+    metrics.reset()
+    reingest_seconds, _ = timed(ingest_statements.ingest_statements)
+    return {
+        'inputs': inputs,
+        'index_rebuild_seconds': round(rebuild_seconds, 4),
+        'index_open_seconds': round(open_seconds, 4),
+        'reingest_seconds': round(reingest_seconds, 4),
+        'dedup_hits': metrics.snapshot()['counters'].get('dedup_hits', 0),
+        'stages': stage_totals(),
+    }
+
+
+def run_pdf_ingest(sizes, seed):
+    from financial_discovery.scripts import ingest_pdf
+    paths = generators.write_pdf_statements(ingest_pdf.RAW_STATEMENTS_DIR, sizes['pdf_rows'],
+                                            sizes['statements'], seed)
+    inputs = {'pdf_rows': sizes['pdf_rows'], 'statements': sizes['statements'],
+              'sha256': generators.digest_files(paths)}
+    os.makedirs(ingest_pdf.PROCESSED_STATEMENTS_DIR, exist_ok=True)
+    metrics.reset()
+    seconds, _ = timed(ingest_pdf.ingest_pdf_files)
+    recorded = metrics.snapshot()
+    pages = recorded['stages'].get('pdf_extract_page', {}).get('count', 0)
+    return {
+        'inputs': inputs,
+        'ingest_seconds': round(seconds, 4),
+        'rows_per_second': round(sizes['pdf_rows'] / seconds),
+        'pages_per_second': round(pages / seconds),
+        'rows_written': recorded['counters'].get('rows_written', 0),
+        'stages': stage_totals(),
+    }
+
+
+def run_session_summarization(sizes, seed):
+    from ai_bridge import summarize_activity
+    generators.write_message_flood('ai_bridge', sizes['messages'], seed)
+    inputs = {'messages': sizes['messages'], 'sha256': generators.digest_tree('ai_bridge')}
+    os.makedirs(summarize_activity.CLOUD_DISCOVERY_DIR, exist_ok=True)
+    metrics.reset()
+    cold_seconds, _ = timed(summarize_activity.summarize_activity)
+    stages = stage_totals()
+    warm_seconds, _ = timed(summarize_activity.summarize_activity)
+    return {
+        'inputs': inputs,
+        'cold_seconds': round(cold_seconds, 4),
+        'messages_per_second': round(sizes['messages'] / cold_seconds),
+        'unchanged_seconds': round(warm_seconds, 4),
+        'stages': stages,
+    }
+
+
+def run_directory_indexing(sizes, seed):
+    from ai_bridge import index_cloud_discovery
+    from ai_bridge.index_cloud_discovery import CloudIndexer
+    from ai_bridge.watcher import EXISTING, FileEvent
+    directory = index_cloud_discovery.EVIDENCE_DIR
+    total_bytes = generators.write_evidence_tree(directory, sizes['evidence_files'], seed)
+    inputs = {'evidence_files': sizes['evidence_files'], 'sha256': generators.digest_tree(directory)}
+    os.makedirs(index_cloud_discovery.OUTPUT_DIR, exist_ok=True)
+
+    def index_all():
+        indexer = CloudIndexer(index_cloud_discovery.load_state())
+        for name in sorted(os.listdir(directory)):
+            indexer.handle(FileEvent(EXISTING, os.path.join(directory, name)))
+        indexer.close()
+
+    metrics.reset()
+    seconds, _ = timed(index_all)
+    return {
+        'inputs': inputs,
+        'index_seconds': round(seconds, 4),
+        'files_per_second': round(sizes['evidence_files'] / seconds),
+        'megabytes_per_second': round(total_bytes / 2**20 / seconds, 1),
+        'stages': stage_totals(),
+    }
+
+
+RUNNERS = {
+    'csv_ingest': run_csv_ingest,
+    'dedup_load': run_dedup_load,
+    'pdf_ingest': run_pdf_ingest,
+    'session_summarization': run_session_summarization,
+    'directory_indexing': run_directory_indexing,
+}
+
+
+def run_scenario(name, sizes, seed, root):
+    """Runs one scenario with `root` as the working directory."""
+    os.makedirs(os.path.join(root, SCHEMA_DIR), exist_ok=True)
+    for filename in os.listdir(os.path.join(REPO_ROOT, SCHEMA_DIR)):
+        shutil.copy(os.path.join(REPO_ROOT, SCHEMA_DIR, filename), os.path.join(root, SCHEMA_DIR))
+    os.makedirs(os.path.join(root, 'ai_bridge', 'logs'), exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        return RUNNERS[name](sizes, seed)
+    finally:
+        os.chdir(cwd)
+
+
+def median_result(runs):
+    """Per-key median of the timings across repeats; the rest from the first run."""
+    result = dict(runs[0])
+    for key, value in runs[0].items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            result[key] = statistics.median(run[key] for run in runs)
+    return result
+
+
+# --- Baseline ---
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Lists (scenario, metric, baseline, current, ratio, verdict) for the
+    _seconds metrics of scenarios that ran on the same inputs as the baseline."""
+    rows = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        if previous['inputs'] != current['inputs']:
+            rows.append((name, 'inputs', None, None, None, 'not comparable (different inputs)'))
+            continue
+        for key, value in current.items():
+            if not key.endswith('_seconds') or key not in previous:
+                continue
+            ratio = value / previous[key] if previous[key] else float('inf')
+            if ratio > 1 + tolerance:
+                verdict = 'regression'
+            elif ratio < 1 - tolerance:
+                verdict = 'improvement'
+            else:
+                verdict = 'ok'
+            rows.append((name, key, previous[key], value, round(ratio, 3), verdict))
+    return rows
+
+
+def environment():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='100k')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}.")
+    for key in SCALES['1k']:
+        parser.add_argument('--' + key.replace('_', '-'), type=int, help="Overrides the scale's value.")
+    parser.add_argument('--seed', type=int, default=generators.SEED)
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per scenario; timings are medians.")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the baseline.")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--output', help="Results file (default: benchmarks/results/<scale>-<time>.json).")
+    args = parser.parse_args()
+
+    sizes = dict(SCALES[args.scale])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(names) - set(RUNNERS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = {'scale': args.scale, 'sizes': sizes, 'seed': args.seed, 'environment': environment(),
+               'started': datetime.now().isoformat(), 'scenarios': {}}
+    for name in names:
+        runs = []
+        for _ in range(args.repeat):
+            root = tempfile.mkdtemp(prefix=f'bench-suite-{name}-')
+            try:
+                runs.append(run_scenario(name, sizes, args.seed, root))
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+        results['scenarios'][name] = median_result(runs)
+        timings = {k: v for k, v in results['scenarios'][name].items() if k.endswith('_seconds')}
+        print(f"{name}: {json.dumps(timings)}", file=sys.stderr)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{args.scale}-{datetime.now():%Y%m%d%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            rows = compare(results, json.load(f), args.tolerance)
+        results['comparison'] = [dict(zip(('scenario', 'metric', 'baseline', 'current', 'ratio', 'verdict'), row))
+                                 for row in rows]
+        regressions = [row for row in rows if row[5] == 'regression']
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline:
+        shutil.copy(output, args.baseline)
+    print(json.dumps(results, indent=2))
+    for name, key, previous, current, ratio, _ in regressions:
+        print(f"Regression: {name}.{key} {previous} -> {current} ({ratio}x)", file=sys.stderr)
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+import unittest
+import os
+import shutil
+import tempfile
+from benchmarks import generators, run_suite
+
+SIZES = {'rows': 300, 'statements': 3, 'pdf_rows': 150, 'messages': 40, 'evidence_files': 10}
+
+class TestRunSuite(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def run_scenario(self, name):
+        root = os.path.join(self.tmp_dir, name)
+        return run_suite.run_scenario(name, SIZES, generators.SEED, root)
+
+    def test_generators_are_deterministic(self):
+        first = generators.write_becu_statements(os.path.join(self.tmp_dir, 'a'), 1000, 2)
+        second = generators.write_becu_statements(os.path.join(self.tmp_dir, 'b'), 1000, 2)
+        self.assertEqual(generators.digest_files(first), generators.digest_files(second))
+        third = generators.write_becu_statements(os.path.join(self.tmp_dir, 'c'), 1000, 2, seed=1)
+        self.assertNotEqual(generators.digest_files(first), generators.digest_files(third))
+
+    def test_scenarios_process_every_generated_row(self):
+        self.assertEqual(self.run_scenario('csv_ingest')['rows_written'], 300)
+        self.assertEqual(self.run_scenario('dedup_load')['dedup_hits'], 100)
+        self.assertEqual(self.run_scenario('pdf_ingest')['rows_written'], 150)
+        self.assertIn('json_decode', self.run_scenario('session_summarization')['stages'])
+        self.assertIn('describe_file', self.run_scenario('directory_indexing')['stages'])
+
+    def test_comparison_flags_slower_timings(self):
+        baseline = {'scenarios': {'csv_ingest': {'inputs': {'rows': 1}, 'ingest_seconds': 1.0}}}
+        results = {'scenarios': {'csv_ingest': {'inputs': {'rows': 1}, 'ingest_seconds': 1.5}}}
+        self.assertEqual(run_suite.compare(results, baseline),
+                         [('csv_ingest', 'ingest_seconds', 1.0, 1.5, 1.5, 'regression')])
+        results['scenarios']['csv_ingest']['inputs'] = {'rows': 2}
+        self.assertEqual(run_suite.compare(results, baseline)[0][5], 'not comparable (different inputs)')
+
+if __name__ == '__main__':
+    unittest.main()
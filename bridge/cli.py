@@ -0,0 +1,202 @@
+"""One entry point for the bridge and ledger scripts.
+
+Run from the repository root:
+
+    python -m bridge summarize                 # ai_bridge/summarize_activity.py
+    python -m bridge index [--once]            # ai_bridge/index_cloud_discovery.py
+    python -m bridge update [--once]           # ai_bridge/scripts/update_legal_codex.py
+    python -m bridge ingest statements|csv|pdf [--workers N]
+    python -m bridge query --account ... [--count]
+    python -m bridge worker                    # see bridge/worker.py
+
+Each command imports its modules only when it runs, so a run that finds
+nothing to do does not pay for PyPDF2, numpy or the other commands' code.
+With --worker (or $BRIDGE_WORKER_SOCKET set), one-shot commands are sent to
+a running worker instead, and run here only if no worker answers.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# --- Configuration ---
+SOCKET_ENV = 'BRIDGE_WORKER_SOCKET'
+DEFAULT_SOCKET = 'ai_bridge/logs/bridge.sock'  # worker.SOCKET_PATH, without importing it
+ONE_SHOT_COMMANDS = ('summarize', 'ingest', 'query')
+QUERY_HELP = "Query the unified ledger through its indexes; prints JSONL."
+
+
+# --- Commands ---
+# Each imports what it needs; the parser below must stay import-free.
+
+def cmd_summarize(args):
+    from ai_bridge import metrics
+    from ai_bridge.summarize_activity import summarize_activity
+    with metrics.session('summarize_activity', profile=args.profile):
+        summarize_activity()
+
+
+def cmd_index(args):
+    from ai_bridge import index_cloud_discovery, metrics
+    from ai_bridge.watcher import Watcher
+    os.makedirs(index_cloud_discovery.OUTPUT_DIR, exist_ok=True)
+    with metrics.session('index_cloud_discovery', profile=args.profile):
+        if args.once:
+            index_cloud_discovery.index_once()
+        else:
+            index_cloud_discovery.index_cloud_discovery(Watcher(force_polling=args.polling))
+
+
+def cmd_update(args):
+    from ai_bridge import metrics
+    from ai_bridge.scripts import update_legal_codex
+    from ai_bridge.watcher import Watcher
+    os.makedirs("ai_bridge/logs", exist_ok=True)
+    with metrics.session('update_legal_codex', profile=args.profile):
+        if args.once:
+            update_legal_codex.update_once()
+        else:
+            update_legal_codex.monitor_to_codex_directory(Watcher(force_polling=args.polling))
+
+
+def cmd_ingest(args):
+    from ai_bridge import metrics
+    from financial_discovery.scripts.ledger_schema import load_validator
+    # A worker outlives schema edits; recompile the validator on each run.
+    load_validator.cache_clear()
+    if args.kind == 'statements':
+        from financial_discovery.scripts import ingest_statements as ingest
+        os.makedirs(ingest.PROCESSED_STATEMENTS_DIR, exist_ok=True)
+        os.makedirs(os.path.dirname(ingest.UNIFIED_LEDGER_FILE), exist_ok=True)
+        with metrics.session('ingest_statements', profile=args.profile):
+            ingest.ingest_statements(workers=args.workers)
+        print("Ingestion complete.")
+        return
+    if args.kind == 'csv':
+        from financial_discovery.scripts import ingest_csv as ingest
+        os.makedirs(ingest.RAW_STATEMENTS_DIR, exist_ok=True)
+        with metrics.session('ingest_csv', profile=args.profile):
+            ingest.ingest_csv_files(workers=args.workers)
+    else:
+        from financial_discovery.scripts import ingest_pdf as ingest
+        os.makedirs(ingest.RAW_STATEMENTS_DIR, exist_ok=True)
+        with metrics.session('ingest_pdf', profile=args.profile):
+            ingest.ingest_pdf_files(workers=args.workers, page_workers=args.page_workers)
+    print("Done.")
+
+
+def cmd_query(args):
+    import argparse
+    from financial_discovery.scripts import query_ledger
+    parser = argparse.ArgumentParser(prog='python -m bridge query', description=QUERY_HELP)
+    query_ledger.add_query_arguments(parser)
+    query_ledger.run_query(parser.parse_args(args.query_args))
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def cmd_worker(args):
+    import signal
+    from bridge import worker
+    # Started in the background, the worker may not see SIGINT; stop cleanly on SIGTERM too.
+    signal.signal(signal.SIGTERM, _interrupt)
+    worker.serve(run, args.socket or DEFAULT_SOCKET)
+
+
+# --- Parsing ---
+
+def _add_profile(parser):
+    # Mirrors metrics.add_arguments, which would import ai_bridge.metrics.
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile the run with cProfile and tracemalloc (written to ai_bridge/logs/profiles).")
+
+
+def build_parser():
+    import argparse  # Not needed when the command goes to a worker.
+    parser = argparse.ArgumentParser(prog='python -m bridge', description=__doc__.splitlines()[0])
+    parser.add_argument('--worker', action='store_true',
+                        help=f"Send one-shot commands to a running worker (also enabled by ${SOCKET_ENV}).")
+    parser.add_argument('--socket', help=f"Worker socket (default ${SOCKET_ENV} or {DEFAULT_SOCKET}).")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    summarize = commands.add_parser('summarize', help="Log new bridge and cloud_discovery activity.")
+    _add_profile(summarize)
+    summarize.set_defaults(func=cmd_summarize)
+
+    for name, func, help_text in [
+            ('index', cmd_index, "Summarize new cloud_discovery files into from_jules."),
+            ('update', cmd_update, "Push to_codex responses into LegalCodex.")]:
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--once', action='store_true',
+                             help="Handle the files that arrived since the last run, then exit.")
+        command.add_argument('--polling', action='store_true', help="Use snapshot polling instead of inotify.")
+        _add_profile(command)
+        command.set_defaults(func=func)
+
+    ingest = commands.add_parser('ingest', help="Ingest raw statements into the ledger.")
+    ingest.add_argument('kind', choices=['statements', 'csv', 'pdf'])
+    ingest.add_argument('--workers', type=int, default=1, help="Parse files in N worker processes.")
+    ingest.add_argument('--page-workers', type=int, default=1,
+                        help="pdf only: extract the pages of each PDF in N worker processes.")
+    _add_profile(ingest)
+    ingest.set_defaults(func=cmd_ingest)
+
+    # Its options are defined by query_ledger.add_query_arguments and parsed
+    # by cmd_query, so they are passed through untouched: with no '-' prefix
+    # chars, '--account' and even '--help' land in `query_args`.
+    query = commands.add_parser('query', help=QUERY_HELP, add_help=False, prefix_chars='+')
+    query.add_argument('query_args', nargs=argparse.REMAINDER)
+    query.set_defaults(func=cmd_query)
+
+    worker = commands.add_parser('worker', help="Serve commands sent with --worker over a unix socket.")
+    worker.set_defaults(func=cmd_worker)
+    return parser
+
+
+def run(argv):
+    """Runs one command in this process; returns its exit code."""
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+def _worker_request(argv):
+    """(socket path, command argv) if this run should go to a worker, else None.
+
+    Worked out without argparse, which is a good share of the client's startup;
+    the worker parses the command itself.
+    """
+    use_worker, socket_path = False, os.environ.get(SOCKET_ENV)
+    i = 0
+    while i < len(argv) and argv[i].startswith('-'):
+        if argv[i] == '--worker':
+            use_worker = True
+        elif argv[i] == '--socket' and i + 1 < len(argv):
+            socket_path = argv[i + 1]
+            i += 1
+        elif argv[i].startswith('--socket='):
+            socket_path = argv[i].split('=', 1)[1]
+        else:
+            return None
+        i += 1
+    command = argv[i:]
+    if not (use_worker or socket_path) or not command or '-h' in command or '--help' in command:
+        return None
+    # Daemons (index/update without --once) and the worker itself always run here.
+    if command[0] in ONE_SHOT_COMMANDS or (command[0] in ('index', 'update') and '--once' in command):
+        return socket_path or DEFAULT_SOCKET, command
+    return None
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    request = _worker_request(argv)
+    if request is not None:
+        from bridge import worker
+        try:
+            return worker.send(request[1], request[0])
+        except worker.WorkerUnavailable as e:
+            print(f"Bridge worker unavailable ({e}); running in-process.", file=sys.stderr)
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
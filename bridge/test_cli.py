@@ -0,0 +1,73 @@
+import unittest
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+from bridge import cli, worker
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def fake_run(argv):
+    print(f"ran {' '.join(argv)}")
+    return 3 if argv == ['fail'] else 0
+
+class TestBridgeCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp_dir, 'bridge.sock')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def send(self, argv):
+        out = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+        with mock.patch.object(sys, 'stdout', out):
+            code = worker.send(argv, self.socket_path)
+        out.flush()
+        return code, out.buffer.getvalue().decode()
+
+    def test_worker_runs_commands_and_returns_their_output(self):
+        server = threading.Thread(target=worker.serve, args=(fake_run, self.socket_path, 2), daemon=True)
+        # The worker's own log lines would land in the same (patched) stdout.
+        with mock.patch('bridge.worker.print', create=True):
+            server.start()
+            while not os.path.exists(self.socket_path):
+                time.sleep(0.01)
+            self.assertEqual(self.send(['summarize']), (0, "ran summarize\n"))
+            self.assertEqual(self.send(['fail']), (3, "ran fail\n"))
+            server.join(10)
+        self.assertFalse(os.path.exists(self.socket_path))
+        # Nothing listening now: the client must fall back to running in-process.
+        with self.assertRaises(worker.WorkerUnavailable):
+            worker.send(['summarize'], self.socket_path)
+
+    def test_only_one_shot_commands_go_to_the_worker(self):
+        with mock.patch.dict(os.environ, {cli.SOCKET_ENV: ''}):
+            self.assertIsNone(cli._worker_request(['summarize']))
+            self.assertEqual(cli._worker_request(['--worker', 'ingest', 'csv']),
+                             (cli.DEFAULT_SOCKET, ['ingest', 'csv']))
+            self.assertEqual(cli._worker_request(['--socket', 'w.sock', 'index', '--once']),
+                             ('w.sock', ['index', '--once']))
+            self.assertIsNone(cli._worker_request(['--worker', 'index']))
+            self.assertIsNone(cli._worker_request(['--worker', 'worker']))
+        with mock.patch.dict(os.environ, {cli.SOCKET_ENV: 'env.sock'}):
+            self.assertEqual(cli._worker_request(['update', '--once']), ('env.sock', ['update', '--once']))
+
+    def test_no_op_commands_skip_heavy_imports(self):
+        code = ("import sys; from bridge import cli; cli.build_parser(); "
+                "from financial_discovery.scripts import ingest_csv, ingest_pdf; "
+                "from ai_bridge.scripts import update_legal_codex; "
+                "print(sorted(m for m in ('PyPDF2', 'numpy', 'pstats', 'http.client', 'multiprocessing') "
+                "if m in sys.modules))")
+        result = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '[]')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+"""Long-lived bridge worker that runs CLI commands sent over a unix socket.
+
+Cron jobs that fire every few minutes mostly find nothing to do, so their
+cost is interpreter startup and imports. A worker pays that once:
+
+    python -m bridge worker &                          # keeps modules loaded
+    python -m bridge --worker summarize                # from cron
+
+The client sends its argv (and working directory) as one JSON line. The worker
+runs the command in-process, one at a time, and replies with a JSON header
+line {"exit": code, "bytes": n} followed by the command's n bytes of output.
+If no worker is listening, the client runs the command itself.
+"""
+import json
+import os
+import socket
+import sys
+
+# --- Configuration ---
+SOCKET_PATH = 'ai_bridge/logs/bridge.sock'
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+class WorkerUnavailable(Exception):
+    """No worker is listening on the socket, or it will not run this request."""
+
+
+def _read_line(conn, limit=MAX_REQUEST_BYTES):
+    data = b''
+    while not data.endswith(b'\n'):
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > limit:
+            raise ValueError("request too large")
+    return data
+
+
+def _run_captured(run, argv):
+    """Runs run(argv) with stdout and stderr captured; returns (exit code, output bytes)."""
+    # Imported here to keep them off the client's startup path.
+    import io
+    import traceback
+    from contextlib import redirect_stderr, redirect_stdout
+    buffer = io.BytesIO()
+    # A TextIOWrapper, so commands that write sys.stdout.buffer work too.
+    out = io.TextIOWrapper(buffer, encoding='utf-8', errors='replace', write_through=True)
+    with redirect_stdout(out), redirect_stderr(out):
+        try:
+            code = run(argv) or 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except Exception:
+            traceback.print_exc(file=out)
+            code = 1
+        out.flush()
+    return code, buffer.getvalue()
+
+
+def _listen(path):
+    if os.path.exists(path):
+        try:
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            probe.connect(path)
+            probe.close()
+            raise RuntimeError(f"A bridge worker is already listening on {path}")
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(path)  # Left behind by a worker that was killed.
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Bound under a temporary name and moved into place once listening, so
+    # a client never finds the socket before it accepts connections.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    old_umask = os.umask(0o177)  # Only this user may send commands.
+    try:
+        server.bind(tmp_path)
+    finally:
+        os.umask(old_umask)
+    server.listen(16)
+    os.replace(tmp_path, path)
+    return server
+
+
+def handle(conn, run):
+    """Serves one request on an accepted connection."""
+    try:
+        request = json.loads(_read_line(conn))
+        argv = request['argv']
+    except (ValueError, KeyError, TypeError) as e:
+        conn.sendall(json.dumps({'exit': None, 'error': f"bad request: {e}"}).encode() + b'\n')
+        return
+    if os.path.realpath(request.get('cwd', '.')) != os.path.realpath(os.getcwd()):
+        # Every path in the scripts is relative to the repository root.
+        conn.sendall(json.dumps({'exit': None, 'error': f"worker serves {os.getcwd()}"}).encode() + b'\n')
+        return
+    print(f"Running: {' '.join(argv)}")
+    code, output = _run_captured(run, argv)
+    print(f"Finished with exit code {code}.")
+    conn.sendall(json.dumps({'exit': code, 'bytes': len(output)}).encode() + b'\n' + output)
+
+
+def serve(run, path=SOCKET_PATH, max_requests=None):
+    """Runs commands sent to `path` through run(argv) until interrupted.
+
+    Requests are handled one at a time, so two cron jobs never run the same
+    script concurrently; a second one waits in the listen backlog.
+    """
+    server = _listen(path)
+    print(f"Bridge worker listening on {path} (pid {os.getpid()}).")
+    served = 0
+    try:
+        while max_requests is None or served < max_requests:
+            conn, _ = server.accept()
+            with conn:
+                try:
+                    handle(conn, run)
+                except OSError as e:
+                    print(f"Client went away: {e}")
+            served += 1
+    except KeyboardInterrupt:
+        print("\nBridge worker stopped.")
+    finally:
+        server.close()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def send(argv, path=SOCKET_PATH):
+    """Runs `argv` on the worker at `path`; returns its exit code.
+
+    The command's output is written to this process's stdout. Raises
+    WorkerUnavailable if nothing is listening or the worker declines.
+    """
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            conn.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise WorkerUnavailable(f"no worker on {path} ({e.strerror})")
+        conn.sendall(json.dumps({'argv': argv, 'cwd': os.getcwd()}).encode() + b'\n')
+        reader = conn.makefile('rb')
+        header = reader.readline()
+        if not header:
+            raise WorkerUnavailable(f"worker on {path} closed the connection")
+        reply = json.loads(header)
+        if reply['exit'] is None:
+            raise WorkerUnavailable(reply.get('error', 'request refused'))
+        remaining = reply['bytes']
+        out = sys.stdout.buffer
+        while remaining:
+            chunk = reader.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                break
+            out.write(chunk)
+            remaining -= len(chunk)
+        out.flush()
+        return reply['exit']
+    finally:
+        conn.close()
@@ -1,22 +1,19 @@
 
-import csv
-import json
-import hashlib
+import argparse
 import os
-import shutil
-from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from ai_bridge import metrics
+from financial_discovery.scripts.csv_profiles import parse_statement_into
+from financial_discovery.scripts.ledger_schema import load_validator, statement_source
+from financial_discovery.scripts.ledger_partitions import ledger_writer, load_index
+from financial_discovery.scripts.parallel_ingest import list_statements, map_statements
+from financial_discovery.scripts.transaction_batch import TransactionBatch
 
 # --- Configuration ---
-# This dictionary maps the CSV column headers to the unified transaction schema fields.
-# You may need to adjust this mapping for different CSV formats.
-# For example, if your CSV has a "Date" column instead of "Timestamp", you would change:
-# "timestamp": "Timestamp" to "timestamp": "Date"
-COLUMN_MAPPING = {
-    "timestamp": "Date",
-    "description": "Description",
-    "amount": "Amount",
-    "currency": "Currency"
-}
+# Column mappings for each bank's export live in csv_profiles.py; the profile
+# is picked from each file's header.
 
 # The path to the directory containing the raw CSV statements.
 RAW_STATEMENTS_DIR = "financial_discovery/statements/raw"
@@ -26,74 +23,56 @@ PROCESSED_STATEMENTS_DIR = "financial_discovery/statements/processed"
 # The path to the output unified ledger file.
 LEDGER_FILE = "financial_discovery/ledger/unified_ledger.jsonl"
 
-def create_transaction_id(row_data):
-    """Creates a unique transaction ID by hashing the row data."""
-    # We create a string from the row data to ensure a consistent hash
-    row_string = "".join(str(value) for value in row_data.values())
-    return hashlib.sha256(row_string.encode()).hexdigest()
-
-def process_csv_file(filepath):
-    """Processes a single CSV file and appends its transactions to the ledger."""
-    try:
-        with open(filepath, 'r', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            transactions = []
-            for i, row in enumerate(reader):
-                try:
-                    # Attempt to parse date from common formats
-                    date_str = row[COLUMN_MAPPING["timestamp"]]
-                    timestamp = ""
-                    for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y"):
-                        try:
-                            timestamp = datetime.strptime(date_str, fmt).isoformat()
-                            break
-                        except ValueError:
-                            pass
-                    if not timestamp:
-                        raise ValueError(f"Date format not recognized: {date_str}")
-
-                    transaction = {
-                        "timestamp": timestamp,
-                        "description": row[COLUMN_MAPPING["description"]],
-                        "amount": float(row[COLUMN_MAPPING["amount"]]),
-                        "currency": row[COLUMN_MAPPING["currency"]],
-                        "source_file": filepath
-                    }
-                    transaction["transaction_id"] = create_transaction_id(transaction)
-                    transactions.append(transaction)
-                except KeyError as e:
-                    print(f"Error processing row {i+2} in {filepath}: Missing column {e}")
-                except ValueError as e:
-                    print(f"Error processing row {i+2} in {filepath}: {e}")
-
-        if not transactions:
-            print(f"No valid transactions found in {filepath}")
-            # Move the file even if no transactions are found to avoid reprocessing
-            os.makedirs(PROCESSED_STATEMENTS_DIR, exist_ok=True)
-            shutil.move(filepath, os.path.join(PROCESSED_STATEMENTS_DIR, os.path.basename(filepath)))
-            return
+def parse_csv_file(filepath):
+    """Parses a single CSV file into transactions without touching the ledger."""
+    source = statement_source(filepath)
+    metrics.count('files_read')
+    metrics.count('bytes_read', os.path.getsize(filepath))
+    transactions = TransactionBatch(source, filepath)
+    with metrics.stage('csv_parse'):
+        parse_statement_into(filepath, transactions)
+    return transactions.assign_ids()
 
-        # Ensure the ledger directory exists
-        os.makedirs(os.path.dirname(LEDGER_FILE), exist_ok=True)
+def commit_csv_transactions(filepath, transactions, writer):
+    """Appends a parsed file's transactions to the ledger, then moves the file."""
+    # Move the file even if no transactions are found to avoid reprocessing
+    processed_filepath = os.path.join(PROCESSED_STATEMENTS_DIR, os.path.basename(filepath))
+    with writer.ingest(filepath, processed_filepath):
+        written = writer.write_all(transactions)
 
-        with open(LEDGER_FILE, 'a') as ledger:
-            for transaction in transactions:
-                ledger.write(json.dumps(transaction) + '\n')
+    if transactions:
+        print(f"Successfully processed {filepath} with {written} transactions.")
+    else:
+        print(f"No valid transactions found in {filepath}")
 
-        # Move the processed file
-        os.makedirs(PROCESSED_STATEMENTS_DIR, exist_ok=True)
-        shutil.move(filepath, os.path.join(PROCESSED_STATEMENTS_DIR, os.path.basename(filepath)))
-        print(f"Successfully processed {filepath} with {len(transactions)} transactions.")
+def ingest_csv_files(workers=1):
+    """Ingests every CSV in the raw directory, parsing in `workers` processes.
 
-    except Exception as e:
-        print(f"Failed to process {filepath}: {e}")
+    Transactions already in the ledger are written marked `overlapping`.
+    """
+    index = load_index(LEDGER_FILE)
+    with ledger_writer(LEDGER_FILE, index=index, validator=load_validator()) as writer:
+        # Listed after the writer has finished any interrupted statements.
+        filepaths = list_statements(RAW_STATEMENTS_DIR, ".csv")
+        jobs = [(filepath, parse_csv_file, (filepath,)) for filepath in filepaths]
+        for filepath, transactions, error in map_statements(jobs, workers):
+            print(f"Processing {filepath}...")
+            try:
+                if error is not None:
+                    raise error
+                commit_csv_transactions(filepath, transactions, writer)
+            except Exception as e:
+                print(f"Failed to process {filepath}: {e}")
+    index.close()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest raw CSV statements into the ledger.")
+    parser.add_argument("--workers", type=int, default=1, help="Parse files in N worker processes.")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
     os.makedirs(RAW_STATEMENTS_DIR, exist_ok=True)
-    for filename in os.listdir(RAW_STATEMENTS_DIR):
-        if filename.endswith(".csv"):
-            filepath = os.path.join(RAW_STATEMENTS_DIR, filename)
-            print(f"Processing {filepath}...")
-            process_csv_file(filepath)
+    with metrics.session("ingest_csv", profile=args.profile):
+        ingest_csv_files(workers=args.workers)
     print("Done.")
@@ -1,42 +1,145 @@
 
-import json
+import argparse
 import hashlib
+import json
 import os
 import re
-import shutil
-from PyPDF2 import PdfReader
+import sys
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from ai_bridge import metrics
+from financial_discovery.scripts.csv_profiles import account_from_filename
+from financial_discovery.scripts.ledger_schema import load_validator, statement_source
+from financial_discovery.scripts.ledger_partitions import ledger_writer, load_index
+from financial_discovery.scripts.parallel_ingest import list_statements, map_statements
+from financial_discovery.scripts.transaction_batch import TransactionBatch
+
 # --- Configuration ---
 RAW_STATEMENTS_DIR = "financial_discovery/statements/raw"
 PROCESSED_STATEMENTS_DIR = "financial_discovery/statements/processed"
 LEDGER_FILE = "financial_discovery/ledger/unified_ledger.jsonl"
 
+# Extracted page text is cached by PDF content hash and page number, so
+# re-ingesting a statement or re-parsing it with a new regex skips PyPDF2.
+PDF_TEXT_CACHE_DIR = "financial_discovery/cache/pdf_text"
+# Pages handed to each worker when one PDF's extraction is fanned out.
+PAGES_PER_TASK = 16
+
 # --- Regular Expression for Transaction Parsing ---
 # This is a simple regex that looks for a date, a description, and an amount.
 # It will likely need to be adjusted for different PDF statement formats.
 TRANSACTION_REGEX = re.compile(r"(\d{2}/\d{2}/\d{4})\s+(.+?)\s+([\d,]+\.\d{2})")
 
-def create_transaction_id(row_data):
-    """Creates a unique transaction ID by hashing the row data."""
-    row_string = "".join(str(value) for value in row_data.values())
-    return hashlib.sha256(row_string.encode()).hexdigest()
+def hash_file(filepath):
+    """Returns the SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with metrics.stage("sha256_file"), open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+            metrics.count("bytes_read", len(chunk))
+    metrics.count("files_read")
+    return digest.hexdigest()
+
+def _cache_dir(digest):
+    return os.path.join(PDF_TEXT_CACHE_DIR, digest)
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def read_cached_page(digest, page_number):
+    try:
+        with open(os.path.join(_cache_dir(digest), f"{page_number}.txt"), "r") as f:
+            return f.read()
+    except IOError:
+        return None
+
+def cached_page_count(digest):
+    try:
+        with open(os.path.join(_cache_dir(digest), "pages.json"), "r") as f:
+            return json.load(f)["pages"]
+    except (IOError, ValueError, KeyError):
+        return None
+
+def open_pdf(f):
+    # PyPDF2 is imported on first use: it is most of this module's import
+    # time, and CSV-only or no-op runs never need it.
+    from PyPDF2 import PdfReader
+    return PdfReader(f)
+
+def extract_page_range(filepath, digest, start, stop):
+    """Extracts pages [start, stop) of a PDF, caching each page's text."""
+    os.makedirs(_cache_dir(digest), exist_ok=True)
+    texts = []
+    with open(filepath, "rb") as f:
+        reader = open_pdf(f)
+        for page_number in range(start, stop):
+            text = read_cached_page(digest, page_number)
+            if text is None:
+                with metrics.stage("pdf_extract_page"):
+                    text = reader.pages[page_number].extract_text() or ""
+                _write_atomic(os.path.join(_cache_dir(digest), f"{page_number}.txt"), text)
+            else:
+                metrics.count("pdf_cache_hits")
+            texts.append(text)
+    return texts
+
+def iter_pdf_pages(filepath, workers=1):
+    """Yields (page_number, text) for each page of a PDF, in page order.
+
+    Only one page (or, with `workers` > 1, a window of page ranges) is held in
+    memory at a time. Pages already in the text cache are read from it
+    without opening the PDF.
+    """
+    digest = hash_file(filepath)
+    page_count = cached_page_count(digest)
+    if page_count is not None:
+        for page_number in range(page_count):
+            text = read_cached_page(digest, page_number)
+            if text is None:
+                text = extract_page_range(filepath, digest, page_number, page_number + 1)[0]
+            else:
+                metrics.count("pdf_cache_hits")
+            yield page_number, text
+        return
+
+    with open(filepath, "rb") as f:
+        page_count = len(open_pdf(f).pages)
+    ranges = [(start, min(start + PAGES_PER_TASK, page_count))
+              for start in range(0, page_count, PAGES_PER_TASK)]
+    if workers <= 1 or len(ranges) <= 1:
+        for page_number in range(page_count):
+            yield page_number, extract_page_range(filepath, digest, page_number, page_number + 1)[0]
+    else:
+        jobs = [(start, extract_page_range, (filepath, digest, start, stop)) for start, stop in ranges]
+        for start, texts, error in map_statements(jobs, workers, stage="pdf_extract_range"):
+            if error is not None:
+                raise error
+            for offset, text in enumerate(texts):
+                yield start + offset, text
+    os.makedirs(_cache_dir(digest), exist_ok=True)
+    _write_atomic(os.path.join(_cache_dir(digest), "pages.json"), json.dumps({"pages": page_count}))
 
 def extract_text_from_pdf(filepath):
     """Extracts text from a PDF file."""
-    text = ""
     try:
-        with open(filepath, "rb") as f:
-            reader = PdfReader(f)
-            for page in reader.pages:
-                text += page.extract_text()
+        return "".join(text for _, text in iter_pdf_pages(filepath))
     except Exception as e:
         print(f"Error extracting text from {filepath}: {e}")
-    return text
+        return ""
+
+def parse_transactions_from_text(text, source_file, transactions=None):
+    """Parses transactions from text using a regular expression.
 
-def parse_transactions_from_text(text, source_file):
-    """Parses transactions from text using a regular expression."""
-    transactions = []
+    They are appended to `transactions` (a new TransactionBatch by default),
+    which is returned.
+    """
+    if transactions is None:
+        transactions = TransactionBatch(statement_source(source_file), source_file)
+    account_number = account_from_filename(source_file)
     for match in TRANSACTION_REGEX.finditer(text):
         try:
             date_str = match.group(1)
@@ -46,47 +149,90 @@ def parse_transactions_from_text(text, source_file):
             amount_str = match.group(3).replace(",", "")
             amount = float(amount_str)
 
-            transaction = {
-                "timestamp": timestamp,
-                "description": description,
-                "amount": amount,
-                "currency": "USD",  # Assuming USD for now, this may need to be extracted
-                "source_file": source_file
-            }
-            transaction["transaction_id"] = create_transaction_id(transaction)
-            transactions.append(transaction)
+            transactions.append(
+                timestamp, amount, description,
+                "USD",  # Assuming USD for now, this may need to be extracted
+                account_number,
+            )
         except Exception as e:
             print(f"Error parsing transaction: {e}")
+    return transactions.assign_ids()
+
+def iter_transactions_from_pdf(filepath, workers=1):
+    """Yields a PDF's transactions page by page as the pages are extracted."""
+    for _, text in iter_pdf_pages(filepath, workers):
+        with metrics.stage("pdf_parse_page"):
+            transactions = parse_transactions_from_text(text, filepath)
+        yield from transactions
+
+def parse_pdf_file(filepath):
+    """Extracts and parses all of a PDF's transactions, into one TransactionBatch,
+    without touching the ledger."""
+    transactions = TransactionBatch(statement_source(filepath), filepath)
+    for _, text in iter_pdf_pages(filepath):
+        with metrics.stage("pdf_parse_page"):
+            parse_transactions_from_text(text, filepath, transactions)
     return transactions
 
-def process_pdf_file(filepath):
-    """Processes a single PDF file and appends its transactions to the ledger."""
+def commit_pdf_transactions(filepath, transactions, writer):
+    """Streams a PDF's transactions into the ledger, then moves the file."""
+    # Move the file even if no transactions are found to avoid reprocessing
+    processed_filepath = os.path.join(PROCESSED_STATEMENTS_DIR, os.path.basename(filepath))
+    with writer.ingest(filepath, processed_filepath):
+        count = writer.write_all(transactions)
+
+    if count:
+        print(f"Successfully processed {filepath} and found {count} transactions.")
+    else:
+        print(f"No transactions found in {filepath}.")
+
+def process_pdf_file(filepath, writer, page_workers=1):
+    """Processes a single PDF file and appends its transactions to the ledger.
+
+    Pages are extracted and parsed one at a time, so memory stays bounded no
+    matter how long the statement is. If extraction fails partway, nothing
+    from the file is committed and it stays in the raw directory.
+    """
     print(f"Processing {filepath}...")
-    text = extract_text_from_pdf(filepath)
-    if text:
-        transactions = parse_transactions_from_text(text, filepath)
-        if transactions:
-            # Ensure the ledger directory exists
-            os.makedirs(os.path.dirname(LEDGER_FILE), exist_ok=True)
-            with open(LEDGER_FILE, 'a') as ledger:
-                for transaction in transactions:
-                    ledger.write(json.dumps(transaction) + '\n')
-
-            # Move the processed file
-            os.makedirs(PROCESSED_STATEMENTS_DIR, exist_ok=True)
-            shutil.move(filepath, os.path.join(PROCESSED_STATEMENTS_DIR, os.path.basename(filepath)))
-            print(f"Successfully processed {filepath} and found {len(transactions)} transactions.")
+    try:
+        commit_pdf_transactions(filepath, iter_transactions_from_pdf(filepath, page_workers), writer)
+    except Exception as e:
+        print(f"Error extracting text from {filepath}: {e}")
+
+def ingest_pdf_files(workers=1, page_workers=1):
+    """Ingests every PDF in the raw directory.
+
+    `workers` parses whole files in parallel; `page_workers` instead fans the
+    pages of each file out across processes, which suits a few large PDFs.
+    Transactions already in the ledger are written marked `overlapping`.
+    """
+    index = load_index(LEDGER_FILE)
+    with ledger_writer(LEDGER_FILE, index=index, validator=load_validator()) as writer:
+        # Listed after the writer has finished any interrupted statements.
+        filepaths = list_statements(RAW_STATEMENTS_DIR, ".pdf")
+        if workers <= 1:
+            for filepath in filepaths:
+                process_pdf_file(filepath, writer, page_workers)
         else:
-            print(f"No transactions found in {filepath}.")
-            # Move the file even if no transactions are found to avoid reprocessing
-            os.makedirs(PROCESSED_STATEMENTS_DIR, exist_ok=True)
-            shutil.move(filepath, os.path.join(PROCESSED_STATEMENTS_DIR, os.path.basename(filepath)))
+            jobs = [(filepath, parse_pdf_file, (filepath,)) for filepath in filepaths]
+            for filepath, transactions, error in map_statements(jobs, workers):
+                print(f"Processing {filepath}...")
+                if error is not None:
+                    print(f"Failed to process {filepath}: {error}")
+                    continue
+                commit_pdf_transactions(filepath, transactions, writer)
+    index.close()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest raw PDF statements into the ledger.")
+    parser.add_argument("--workers", type=int, default=1, help="Parse files in N worker processes.")
+    parser.add_argument("--page-workers", type=int, default=1,
+                        help="Extract the pages of each PDF in N worker processes.")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
     os.makedirs(RAW_STATEMENTS_DIR, exist_ok=True)
-    for filename in os.listdir(RAW_STATEMENTS_DIR):
-        if filename.lower().endswith(".pdf"):
-            filepath = os.path.join(RAW_STATEMENTS_DIR, filename)
-            process_pdf_file(filepath)
+    with metrics.session("ingest_pdf", profile=args.profile):
+        ingest_pdf_files(workers=args.workers, page_workers=args.page_workers)
     print("Done.")
@@ -1,101 +1,118 @@
-import csv
-import json
+import argparse
 import os
-import hashlib
-from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from ai_bridge import metrics
+from financial_discovery.scripts.csv_profiles import parse_statement_into
+from financial_discovery.scripts.ledger_schema import load_validator, statement_source
+from financial_discovery.scripts.ledger_partitions import ledger_writer, load_index
+from financial_discovery.scripts.parallel_ingest import map_statements
+from financial_discovery.scripts.transaction_batch import LEDGER_FIELDS, TransactionBatch
 
 RAW_STATEMENTS_DIR = 'financial_discovery/statements/raw'
 PROCESSED_STATEMENTS_DIR = 'financial_discovery/statements/processed'
 UNIFIED_LEDGER_FILE = 'financial_discovery/ledger/unified_ledger.jsonl'
 SCHEMA_FILE = 'financial_discovery/schema/unified_ledger_schema.json'
 
-def generate_transaction_id(row_data):
-    """Generates a unique transaction ID from a row of data."""
-    row_string = json.dumps(row_data, sort_keys=True)
-    return hashlib.sha256(row_string.encode()).hexdigest()
-
 def load_existing_transaction_ids():
-    """Loads all existing transaction IDs from the ledger into a set for fast lookups."""
-    ids = set()
-    if not os.path.exists(UNIFIED_LEDGER_FILE):
-        return ids
-    with open(UNIFIED_LEDGER_FILE, 'r') as f:
-        for line in f:
-            try:
-                transaction = json.loads(line)
-                if 'transaction_id' in transaction:
-                    ids.add(transaction['transaction_id'])
-            except json.JSONDecodeError:
-                continue # Ignore corrupted lines
-    return ids
-
-def process_csv_statement(filepath, source, existing_ids):
-    """Processes a single CSV financial statement and appends it to the unified ledger."""
-    with open(filepath, 'r') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            transaction = {
-                'transaction_id': generate_transaction_id(row),
-                'timestamp': row.get('Date', row.get('Timestamp', datetime.now().isoformat())),
-                'account_number': row.get('Account Number'),
-                'amount': float(row.get('Amount', 0.0)),
-                'currency': row.get('Currency', 'USD'),
-                'description': row.get('Description'),
-                'source': source,
-                'reconciliation_status': 'new',
-                'metadata': {
-                    'original_row': row
-                }
-            }
-            append_to_ledger(transaction, existing_ids)
-
-def process_pdf_statement(filepath, source, existing_ids):
-    """Processes a single PDF financial statement."""
+    """Opens the persistent transaction ID index for the ledger.
+
+    The index is only brought up to date with rows appended since the last run,
+    so startup cost no longer grows with ledger history. For a partitioned
+    ledger (see ledger_partitions.py), IDs are loaded per account and month
+    as statements touch them.
+    """
+    with metrics.stage('load_index'):
+        return load_index(UNIFIED_LEDGER_FILE)
+
+def parse_csv_statement(filepath, source):
+    """Parses a single CSV financial statement into ledger transactions.
+
+    The column mapping and date format come from the bank profile matching
+    the file's header (see csv_profiles.py). This touches neither the ledger
+    nor the ID index, so it can run in a worker process. The transactions
+    come back as a compact TransactionBatch; each row's `metadata.original_row`
+    is read back from the file as the row is written.
+    """
+    metrics.count('files_read')
+    metrics.count('bytes_read', os.path.getsize(filepath))
+    transactions = TransactionBatch(source, filepath, LEDGER_FIELDS)
+    with metrics.stage('csv_parse'):
+        parse_statement_into(filepath, transactions, keep_rows=True)
+    return transactions.assign_ids()
+
+def parse_pdf_statement(filepath, source):
+    """Parses a single PDF financial statement."""
     # Placeholder for PDF processing logic
     print(f"PDF processing for {filepath} is not yet implemented.")
-    pass
-
-def append_to_ledger(transaction, existing_ids):
-    """Appends a transaction to the unified ledger after checking for duplicates."""
-    transaction_id = transaction['transaction_id']
-    if transaction_id in existing_ids:
-        transaction['reconciliation_status'] = 'overlapping'
-    else:
-        existing_ids.add(transaction_id)
-    
-    with open(UNIFIED_LEDGER_FILE, 'a') as f:
-        f.write(json.dumps(transaction) + '\n')
+    return []
 
-def ingest_statements():
-    """Ingests all financial statements from the raw statements directory."""
+def append_to_ledger(transaction, writer):
+    """Appends a transaction to the unified ledger, marked `overlapping` if the
+    writer's index already holds its ID."""
+    writer.append(transaction)
+
+def ingest_statements(workers=1):
+    """Ingests all financial statements from the raw statements directory.
+
+    With `workers` > 1, statements are parsed and hashed in a process pool
+    while this process alone deduplicates and appends them, in filename order,
+    so the ledger comes out the same for any worker count.
+    """
     existing_ids = load_existing_transaction_ids()
     
     # Check if RAW_STATEMENTS_DIR exists
     if not os.path.exists(RAW_STATEMENTS_DIR):
         print(f"Raw statements directory not found: {RAW_STATEMENTS_DIR}")
+        existing_ids.close()
         return
-        
-    for filename in os.listdir(RAW_STATEMENTS_DIR):
+
+    # Opened before listing, so statements an interrupted run left in
+    # flight are finished first.
+    with ledger_writer(UNIFIED_LEDGER_FILE, index=existing_ids,
+                       validator=load_validator(SCHEMA_FILE)) as writer:
+        ingest_raw_statements(writer, workers)
+    existing_ids.close()
+
+def ingest_raw_statements(writer, workers=1):
+    """Ingests the raw statements directory through an open ledger writer."""
+    jobs = []
+    for filename in sorted(os.listdir(RAW_STATEMENTS_DIR)):
         filepath = os.path.join(RAW_STATEMENTS_DIR, filename)
-        source = 'Comet' if 'cloud' in filename.lower() else 'LegalCodex'
+        source = statement_source(filename)
 
         if filename.endswith('.csv'):
-            process_csv_statement(filepath, source, existing_ids)
+            jobs.append((filename, parse_csv_statement, (filepath, source)))
         elif filename.endswith('.pdf'):
-            process_pdf_statement(filepath, source, existing_ids)
+            jobs.append((filename, parse_pdf_statement, (filepath, source)))
         else:
             print(f"Unsupported file format: {filename}")
-            continue
 
-        # Move processed file
+    for filename, transactions, error in map_statements(jobs, workers):
+        if error is not None:
+            raise error
+        filepath = os.path.join(RAW_STATEMENTS_DIR, filename)
+
+        # Either every row of the statement lands in the ledger or none does,
+        # and the file is moved only once its rows are committed.
         processed_filepath = os.path.join(PROCESSED_STATEMENTS_DIR, filename)
-        os.rename(filepath, processed_filepath)
+        with writer.ingest(filepath, processed_filepath):
+            # Rows failing the ledger schema go to the quarantine file instead.
+            for transaction in writer.accepted(transactions):
+                append_to_ledger(transaction, writer)
         print(f"Processed and moved {filename}")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ingest raw statements into the unified ledger.")
+    parser.add_argument('--workers', type=int, default=1, help="Parse statements in N worker processes.")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
     # Ensure processed and ledger directories exist
     os.makedirs(PROCESSED_STATEMENTS_DIR, exist_ok=True)
     os.makedirs(os.path.dirname(UNIFIED_LEDGER_FILE), exist_ok=True)
 
-    ingest_statements()
+    with metrics.session('ingest_statements', profile=args.profile):
+        ingest_statements(workers=args.workers)
     print("Ingestion complete.")
@@ -0,0 +1,330 @@
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from financial_discovery.scripts.ledger_index import tail_hash
+from financial_discovery.scripts.ledger_partitions import is_partitioned, load_view, sync_view
+
+# --- Configuration ---
+LEDGER_FILE = 'financial_discovery/ledger/unified_ledger.jsonl'
+COLUMNS_DIR = 'financial_discovery/ledger/columns'
+MANIFEST_FILE = 'manifest.json'
+# Rows parsed from the JSONL before they are appended to the column files.
+CHUNK_ROWS = 100000
+
+# Fixed-width columns, stored as raw little-endian arrays (`<name>.bin`).
+NUMERIC_COLUMNS = {
+    'offset': '<i8',        # byte offset of the row in the ledger
+    'amount_cents': '<i8',
+    'timestamp': '<i8',     # seconds since the epoch, UTC
+}
+# Dictionary-encoded string columns: `<name>.bin` holds int32 codes into
+# `<name>.dict.jsonl`, which lists each distinct value once in code order.
+DICTIONARY_COLUMNS = {
+    'account': 'account_number',
+    'currency': 'currency',
+    'source': 'source',
+    'status': 'reconciliation_status',
+    'description': 'description',
+    'source_file': 'source_file',
+}
+CODE_DTYPE = '<i4'
+# Status of rows that duplicate an earlier row (see LedgerWriter.append).
+OVERLAPPING = 'overlapping'
+NULL_CODE = -1
+MISSING_TIMESTAMP = np.iinfo(np.int64).min
+
+
+def parse_timestamp(value):
+    """Converts an ISO 8601 timestamp to epoch seconds; naive values are UTC."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return MISSING_TIMESTAMP
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def to_cents(amount):
+    try:
+        return int(round(float(amount) * 100))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _column_path(columns_dir, name):
+    return os.path.join(columns_dir, f"{name}.bin")
+
+
+def _dictionary_path(columns_dir, name):
+    return os.path.join(columns_dir, f"{name}.dict.jsonl")
+
+
+def _dtype(name):
+    return NUMERIC_COLUMNS.get(name, CODE_DTYPE)
+
+
+def load_manifest(columns_dir=COLUMNS_DIR):
+    try:
+        with open(os.path.join(columns_dir, MANIFEST_FILE), 'r') as f:
+            return json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return None
+
+
+def _empty_manifest():
+    return {
+        # Changes whenever the store is rebuilt, so derived indexes can tell.
+        'generation': os.urandom(8).hex(),
+        'rows': 0,
+        'watermark': 0,
+        'tail_hash': None,
+        'dictionaries': {name: 0 for name in DICTIONARY_COLUMNS},
+        'dictionary_bytes': {name: 0 for name in DICTIONARY_COLUMNS},
+    }
+
+
+def _save_manifest(columns_dir, manifest):
+    path = os.path.join(columns_dir, MANIFEST_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _load_dictionary(columns_dir, name, count):
+    values = []
+    if count:
+        with open(_dictionary_path(columns_dir, name), 'r') as f:
+            for line in f:
+                values.append(json.loads(line))
+                if len(values) == count:
+                    break
+    return values
+
+
+def _truncate_to_manifest(columns_dir, manifest):
+    """Drops anything appended after the last manifest write (an interrupted refresh)."""
+    for name in list(NUMERIC_COLUMNS) + list(DICTIONARY_COLUMNS):
+        path = _column_path(columns_dir, name)
+        size = manifest['rows'] * np.dtype(_dtype(name)).itemsize
+        with open(path, 'ab') as f:
+            f.truncate(size)
+    for name, size in manifest['dictionary_bytes'].items():
+        with open(_dictionary_path(columns_dir, name), 'ab') as f:
+            f.truncate(size)
+
+
+def refresh_columns(ledger_path=LEDGER_FILE, columns_dir=COLUMNS_DIR, chunk_rows=CHUNK_ROWS):
+    """Appends ledger rows written since the last refresh to the column store.
+
+    The store remembers how many ledger bytes it has compacted plus a hash of
+    the bytes just before that point, so only new JSONL rows are parsed; a
+    rewritten or truncated ledger triggers a full rebuild. A partitioned
+    ledger's single-file view is synced first (see ledger_partitions.sync_view),
+    and a rebuilt view also triggers a full rebuild. Returns the number of
+    rows added.
+    """
+    view_generation = None
+    if is_partitioned(ledger_path):
+        sync_view(ledger_path)
+        view_generation = load_view(ledger_path)['generation']
+    os.makedirs(columns_dir, exist_ok=True)
+    manifest = load_manifest(columns_dir)
+    ledger_size = os.path.getsize(ledger_path) if os.path.exists(ledger_path) else 0
+    if (manifest is None or ledger_size < manifest['watermark']
+            or set(manifest['dictionaries']) != set(DICTIONARY_COLUMNS)
+            or manifest.get('view_generation') != view_generation
+            or tail_hash(ledger_path, manifest['watermark']) != manifest['tail_hash']):
+        if manifest is not None:
+            print(f"Column store {columns_dir} is out of sync with the ledger. Rebuilding.")
+        manifest = _empty_manifest()
+        manifest['tail_hash'] = tail_hash(ledger_path, 0)
+        manifest['view_generation'] = view_generation
+    manifest.setdefault('generation', os.urandom(8).hex())
+    _truncate_to_manifest(columns_dir, manifest)
+    if ledger_size == manifest['watermark']:
+        _save_manifest(columns_dir, manifest)
+        return 0
+
+    encoders = {}
+    for name, count in manifest['dictionaries'].items():
+        encoders[name] = {value: code for code, value in enumerate(_load_dictionary(columns_dir, name, count))}
+
+    added = 0
+    chunk = {name: [] for name in list(NUMERIC_COLUMNS) + list(DICTIONARY_COLUMNS)}
+    new_values = {name: [] for name in DICTIONARY_COLUMNS}
+    offset = manifest['watermark']
+    with open(ledger_path, 'rb') as ledger:
+        ledger.seek(offset)
+        for line in ledger:
+            if not line.endswith(b'\n'):
+                break  # A writer is mid-append; pick it up next time.
+            try:
+                transaction = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                transaction = None  # Ignore corrupted lines
+            if isinstance(transaction, dict):
+                chunk['offset'].append(offset)
+                chunk['amount_cents'].append(to_cents(transaction.get('amount')))
+                chunk['timestamp'].append(parse_timestamp(transaction.get('timestamp')))
+                for name, field in DICTIONARY_COLUMNS.items():
+                    value = transaction.get(field)
+                    if value is None:
+                        chunk[name].append(NULL_CODE)
+                        continue
+                    value = str(value)
+                    code = encoders[name].get(value)
+                    if code is None:
+                        code = encoders[name][value] = len(encoders[name])
+                        new_values[name].append(value)
+                    chunk[name].append(code)
+            offset += len(line)
+            if len(chunk['offset']) >= chunk_rows:
+                added += _append_chunk(ledger_path, columns_dir, manifest, chunk, new_values, offset)
+        added += _append_chunk(ledger_path, columns_dir, manifest, chunk, new_values, offset)
+    return added
+
+
+def _append_chunk(ledger_path, columns_dir, manifest, chunk, new_values, watermark):
+    rows = len(chunk['offset'])
+    for name, values in chunk.items():
+        with open(_column_path(columns_dir, name), 'ab') as f:
+            np.asarray(values, dtype=_dtype(name)).tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        values.clear()
+    for name, values in new_values.items():
+        if values:
+            with open(_dictionary_path(columns_dir, name), 'a') as f:
+                f.writelines(json.dumps(value) + '\n' for value in values)
+                f.flush()
+                os.fsync(f.fileno())
+                manifest['dictionary_bytes'][name] = f.tell()
+            manifest['dictionaries'][name] += len(values)
+            values.clear()
+    manifest['rows'] += rows
+    manifest['watermark'] = watermark
+    manifest['tail_hash'] = tail_hash(ledger_path, watermark)
+    _save_manifest(columns_dir, manifest)
+    return rows
+
+
+def discard_columns(columns_dir=COLUMNS_DIR):
+    """Forces a full rebuild on the next refresh, for ledgers rewritten in place."""
+    path = os.path.join(columns_dir, MANIFEST_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class LedgerColumns:
+    """Read-only, memory-mapped view of the column store."""
+
+    def __init__(self, columns_dir=COLUMNS_DIR):
+        self.columns_dir = columns_dir
+        self.manifest = load_manifest(columns_dir) or _empty_manifest()
+        self.rows = self.manifest['rows']
+        self._dictionaries = {}
+
+    def column(self, name):
+        dtype = _dtype(name)
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(_column_path(self.columns_dir, name), dtype=dtype, mode='r', shape=(self.rows,))
+
+    def dictionary(self, name):
+        if name not in self._dictionaries:
+            self._dictionaries[name] = _load_dictionary(
+                self.columns_dir, name, self.manifest['dictionaries'][name])
+        return self._dictionaries[name]
+
+    def decode(self, name, code):
+        return None if code == NULL_CODE else self.dictionary(name)[code]
+
+
+def distinct_rows(columns):
+    """Boolean mask of the rows that are not `overlapping` duplicates of an earlier row."""
+    mask = np.ones(columns.rows, dtype=bool)
+    statuses = columns.dictionary('status')
+    if OVERLAPPING in statuses:
+        mask &= np.asarray(columns.column('status')) != statuses.index(OVERLAPPING)
+    return mask
+
+
+def account_totals(columns, rows=None):
+    """Per-account row count, time range, inflows, outflows and net (in cents).
+
+    Returns {account_number: {...}}; rows without an account are grouped
+    under None. `rows` optionally restricts the aggregation to an array of
+    row numbers; by default every row but the `overlapping` duplicates is
+    counted.
+    """
+    if rows is None:
+        rows = np.flatnonzero(distinct_rows(columns))
+    accounts = columns.column('account').astype(np.int64)[rows] + 1  # shift NULL_CODE to 0
+    amounts = columns.column('amount_cents')[rows]
+    timestamps = columns.column('timestamp')[rows]
+    groups = len(columns.dictionary('account')) + 1
+
+    counts = np.bincount(accounts, minlength=groups)
+    inflows = np.bincount(accounts, weights=np.where(amounts > 0, amounts, 0), minlength=groups)
+    outflows = np.bincount(accounts, weights=np.where(amounts < 0, -amounts, 0), minlength=groups)
+    valid = timestamps != MISSING_TIMESTAMP
+    first = np.full(groups, np.iinfo(np.int64).max, dtype=np.int64)
+    last = np.full(groups, np.iinfo(np.int64).min, dtype=np.int64)
+    np.minimum.at(first, accounts[valid], timestamps[valid])
+    np.maximum.at(last, accounts[valid], timestamps[valid])
+
+    totals = {}
+    for group in np.flatnonzero(counts):
+        has_time = first[group] <= last[group]
+        totals[columns.decode('account', group - 1)] = {
+            'transactions': int(counts[group]),
+            'first_timestamp': int(first[group]) if has_time else None,
+            'last_timestamp': int(last[group]) if has_time else None,
+            'inflow_cents': int(round(inflows[group])),
+            'outflow_cents': int(round(outflows[group])),
+            'net_cents': int(round(inflows[group] - outflows[group])),
+        }
+    return totals
+
+
+def matching_description_codes(columns, predicate):
+    """Boolean array over description codes; `predicate` runs once per distinct value."""
+    return np.fromiter((bool(predicate(value)) for value in columns.dictionary('description')),
+                       dtype=bool, count=len(columns.dictionary('description')))
+
+
+def select_rows(columns, min_cents=None, description_predicate=None):
+    """Returns the row numbers matching an amount floor and/or description test,
+    leaving out `overlapping` duplicates."""
+    mask = distinct_rows(columns)
+    if min_cents is not None:
+        mask &= columns.column('amount_cents') >= min_cents
+    if description_predicate is not None:
+        codes = columns.column('description')
+        # Append a False slot so NULL_CODE (-1) indexes it.
+        matches = np.append(matching_description_codes(columns, description_predicate), False)
+        mask &= matches[codes]
+    return np.flatnonzero(mask)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compact the unified ledger into the column store.")
+    parser.add_argument('--ledger', default=LEDGER_FILE)
+    parser.add_argument('--columns-dir', default=COLUMNS_DIR)
+    args = parser.parse_args()
+
+    added = refresh_columns(args.ledger, args.columns_dir)
+    columns = LedgerColumns(args.columns_dir)
+    print(f"Added {added} row(s); column store now holds {columns.rows} row(s).")
+    for account, summary in account_totals(columns).items():
+        print(f"{account}: {json.dumps(summary)}")
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+# The index lives next to the ledger as `<ledger>.idx.sqlite`.
+INDEX_SUFFIX = '.idx.sqlite'
+# Number of ledger bytes just before the watermark that are hashed to detect
+# rewrites of already-indexed history.
+WATERMARK_WINDOW = 4096
+
+
+def tail_hash(path, end):
+    """Hashes the WATERMARK_WINDOW bytes of `path` that end at offset `end`.
+
+    Returns None if the file is shorter than `end`.
+    """
+    start = max(0, end - WATERMARK_WINDOW)
+    try:
+        with open(path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+    except OSError:
+        data = b''
+    if len(data) != end - start:
+        return None
+    return hashlib.sha256(data).hexdigest()
+
+
+def _key(transaction_id):
+    """Stores SHA-256 hex IDs as 32 raw bytes; anything else as UTF-8."""
+    try:
+        return bytes.fromhex(transaction_id)
+    except (ValueError, TypeError):
+        return str(transaction_id).encode()
+
+
+def discard_index(ledger_path, index_path=None):
+    """Deletes the index of a ledger whose existing rows were rewritten.
+
+    The watermark check only notices changes near the end of the ledger, so
+    tools that rewrite rows in place call this and the index is rebuilt on
+    next open.
+    """
+    index_path = index_path or ledger_path + INDEX_SUFFIX
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(index_path + suffix):
+            os.remove(index_path + suffix)
+
+
+class LedgerIndex:
+    """Persistent sidecar index mapping transaction IDs to ledger byte offsets.
+
+    Behaves like the set of IDs that `load_existing_transaction_ids` used to
+    build (`in`, `add`, `len`), but survives between runs so startup never
+    rereads the JSONL. The index remembers how far into the ledger it has
+    indexed (the watermark) plus a hash of the bytes just before it; rows
+    appended by other tools are picked up incrementally and a rewritten or
+    truncated ledger triggers a full rebuild.
+    """
+
+    def __init__(self, ledger_path, index_path=None):
+        self.ledger_path = ledger_path
+        self.index_path = index_path or ledger_path + INDEX_SUFFIX
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(self.index_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS transactions ('
+            'transaction_id BLOB PRIMARY KEY, offset INTEGER NOT NULL, length INTEGER NOT NULL'
+            ') WITHOUT ROWID')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.conn.commit()
+        self.pending = {}
+        self.watermark = int(self._get_meta('watermark', 0))
+        self.pending_watermark = self.watermark
+        self.sync()
+
+    # --- Watermark handling ---
+
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def _ledger_size(self):
+        try:
+            return os.path.getsize(self.ledger_path)
+        except OSError:
+            return 0
+
+    def _tail_hash(self, end):
+        return tail_hash(self.ledger_path, end)
+
+    def in_sync(self):
+        size = self._ledger_size()
+        if size < self.watermark:
+            return False
+        return self._tail_hash(self.watermark) == self._get_meta('tail_hash', self._tail_hash(0))
+
+    def sync(self):
+        """Brings the index up to date with the ledger, rebuilding it if needed."""
+        if not self.in_sync():
+            print(f"Ledger index {self.index_path} is out of sync with the ledger. Rebuilding.")
+            self.rebuild()
+        elif self._ledger_size() > self.watermark:
+            self.catch_up()
+
+    def rebuild(self):
+        self.conn.execute('DELETE FROM transactions')
+        self.conn.execute('DELETE FROM meta')
+        self.conn.commit()
+        self.pending.clear()
+        self.watermark = self.pending_watermark = 0
+        self.catch_up()
+
+    def catch_up(self):
+        """Indexes complete ledger lines written past the watermark."""
+        if not os.path.exists(self.ledger_path):
+            self.commit()
+            return
+        with open(self.ledger_path, 'rb') as f:
+            f.seek(self.watermark)
+            offset = self.watermark
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # A writer is mid-append; index it next time.
+                try:
+                    transaction_id = json.loads(line).get('transaction_id')
+                except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+                    transaction_id = None  # Ignore corrupted lines
+                if transaction_id is not None:
+                    self.record(transaction_id, offset, len(line))
+                else:
+                    self.pending_watermark = offset + len(line)
+                offset += len(line)
+        self.commit()
+
+    # --- Set-like interface ---
+
+    def __contains__(self, transaction_id):
+        if transaction_id in self.pending:
+            return True
+        return self.lookup(transaction_id) is not None
+
+    def __len__(self):
+        stored = self.conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+        return stored + sum(1 for tid in self.pending if self._stored(tid) is None)
+
+    def add(self, transaction_id):
+        self.pending.setdefault(transaction_id, None)
+
+    def record(self, transaction_id, offset, length):
+        """Records a row written at `offset`; the first row seen for an ID wins."""
+        if self.pending.get(transaction_id) is None:
+            self.pending[transaction_id] = (offset, length)
+        if offset == self.pending_watermark:
+            self.pending_watermark = offset + length
+
+    def scope(self, transaction):
+        """The IDs a duplicate of `transaction` could be among: for a single
+        ledger, all of them (see ledger_partitions.PartitionedIndex)."""
+        return self
+
+    def _stored(self, transaction_id):
+        return self.conn.execute(
+            'SELECT offset, length FROM transactions WHERE transaction_id = ?',
+            (_key(transaction_id),)).fetchone()
+
+    def lookup(self, transaction_id):
+        """Returns (offset, length) of the first ledger row with this ID, or None."""
+        location = self.pending.get(transaction_id)
+        if location is not None:
+            return location
+        return self._stored(transaction_id)
+
+    def fetch(self, transaction_id):
+        """Reads a single transaction from the ledger by ID without scanning it."""
+        location = self.lookup(transaction_id)
+        if location is None:
+            return None
+        offset, length = location
+        with open(self.ledger_path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    # --- Persistence ---
+
+    def commit(self):
+        """Persists recorded rows and advances the watermark past them."""
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO transactions (transaction_id, offset, length) VALUES (?, ?, ?)',
+            [(_key(tid), loc[0], loc[1]) for tid, loc in self.pending.items() if loc is not None])
+        self.watermark = self.pending_watermark
+        self.conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', [
+            ('watermark', str(self.watermark)),
+            ('tail_hash', self._tail_hash(self.watermark)),
+        ])
+        self.conn.commit()
+        self.pending = {tid: loc for tid, loc in self.pending.items() if loc is None}
+
+    def rollback(self):
+        self.pending.clear()
+        self.pending_watermark = self.watermark
+
+    def close(self):
+        self.commit()
+        self.conn.close()
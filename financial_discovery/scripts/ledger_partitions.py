@@ -0,0 +1,829 @@
+"""Partitioned layout of the unified ledger, for several writers (and machines) at once.
+
+Instead of one append-only JSONL, rows live in
+
+    ledger/account=<account>/month=<YYYY-MM>/part-<writer>.jsonl
+
+Every writer appends only to its own part files, so writers never contend for
+a file or a lock, wherever they run. A writer's commit atomically replaces its
+own manifest file, ledger/_manifest/<writer>.json, which records how many
+bytes and rows of each part are committed. Readers read only that committed
+prefix, and skip partitions whose account or month they do not need. A crash
+leaves at most an uncommitted tail, which the next writer with the same id
+truncates.
+
+The layout is switched on by creating the _manifest directory, which `split`
+does (it also moves existing single-file rows into partitions). After that,
+the ingesters write partitions transparently (see ledger_writer() and
+load_index()). The single JSONL becomes a view of the partitions, which the
+column store, queries, reconciliation and summaries go on reading: rows are
+appended to it as they are committed (see sync_view()). Reconciliation writes
+its results back into the part files (see rewrite_parts()). `merge` rebuilds
+the view in (timestamp, account, transaction ID) order, or writes a selection
+of it elsewhere:
+
+    python financial_discovery/scripts/ledger_partitions.py split
+    python financial_discovery/scripts/ledger_partitions.py merge [--account A] [--from 2022-01] [--to 2022-12]
+    python financial_discovery/scripts/ledger_partitions.py manifest
+"""
+import argparse
+import fcntl
+import json
+import os
+import re
+import socket
+import sys
+import time
+from contextlib import contextmanager
+from urllib.parse import quote, unquote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from ai_bridge import metrics
+from ai_bridge.journal import INTENT, Journal
+from financial_discovery.scripts.ledger_index import LedgerIndex, discard_index
+from financial_discovery.scripts.ledger_writer import (
+    DEFAULT_BATCH_SIZE, DEFAULT_FLUSH_INTERVAL, LedgerLock, LedgerWriter, _fsync_directory, _move,
+    open_journal, recover_ledger, recover_statements)
+from financial_discovery.scripts.transaction_ids import normalize_timestamp
+
+# --- Configuration ---
+LEDGER_FILE = 'financial_discovery/ledger/unified_ledger.jsonl'
+# Directories inside the partitioned root (the directory holding LEDGER_FILE).
+MANIFEST_DIR = '_manifest'
+WRITERS_DIR = '_writers'
+QUARANTINE_DIR = '_quarantine'
+# Rows without an account number or a parseable date.
+UNKNOWN = 'unknown'
+# Rows per commit when `split` moves an existing ledger into partitions.
+SPLIT_COMMIT_ROWS = 100000
+# What the single-file view holds of each part is tracked in `<ledger>.view.json`.
+VIEW_SUFFIX = '.view.json'
+# A part rewritten by rewrite_parts() is written to `<part>.next` first.
+NEXT_SUFFIX = '.next'
+MONTH_PATTERN = re.compile(r'^\d{4}-\d{2}$')
+
+
+# --- Layout ---
+
+def partition_root(ledger_path):
+    return os.path.dirname(ledger_path) or '.'
+
+
+def is_partitioned(ledger_path):
+    """True once `split` has switched the ledger to the partitioned layout."""
+    return os.path.isdir(os.path.join(partition_root(ledger_path), MANIFEST_DIR))
+
+
+def partition_of(transaction):
+    """(account, month) partition key of a transaction.
+
+    Both are fields of the transaction ID, so duplicates always share a
+    partition and dedup never has to look outside it.
+    """
+    account = transaction.get('account_number')
+    account = str(account).strip() if account is not None else ''
+    month = normalize_timestamp(transaction.get('timestamp'))[:7]
+    return account or UNKNOWN, month if MONTH_PATTERN.match(month) else UNKNOWN
+
+
+def partition_dir(key):
+    account, month = key
+    return f"account={quote(account, safe='')}/month={month}"
+
+
+def parse_partition_dir(relpath):
+    """Inverse of partition_dir() for a part's relative path; None if it is not one."""
+    parts = relpath.split('/')
+    if len(parts) != 3 or not parts[0].startswith('account=') or not parts[1].startswith('month='):
+        return None
+    return unquote(parts[0][len('account='):]), parts[1][len('month='):]
+
+
+def _writer_file(root, directory, writer_id, suffix):
+    return os.path.join(root, directory, f"{writer_id}{suffix}")
+
+
+def claim_writer(root):
+    """Claims the first free writer slot on this host; returns (writer_id, lease).
+
+    The slot's lock file stays flock()ed while `lease` is open and is
+    released by the kernel if the process dies, so concurrent writers on a
+    host get distinct ids without ever waiting for each other, and part
+    files are reused run after run instead of piling up.
+    """
+    os.makedirs(os.path.join(root, WRITERS_DIR), exist_ok=True)
+    host = quote(socket.gethostname() or 'localhost', safe='')
+    slot = 0
+    while True:
+        writer_id = f"{host}-{slot}"
+        lease = open(_writer_file(root, WRITERS_DIR, writer_id, '.lock'), 'a')
+        try:
+            fcntl.flock(lease, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return writer_id, lease
+        except BlockingIOError:
+            lease.close()
+            slot += 1
+
+
+def load_writer_manifest(root, writer_id):
+    try:
+        with open(_writer_file(root, MANIFEST_DIR, writer_id, '.json')) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {'writer': writer_id, 'sequence': 0, 'parts': {}}
+
+
+def save_writer_manifest(manifest_path, manifest):
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, manifest_path)
+    _fsync_directory(manifest_path)
+
+
+def writer_lease(root, writer_id):
+    """Waits for and takes the lease of writer `writer_id` (see claim_writer),
+    for tools that rewrite its part files while it is not running."""
+    return LedgerLock(_writer_file(root, WRITERS_DIR, writer_id, ''))
+
+
+def load_manifest(root):
+    """Committed parts of every writer: {relative path: {bytes, rows, min/max_timestamp, writer}}."""
+    parts = {}
+    directory = os.path.join(root, MANIFEST_DIR)
+    if not os.path.isdir(directory):
+        return parts
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        manifest = load_writer_manifest(root, name[:-len('.json')])
+        for relpath, info in manifest['parts'].items():
+            parts[relpath] = dict(info, writer=manifest['writer'])
+    return parts
+
+
+def select_parts(manifest, account=None, start_month=None, end_month=None):
+    """Relative paths of the parts that can hold rows for `account` in
+    [start_month, end_month] (YYYY-MM, inclusive); rows with an unknown month
+    are only selected when no month bound is given."""
+    selected = []
+    for relpath in sorted(manifest):
+        key = parse_partition_dir(relpath)
+        if key is None or not manifest[relpath]['rows']:
+            continue
+        if account is not None and key[0] != str(account):
+            continue
+        month = key[1]
+        if (start_month or end_month) and month == UNKNOWN:
+            continue
+        if (start_month and month < start_month) or (end_month and month > end_month):
+            continue
+        selected.append(relpath)
+    return selected
+
+
+def _open_part(root, relpath, info):
+    path = os.path.join(root, relpath)
+    if info.get('replacing'):
+        # Mid-rewrite, the committed rows are in the new copy until it is swapped in.
+        try:
+            return open(path + NEXT_SUFFIX, 'rb')
+        except FileNotFoundError:
+            pass
+    return open(path, 'rb')
+
+
+def iter_part_lines(root, relpath, info):
+    """Yields the committed lines (bytes) of one part file, given its manifest entry."""
+    with _open_part(root, relpath, info) as f:
+        remaining = info['bytes']
+        for line in f:
+            if remaining <= 0:
+                break
+            remaining -= len(line)
+            yield line
+
+
+# --- Dedup ---
+
+class PartitionIds:
+    """Transaction IDs of one partition, with the interface ingest expects of LedgerIndex."""
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.pending = set()
+
+    def __contains__(self, transaction_id):
+        return transaction_id in self.ids or transaction_id in self.pending
+
+    def __len__(self):
+        return len(self.ids | self.pending)
+
+    def add(self, transaction_id):
+        self.pending.add(transaction_id)
+
+    def record(self, transaction_id, offset, length):
+        self.pending.add(transaction_id)
+
+
+class PartitionedIndex:
+    """Dedup index of a partitioned ledger, scoped to (account, month) partitions.
+
+    Each partition's IDs are read from its committed parts the first time a
+    transaction of that partition is checked, so the cost of dedup grows
+    with the partitions a run touches, not with the whole ledger. Rows that
+    other writers commit after the index was opened are not seen.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.manifest = load_manifest(root)
+        self.scopes = {}
+
+    def scope(self, transaction):
+        key = partition_of(transaction)
+        ids = self.scopes.get(key)
+        if ids is None:
+            ids = self.scopes[key] = PartitionIds(self._load(key))
+        return ids
+
+    def _load(self, key):
+        ids = set()
+        prefix = partition_dir(key) + '/'
+        # Reread, so a part rewritten since the index was opened is read at its new size.
+        self.manifest = load_manifest(self.root)
+        for relpath, info in self.manifest.items():
+            if not relpath.startswith(prefix):
+                continue
+            for line in iter_part_lines(self.root, relpath, info):
+                try:
+                    transaction_id = json.loads(line).get('transaction_id')
+                except (ValueError, AttributeError):
+                    transaction_id = None
+                if transaction_id is not None:
+                    ids.add(transaction_id)
+        metrics.count('partitions_loaded')
+        return ids
+
+    def __contains__(self, transaction_id):
+        return any(transaction_id in ids for ids in self.scopes.values())
+
+    def commit(self):
+        for ids in self.scopes.values():
+            ids.ids.update(ids.pending)
+            ids.pending.clear()
+
+    def rollback(self):
+        for ids in self.scopes.values():
+            ids.pending.clear()
+
+    def close(self):
+        self.commit()
+
+
+# --- Writing ---
+
+class PartitionedLedgerWriter(LedgerWriter):
+    """A LedgerWriter over a partitioned ledger, appending to this writer's own part files.
+
+    Batching, validation, quarantine and statement()/ingest() behave as in
+    LedgerWriter. A commit fsyncs the touched parts and then replaces this
+    writer's manifest, so a statement becomes visible to readers atomically
+    even when it spans several partitions. Rollback truncates the parts back
+    to their committed size. The writer keeps its own journal of raw files
+    in flight, and `position` is the manifest's commit sequence number,
+    which is what the journal records and recovery compares against.
+    """
+
+    def __init__(self, root, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 index=None, validator=None):
+        self.root = root
+        self.validator = validator
+        self.quarantined = []
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.index = index
+        for directory in (MANIFEST_DIR, QUARANTINE_DIR):
+            os.makedirs(os.path.join(root, directory), exist_ok=True)
+        self.writer_id, self.lease = claim_writer(root)
+        self.part_name = f"part-{self.writer_id}.jsonl"
+        self.manifest_path = _writer_file(root, MANIFEST_DIR, self.writer_id, '.json')
+        self.quarantine_path = _writer_file(root, QUARANTINE_DIR, self.writer_id, '.jsonl')
+        self.manifest = load_writer_manifest(root, self.writer_id)
+        finish_rewrites(root, self.manifest, self.manifest_path)
+        self._truncate_uncommitted()
+        self.journal = Journal(_writer_file(root, WRITERS_DIR, self.writer_id, '.journal'))
+        self._recover_statements()
+        self.position = self.manifest['sequence']
+        self.files = {}     # relpath -> open part file
+        self.sizes = {relpath: info['bytes'] for relpath, info in self.manifest['parts'].items()}
+        self.buffers = {}   # relpath -> [line]
+        self.changes = {}   # relpath -> [rows, min timestamp, max timestamp] since the last commit
+        self.placements = {}
+        self.buffered = 0
+        self.last_flush = time.monotonic()
+        self.statement_start = None
+        self.statement_name = None
+
+    def _own_parts(self):
+        for entry in os.scandir(self.root):
+            if not entry.is_dir() or not entry.name.startswith('account='):
+                continue
+            for month in os.scandir(entry.path):
+                path = os.path.join(month.path, self.part_name)
+                if os.path.exists(path):
+                    yield f"{entry.name}/{month.name}/{self.part_name}", path
+
+    def _truncate_uncommitted(self):
+        """Drops whatever a crashed run with this writer id wrote past its last commit."""
+        for relpath, path in self._own_parts():
+            committed = self.manifest['parts'].get(relpath, {}).get('bytes', 0)
+            if os.path.getsize(path) > committed:
+                with open(path, 'r+b') as f:
+                    f.truncate(committed)
+                    os.fsync(f.fileno())
+                print(f"Rolled back uncommitted rows in {relpath}.")
+
+    def _recover_statements(self):
+        # As ledger_writer.recover_statements, with the commit sequence in
+        # place of the ledger offset.
+        for key, state, data in self.journal.in_flight():
+            if state == INTENT and self.manifest['sequence'] <= data['start_offset']:
+                self.journal.abort(key)
+                continue
+            if os.path.exists(data['source']):
+                _move(data['source'], data['destination'])
+            self.journal.commit(key)
+            print(f"Finished interrupted ingestion of {data['source']}.")
+
+    def _placement(self, transaction):
+        """(part file, normalized timestamp) of a transaction.
+
+        Statements repeat the same few account/date pairs, so placements are
+        cached until the next commit.
+        """
+        raw = (transaction.get('account_number'), transaction.get('timestamp'))
+        placement = self.placements.get(raw)
+        if placement is None:
+            relpath = f"{partition_dir(partition_of(transaction))}/{self.part_name}"
+            placement = self.placements[raw] = (relpath, normalize_timestamp(raw[1]) or None)
+        return placement
+
+    def write(self, transaction):
+        """Buffers one transaction; returns its (offset, length) in its part file."""
+        line = (json.dumps(transaction) + '\n').encode()
+        relpath, timestamp = self._placement(transaction)
+        offset = self.sizes.get(relpath, 0)
+        self.buffers.setdefault(relpath, []).append(line)
+        self.sizes[relpath] = offset + len(line)
+        change = self.changes.get(relpath)
+        if change is None:
+            self.changes[relpath] = [1, timestamp, timestamp]
+        else:
+            change[0] += 1
+            if timestamp is not None:
+                if change[1] is None or timestamp < change[1]:
+                    change[1] = timestamp
+                if change[2] is None or timestamp > change[2]:
+                    change[2] = timestamp
+        self.buffered += 1
+        if self.buffered >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+        return offset, len(line)
+
+    def _file(self, relpath):
+        f = self.files.get(relpath)
+        if f is None:
+            path = os.path.join(self.root, relpath)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = self.files[relpath] = open(path, 'ab')
+        return f
+
+    def flush(self):
+        """Writes buffered rows to their parts, fsyncing each part once."""
+        if self.buffered:
+            with metrics.stage('ledger_flush'):
+                written = 0
+                for relpath, lines in self.buffers.items():
+                    if not lines:
+                        continue
+                    data = b''.join(lines)
+                    f = self._file(relpath)
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    written += len(data)
+                    lines.clear()
+            metrics.count('rows_written', self.buffered)
+            metrics.count('bytes_written', written)
+            self.buffered = 0
+        self.last_flush = time.monotonic()
+
+    def _save_manifest(self):
+        save_writer_manifest(self.manifest_path, self.manifest)
+
+    # --- Statement transactions ---
+
+    def begin(self, statement):
+        if self.changes:
+            self.commit()  # Rows written outside a statement are not rolled back with it.
+        self._write_quarantine()
+        self.statement_name = statement
+
+    def commit(self):
+        self.flush()
+        self._write_quarantine()
+        if self.index is not None:
+            self.index.commit()
+        if self.changes:
+            for relpath, (rows, low, high) in self.changes.items():
+                info = self.manifest['parts'].get(relpath)
+                if info is None:
+                    # A new part file: make its directory entries durable too.
+                    _fsync_directory(os.path.join(self.root, relpath))
+                    _fsync_directory(os.path.dirname(os.path.join(self.root, relpath)))
+                    info = self.manifest['parts'][relpath] = {
+                        'bytes': 0, 'rows': 0, 'min_timestamp': None, 'max_timestamp': None}
+                info['bytes'] = self.sizes[relpath]
+                info['rows'] += rows
+                if low is not None:
+                    info['min_timestamp'] = min(filter(None, [info['min_timestamp'], low]))
+                    info['max_timestamp'] = max(filter(None, [info['max_timestamp'], high]))
+            self.manifest['sequence'] += 1
+            self._save_manifest()
+            self.position = self.manifest['sequence']
+            self.changes.clear()
+            self.placements.clear()
+        self.statement_name = None
+
+    def rollback(self):
+        self.quarantined.clear()
+        self.buffered = 0
+        for relpath in self.changes:
+            self.buffers.get(relpath, []).clear()
+            committed = self.manifest['parts'].get(relpath, {}).get('bytes', 0)
+            f = self._file(relpath)
+            f.truncate(committed)
+            os.fsync(f.fileno())
+            self.sizes[relpath] = committed
+        self.changes.clear()
+        if self.index is not None:
+            self.index.rollback()
+        self.statement_name = None
+
+    @contextmanager
+    def ingest(self, source, destination):
+        if self.changes:
+            # The sequence journaled with the intent must be this statement's own.
+            self.commit()
+        with super().ingest(source, destination):
+            yield self
+
+    def close(self):
+        self.commit()
+        for f in self.files.values():
+            f.close()
+        self.journal.close()
+        self.lease.close()
+
+
+@contextmanager
+def ledger_writer(ledger_path, index=None, validator=None, **options):
+    """A journaled writer for the ledger at `ledger_path`, in whichever layout it uses."""
+    if not is_partitioned(ledger_path):
+        # The journal is recovered and compacted by whoever holds the ledger.
+        with LedgerLock(ledger_path):
+            # Checked again: `split` may have run while this waited for the lock.
+            if not is_partitioned(ledger_path):
+                journal = open_journal(ledger_path)
+                try:
+                    with LedgerWriter(ledger_path, index=index, journal=journal, validator=validator,
+                                      **options) as writer:
+                        yield writer
+                finally:
+                    journal.close()
+                return
+    with PartitionedLedgerWriter(partition_root(ledger_path), index=index, validator=validator,
+                                 **options) as writer:
+        yield writer
+    # After the lease is released, so a rewrite_parts() holding the
+    # LedgerLock never waits on this writer.
+    sync_view(ledger_path)
+
+
+def load_index(ledger_path):
+    """The dedup index for the ledger's layout (see LedgerIndex and PartitionedIndex)."""
+    if is_partitioned(ledger_path):
+        return PartitionedIndex(partition_root(ledger_path))
+    # Roll back any half-written statement first so it is never indexed, and
+    # catch up while no other process is appending.
+    with LedgerLock(ledger_path):
+        recover_ledger(ledger_path)
+        return LedgerIndex(ledger_path)
+
+
+# --- Rewriting ---
+
+def finish_rewrites(root, manifest, manifest_path):
+    """Swaps in the part copies a rewrite_parts() that died left behind.
+
+    The caller holds the writer's lease. Copies the manifest does not mark
+    `replacing` were never committed and are deleted.
+    """
+    finished = False
+    for relpath, info in manifest['parts'].items():
+        path = os.path.join(root, relpath)
+        if info.pop('replacing', False):
+            finished = True
+            if os.path.exists(path + NEXT_SUFFIX):
+                os.replace(path + NEXT_SUFFIX, path)
+                _fsync_directory(path)
+        elif os.path.exists(path + NEXT_SUFFIX):
+            os.remove(path + NEXT_SUFFIX)
+    if finished:
+        save_writer_manifest(manifest_path, manifest)
+
+
+def rewrite_parts(root, writer_id, relpaths, rewrite):
+    """Rewrites committed rows of writer `writer_id`'s parts `relpaths`.
+
+    `rewrite(relpath, line)` returns a replacement line (bytes) or None to
+    keep the line. Waits for the writer's lease, so the writer is not
+    appending meanwhile. Each changed part is written to `<part>.next`, then
+    the writer's manifest records its new size with the part marked
+    `replacing`, then the copy is swapped in. Readers and crash recovery
+    (finish_rewrites) pick the copy while the mark is set, so every reader
+    sees either the old rows or the new ones. Each rewrite also bumps the
+    part's `rewrites` count, which tells sync_view() to rebuild the view.
+    Returns the number of lines changed.
+    """
+    with writer_lease(root, writer_id):
+        manifest_path = _writer_file(root, MANIFEST_DIR, writer_id, '.json')
+        manifest = load_writer_manifest(root, writer_id)
+        finish_rewrites(root, manifest, manifest_path)
+        changed = 0
+        sizes = {}
+        for relpath in sorted(relpaths):
+            info = manifest['parts'].get(relpath)
+            if info is None:
+                continue
+            path = os.path.join(root, relpath)
+            part_changed = 0
+            with open(path + NEXT_SUFFIX, 'wb') as target:
+                for line in iter_part_lines(root, relpath, info):
+                    replacement = rewrite(relpath, line)
+                    if replacement is not None and replacement != line:
+                        line = replacement
+                        part_changed += 1
+                    target.write(line)
+                target.flush()
+                os.fsync(target.fileno())
+                size = target.tell()
+            if not part_changed:
+                os.remove(path + NEXT_SUFFIX)
+                continue
+            changed += part_changed
+            sizes[relpath] = size
+        if not sizes:
+            return 0
+        for relpath, size in sizes.items():
+            info = manifest['parts'][relpath]
+            info.update(bytes=size, rewrites=info.get('rewrites', 0) + 1, replacing=True)
+        save_writer_manifest(manifest_path, manifest)
+        finish_rewrites(root, manifest, manifest_path)
+    return changed
+
+
+# --- Single-file view ---
+
+def load_view(ledger_path):
+    """What the single ledger file holds of the partitions:
+    {'bytes': size, 'generation': id, 'parts': {relpath: {bytes, rows, rewrites}}},
+    or None. The generation changes whenever the view is rebuilt rather than
+    appended to, which tells the column store to rebuild too."""
+    try:
+        with open(ledger_path + VIEW_SUFFIX) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
+def _save_view(ledger_path, manifest, generation=None):
+    view = {'bytes': os.path.getsize(ledger_path) if os.path.exists(ledger_path) else 0,
+            'generation': generation or os.urandom(8).hex(),
+            'parts': {relpath: {'bytes': info['bytes'], 'rows': info['rows'],
+                                'rewrites': info.get('rewrites', 0)} for relpath, info in manifest.items()}}
+    save_writer_manifest(ledger_path + VIEW_SUFFIX, view)
+
+
+def _view_is_stale(ledger_path, view, manifest):
+    if view is None or 'generation' not in view:
+        return True
+    size = os.path.getsize(ledger_path) if os.path.exists(ledger_path) else 0
+    if size < view['bytes']:
+        return True
+    for relpath, viewed in view['parts'].items():
+        info = manifest.get(relpath)
+        if info is None or info.get('rewrites', 0) != viewed['rewrites'] or info['bytes'] < viewed['bytes']:
+            return True
+    return False
+
+
+def sync_view(ledger_path=LEDGER_FILE):
+    """Brings the single ledger file up to date with the committed partitions.
+
+    Rows committed since the last sync are appended as they are, part by
+    part, so the column store and the other readers, which catch up on
+    appended rows, only parse the new rows. If a part was rewritten (see
+    rewrite_parts()), or the view is missing or was truncated, the view is
+    rebuilt in merged order instead. Holds the LedgerLock. Returns the number
+    of rows added.
+    """
+    root = partition_root(ledger_path)
+    with LedgerLock(ledger_path):
+        manifest = load_manifest(root)
+        view = load_view(ledger_path)
+        if _view_is_stale(ledger_path, view, manifest):
+            rows = _rebuild_view(ledger_path, root, manifest)
+            metrics.count('view_rebuilds')
+            return rows
+        added = 0
+        with open(ledger_path, 'ab') as out:
+            # Whatever a sync that died appended past its last save.
+            out.truncate(view['bytes'])
+            for relpath in sorted(manifest):
+                info = manifest[relpath]
+                viewed = view['parts'].get(relpath, {'bytes': 0, 'rows': 0})
+                if info['bytes'] == viewed['bytes']:
+                    continue
+                with _open_part(root, relpath, info) as part:
+                    part.seek(viewed['bytes'])
+                    out.write(part.read(info['bytes'] - viewed['bytes']))
+                added += info['rows'] - viewed['rows']
+            out.flush()
+            os.fsync(out.fileno())
+        if added or set(manifest) != set(view['parts']):
+            _save_view(ledger_path, manifest, view['generation'])
+    if added:
+        metrics.count('view_rows_appended', added)
+    return added
+
+
+# --- Tools ---
+
+def split_ledger(ledger_path=LEDGER_FILE):
+    """Switches the ledger to the partitioned layout, moving its rows into partitions.
+
+    The single file is left in place as the merged view. Returns the number
+    of rows moved.
+    """
+    root = partition_root(ledger_path)
+    with LedgerLock(ledger_path):
+        if is_partitioned(ledger_path):
+            print(f"{root} is already partitioned.")
+            return 0
+        moved = _split_ledger(ledger_path, root)
+        # The single file already holds every row moved, so it stays the view.
+        _save_view(ledger_path, load_manifest(root))
+    print(f"Moved {moved} rows into partitions under {root}.")
+    return moved
+
+
+def _split_ledger(ledger_path, root):
+    recover_ledger(ledger_path)
+    # Statements in flight are journaled next to the single file; finish them first.
+    journal = open_journal(ledger_path)
+    recover_statements(ledger_path, journal)
+    journal.close()
+    os.makedirs(os.path.join(root, MANIFEST_DIR), exist_ok=True)
+    moved = 0
+    with PartitionedLedgerWriter(root, batch_size=10000, flush_interval=60) as writer:
+        if os.path.exists(ledger_path):
+            with open(ledger_path, 'rb') as f:
+                for line in f:
+                    try:
+                        transaction = json.loads(line)
+                    except ValueError:
+                        print(f"Skipping unreadable ledger line {moved + 1}.")
+                        continue
+                    writer.write(transaction)
+                    moved += 1
+                    if moved % SPLIT_COMMIT_ROWS == 0:
+                        writer.commit()
+    return moved
+
+
+def _order_key(line):
+    try:
+        transaction = json.loads(line)
+    except ValueError:
+        return ('', '', '')
+    return (normalize_timestamp(transaction.get('timestamp')), str(transaction.get('account_number') or ''),
+            str(transaction.get('transaction_id') or ''))
+
+
+def iter_merged(root, account=None, start_month=None, end_month=None, manifest=None):
+    """Yields the committed rows of the selected partitions, ordered by
+    (timestamp, account, transaction ID).
+
+    Months are merged one at a time, so memory holds one month's rows
+    (of the selected accounts), not the ledger.
+    """
+    if manifest is None:
+        manifest = load_manifest(root)
+    by_month = {}
+    for relpath in select_parts(manifest, account, start_month, end_month):
+        by_month.setdefault(parse_partition_dir(relpath)[1], []).append(relpath)
+    # 'unknown' sorts after every YYYY-MM.
+    for month in sorted(by_month):
+        lines = []
+        for relpath in by_month[month]:
+            lines.extend(iter_part_lines(root, relpath, manifest[relpath]))
+        lines.sort(key=_order_key)
+        yield from lines
+
+
+def _write_merged(output, root, manifest, account=None, start_month=None, end_month=None):
+    """Replaces `output` atomically with the merged rows; returns the number of rows."""
+    rows = 0
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        for line in iter_merged(root, account, start_month, end_month, manifest):
+            f.write(line)
+            rows += 1
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, output)
+    _fsync_directory(output)
+    return rows
+
+
+def _rebuild_view(ledger_path, root, manifest):
+    """Rewrites the single ledger file from `manifest` in merged order and
+    records it as the view. The caller holds the LedgerLock."""
+    rows = _write_merged(ledger_path, root, manifest)
+    _save_view(ledger_path, manifest)
+    # Rows moved, so offsets in the single-file ID index are stale.
+    discard_index(ledger_path)
+    return rows
+
+
+def merge_ledger(ledger_path=LEDGER_FILE, output=None, account=None, start_month=None, end_month=None):
+    """Writes the ordered view of the partitions to `output` (the single ledger
+    file by default, replaced atomically); returns the number of rows."""
+    root = partition_root(ledger_path)
+    output = output or ledger_path
+    rows = 0
+    if output == '-':
+        out = sys.stdout.buffer
+        for line in iter_merged(root, account, start_month, end_month):
+            out.write(line)
+            rows += 1
+        out.flush()
+        return rows
+    if output == ledger_path:
+        with LedgerLock(ledger_path):
+            rows = _rebuild_view(ledger_path, root, load_manifest(root))
+    else:
+        rows = _write_merged(output, root, load_manifest(root), account, start_month, end_month)
+    print(f"Merged {rows} rows into {output}.")
+    return rows
+
+
+def summarize_manifest(root):
+    manifest = load_manifest(root)
+    partitions = {}
+    for relpath, info in manifest.items():
+        key = partition_dir(parse_partition_dir(relpath))
+        entry = partitions.setdefault(key, {'parts': 0, 'rows': 0, 'bytes': 0})
+        entry['parts'] += 1
+        entry['rows'] += info['rows']
+        entry['bytes'] += info['bytes']
+    return {'partitions': len(partitions), 'parts': len(manifest),
+            'rows': sum(p['rows'] for p in partitions.values()),
+            'writers': sorted({info['writer'] for info in manifest.values()}),
+            'by_partition': dict(sorted(partitions.items()))}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Manage the partitioned ledger layout.")
+    parser.add_argument('command', choices=['split', 'merge', 'manifest'])
+    parser.add_argument('--ledger', default=LEDGER_FILE)
+    parser.add_argument('--output', help="merge: output file, or - for stdout (default: the ledger file).")
+    parser.add_argument('--account', help="merge: only this account.")
+    parser.add_argument('--from', dest='start_month', help="merge: first month, YYYY-MM.")
+    parser.add_argument('--to', dest='end_month', help="merge: last month, YYYY-MM.")
+    args = parser.parse_args()
+
+    if args.command == 'split':
+        split_ledger(args.ledger)
+    elif not is_partitioned(args.ledger):
+        parser.error(f"{partition_root(args.ledger)} is not partitioned; run split first.")
+    elif args.command == 'merge' and args.output is None and (args.account or args.start_month or args.end_month):
+        parser.error("a partial merge needs --output; it would replace the full ledger.")
+    elif args.command == 'merge':
+        merge_ledger(args.ledger, args.output, args.account, args.start_month, args.end_month)
+    else:
+        print(json.dumps(summarize_manifest(partition_root(args.ledger)), indent=2))
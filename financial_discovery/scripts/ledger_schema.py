@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from functools import lru_cache
+
+# --- Configuration ---
+SCHEMA_FILE = 'financial_discovery/schema/unified_ledger_schema.json'
+LEDGER_FILE = 'financial_discovery/ledger/unified_ledger.jsonl'
+
+# JSON Schema types as exact Python types, so the generated checks are one
+# `type(v) is ...` each. bool is deliberately not a number.
+JSON_TYPES = {
+    'string': (str,),
+    'number': (int, float),
+    'integer': (int,),
+    'boolean': (bool,),
+    'object': (dict,),
+    'array': (list,),
+    'null': (type(None),),
+}
+# Keywords that only document the schema.
+ANNOTATIONS = {'$schema', '$id', 'title', 'description', 'default', 'examples'}
+FORMATS = {'date-time'}
+
+
+def statement_source(filename):
+    """The ledger `source` of a raw statement: Comet for cloud exports, else LegalCodex."""
+    return 'Comet' if 'cloud' in os.path.basename(filename).lower() else 'LegalCodex'
+
+
+def _is_date_time(value):
+    """ISO 8601 date and time ('T' separated); the timezone is optional."""
+    if value[10:11] != 'T':
+        return False
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _type_error(name, value, expected):
+    if value is _MISSING:
+        return f"missing '{name}'"
+    return f"'{name}': expected {expected}, got {_json_type(value)}"
+
+
+def _json_type(value):
+    for name, types in JSON_TYPES.items():
+        if type(value) in types:
+            return name
+    return type(value).__name__
+
+
+class _Missing:
+    __slots__ = ()
+
+    def __repr__(self):
+        return '<missing>'
+
+
+_MISSING = _Missing()
+
+
+def _check_keywords(schema, allowed, where):
+    unsupported = set(schema) - allowed - ANNOTATIONS
+    if unsupported:
+        raise ValueError(f"Unsupported schema keywords at {where}: {sorted(unsupported)}")
+
+
+def compile_schema(schema):
+    """Compiles a flat JSON Schema for objects into a batch validator.
+
+    Supports what the ledger schemas use: `type`, `properties`, `required`,
+    `additionalProperties: false`, and per property `type`, scalar `enum`
+    and `format: date-time`. Anything else raises ValueError here rather than
+    going unchecked. The checks are generated as Python source and compiled
+    once, so validating a row runs one inlined test per property.
+
+    The returned function takes a list of rows and returns a list of
+    (index, reasons) for the rows that fail.
+    """
+    _check_keywords(schema, {'type', 'properties', 'required', 'additionalProperties'}, 'top level')
+    if schema.get('type', 'object') != 'object':
+        raise ValueError("Only object schemas are supported.")
+    properties = schema.get('properties', {})
+    required = set(schema.get('required', ()))
+    constants = {'_MISSING': _MISSING, '_type_error': _type_error, '_is_date_time': _is_date_time}
+    lines = [
+        "def validate_batch(rows):",
+        "    rejects = []",
+        "    for index, row in enumerate(rows):",
+        "        if type(row) is not dict:",
+        "            rejects.append((index, ['row: expected object, got ' + type(row).__name__]))",
+        "            continue",
+        "        get = row.get",
+        "        errors = None",
+    ]
+    for i, (name, spec) in enumerate(properties.items()):
+        _check_keywords(spec, {'type', 'enum', 'format'}, f"'{name}'")
+        types = spec.get('type')
+        type_names = [types] if isinstance(types, str) else list(types or ())
+        if any(t not in JSON_TYPES for t in type_names):
+            raise ValueError(f"Unsupported type for '{name}': {types}")
+        python_types = tuple(t for type_name in type_names for t in JSON_TYPES[type_name])
+        expected = ' or '.join(type_names)
+        label = f"'{name}': "
+        lines.append(f"        v = get({name!r}, _MISSING)")
+        # Missing optional properties skip every check.
+        guard = "" if name in required else "v is not _MISSING and "
+        if python_types:
+            if len(python_types) == 1:
+                constants[f'_types_{i}'] = python_types[0]
+                test = f"type(v) is not _types_{i}"
+            else:
+                constants[f'_types_{i}'] = python_types
+                test = f"type(v) not in _types_{i}"
+            lines += [f"        if {guard}{test}:",
+                      f"            errors = (errors or []) + [_type_error({name!r}, v, {expected!r})]"]
+            branch = "elif"
+        elif name in required:
+            lines += ["        if v is _MISSING:",
+                      f"            errors = (errors or []) + [\"missing '{name}'\"]"]
+            branch = "elif"
+        else:
+            branch = "if"
+        if 'enum' in spec:
+            values = spec['enum']
+            if any(isinstance(value, (dict, list)) for value in values):
+                raise ValueError(f"Only scalar enums are supported ('{name}').")
+            constants[f'_enum_{i}'] = frozenset(values)
+            lines += [f"        {branch} {guard}v not in _enum_{i}:",
+                      f"            errors = (errors or []) + [{label!r} + repr(v) + {' not one of ' + repr(values)!r}]"]
+            branch = "elif"
+        if 'format' in spec:
+            if spec['format'] not in FORMATS:
+                raise ValueError(f"Unsupported format for '{name}': {spec['format']}")
+            # Only strings are checked against a format.
+            lines += [f"        {branch} {guard}type(v) is str and not _is_date_time(v):",
+                      f"            errors = (errors or []) + [{label + 'not an ISO 8601 date-time: '!r} + repr(v)]"]
+    for name in sorted(required - set(properties)):
+        lines += [f"        if {name!r} not in row:",
+                  f"            errors = (errors or []) + [\"missing '{name}'\"]"]
+    if schema.get('additionalProperties', True) is False:
+        constants['_allowed'] = frozenset(properties)
+        lines += ["        if not row.keys() <= _allowed:",
+                  "            errors = (errors or []) + ['unexpected properties: ' + ', '.join(sorted(row.keys() - _allowed))]"]
+    elif schema.get('additionalProperties', True) is not True:
+        raise ValueError("additionalProperties must be true or false.")
+    lines += [
+        "        if errors:",
+        "            rejects.append((index, errors))",
+        "    return rejects",
+    ]
+    source = '\n'.join(lines) + '\n'
+    namespace = dict(constants)
+    exec(compile(source, f"<schema {schema.get('title', '')}>", 'exec'), namespace)
+    validate_batch = namespace['validate_batch']
+    validate_batch.source = source
+    return validate_batch
+
+
+@lru_cache(maxsize=None)
+def load_validator(schema_file=SCHEMA_FILE):
+    """The compiled validator for a schema file, compiled once per process."""
+    with open(schema_file, 'r') as f:
+        return compile_schema(json.load(f))
+
+
+def validate_ledger(ledger_path=LEDGER_FILE, schema_file=SCHEMA_FILE, batch_rows=10000):
+    """Checks every row already in the ledger; returns {line number: reasons}."""
+    validate_batch = load_validator(schema_file)
+    failures = {}
+    batch, first_line = [], 1
+    with open(ledger_path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            batch.append(json.loads(line))
+            if len(batch) == batch_rows:
+                failures.update((first_line + i, reasons) for i, reasons in validate_batch(batch))
+                batch, first_line = [], line_number + 1
+    failures.update((first_line + i, reasons) for i, reasons in validate_batch(batch))
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the ledger's rows against the unified ledger schema.")
+    parser.add_argument('--ledger', default=LEDGER_FILE)
+    parser.add_argument('--schema', default=SCHEMA_FILE)
+    parser.add_argument('--show-source', action='store_true', help="Print the generated validator and exit.")
+    args = parser.parse_args()
+
+    if args.show_source:
+        print(load_validator(args.schema).source)
+        sys.exit(0)
+    failures = validate_ledger(args.ledger, args.schema)
+    for line_number, reasons in sorted(failures.items()):
+        print(f"line {line_number}: {'; '.join(reasons)}")
+    print(f"{len(failures)} invalid rows.")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,385 @@
+import fcntl
+import json
+import os
+import shutil
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from ai_bridge import metrics
+from ai_bridge.journal import INTENT, Journal, content_key, crash_point, file_digest
+
+# --- Configuration ---
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds a buffered row may wait before it is written
+# A statement in progress is recorded in `<ledger>.pending` until it commits.
+MARKER_SUFFIX = '.pending'
+# Raw statements being ingested are journaled in `<ledger>.journal` (see ingest()).
+JOURNAL_SUFFIX = '.journal'
+# Rows a validator rejects go to `<ledger>.quarantine.jsonl` (see accept()).
+QUARANTINE_SUFFIX = '.quarantine.jsonl'
+# Writers and tools that rewrite the ledger hold an flock() on `<ledger>.lock`.
+LOCK_SUFFIX = '.lock'
+LOCK_TIMEOUT = 300.0  # seconds to wait for another process to release the ledger
+LOCK_POLL_INTERVAL = 0.1
+
+
+def _fsync_directory(path):
+    try:
+        fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class LedgerLock:
+    """An exclusive flock() on the ledger's lock file, held until close().
+
+    One process at a time may append to or rewrite the single-file ledger.
+    While the lock is held, a `.pending` marker can only have been left by a
+    process that died, so recover_ledger() is only ever run under it. The
+    kernel releases the lock of a process that dies. If another process
+    holds it, this waits up to `timeout` seconds and then raises
+    RuntimeError. Within one process the lock is re-entrant, so an ingester
+    can open the index and then the writer.
+    """
+
+    _held = {}  # lock path -> [lock file, holders] for the locks this process holds
+
+    def __init__(self, ledger_path, timeout=None):
+        self.path = os.path.abspath(ledger_path) + LOCK_SUFFIX
+        self.closed = False
+        held = self._held.get(self.path)
+        if held is not None:
+            held[1] += 1
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        lock_file = open(self.path, 'a')
+        deadline = time.monotonic() + (LOCK_TIMEOUT if timeout is None else timeout)
+        waiting = False
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    lock_file.close()
+                    raise RuntimeError(f"{ledger_path} is locked by another process (see {self.path})")
+                if not waiting:
+                    print(f"Waiting for another process to release {ledger_path}...")
+                    waiting = True
+                time.sleep(LOCK_POLL_INTERVAL)
+        self._held[self.path] = [lock_file, 1]
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        held = self._held[self.path]
+        held[1] -= 1
+        if held[1] == 0:
+            del self._held[self.path]
+            held[0].close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return None
+
+
+def recover_ledger(ledger_path):
+    """Rolls back a statement that was still being written when a run crashed.
+
+    The caller must hold the LedgerLock. Returns the name of the statement that was rolled back, or None.
+    """
+    marker_path = ledger_path + MARKER_SUFFIX
+    if not os.path.exists(marker_path):
+        return None
+    try:
+        with open(marker_path, 'r') as f:
+            marker = json.load(f)
+    except (IOError, json.JSONDecodeError):
+        # The marker itself was never completely written, so the ledger was
+        # not touched yet.
+        os.remove(marker_path)
+        return None
+    start = marker['start_offset']
+    if os.path.exists(ledger_path) and os.path.getsize(ledger_path) > start:
+        with open(ledger_path, 'r+b') as f:
+            f.truncate(start)
+            os.fsync(f.fileno())
+    os.remove(marker_path)
+    _fsync_directory(marker_path)
+    print(f"Rolled back incomplete statement {marker.get('statement')} in {ledger_path}.")
+    return marker.get('statement')
+
+
+def open_journal(ledger_path):
+    return Journal(ledger_path + JOURNAL_SUFFIX)
+
+
+def _move(source, destination):
+    os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+    shutil.move(source, destination)
+
+
+def recover_statements(ledger_path, journal):
+    """Finishes raw statements whose ingestion a crashed run left in flight.
+
+    Must run after recover_ledger(), so uncommitted rows are already gone.
+    A statement whose rows are in the ledger is moved to its processed
+    location; one whose rows never committed is dropped from the journal and
+    its raw file, still in place, is simply ingested again.
+    """
+    ledger_size = os.path.getsize(ledger_path) if os.path.exists(ledger_path) else 0
+    for key, state, data in journal.in_flight():
+        if state == INTENT and ledger_size <= data['start_offset']:
+            journal.abort(key)
+            continue
+        if os.path.exists(data['source']):
+            _move(data['source'], data['destination'])
+        journal.commit(key)
+        print(f"Finished interrupted ingestion of {data['source']}.")
+
+
+class LedgerWriter:
+    """Appends rows to the ledger in buffered, fsync'd batches.
+
+    Rows are written in batches of `batch_size` (or sooner once
+    `flush_interval` has passed), with one fsync per batch. Rows written
+    inside `statement()` are all-or-nothing: the starting ledger offset is
+    recorded in a marker file, and a rollback or a crash before commit
+    truncates the ledger back to it.
+
+    With a `validator` (see ledger_schema.compile_schema), accept() and
+    write_all() check rows a batch at a time and divert rejects to the
+    quarantine file instead of the ledger.
+
+    The writer holds the LedgerLock until close(), so a second writer waits
+    for it instead of rolling back the statement it is in the middle of.
+    """
+
+    def __init__(self, ledger_path, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, index=None, journal=None, validator=None):
+        self.ledger_path = ledger_path
+        self.marker_path = ledger_path + MARKER_SUFFIX
+        self.quarantine_path = ledger_path + QUARANTINE_SUFFIX
+        self.validator = validator
+        self.quarantined = []
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.index = index
+        self.journal = journal
+        os.makedirs(os.path.dirname(ledger_path) or '.', exist_ok=True)
+        self.lock = LedgerLock(ledger_path)
+        recover_ledger(ledger_path)
+        if journal is not None:
+            recover_statements(ledger_path, journal)
+        if index is not None:
+            # Rows other processes committed since the index was opened.
+            index.sync()
+        self.file = open(ledger_path, 'ab')
+        self.position = self.file.tell()
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self.statement_start = None
+        self.statement_name = None
+
+    def write(self, transaction):
+        """Buffers one transaction and returns its (offset, length) in the ledger."""
+        line = (json.dumps(transaction) + '\n').encode()
+        offset = self.position
+        self.buffer.append(line)
+        self.position += len(line)
+        if len(self.buffer) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+        return offset, len(line)
+
+    def accept(self, transactions):
+        """Validates a batch of transactions and returns the valid ones.
+
+        Rejects are held with their reasons and appended to the quarantine
+        file when the statement commits, so a rolled-back statement leaves
+        no quarantine entries behind either.
+        """
+        if self.validator is None:
+            return transactions
+        if not isinstance(transactions, list):
+            transactions = list(transactions)
+        with metrics.stage('validate'):
+            rejects = self.validator(transactions)
+        if not rejects:
+            return transactions
+        metrics.count('rows_quarantined', len(rejects))
+        quarantined_at = datetime.now(timezone.utc).isoformat()
+        for index, reasons in rejects:
+            self.quarantined.append({'quarantined_at': quarantined_at, 'statement': self.statement_name,
+                                     'reasons': reasons, 'row': transactions[index]})
+        rejected = {index for index, _ in rejects}
+        return [transaction for i, transaction in enumerate(transactions) if i not in rejected]
+
+    def accepted(self, transactions):
+        """Yields the valid transactions of an iterable, validating them
+        `batch_size` at a time, so a TransactionBatch is only ever turned
+        into that many dicts at once."""
+        transactions = iter(transactions)
+        while True:
+            batch = list(islice(transactions, self.batch_size))
+            if not batch:
+                return
+            yield from self.accept(batch)
+
+    def append(self, transaction):
+        """Writes a transaction after checking the index for its ID.
+
+        A transaction the ledger (or this run) already holds is still written,
+        marked `overlapping`, so reconciliation can review it.
+        """
+        transaction_id = transaction['transaction_id']
+        # The IDs that can hold a duplicate: the whole ledger, or one partition.
+        ids = self.index.scope(transaction)
+        if transaction_id in ids:
+            transaction['reconciliation_status'] = 'overlapping'
+            metrics.count('dedup_hits')
+
+        offset, length = self.write(transaction)
+        ids.record(transaction_id, offset, length)
+
+    def write_all(self, transactions):
+        """Validates and writes an iterable of transactions in batches of
+        `batch_size`; returns the number written to the ledger. With an
+        index, each is checked for duplicates as by append()."""
+        write = self.write if self.index is None else self.append
+        written = 0
+        for transaction in self.accepted(transactions):
+            write(transaction)
+            written += 1
+        return written
+
+    def _write_quarantine(self):
+        if not self.quarantined:
+            return
+        with open(self.quarantine_path, 'a') as f:
+            f.writelines(json.dumps(record) + '\n' for record in self.quarantined)
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"Quarantined {len(self.quarantined)} invalid rows in {self.quarantine_path}.")
+        self.quarantined.clear()
+
+    def flush(self):
+        """Writes buffered rows and fsyncs them as one batch."""
+        if self.buffer:
+            data = b''.join(self.buffer)
+            with metrics.stage('ledger_flush'):
+                self.file.write(data)
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            metrics.count('rows_written', len(self.buffer))
+            metrics.count('bytes_written', len(data))
+            self.buffer.clear()
+        self.last_flush = time.monotonic()
+
+    # --- Statement transactions ---
+
+    def begin(self, statement):
+        self.flush()
+        self._write_quarantine()
+        self.statement_start = self.position
+        self.statement_name = statement
+        tmp_path = self.marker_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'statement': statement, 'start_offset': self.statement_start}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.marker_path)
+        _fsync_directory(self.marker_path)
+
+    def commit(self):
+        self.flush()
+        # Before the marker goes, so a crash can repeat quarantine entries
+        # when the statement is ingested again but never lose them.
+        self._write_quarantine()
+        if self.index is not None:
+            self.index.commit()
+        if os.path.exists(self.marker_path):
+            os.remove(self.marker_path)
+            _fsync_directory(self.marker_path)
+        self.statement_start = None
+        self.statement_name = None
+
+    def rollback(self):
+        self.buffer.clear()
+        self.quarantined.clear()
+        if self.statement_start is not None:
+            self.file.truncate(self.statement_start)
+            os.fsync(self.file.fileno())
+            self.position = self.statement_start
+        if self.index is not None:
+            self.index.rollback()
+        if os.path.exists(self.marker_path):
+            os.remove(self.marker_path)
+        self.statement_start = None
+        self.statement_name = None
+
+    @contextmanager
+    def statement(self, name):
+        """Groups the rows of one statement so they land in the ledger atomically."""
+        self.begin(name)
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    @contextmanager
+    def ingest(self, source, destination):
+        """A statement() for the rows of raw file `source`, which is moved to
+        `destination` once they are committed.
+
+        With a journal, the statement is logged as intent (with the ledger
+        offset it starts at), done once its rows commit, and committed once
+        the file has moved, so a crash at any point neither loses the
+        statement nor ingests it twice.
+        """
+        key = None
+        if self.journal is not None:
+            # Hashed in chunks: a raw statement can be far larger than memory.
+            key = content_key('statement', os.path.basename(source), digest=file_digest(source))
+            self.flush()
+            self.journal.intent(key, source=source, destination=destination, start_offset=self.position)
+            crash_point('statement.intent')
+        with self.statement(source):
+            yield self
+            crash_point('statement.rows')
+        crash_point('statement.committed')
+        if key is not None:
+            self.journal.done(key)
+            crash_point('statement.done')
+        _move(source, destination)
+        crash_point('statement.moved')
+        if key is not None:
+            self.journal.commit(key)
+        metrics.count('statements_ingested')
+
+    def close(self):
+        self.flush()
+        self._write_quarantine()
+        self.file.close()
+        self.lock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
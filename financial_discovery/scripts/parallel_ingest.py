@@ -0,0 +1,66 @@
+import os
+import sys
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from ai_bridge import metrics
+
+# How many statements each worker may have parsed ahead of the ledger writer.
+PREFETCH_PER_WORKER = 2
+
+
+def list_statements(directory, extensions):
+    """Returns the statement files in `directory` in a stable (sorted) order."""
+    if not os.path.exists(directory):
+        return []
+    return [
+        os.path.join(directory, filename)
+        for filename in sorted(os.listdir(directory))
+        if filename.lower().endswith(extensions)
+    ]
+
+
+def _timed(stage, fn, args):
+    with metrics.stage(stage):
+        return fn(*args)
+
+
+def map_statements(jobs, workers=1, stage='parse_statement'):
+    """Runs `fn(*args)` for each (key, fn, args) job and yields (key, result, error).
+
+    With `workers` > 1 the jobs run in a process pool, but results are still
+    yielded in job order so whoever consumes them (the single ledger writer)
+    produces the same ledger whatever the worker count. At most
+    PREFETCH_PER_WORKER parsed statements per worker wait in memory. Each
+    job is timed as `stage`; metrics recorded in the workers are merged
+    into this process's.
+    """
+    if workers <= 1:
+        for key, fn, args in jobs:
+            try:
+                yield key, _timed(stage, fn, args), None
+            except Exception as e:
+                yield key, None, e
+        return
+
+    # Imported only here: it pulls in multiprocessing, which single-process
+    # and no-op runs would otherwise pay for at startup.
+    from concurrent.futures import ProcessPoolExecutor
+    jobs = iter(jobs)
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for key, fn, args in jobs:
+            in_flight.append((key, executor.submit(metrics.call_collecting, _timed, stage, fn, args)))
+            if len(in_flight) >= workers * PREFETCH_PER_WORKER:
+                yield _result(*in_flight.popleft())
+        while in_flight:
+            yield _result(*in_flight.popleft())
+
+
+def _result(key, future):
+    try:
+        result, recorded = future.result()
+    except Exception as e:
+        return key, None, e
+    metrics.merge(recorded)
+    return key, result, None
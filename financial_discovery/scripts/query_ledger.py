@@ -0,0 +1,298 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from financial_discovery.scripts.ledger_columns import (
+    COLUMNS_DIR, LEDGER_FILE, MISSING_TIMESTAMP, LedgerColumns, refresh_columns, to_cents)
+
+# --- Configuration ---
+# Secondary indexes over the column store live in this subdirectory of it
+# and can be rebuilt from it at any time.
+INDEX_SUBDIR = 'query_index'
+META_FILE = 'meta.json'
+# Rows added since the last build are scanned instead of looked up; once
+# there are more than this many, the indexes are rebuilt.
+MAX_UNINDEXED_ROWS = 200000
+TOKEN_PATTERN = re.compile(r'[A-Z0-9]+')
+ROW_DTYPE = np.int32  # row numbers; fine up to 2**31 ledger rows
+
+
+def tokenize(text):
+    return set(TOKEN_PATTERN.findall(text.upper())) if text else set()
+
+
+def token_hash(token):
+    """Stable 64-bit hash of a description token, as a signed int."""
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'little', signed=True)
+
+
+def parse_date(value):
+    """Parses a CLI/API date (ISO 8601) into epoch seconds, naive as UTC."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+# --- Building ---
+
+def _sorted_index(values, index_dir, name):
+    order = np.argsort(values, kind='stable').astype(ROW_DTYPE)
+    np.save(os.path.join(index_dir, f"{name}.order.npy"), order)
+    np.save(os.path.join(index_dir, f"{name}.sorted.npy"), np.asarray(values)[order])
+
+
+def default_index_dir(columns_dir):
+    return os.path.join(columns_dir, INDEX_SUBDIR)
+
+
+def build_indexes(columns, index_dir):
+    """Builds all secondary indexes for the rows currently in the column store.
+
+    - account, description code: rows sorted by code (`order`) and each
+      code's start in that order (`starts`), so one code's rows are a slice.
+    - timestamp, amount_cents: rows sorted by value plus the sorted values,
+      so a range is two binary searches.
+    - description tokens: sorted token hashes, each with a slice of the
+      description codes containing the token.
+    """
+    tmp_dir = index_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name in ('account', 'description'):
+        codes = np.asarray(columns.column(name)).astype(np.int64)
+        order = np.argsort(codes, kind='stable').astype(ROW_DTYPE)
+        # Shift by one so NULL_CODE (-1) gets slot 0.
+        starts = np.searchsorted(codes[order] + 1, np.arange(len(columns.dictionary(name)) + 2))
+        np.save(os.path.join(tmp_dir, f"{name}.order.npy"), order)
+        np.save(os.path.join(tmp_dir, f"{name}.starts.npy"), starts)
+    _sorted_index(np.asarray(columns.column('timestamp')), tmp_dir, 'timestamp')
+    _sorted_index(np.asarray(columns.column('amount_cents')), tmp_dir, 'amount_cents')
+
+    hashes, codes = [], []
+    for code, description in enumerate(columns.dictionary('description')):
+        for token in tokenize(description):
+            hashes.append(token_hash(token))
+            codes.append(code)
+    hashes = np.asarray(hashes, dtype=np.int64)
+    codes = np.asarray(codes, dtype=ROW_DTYPE)
+    order = np.argsort(hashes, kind='stable')
+    token_hashes, token_starts = np.unique(hashes[order], return_index=True)
+    np.save(os.path.join(tmp_dir, 'token.hashes.npy'), token_hashes)
+    np.save(os.path.join(tmp_dir, 'token.starts.npy'), np.append(token_starts, len(hashes)))
+    np.save(os.path.join(tmp_dir, 'token.codes.npy'), codes[order])
+
+    with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+        json.dump({
+            'generation': columns.manifest.get('generation'),
+            'rows': columns.rows,
+            'accounts': len(columns.dictionary('account')),
+            'descriptions': len(columns.dictionary('description')),
+        }, f)
+    shutil.rmtree(index_dir, ignore_errors=True)
+    os.replace(tmp_dir, index_dir)
+
+
+def _load_meta(index_dir):
+    try:
+        with open(os.path.join(index_dir, META_FILE), 'r') as f:
+            return json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return None
+
+
+def refresh_indexes(ledger_path=LEDGER_FILE, columns_dir=COLUMNS_DIR, index_dir=None):
+    """Brings the column store and the indexes up to date with the ledger.
+
+    Returns True if the indexes were rebuilt.
+    """
+    index_dir = index_dir or default_index_dir(columns_dir)
+    refresh_columns(ledger_path, columns_dir)
+    columns = LedgerColumns(columns_dir)
+    meta = _load_meta(index_dir)
+    if (meta is None or meta['generation'] != columns.manifest.get('generation')
+            or columns.rows - meta['rows'] > MAX_UNINDEXED_ROWS or columns.rows < meta['rows']):
+        build_indexes(columns, index_dir)
+        return True
+    return False
+
+
+# --- Querying ---
+
+class LedgerQuery:
+    """Filter queries over the ledger through the secondary indexes.
+
+    The most selective indexed filter picks the candidate rows; the other
+    filters are checked against the column store for just those rows. Rows
+    appended since the last index build are scanned directly. Matching rows
+    are read from the ledger by byte offset, in ledger order.
+    """
+
+    def __init__(self, ledger_path=LEDGER_FILE, columns_dir=COLUMNS_DIR, index_dir=None, refresh=True):
+        index_dir = index_dir or default_index_dir(columns_dir)
+        if refresh:
+            refresh_indexes(ledger_path, columns_dir, index_dir)
+        self.ledger_path = ledger_path
+        self.index_dir = index_dir
+        self.columns = LedgerColumns(columns_dir)
+        self.meta = _load_meta(index_dir)
+        self._arrays = {}
+        self._account_codes = None
+
+    def _array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.index_dir, f"{name}.npy"), mmap_mode='r')
+        return self._arrays[name]
+
+    def _column(self, name):
+        return np.asarray(self.columns.column(name))
+
+    def _account_code(self, account):
+        if self._account_codes is None:
+            self._account_codes = {value: code for code, value in enumerate(self.columns.dictionary('account'))}
+        return self._account_codes.get(account)
+
+    def _token_codes(self, tokens):
+        """Description codes containing every token; None if no token filter."""
+        if not tokens:
+            return None
+        hashes, starts, codes = self._array('token.hashes'), self._array('token.starts'), self._array('token.codes')
+        matching = None
+        for token in tokens:
+            h = token_hash(token)
+            i = int(np.searchsorted(hashes, h))
+            found = codes[starts[i]:starts[i + 1]] if i < len(hashes) and hashes[i] == h else codes[:0]
+            matching = np.asarray(found) if matching is None else np.intersect1d(matching, found)
+        # Descriptions first seen after the last build are not in the inverted index.
+        described = self.columns.manifest['dictionaries']['description']
+        extra = [code for code in range(self.meta['descriptions'], described)
+                 if tokens <= tokenize(self.columns.dictionary('description')[code])]
+        return np.union1d(matching, np.asarray(extra, dtype=matching.dtype)) if extra else matching
+
+    def _range(self, name, low, high):
+        """Row numbers with low <= value <= high (either bound may be None)."""
+        values = self._array(f"{name}.sorted")
+        lo = 0 if low is None else int(np.searchsorted(values, low, side='left'))
+        hi = len(values) if high is None else int(np.searchsorted(values, high, side='right'))
+        return self._array(f"{name}.order")[lo:hi]
+
+    def _slices(self, name, codes):
+        order, starts = self._array(f"{name}.order"), self._array(f"{name}.starts")
+        parts = [order[starts[code + 1]:starts[code + 2]] for code in np.asarray(codes).tolist()]
+        return np.concatenate(parts) if parts else order[:0]
+
+    def rows(self, account=None, start=None, end=None, min_amount=None, max_amount=None, text=None):
+        """Returns the ledger row numbers matching every given filter, in ledger order.
+
+        `start`/`end` are ISO 8601 dates or datetimes (inclusive), amounts are
+        in currency units and `text` must match whole description tokens.
+        """
+        account_code = None
+        if account is not None:
+            account_code = self._account_code(account)
+            if account_code is None:
+                return np.empty(0, dtype=np.int64)
+        low_time = parse_date(start) if start else None
+        high_time = parse_date(end) if end else None
+        if high_time is not None and end and len(end) == 10:
+            high_time += 86399  # A bare end date includes that whole day.
+        low_cents = to_cents(min_amount) if min_amount is not None else None
+        high_cents = to_cents(max_amount) if max_amount is not None else None
+        description_codes = self._token_codes(tokenize(text))
+
+        # Candidate rows from whichever indexed filter selects the fewest.
+        indexed = self.meta['rows']
+        candidates = []
+        if account_code is not None:
+            # Accounts first seen after the last build only have unindexed rows.
+            indexed_account = [account_code] if account_code < self.meta['accounts'] else []
+            starts = self._array('account.starts')
+            size = sum(int(starts[code + 2] - starts[code + 1]) for code in indexed_account)
+            candidates.append((size, lambda: self._slices('account', indexed_account)))
+        if low_time is not None or high_time is not None:
+            time_rows = self._range('timestamp', low_time, high_time)
+            candidates.append((len(time_rows), lambda: time_rows))
+        if low_cents is not None or high_cents is not None:
+            amount_rows = self._range('amount_cents', low_cents, high_cents)
+            candidates.append((len(amount_rows), lambda: amount_rows))
+        if description_codes is not None:
+            starts = self._array('description.starts')
+            indexed_codes = description_codes[description_codes < self.meta['descriptions']]
+            size = int((starts[indexed_codes + 2] - starts[indexed_codes + 1]).sum())
+            candidates.append((size, lambda: self._slices('description', indexed_codes)))
+        if candidates:
+            rows = np.asarray(min(candidates, key=lambda candidate: candidate[0])[1](), dtype=np.int64)
+        else:
+            rows = np.arange(indexed, dtype=np.int64)
+        rows = np.concatenate([rows, np.arange(indexed, self.columns.rows, dtype=np.int64)])
+
+        mask = np.ones(len(rows), dtype=bool)
+        if account_code is not None:
+            mask &= self._column('account')[rows] == account_code
+        if low_time is not None or high_time is not None:
+            timestamps = self._column('timestamp')[rows]
+            mask &= timestamps != MISSING_TIMESTAMP
+            if low_time is not None:
+                mask &= timestamps >= low_time
+            if high_time is not None:
+                mask &= timestamps <= high_time
+        if low_cents is not None:
+            mask &= self._column('amount_cents')[rows] >= low_cents
+        if high_cents is not None:
+            mask &= self._column('amount_cents')[rows] <= high_cents
+        if description_codes is not None:
+            mask &= np.isin(self._column('description')[rows], description_codes)
+        return np.sort(rows[mask])
+
+    def iter_lines(self, rows):
+        """Yields the raw JSONL line (bytes) of each row, seeking straight to it."""
+        offsets = self._column('offset')
+        with open(self.ledger_path, 'rb') as f:
+            for offset in offsets[rows].tolist():
+                f.seek(offset)
+                yield f.readline()
+
+
+def add_query_arguments(parser):
+    """Adds the query filters and paths run_query() expects; shared with
+    `python -m bridge query`."""
+    parser.add_argument('--account', help="Account number.")
+    parser.add_argument('--from', dest='start', help="Earliest date or datetime (ISO 8601, inclusive).")
+    parser.add_argument('--to', dest='end', help="Latest date or datetime (ISO 8601, inclusive).")
+    parser.add_argument('--min-amount', type=float)
+    parser.add_argument('--max-amount', type=float)
+    parser.add_argument('--text', help="Words that must all appear in the description.")
+    parser.add_argument('--limit', type=int, help="Print at most N rows.")
+    parser.add_argument('--count', action='store_true', help="Print only the number of matching rows.")
+    parser.add_argument('--ledger', default=LEDGER_FILE)
+    parser.add_argument('--columns-dir', default=COLUMNS_DIR)
+    parser.add_argument('--index-dir', help="Defaults to query_index/ inside the column store.")
+
+
+def run_query(args):
+    """Prints the rows matching command-line `args` parsed with add_query_arguments()."""
+    query = LedgerQuery(args.ledger, args.columns_dir, args.index_dir)
+    matches = query.rows(args.account, args.start, args.end, args.min_amount, args.max_amount, args.text)
+    if args.count:
+        print(len(matches))
+    else:
+        out = sys.stdout.buffer
+        for line in query.iter_lines(matches[:args.limit]):
+            out.write(line)
+        out.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Query the unified ledger through its indexes; prints JSONL.")
+    add_query_arguments(parser)
+    args = parser.parse_args()
+
+    run_query(args)
@@ -0,0 +1,331 @@
+import argparse
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from financial_discovery.scripts.ledger_columns import (
+    COLUMNS_DIR, LEDGER_FILE, MISSING_TIMESTAMP,
+    LedgerColumns, discard_columns, distinct_rows, refresh_columns)
+from financial_discovery.scripts.ledger_index import discard_index
+from financial_discovery.scripts.ledger_partitions import (
+    is_partitioned, load_manifest, partition_dir, partition_of, partition_root, rewrite_parts, sync_view)
+from financial_discovery.scripts.ledger_writer import LedgerLock, _fsync_directory, recover_ledger
+
+# --- Configuration ---
+# Rows from different sources match if they share account and amount and
+# their dates are at most this many days apart.
+DATE_WINDOW_DAYS = 2
+# Only this many neighbours (in account, amount, date order) are compared per
+# row; blocks bigger than that, e.g. a fee charged every day, are cut off.
+MAX_BLOCK_CANDIDATES = 20
+# Score = DESCRIPTION_WEIGHT * description similarity
+#         + (1 - DESCRIPTION_WEIGHT) * date closeness.
+DESCRIPTION_WEIGHT = 0.6
+MIN_SCORE = 0.5
+RECONCILED = 'reconciled'
+TOKEN_PATTERN = re.compile(r'[A-Z0-9]+')
+ID_PATTERN = re.compile(rb'"transaction_id": "([^"]*)"')
+
+SECONDS_PER_DAY = 86400
+
+
+def source_kind(source, source_file):
+    """Names the kind of source a row came from: comet, csv, pdf, or its `source`."""
+    if source == 'Comet':
+        return 'comet'
+    if source_file:
+        extension = os.path.splitext(source_file)[1].lower().lstrip('.')
+        if extension:
+            return extension
+    return source.lower() if source else None
+
+
+def _row_kinds(columns):
+    """Returns an int array of source kinds per row (-1 if unknown) and the kind names."""
+    sources = np.asarray(columns.column('source')).astype(np.int64) + 1
+    files = np.asarray(columns.column('source_file')).astype(np.int64) + 1
+    pairs, inverse = np.unique(sources * (len(columns.dictionary('source_file')) + 1) + files,
+                               return_inverse=True)
+    names = []
+    pair_kinds = np.empty(len(pairs), dtype=np.int64)
+    for i, pair in enumerate(pairs.tolist()):
+        source_code, file_code = divmod(pair, len(columns.dictionary('source_file')) + 1)
+        kind = source_kind(columns.decode('source', source_code - 1), columns.decode('source_file', file_code - 1))
+        if kind is None:
+            pair_kinds[i] = -1
+            continue
+        if kind not in names:
+            names.append(kind)
+        pair_kinds[i] = names.index(kind)
+    return pair_kinds[inverse], names
+
+
+def candidate_pairs(columns, kinds):
+    """Finds pairs of rows from different source `kinds` in the same block.
+
+    Rows are sorted by (account, amount, day), so every row's candidates are
+    its next few neighbours; each step compares all rows with the row `step`
+    places later in one vectorized pass. Returns (left, right, day_gap) arrays.
+    """
+    amounts = np.asarray(columns.column('amount_cents'))
+    timestamps = np.asarray(columns.column('timestamp'))
+    accounts = np.asarray(columns.column('account'))
+    # Exact duplicates are already accounted for by the row they duplicate.
+    eligible = (timestamps != MISSING_TIMESTAMP) & (kinds >= 0) & distinct_rows(columns)
+    rows = np.flatnonzero(eligible)
+    days = timestamps[rows] // SECONDS_PER_DAY
+    order = np.lexsort((days, amounts[rows], accounts[rows]))
+    rows, days = rows[order], days[order]
+    block_accounts, block_amounts, row_kinds = accounts[rows], amounts[rows], kinds[rows]
+
+    lefts, rights, gaps = [], [], []
+    for step in range(1, MAX_BLOCK_CANDIDATES + 1):
+        gap = days[step:] - days[:-step]
+        same_block = ((block_accounts[step:] == block_accounts[:-step])
+                      & (block_amounts[step:] == block_amounts[:-step]) & (gap <= DATE_WINDOW_DAYS))
+        if not same_block.any():
+            break  # Rows further apart are further apart in date, too.
+        match = same_block & (row_kinds[step:] != row_kinds[:-step])
+        lefts.append(rows[:-step][match])
+        rights.append(rows[step:][match])
+        gaps.append(gap[match])
+    if not lefts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    return np.concatenate(lefts), np.concatenate(rights), np.concatenate(gaps)
+
+
+def _tokens(description):
+    return frozenset(TOKEN_PATTERN.findall(description.upper())) if description else frozenset()
+
+
+def description_similarity(columns, left_codes, right_codes):
+    """Token overlap of pairs of description codes: shared tokens / tokens of the shorter.
+
+    Overlap rather than Jaccard, since one source often truncates or
+    abbreviates what another spells out. Each distinct pair of descriptions
+    is scored once, however many rows share it.
+    """
+    size = len(columns.dictionary('description')) + 1
+    low = np.minimum(left_codes, right_codes).astype(np.int64) + 1
+    high = np.maximum(left_codes, right_codes).astype(np.int64) + 1
+    pairs, inverse = np.unique(low * size + high, return_inverse=True)
+    tokens = {}
+    scores = np.empty(len(pairs))
+    for i, pair in enumerate(pairs.tolist()):
+        codes = divmod(pair, size)
+        for code in codes:
+            if code not in tokens:
+                tokens[code] = _tokens(columns.decode('description', code - 1))
+        a, b = tokens[codes[0]], tokens[codes[1]]
+        scores[i] = len(a & b) / min(len(a), len(b)) if a and b else 0.0
+    return scores[inverse]
+
+
+def match_rows(columns):
+    """Scores candidate pairs and groups the rows that record the same transaction.
+
+    Pairs are accepted greedily, best score first, as long as the merged
+    group still holds at most one row per source. Returns a list of groups,
+    each a sorted list of row numbers.
+    """
+    kinds, _ = _row_kinds(columns)
+    left, right, gaps = candidate_pairs(columns, kinds)
+    if not len(left):
+        return []
+    descriptions = np.asarray(columns.column('description'))
+    scores = (DESCRIPTION_WEIGHT * description_similarity(columns, descriptions[left], descriptions[right])
+              + (1 - DESCRIPTION_WEIGHT) * (1 - gaps / (DATE_WINDOW_DAYS + 1)))
+    keep = scores >= MIN_SCORE
+    order = np.argsort(-scores[keep], kind='stable')
+    left, right = left[keep][order].tolist(), right[keep][order].tolist()
+
+    parent = {}
+    group_kinds = {}  # root row -> kinds in its group
+
+    def find(row):
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    for a, b in zip(left, right):
+        for row in (a, b):
+            if row not in parent:
+                parent[row] = row
+                group_kinds[row] = {int(kinds[row])}
+        root_a, root_b = find(a), find(b)
+        if root_a == root_b or group_kinds[root_a] & group_kinds[root_b]:
+            continue
+        parent[root_b] = root_a
+        group_kinds[root_a] |= group_kinds.pop(root_b)
+
+    groups = {}
+    for row in parent:
+        groups.setdefault(find(row), []).append(row)
+    return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+
+# --- Writing ---
+
+def _read_ids(ledger_path, offsets):
+    """Returns the transaction IDs of the rows at `offsets` (sorted ascending)."""
+    ids = {}
+    with open(ledger_path, 'rb') as f:
+        for offset in offsets:
+            f.seek(offset)
+            line = f.readline()
+            match = ID_PATTERN.search(line)
+            ids[offset] = match.group(1).decode() if match else json.loads(line).get('transaction_id')
+    return ids
+
+
+def _group_links(ledger_path, offsets, groups):
+    """Returns {ledger offset: IDs of the other rows in its group}."""
+    row_offsets = {row: int(offsets[row]) for group in groups for row in group}
+    ids = _read_ids(ledger_path, sorted(row_offsets.values()))
+    links = {}
+    for group in groups:
+        group_ids = [ids[row_offsets[row]] for row in group]
+        for i, row in enumerate(group):
+            links[row_offsets[row]] = group_ids[:i] + group_ids[i + 1:]
+    return links
+
+
+def _reconciled_line(line, linked):
+    """Returns `line` re-encoded as reconciled with `linked`, or None if it already is."""
+    row = json.loads(line)
+    metadata = row.setdefault('metadata', {})
+    if row.get('reconciliation_status') == RECONCILED and metadata.get('reconciled_with') == linked:
+        return None
+    row['reconciliation_status'] = RECONCILED
+    metadata['reconciled_with'] = linked
+    return (json.dumps(row) + '\n').encode()
+
+
+def write_reconciliation(ledger_path, offsets, groups):
+    """Marks each grouped row `reconciled` and links the IDs of its group.
+
+    Only the changed rows are re-encoded; the rest of the ledger is copied
+    byte for byte. Returns the number of rows changed.
+    """
+    links = _group_links(ledger_path, offsets, groups)
+    tmp_path = ledger_path + '.reconcile.tmp'
+    changed = 0
+    with open(ledger_path, 'rb') as source, open(tmp_path, 'wb') as target:
+        position = 0
+        for offset in sorted(links):
+            if offset > position:
+                _copy(source, target, position, offset - position)
+            source.seek(offset)
+            line = source.readline()
+            position = offset + len(line)
+            reconciled = _reconciled_line(line, links[offset])
+            if reconciled is not None:
+                line = reconciled
+                changed += 1
+            target.write(line)
+        _copy(source, target, position, None)
+        target.flush()
+        os.fsync(target.fileno())
+    if not changed:
+        os.remove(tmp_path)
+        return 0
+    os.replace(tmp_path, ledger_path)
+    _fsync_directory(ledger_path)
+    return changed
+
+
+def write_partition_reconciliation(ledger_path, offsets, groups):
+    """write_reconciliation() for a partitioned ledger: the rows are rewritten
+    in the part files they came from, which the single-file view only copies.
+
+    The grouped rows are read from the view and found again, by content, in
+    the parts of their partition; each writer's parts are rewritten under
+    its lease (see ledger_partitions.rewrite_parts). Returns the number of
+    rows changed.
+    """
+    links = _group_links(ledger_path, offsets, groups)
+    # {partition directory: {line: [links of each copy, in view order]}}
+    wanted = {}
+    with open(ledger_path, 'rb') as f:
+        for offset in sorted(links):
+            f.seek(offset)
+            line = f.readline()
+            directory = partition_dir(partition_of(json.loads(line))) + '/'
+            wanted.setdefault(directory, {}).setdefault(line, []).append(links[offset])
+
+    root = partition_root(ledger_path)
+    by_writer = {}
+    for relpath, info in load_manifest(root).items():
+        if relpath[:relpath.rindex('/') + 1] in wanted:
+            by_writer.setdefault(info['writer'], []).append(relpath)
+
+    def rewrite(relpath, line):
+        copies = wanted[relpath[:relpath.rindex('/') + 1]].get(line)
+        if not copies:
+            return None
+        return _reconciled_line(line, copies.pop(0))
+
+    return sum(rewrite_parts(root, writer_id, relpaths, rewrite)
+               for writer_id, relpaths in sorted(by_writer.items()))
+
+
+def _copy(source, target, start, length, chunk_bytes=1024 * 1024):
+    source.seek(start)
+    while length is None or length > 0:
+        data = source.read(chunk_bytes if length is None else min(chunk_bytes, length))
+        if not data:
+            break
+        target.write(data)
+        if length is not None:
+            length -= len(data)
+
+
+def reconcile_ledger(ledger_path=LEDGER_FILE, columns_dir=COLUMNS_DIR):
+    """Matches rows of the same transaction across sources and marks them reconciled.
+
+    Holds the LedgerLock throughout, so it waits for a running ingester and
+    ingesters wait for it; rows can neither be rolled back under it nor
+    appended between its read and its rewrite. On a partitioned ledger,
+    writers append to their parts without the LedgerLock; each one's parts are
+    rewritten under its lease instead. Returns a report of the
+    groups found and rows changed.
+    """
+    with LedgerLock(ledger_path):
+        recover_ledger(ledger_path)
+        refresh_columns(ledger_path, columns_dir)
+        columns = LedgerColumns(columns_dir)
+        groups = match_rows(columns)
+        partitioned = is_partitioned(ledger_path)
+        write = write_partition_reconciliation if partitioned else write_reconciliation
+        changed = write(ledger_path, np.asarray(columns.column('offset')), groups) if groups else 0
+        if changed and partitioned:
+            # The rewritten parts make the view rebuild itself.
+            sync_view(ledger_path)
+        elif changed:
+            # Row offsets moved, which the watermark checks cannot see.
+            discard_index(ledger_path)
+            discard_columns(columns_dir)
+    sizes = {}
+    for group in groups:
+        sizes[len(group)] = sizes.get(len(group), 0) + 1
+    return {
+        'groups': len(groups),
+        'rows_reconciled': sum(len(group) for group in groups),
+        'group_sizes': {str(size): count for size, count in sorted(sizes.items())},
+        'rows_changed': changed,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Reconcile the same transactions across statement sources.")
+    parser.add_argument('--ledger', default=LEDGER_FILE)
+    parser.add_argument('--columns-dir', default=COLUMNS_DIR)
+    args = parser.parse_args()
+
+    print(json.dumps(reconcile_ledger(args.ledger, args.columns_dir), indent=2))
@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from financial_discovery.scripts.ledger_index import tail_hash
+from financial_discovery.scripts.ledger_columns import (
+    COLUMNS_DIR, LEDGER_FILE, MISSING_TIMESTAMP, NULL_CODE,
+    LedgerColumns, account_totals, distinct_rows, refresh_columns, select_rows)
+
+# --- Configuration ---
+OUTPUT_DIR = 'cloud_discovery/financial'
+STATE_FILE = 'financial_discovery/ledger/summarize_ledger.state.json'
+
+# Cash deposits at or above the currency transaction report threshold.
+LARGE_CASH_DEPOSIT_CENTS = 1000000
+CASH_PATTERN = re.compile(r'\bCASH\b', re.IGNORECASE)
+# An outflow from one account and an equal inflow to another within this many
+# days is flagged as a transfer between related accounts.
+TRANSFER_WINDOW_DAYS = 3
+# Ignore small amounts, which match by coincidence far too often.
+TRANSFER_MIN_CENTS = 10000
+# Skip (amount, day) keys shared by more inflows than this; they are too
+# ambiguous to pair (e.g. a round payroll amount paid to many accounts).
+TRANSFER_MAX_CANDIDATES = 20
+# Flagged rows listed in full per account; the count always covers all of them.
+MAX_LISTED_FLAGS = 100
+
+SECONDS_PER_DAY = 86400
+# Join keys pack (amount in cents, day number) into one int64. Days are
+# counted from the ledger's first day, so they are never negative, and the
+# span covers every date datetime parses (years 1 to 9999).
+DAY_KEY_SPAN = 1 << 22
+
+
+def find_related_transfers(columns):
+    """Pairs outflows with equal inflows to a different account within the window.
+
+    This is a join on (amount, day) keys: inflow keys are sorted once and each
+    outflow probes the TRANSFER_WINDOW_DAYS + 1 keys it could match with a
+    vectorized binary search, so cost grows as n log n rather than n².
+    Returns (outflow_rows, inflow_rows) arrays of row numbers.
+    """
+    amounts = np.asarray(columns.column('amount_cents'))
+    timestamps = np.asarray(columns.column('timestamp'))
+    accounts = np.asarray(columns.column('account'))
+    eligible = (timestamps != MISSING_TIMESTAMP) & (accounts != NULL_CODE) & distinct_rows(columns)
+    days = timestamps // SECONDS_PER_DAY
+    if eligible.any():
+        days = days - days[eligible].min()
+
+    outflows = np.flatnonzero(eligible & (amounts <= -TRANSFER_MIN_CENTS))
+    inflows = np.flatnonzero(eligible & (amounts >= TRANSFER_MIN_CENTS))
+    inflow_keys = amounts[inflows] * DAY_KEY_SPAN + days[inflows]
+    order = np.argsort(inflow_keys, kind='stable')
+    sorted_keys = inflow_keys[order]
+    # Probing in key order keeps the binary searches in cache; at 10M rows
+    # that is ten times faster than probing in row order.
+    outflow_keys = -amounts[outflows] * DAY_KEY_SPAN + days[outflows]
+    outflow_order = np.argsort(outflow_keys, kind='stable')
+    outflow_keys = outflow_keys[outflow_order]
+    outflows = outflows[outflow_order]
+
+    pairs_out, pairs_in = [], []
+    for delta in range(TRANSFER_WINDOW_DAYS + 1):
+        probes = outflow_keys + delta
+        lo = np.searchsorted(sorted_keys, probes, side='left')
+        hi = np.searchsorted(sorted_keys, probes, side='right')
+        counts = hi - lo
+        counts[counts > TRANSFER_MAX_CANDIDATES] = 0
+        total = int(counts.sum())
+        if not total:
+            continue
+        # Expand each outflow's [lo, hi) candidate range into explicit pairs.
+        out_pos = np.repeat(np.arange(len(outflows)), counts)
+        starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        candidates = inflows[order[starts + np.arange(total)]]
+        sources = outflows[out_pos]
+        different = accounts[sources] != accounts[candidates]
+        sources, candidates = sources[different], candidates[different]
+        # Back to row order, which decides the transfers a summary lists.
+        by_row = np.argsort(sources, kind='stable')
+        pairs_out.append(sources[by_row])
+        pairs_in.append(candidates[by_row])
+    if not pairs_out:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(pairs_out), np.concatenate(pairs_in)
+
+
+def load_state():
+    try:
+        with open(STATE_FILE, 'r') as f:
+            return json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return {'rows': 0, 'watermark': 0, 'tail_hash': None}
+
+
+def save_state(state):
+    tmp_path = STATE_FILE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def summary_path(account):
+    short_id = re.sub(r'[^A-Za-z0-9_-]', '_', account) if account is not None else 'unassigned'
+    return os.path.join(OUTPUT_DIR, f"account_{short_id}_summary.json")
+
+
+def _iso(epoch_seconds):
+    if epoch_seconds is None:
+        return None
+    return datetime.fromtimestamp(epoch_seconds, tz=timezone.utc).isoformat()
+
+
+def _read_rows(ledger_path, offsets):
+    """Reads individual ledger rows by byte offset."""
+    rows = []
+    with open(ledger_path, 'rb') as f:
+        for offset in offsets:
+            f.seek(int(offset))
+            rows.append(json.loads(f.readline()))
+    return rows
+
+
+def _flagged(row):
+    return {key: row.get(key) for key in ('transaction_id', 'timestamp', 'amount', 'description')}
+
+
+def summarize_ledger(ledger_path=LEDGER_FILE, columns_dir=COLUMNS_DIR, full=False):
+    """Writes account_<id>_summary.json for every account with new ledger rows.
+
+    Returns the list of summary files written.
+    """
+    refresh_columns(ledger_path, columns_dir)
+    columns = LedgerColumns(columns_dir)
+    state = load_state()
+    # Start over if the ledger or the column store was rewritten since the last summary.
+    unchanged = (state['rows'] <= columns.rows
+                 and state.get('generation') == columns.manifest.get('generation')
+                 and tail_hash(ledger_path, state['watermark']) == state['tail_hash'])
+    first_new_row = state['rows'] if unchanged and not full else 0
+    if first_new_row == columns.rows:
+        print("No new ledger rows to summarize.")
+        return []
+
+    accounts = np.asarray(columns.column('account'))
+    transfers_out, transfers_in = find_related_transfers(columns)
+    # Accounts with new rows, plus counterparties of transfers touching new rows.
+    dirty = set(np.unique(accounts[first_new_row:]).tolist())
+    new_pairs = (transfers_out >= first_new_row) | (transfers_in >= first_new_row)
+    dirty.update(accounts[transfers_out[new_pairs]].tolist())
+    dirty.update(accounts[transfers_in[new_pairs]].tolist())
+    dirty_codes = np.array(sorted(dirty), dtype=np.int64)
+
+    # Duplicates marked `overlapping` would count the same transaction twice.
+    rows = np.flatnonzero(np.isin(accounts, dirty_codes) & distinct_rows(columns))
+    totals = account_totals(columns, rows)
+    large_cash = select_rows(columns, LARGE_CASH_DEPOSIT_CENTS, CASH_PATTERN.search)
+    offsets = np.asarray(columns.column('offset'))
+    timestamps = np.asarray(columns.column('timestamp'))
+    amounts = np.asarray(columns.column('amount_cents'))
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    generated = datetime.now(timezone.utc).isoformat()
+    written = []
+    for code in dirty_codes.tolist():
+        account = columns.decode('account', code)
+        summary = totals.get(account)
+        if summary is None:
+            continue
+        cash_rows = large_cash[accounts[large_cash] == code]
+        outgoing = accounts[transfers_out] == code
+        incoming = accounts[transfers_in] == code
+        transfers = []
+        for direction, mask in (('out', outgoing), ('in', incoming)):
+            for sender, receiver in zip(transfers_out[mask][:MAX_LISTED_FLAGS].tolist(),
+                                        transfers_in[mask][:MAX_LISTED_FLAGS].tolist()):
+                counterparty = receiver if direction == 'out' else sender
+                transfers.append({
+                    'direction': direction,
+                    'counterparty_account': columns.decode('account', int(accounts[counterparty])),
+                    'amount': int(amounts[receiver]) / 100,
+                    'sent': _iso(int(timestamps[sender])),
+                    'received': _iso(int(timestamps[receiver])),
+                })
+        document = {
+            'account': account,
+            'generated': generated,
+            'time_range': {
+                'first': _iso(summary['first_timestamp']),
+                'last': _iso(summary['last_timestamp']),
+            },
+            'transactions': summary['transactions'],
+            'total_inflows': summary['inflow_cents'] / 100,
+            'total_outflows': summary['outflow_cents'] / 100,
+            'net': summary['net_cents'] / 100,
+            'flags': {
+                'large_cash_deposits': {
+                    'threshold': LARGE_CASH_DEPOSIT_CENTS / 100,
+                    'count': int(len(cash_rows)),
+                    'transactions': [_flagged(row) for row in
+                                     _read_rows(ledger_path, offsets[cash_rows[:MAX_LISTED_FLAGS]])],
+                },
+                'related_account_transfers': {
+                    'window_days': TRANSFER_WINDOW_DAYS,
+                    'count': int(outgoing.sum() + incoming.sum()),
+                    'transfers': transfers,
+                },
+            },
+        }
+        path = summary_path(account)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(document, f, indent=2)
+            f.write('\n')
+        os.replace(tmp_path, path)
+        written.append(path)
+
+    watermark = columns.manifest['watermark']
+    save_state({'rows': columns.rows, 'watermark': watermark, 'tail_hash': tail_hash(ledger_path, watermark),
+                'generation': columns.manifest.get('generation')})
+    print(f"Wrote {len(written)} account summary file(s) to {OUTPUT_DIR}.")
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write per-account summaries of the unified ledger.")
+    parser.add_argument('--full', action='store_true', help="Recompute every account, not just changed ones.")
+    args = parser.parse_args()
+    summarize_ledger(full=args.full)
@@ -0,0 +1,54 @@
+import unittest
+import os
+import shutil
+import tempfile
+from financial_discovery.scripts.csv_profiles import detect_date_format, parse_statement
+
+class TestCsvProfiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_becu_export(self):
+        path = self.write('becu_3621082978.csv',
+                          'date,type,amount,name,memo\n'
+                          '2022-08-14,CREDIT,1400.00,Deposit Internet Transfer from 3,'
+                          'Deposit Internet Transfer from 3621082704\n'
+                          '2022-09-12,DEBIT,-12.50,ATM Fee,\n'
+                          'not a date,DEBIT,-1.00,Bad row,\n')
+        transactions = parse_statement(path, keep_rows=True)
+        self.assertEqual(len(transactions), 2)
+        self.assertEqual(transactions[0]['timestamp'], '2022-08-14T00:00:00')
+        self.assertEqual(transactions[0]['amount'], 1400.0)
+        self.assertEqual(transactions[0]['description'], 'Deposit Internet Transfer from 3621082704')
+        self.assertEqual(transactions[0]['account_number'], '3621082978')
+        self.assertEqual(transactions[0]['currency'], 'USD')
+        self.assertEqual(transactions[1]['description'], 'ATM Fee')
+        self.assertEqual(transactions[1]['row']['type'], 'DEBIT')
+
+    def test_generic_export_with_day_first_dates(self):
+        path = self.write('statement.csv',
+                          'Date,Account Number,Amount,Currency,Description\n'
+                          '03/01/2025,12345,10.00,EUR,Coffee\n'
+                          '25/01/2025,12345,-4.00,EUR,Refund\n')
+        transactions = parse_statement(path)
+        self.assertEqual([t['timestamp'] for t in transactions], ['2025-01-03T00:00:00', '2025-01-25T00:00:00'])
+        self.assertEqual(transactions[0]['account_number'], '12345')
+        self.assertEqual(detect_date_format(['03/01/2025', '04/01/2025']), '%m/%d/%Y')
+
+    def test_unknown_header(self):
+        path = self.write('other.csv', 'when,how much\n2025-01-01,1\n')
+        with self.assertRaises(ValueError):
+            parse_statement(path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import os
+import sys
+import csv
+import shutil
+import subprocess
+import tempfile
+from ai_bridge.journal import Journal
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Runs ingest_statements against a scratch tree in a fresh process, so a
+# crash point can kill it outright.
+RUN_INGEST = '''
+import sys
+from financial_discovery.scripts import ingest_statements
+root = sys.argv[1]
+ingest_statements.RAW_STATEMENTS_DIR = root + '/statements/raw'
+ingest_statements.PROCESSED_STATEMENTS_DIR = root + '/statements/processed'
+ingest_statements.UNIFIED_LEDGER_FILE = root + '/ledger/unified_ledger.jsonl'
+ingest_statements.ingest_statements()
+'''
+
+CRASH_POINTS = ['statement.intent', 'statement.rows', 'statement.committed', 'statement.done', 'statement.moved']
+
+class TestIngestRecovery(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def make_tree(self, name):
+        root = os.path.join(self.tmp_dir, name)
+        raw_dir = os.path.join(root, 'statements/raw')
+        os.makedirs(raw_dir)
+        os.makedirs(os.path.join(root, 'statements/processed'))
+        for n in range(3):
+            with open(os.path.join(raw_dir, f'statement{n}.csv'), 'w', newline='') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(['Date', 'Account Number', 'Amount', 'Currency', 'Description'])
+                for i in range(5):
+                    writer.writerow(['2025-03-01', '12345', n * 10 + i, 'USD', f'Row {i}'])
+        return root
+
+    def run_ingest(self, root, crash_at=None):
+        env = dict(os.environ)
+        env.pop('BRIDGE_CRASH_AT', None)
+        if crash_at:
+            env['BRIDGE_CRASH_AT'] = crash_at
+        return subprocess.run([sys.executable, '-c', RUN_INGEST, root], cwd=REPO_ROOT, env=env,
+                              capture_output=True).returncode
+
+    def read_ledger(self, root):
+        # Rows record their statement's path, which differs between trees.
+        with open(os.path.join(root, 'ledger/unified_ledger.jsonl'), 'r') as f:
+            return f.read().replace(root, '<root>')
+
+    def test_crash_at_every_step_ingests_each_statement_once(self):
+        clean = self.make_tree('clean')
+        self.assertEqual(self.run_ingest(clean), 0)
+        expected = self.read_ledger(clean)
+
+        for point in CRASH_POINTS:
+            with self.subTest(point=point):
+                root = self.make_tree(point)
+                self.assertEqual(self.run_ingest(root, crash_at=point), 137)
+                self.assertEqual(self.run_ingest(root), 0)
+
+                self.assertEqual(self.read_ledger(root), expected)
+                self.assertNotIn('overlapping', self.read_ledger(root))
+                self.assertEqual(os.listdir(os.path.join(root, 'statements/raw')), [])
+                self.assertEqual(sorted(os.listdir(os.path.join(root, 'statements/processed'))),
+                                 ['statement0.csv', 'statement1.csv', 'statement2.csv'])
+                journal = Journal(os.path.join(root, 'ledger/unified_ledger.jsonl.journal'))
+                self.assertEqual(journal.in_flight(), [])
+                journal.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,11 +2,24 @@ import unittest
 import os
 import json
 import csv
+import shutil
+import tempfile
 from financial_discovery.scripts import ingest_statements
 
 class TestIngestStatements(unittest.TestCase):
 
     def setUp(self):
+        # Point the ingester at a scratch tree so the real ledger is untouched.
+        self.tmp_dir = tempfile.mkdtemp()
+        self.original_paths = (
+            ingest_statements.RAW_STATEMENTS_DIR,
+            ingest_statements.PROCESSED_STATEMENTS_DIR,
+            ingest_statements.UNIFIED_LEDGER_FILE,
+        )
+        ingest_statements.RAW_STATEMENTS_DIR = os.path.join(self.tmp_dir, 'statements/raw')
+        ingest_statements.PROCESSED_STATEMENTS_DIR = os.path.join(self.tmp_dir, 'statements/processed')
+        ingest_statements.UNIFIED_LEDGER_FILE = os.path.join(self.tmp_dir, 'ledger/unified_ledger.jsonl')
+
         self.raw_dir = ingest_statements.RAW_STATEMENTS_DIR
         self.processed_dir = ingest_statements.PROCESSED_STATEMENTS_DIR
         self.ledger_file = ingest_statements.UNIFIED_LEDGER_FILE
@@ -32,6 +45,10 @@ class TestIngestStatements(unittest.TestCase):
         for f in files_to_remove:
             if os.path.exists(f):
                 os.remove(f)
+        (ingest_statements.RAW_STATEMENTS_DIR,
+         ingest_statements.PROCESSED_STATEMENTS_DIR,
+         ingest_statements.UNIFIED_LEDGER_FILE) = self.original_paths
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
 
     def test_ingest_statements(self):
         ingest_statements.ingest_statements()
@@ -49,5 +66,28 @@ class TestIngestStatements(unittest.TestCase):
             self.assertEqual(first_transaction['reconciliation_status'], 'new')
             self.assertEqual(second_transaction['reconciliation_status'], 'overlapping')
 
+    def test_parallel_ingest_matches_serial(self):
+        for n in range(4):
+            with open(os.path.join(self.raw_dir, f'extra{n}.csv'), 'w', newline='') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(['Date', 'Account Number', 'Amount', 'Currency', 'Description'])
+                for i in range(20):
+                    writer.writerow(['2025-02-01', '12345', n * 100 + i % 7, 'USD', f'Row {i % 7}'])
+        raw_files = {name: open(os.path.join(self.raw_dir, name)).read() for name in os.listdir(self.raw_dir)}
+
+        ledgers = []
+        for workers in (1, 3):
+            for name, content in raw_files.items():
+                with open(os.path.join(self.raw_dir, name), 'w') as f:
+                    f.write(content)
+            ingest_statements.ingest_statements(workers=workers)
+            with open(self.ledger_file, 'r') as f:
+                ledgers.append(f.read())
+            os.remove(self.ledger_file)
+            os.remove(self.ledger_file + '.idx.sqlite')
+
+        self.assertEqual(ledgers[0], ledgers[1])
+        self.assertEqual(len(os.listdir(self.raw_dir)), 0)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from financial_discovery.scripts.ledger_columns import LedgerColumns, account_totals, refresh_columns
+
+class TestLedgerColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.ledger_file = os.path.join(self.tmp_dir, 'unified_ledger.jsonl')
+        self.columns_dir = os.path.join(self.tmp_dir, 'columns')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write_rows(self, rows, mode='a'):
+        with open(self.ledger_file, mode) as f:
+            for account, timestamp, amount in rows:
+                f.write(json.dumps({'account_number': account, 'timestamp': timestamp, 'amount': amount}) + '\n')
+
+    def test_incremental_refresh_and_totals(self):
+        self.write_rows([('2704', '2022-08-14', 1400.0), ('2704', '2022-09-01', -25.5)])
+        self.assertEqual(refresh_columns(self.ledger_file, self.columns_dir), 2)
+        self.write_rows([('3009', '2023-01-01', 10.0)])
+        self.assertEqual(refresh_columns(self.ledger_file, self.columns_dir), 1)
+
+        totals = account_totals(LedgerColumns(self.columns_dir))
+        self.assertEqual(totals['2704']['inflow_cents'], 140000)
+        self.assertEqual(totals['2704']['outflow_cents'], 2550)
+        self.assertEqual(totals['2704']['net_cents'], 137450)
+        self.assertEqual(totals['3009']['transactions'], 1)
+
+    def test_rebuilds_after_ledger_rewrite(self):
+        self.write_rows([('2704', '2022-08-14', 1400.0), ('2704', '2022-09-01', -25.5)])
+        refresh_columns(self.ledger_file, self.columns_dir)
+        self.write_rows([('3009', '2023-01-01', 10.0)], mode='w')
+        refresh_columns(self.ledger_file, self.columns_dir)
+
+        totals = account_totals(LedgerColumns(self.columns_dir))
+        self.assertEqual(list(totals), ['3009'])
+
+if __name__ == '__main__':
+    unittest.main()
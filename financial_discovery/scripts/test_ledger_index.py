@@ -0,0 +1,59 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from financial_discovery.scripts.ledger_index import LedgerIndex
+
+class TestLedgerIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.ledger_file = os.path.join(self.tmp_dir, 'unified_ledger.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write_rows(self, ids, mode='a'):
+        with open(self.ledger_file, mode) as f:
+            for transaction_id in ids:
+                f.write(json.dumps({'transaction_id': transaction_id, 'amount': 1.0}) + '\n')
+
+    def test_indexes_existing_ledger_and_fetches_by_id(self):
+        self.write_rows(['aa' * 32, 'bb' * 32])
+        index = LedgerIndex(self.ledger_file)
+        self.assertIn('aa' * 32, index)
+        self.assertNotIn('cc' * 32, index)
+        self.assertEqual(index.fetch('bb' * 32)['transaction_id'], 'bb' * 32)
+        index.close()
+
+    def test_picks_up_rows_appended_by_other_writers(self):
+        self.write_rows(['aa' * 32])
+        LedgerIndex(self.ledger_file).close()
+        self.write_rows(['bb' * 32])
+        index = LedgerIndex(self.ledger_file)
+        self.assertIn('bb' * 32, index)
+        self.assertEqual(len(index), 2)
+        index.close()
+
+    def test_rebuilds_when_ledger_is_rewritten(self):
+        self.write_rows(['aa' * 32, 'bb' * 32])
+        LedgerIndex(self.ledger_file).close()
+        self.write_rows(['cc' * 32, 'dd' * 32], mode='w')
+        index = LedgerIndex(self.ledger_file)
+        self.assertNotIn('aa' * 32, index)
+        self.assertIn('dd' * 32, index)
+        self.assertEqual(index.fetch('dd' * 32)['transaction_id'], 'dd' * 32)
+        index.close()
+
+    def test_ignores_partial_trailing_line(self):
+        self.write_rows(['aa' * 32])
+        with open(self.ledger_file, 'a') as f:
+            f.write('{"transaction_id": "')
+        index = LedgerIndex(self.ledger_file)
+        self.assertEqual(len(index), 1)
+        self.assertLess(index.watermark, os.path.getsize(self.ledger_file))
+        index.close()
+
+if __name__ == '__main__':
+    unittest.main()
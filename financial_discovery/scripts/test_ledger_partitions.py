@@ -0,0 +1,210 @@
+import unittest
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+from ai_bridge.journal import CRASH_EXIT_CODE
+from financial_discovery.scripts import ingest_statements, ledger_columns, ledger_partitions
+from financial_discovery.scripts.reconcile_ledger import reconcile_ledger
+from financial_discovery.scripts.ledger_partitions import PartitionedLedgerWriter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RUN_INGEST = '''
+import sys
+from financial_discovery.scripts import ingest_statements
+root = sys.argv[1]
+ingest_statements.RAW_STATEMENTS_DIR = root + '/statements/raw'
+ingest_statements.PROCESSED_STATEMENTS_DIR = root + '/statements/processed'
+ingest_statements.UNIFIED_LEDGER_FILE = root + '/ledger/unified_ledger.jsonl'
+ingest_statements.ingest_statements()
+'''
+
+def row(account, timestamp, n):
+    return {'transaction_id': f'{account}-{timestamp}-{n}', 'account_number': account,
+            'timestamp': timestamp, 'amount': n, 'description': f'Row {n}'}
+
+class TestLedgerPartitions(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.ledger = os.path.join(self.tmp_dir, 'ledger', 'unified_ledger.jsonl')
+        self.root = os.path.dirname(self.ledger)
+        os.makedirs(os.path.join(self.root, ledger_partitions.MANIFEST_DIR))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def merged(self, **selection):
+        return [json.loads(line) for line in ledger_partitions.iter_merged(self.root, **selection)]
+
+    def read_view(self):
+        with open(self.ledger) as f:
+            return [json.loads(line) for line in f]
+
+    def make_raw_statements(self, raw_dir, count):
+        os.makedirs(raw_dir, exist_ok=True)
+        for n in range(count):
+            with open(os.path.join(raw_dir, f'statement{n}.csv'), 'w', newline='') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(['Date', 'Account Number', 'Amount', 'Currency', 'Description'])
+                for i in range(4):
+                    writer.writerow([f'2025-0{i % 2 + 1}-01', str(12345 + n % 2), n * 10 + i, 'USD', f'Row {i}'])
+
+    def test_concurrent_writers_never_share_files_and_merge_in_order(self):
+        with PartitionedLedgerWriter(self.root) as first, PartitionedLedgerWriter(self.root) as second:
+            self.assertNotEqual(first.writer_id, second.writer_id)
+            with first.statement('a'):
+                first.write(row('A', '2024-02-03T00:00:00', 1))
+                first.write(row('A', '2024-01-05T00:00:00', 2))
+            with second.statement('b'):
+                second.write(row('A', '2024-01-04T00:00:00', 3))
+                second.write(row('B', '2024-01-09T00:00:00', 4))
+                second.write(row('B', None, 5))
+        manifest = ledger_partitions.load_manifest(self.root)
+        self.assertEqual(len(manifest), 5)
+        self.assertEqual(sum(info['rows'] for info in manifest.values()), 5)
+        self.assertEqual([r['amount'] for r in self.merged()], [3, 2, 4, 1, 5])
+        # Pruning: only the partitions that can match are read.
+        self.assertEqual(len(ledger_partitions.select_parts(manifest, account='A', start_month='2024-01',
+                                                            end_month='2024-01')), 2)
+        self.assertEqual([r['amount'] for r in self.merged(account='A', start_month='2024-02')], [1])
+        self.assertEqual(ledger_partitions.merge_ledger(self.ledger), 5)
+        with open(self.ledger) as f:
+            self.assertEqual([json.loads(line)['amount'] for line in f], [3, 2, 4, 1, 5])
+
+    def test_uncommitted_rows_are_never_visible_and_are_truncated(self):
+        writer = PartitionedLedgerWriter(self.root)
+        with writer.statement('kept'):
+            writer.write(row('A', '2024-01-01T00:00:00', 1))
+        with self.assertRaises(RuntimeError), writer.statement('failed'):
+            writer.write(row('A', '2024-01-02T00:00:00', 2))
+            writer.flush()
+            raise RuntimeError('parse error')
+        writer.begin('crashed')
+        writer.write(row('A', '2024-01-03T00:00:00', 3))
+        writer.write(row('C', '2024-05-03T00:00:00', 4))
+        writer.flush()
+        self.assertEqual([r['amount'] for r in self.merged()], [1])
+        # Die without committing: the lease goes with the process.
+        writer.lease.close()
+
+        with PartitionedLedgerWriter(self.root) as reopened:
+            self.assertEqual(reopened.writer_id, writer.writer_id)
+        for relpath, path in reopened._own_parts():
+            committed = ledger_partitions.load_manifest(self.root).get(relpath, {}).get('bytes', 0)
+            self.assertEqual(os.path.getsize(path), committed)
+        self.assertEqual([r['amount'] for r in self.merged()], [1])
+
+    def test_ingest_dedups_within_partitions(self):
+        raw_dir = os.path.join(self.tmp_dir, 'statements/raw')
+        processed_dir = os.path.join(self.tmp_dir, 'statements/processed')
+        self.make_raw_statements(raw_dir, 2)
+        with mock.patch.multiple(ingest_statements, RAW_STATEMENTS_DIR=raw_dir,
+                                 PROCESSED_STATEMENTS_DIR=processed_dir, UNIFIED_LEDGER_FILE=self.ledger):
+            ingest_statements.ingest_statements()
+            shutil.copy(os.path.join(processed_dir, 'statement0.csv'), raw_dir)
+            ingest_statements.ingest_statements()
+        rows = self.merged()
+        # Each ingest appended its rows to the single-file view.
+        self.assertEqual(sorted(self.read_view(), key=str), sorted(rows, key=str))
+        self.assertEqual(len(rows), 12)
+        overlapping = [r for r in rows if r['reconciliation_status'] == 'overlapping']
+        self.assertEqual(len(overlapping), 4)
+        self.assertEqual({r['account_number'] for r in overlapping}, {'12345'})
+        index = ledger_partitions.PartitionedIndex(self.root)
+        self.assertIn(rows[0]['transaction_id'], index.scope(rows[0]))
+        # Only the partitions that were checked are loaded.
+        self.assertEqual(len(index.scopes), 1)
+
+    def test_split_moves_an_existing_ledger(self):
+        shutil.rmtree(self.root)
+        os.makedirs(self.root)
+        rows = [row('A', '2024-01-02T00:00:00', 1), row('B', '2023-12-31T00:00:00', 2),
+                row('A', '2024-01-01T00:00:00', 3)]
+        with open(self.ledger, 'w') as f:
+            f.writelines(json.dumps(r) + '\n' for r in rows)
+        self.assertFalse(ledger_partitions.is_partitioned(self.ledger))
+        self.assertEqual(ledger_partitions.split_ledger(self.ledger), 3)
+        self.assertTrue(ledger_partitions.is_partitioned(self.ledger))
+        self.assertEqual([r['amount'] for r in self.merged()], [2, 3, 1])
+
+        # The single file is kept as the view: readers only parse rows written since.
+        columns_dir = os.path.join(self.root, 'columns')
+        self.assertEqual(ledger_columns.refresh_columns(self.ledger, columns_dir), 3)
+        with ledger_partitions.ledger_writer(self.ledger) as writer, writer.statement('new'):
+            writer.write(row('B', '2024-03-01T00:00:00', 4))
+        self.assertEqual([r['amount'] for r in self.read_view()], [1, 2, 3, 4])
+        self.assertEqual(ledger_columns.refresh_columns(self.ledger, columns_dir), 1)
+        self.assertEqual(ledger_columns.LedgerColumns(columns_dir).rows, 4)
+
+    def test_reconcile_writes_into_the_partitions(self):
+        transfer = {'account_number': '3621082978', 'amount': 1400.0, 'currency': 'USD',
+                    'reconciliation_status': 'new'}
+        with PartitionedLedgerWriter(self.root) as first, PartitionedLedgerWriter(self.root) as second:
+            with first.statement('becu.csv'):
+                first.write(dict(transfer, transaction_id='csv1', timestamp='2022-08-14T00:00:00',
+                                 description='Deposit Internet Transfer', source_file='becu.csv'))
+                first.write(row('A', '2022-08-14T00:00:00', 1))
+            with second.statement('becu.pdf'):
+                second.write(dict(transfer, transaction_id='pdf1', timestamp='2022-08-15T00:00:00',
+                                  description='DEPOSIT INTERNET TRANSFER', source_file='becu.pdf'))
+        ledger_partitions.sync_view(self.ledger)
+
+        report = reconcile_ledger(self.ledger, os.path.join(self.root, 'columns'))
+        self.assertEqual(report['rows_changed'], 2)
+        for rows in (self.merged(), self.read_view()):
+            status = {r['transaction_id']: r.get('reconciliation_status') for r in rows}
+            self.assertEqual(status, {'csv1': 'reconciled', 'pdf1': 'reconciled', 'A-2022-08-14T00:00:00-1': None})
+        # Merging rebuilds the view from the partitions, which hold the results.
+        ledger_partitions.merge_ledger(self.ledger)
+        by_id = {r['transaction_id']: r for r in self.read_view()}
+        self.assertEqual(by_id['csv1']['metadata']['reconciled_with'], ['pdf1'])
+        self.assertEqual(reconcile_ledger(self.ledger, os.path.join(self.root, 'columns'))['rows_changed'], 0)
+
+    def test_interrupted_rewrite_is_finished_by_the_next_writer(self):
+        with PartitionedLedgerWriter(self.root) as writer, writer.statement('a'):
+            writer.write(row('A', '2024-01-01T00:00:00', 1))
+            writer.write(row('A', '2024-01-02T00:00:00', 2))
+        relpath, = ledger_partitions.load_manifest(self.root)
+        path = os.path.join(self.root, relpath)
+
+        # Die after the manifest marks the copy, before it is swapped in.
+        with mock.patch.object(ledger_partitions, 'finish_rewrites'):
+            ledger_partitions.rewrite_parts(self.root, writer.writer_id, [relpath],
+                                            lambda relpath, line: line.replace(b'Row 2', b'Row two'))
+        self.assertTrue(os.path.exists(path + ledger_partitions.NEXT_SUFFIX))
+        self.assertEqual([r['description'] for r in self.merged()], ['Row 1', 'Row two'])
+
+        with PartitionedLedgerWriter(self.root) as reopened:
+            self.assertEqual(reopened.writer_id, writer.writer_id)
+        self.assertFalse(os.path.exists(path + ledger_partitions.NEXT_SUFFIX))
+        self.assertNotIn('replacing', ledger_partitions.load_manifest(self.root)[relpath])
+        self.assertEqual([r['description'] for r in self.merged()], ['Row 1', 'Row two'])
+
+    def test_crash_at_every_step_ingests_each_statement_once(self):
+        for crash_at in ['statement.intent', 'statement.rows', 'statement.committed', 'statement.done',
+                         'statement.moved']:
+            root = os.path.join(self.tmp_dir, crash_at)
+            os.makedirs(os.path.join(root, 'ledger', ledger_partitions.MANIFEST_DIR))
+            self.make_raw_statements(os.path.join(root, 'statements/raw'), 3)
+            env = dict(os.environ, BRIDGE_CRASH_AT=crash_at)
+            crashed = subprocess.run([sys.executable, '-c', RUN_INGEST, root], cwd=REPO_ROOT, env=env,
+                                     capture_output=True)
+            self.assertEqual(crashed.returncode, CRASH_EXIT_CODE, crash_at)
+            env.pop('BRIDGE_CRASH_AT')
+            result = subprocess.run([sys.executable, '-c', RUN_INGEST, root], cwd=REPO_ROOT, env=env,
+                                    capture_output=True)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            rows = [json.loads(line) for line in ledger_partitions.iter_merged(os.path.join(root, 'ledger'))]
+            self.assertEqual(len(rows), 12, crash_at)
+            self.assertEqual(len({r['transaction_id'] for r in rows}), 12, crash_at)
+            self.assertEqual(sorted(os.listdir(os.path.join(root, 'statements/processed'))),
+                             ['statement0.csv', 'statement1.csv', 'statement2.csv'], crash_at)
+
+if __name__ == '__main__':
+    unittest.main()
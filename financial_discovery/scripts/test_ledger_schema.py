@@ -0,0 +1,70 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from financial_discovery.scripts.ledger_schema import compile_schema, load_validator
+from financial_discovery.scripts.ledger_writer import QUARANTINE_SUFFIX, LedgerWriter
+
+def row(**changes):
+    transaction = {"transaction_id": "t1", "timestamp": "2022-08-14T00:00:00", "account_number": "3621082978",
+                   "amount": 1400.0, "currency": "USD", "description": "Deposit", "source": "LegalCodex",
+                   "source_file": "becu.csv", "reconciliation_status": "new"}
+    transaction.update(changes)
+    return {key: value for key, value in transaction.items() if value is not ...}
+
+class TestLedgerSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.ledger_file = os.path.join(self.tmp_dir, 'unified_ledger.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_ledger_schema(self):
+        validate = load_validator()
+        self.assertEqual(validate([row(), row(account_number=None, source_file=...), row(amount=3),
+                                   row(description=None)]), [])
+        rejects = validate([
+            row(),
+            row(amount="1400.00"),
+            row(description=..., source="Bank"),
+            row(timestamp="14/08/2022"),
+            row(amount=True),
+            "not a row",
+        ])
+        self.assertEqual([index for index, _ in rejects], [1, 2, 3, 4, 5])
+        self.assertEqual(rejects[0][1], ["'amount': expected number, got string"])
+        self.assertEqual(rejects[1][1], ["missing 'description'", "'source': 'Bank' not one of ['LegalCodex', 'Comet']"])
+        self.assertIn("not an ISO 8601 date-time", rejects[2][1][0])
+
+    def test_unsupported_keywords_are_refused(self):
+        with self.assertRaises(ValueError):
+            compile_schema({"type": "object", "properties": {"amount": {"type": "number", "minimum": 0}}})
+        validate = compile_schema({"type": "object", "properties": {"a": {"type": "integer"}},
+                                   "required": ["a", "b"], "additionalProperties": False})
+        self.assertEqual(validate([{"a": 1, "b": 2}]), [(0, ["unexpected properties: b"])])
+        self.assertEqual(validate([{"a": 1.5}]), [(0, ["'a': expected integer, got number", "missing 'b'"])])
+
+    def test_writer_quarantines_rejects_on_commit(self):
+        with LedgerWriter(self.ledger_file, validator=load_validator()) as writer:
+            with self.assertRaises(RuntimeError):
+                with writer.statement('a.csv'):
+                    writer.write_all([row(), row(amount=None)])
+                    raise RuntimeError('parse failed')
+            self.assertFalse(os.path.exists(self.ledger_file + QUARANTINE_SUFFIX))
+            with writer.statement('b.csv'):
+                self.assertEqual(writer.write_all(iter([row(), row(amount=None), row(transaction_id="t2")])), 2)
+
+        with open(self.ledger_file) as f:
+            self.assertEqual([json.loads(line)['transaction_id'] for line in f], ["t1", "t2"])
+        with open(self.ledger_file + QUARANTINE_SUFFIX) as f:
+            quarantined = [json.loads(line) for line in f]
+        self.assertEqual(len(quarantined), 1)
+        self.assertEqual(quarantined[0]['statement'], 'b.csv')
+        self.assertEqual(quarantined[0]['reasons'], ["'amount': expected number, got null"])
+        self.assertEqual(quarantined[0]['row'], row(amount=None))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import os
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from financial_discovery.scripts import ledger_writer
+from financial_discovery.scripts.ledger_writer import LedgerWriter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Opens a second writer on the ledger from another process.
+OPEN_WRITER = '''
+import sys
+from financial_discovery.scripts import ledger_writer
+ledger_writer.LOCK_TIMEOUT = 0.2
+try:
+    ledger_writer.LedgerWriter(sys.argv[1]).close()
+except RuntimeError:
+    sys.exit(3)
+'''
+
+class TestLedgerWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.ledger_file = os.path.join(self.tmp_dir, 'ledger', 'unified_ledger.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def read_ledger(self):
+        with open(self.ledger_file, 'r') as f:
+            return [json.loads(line) for line in f]
+
+    def test_statement_commits_all_rows(self):
+        with LedgerWriter(self.ledger_file, batch_size=2) as writer:
+            with writer.statement('a.csv'):
+                for i in range(5):
+                    writer.write({'transaction_id': str(i)})
+        self.assertEqual([row['transaction_id'] for row in self.read_ledger()], ['0', '1', '2', '3', '4'])
+        self.assertFalse(os.path.exists(self.ledger_file + ledger_writer.MARKER_SUFFIX))
+
+    def test_failed_statement_leaves_no_rows(self):
+        with LedgerWriter(self.ledger_file, batch_size=2) as writer:
+            with writer.statement('a.csv'):
+                writer.write({'transaction_id': 'kept'})
+            with self.assertRaises(ValueError):
+                with writer.statement('b.csv'):
+                    for i in range(5):
+                        writer.write({'transaction_id': str(i)})
+                    raise ValueError('bad row')
+            with writer.statement('c.csv'):
+                writer.write({'transaction_id': 'after'})
+        self.assertEqual([row['transaction_id'] for row in self.read_ledger()], ['kept', 'after'])
+
+    def test_recovers_statement_interrupted_by_crash(self):
+        writer = LedgerWriter(self.ledger_file, batch_size=1)
+        with writer.statement('a.csv'):
+            writer.write({'transaction_id': 'kept'})
+        writer.begin('b.csv')
+        writer.write({'transaction_id': 'lost'})
+        # Simulate the process dying before commit.
+        writer.file.close()
+        writer.lock.close()
+
+        LedgerWriter(self.ledger_file).close()
+        self.assertEqual([row['transaction_id'] for row in self.read_ledger()], ['kept'])
+        self.assertFalse(os.path.exists(self.ledger_file + ledger_writer.MARKER_SUFFIX))
+
+    def test_a_second_process_cannot_roll_back_a_statement_in_progress(self):
+        def open_elsewhere():
+            return subprocess.run([sys.executable, '-c', OPEN_WRITER, self.ledger_file], cwd=REPO_ROOT,
+                                  capture_output=True).returncode
+
+        with LedgerWriter(self.ledger_file, batch_size=1) as writer:
+            with writer.statement('a.csv'):
+                writer.write({'transaction_id': 'in flight'})
+                self.assertEqual(open_elsewhere(), 3)
+                self.assertEqual([row['transaction_id'] for row in self.read_ledger()], ['in flight'])
+                writer.write({'transaction_id': 'still in flight'})
+        self.assertEqual(open_elsewhere(), 0)
+        self.assertEqual([row['transaction_id'] for row in self.read_ledger()], ['in flight', 'still in flight'])
+
+if __name__ == '__main__':
+    unittest.main()
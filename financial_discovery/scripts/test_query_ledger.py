@@ -0,0 +1,69 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from financial_discovery.scripts.query_ledger import LedgerQuery, refresh_indexes
+
+def row(transaction_id, account, timestamp, amount, description):
+    return {"transaction_id": transaction_id, "timestamp": timestamp, "account_number": account,
+            "amount": amount, "currency": "USD", "description": description, "source": None,
+            "source_file": "becu.csv", "reconciliation_status": "new"}
+
+ROWS = [
+    row("a", "111", "2022-08-14T00:00:00", 1400.0, "Deposit Internet Transfer from 3621082704"),
+    row("b", "111", "2022-08-20T09:30:00", -12.5, "ATM Fee"),
+    row("c", "222", "2022-08-20T00:00:00", 1400.0, "Payroll Deposit ACME"),
+    row("d", "222", "2022-09-01T00:00:00", -60.0, "Safeway Store"),
+    row("e", "111", None, 5.0, "Interest"),
+]
+
+class TestQueryLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.ledger = os.path.join(self.tmp_dir, 'unified_ledger.jsonl')
+        self.columns_dir = os.path.join(self.tmp_dir, 'columns')
+        self.write(ROWS)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write(self, rows, mode='w'):
+        with open(self.ledger, mode) as f:
+            f.writelines(json.dumps(r) + '\n' for r in rows)
+
+    def ids(self, query, **filters):
+        return [json.loads(line)['transaction_id'] for line in query.iter_lines(query.rows(**filters))]
+
+    def test_filters(self):
+        query = LedgerQuery(self.ledger, self.columns_dir)
+        self.assertEqual(self.ids(query, account="111"), ["a", "b", "e"])
+        self.assertEqual(self.ids(query, account="999"), [])
+        self.assertEqual(self.ids(query, start="2022-08-15", end="2022-08-20"), ["b", "c"])
+        self.assertEqual(self.ids(query, min_amount=1000), ["a", "c"])
+        self.assertEqual(self.ids(query, max_amount=0, account="222"), ["d"])
+        self.assertEqual(self.ids(query, text="deposit"), ["a", "c"])
+        self.assertEqual(self.ids(query, text="deposit acme", start="2022-08-01"), ["c"])
+        self.assertEqual(self.ids(query, text="nothing"), [])
+        self.assertEqual(len(query.rows()), len(ROWS))
+
+    def test_appended_rows_are_found_before_rebuild(self):
+        LedgerQuery(self.ledger, self.columns_dir)
+        self.write([row("f", "333", "2022-10-01T00:00:00", 20000.0, "Cash Deposit Branch")], mode='a')
+        self.assertFalse(refresh_indexes(self.ledger, self.columns_dir))
+        query = LedgerQuery(self.ledger, self.columns_dir)
+        self.assertEqual(self.ids(query, account="333"), ["f"])
+        self.assertEqual(self.ids(query, text="deposit"), ["a", "c", "f"])
+        self.assertEqual(self.ids(query, text="cash branch"), ["f"])
+        self.assertEqual(self.ids(query, min_amount=10000), ["f"])
+
+    def test_rewritten_ledger_rebuilds_indexes(self):
+        LedgerQuery(self.ledger, self.columns_dir)
+        self.write(list(reversed(ROWS)))
+        self.assertTrue(refresh_indexes(self.ledger, self.columns_dir))
+        query = LedgerQuery(self.ledger, self.columns_dir)
+        self.assertEqual(self.ids(query, account="111"), ["e", "b", "a"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import os
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+from financial_discovery.scripts import ledger_writer
+from financial_discovery.scripts.reconcile_ledger import reconcile_ledger
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Writes one row of a statement from another process and commits it once
+# told to on stdin.
+WRITE_STATEMENT = '''
+import json, sys
+from financial_discovery.scripts.ledger_writer import LedgerWriter
+with LedgerWriter(sys.argv[1], batch_size=1) as writer:
+    with writer.statement('late.csv'):
+        writer.write(json.loads(sys.argv[2]))
+        print('written', flush=True)
+        sys.stdin.readline()
+'''
+
+def row(transaction_id, timestamp, amount, description, source_file=None, source=None):
+    return {"transaction_id": transaction_id, "timestamp": timestamp, "account_number": "3621082978",
+            "amount": amount, "currency": "USD", "description": description, "source": source,
+            "source_file": source_file, "reconciliation_status": "new"}
+
+class TestReconcileLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.ledger = os.path.join(self.tmp_dir, 'unified_ledger.jsonl')
+        self.columns_dir = os.path.join(self.tmp_dir, 'columns')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def read_ledger(self):
+        with open(self.ledger) as f:
+            return [json.loads(line) for line in f]
+
+    def test_links_same_transaction_across_sources(self):
+        rows = [
+            row("csv1", "2022-08-14T00:00:00", 1400.0, "Deposit Internet Transfer from 3621082704", "becu.csv"),
+            row("csv2", "2022-08-20T00:00:00", -12.5, "ATM Fee", "becu.csv"),
+            row("pdf1", "2022-08-15T00:00:00", 1400.0, "DEPOSIT INTERNET TRANSFER", "becu.pdf"),
+            row("pdf2", "2022-08-14T00:00:00", 1400.0, "Payroll", "becu.pdf"),
+            row("comet1", "2022-08-16T00:00:00", 1400.0, "Internet transfer 3621082704", source="Comet"),
+            row("csv3", "2022-08-30T00:00:00", 1400.0, "Deposit Internet Transfer from 3621082704", "becu.csv"),
+        ]
+        with open(self.ledger, 'w') as f:
+            f.writelines(json.dumps(r) + '\n' for r in rows)
+
+        report = reconcile_ledger(self.ledger, self.columns_dir)
+        self.assertEqual(report['groups'], 1)
+        by_id = {r['transaction_id']: r for r in self.read_ledger()}
+        self.assertEqual(by_id['csv1']['reconciliation_status'], 'reconciled')
+        self.assertEqual(sorted(by_id['csv1']['metadata']['reconciled_with']), ['comet1', 'pdf1'])
+        self.assertEqual(sorted(by_id['comet1']['metadata']['reconciled_with']), ['csv1', 'pdf1'])
+        for unmatched in ('csv2', 'pdf2', 'csv3'):
+            self.assertEqual(by_id[unmatched]['reconciliation_status'], 'new')
+
+        self.assertEqual(reconcile_ledger(self.ledger, self.columns_dir)['rows_changed'], 0)
+
+    def test_waits_for_an_ingester_instead_of_rolling_it_back(self):
+        rows = [
+            row("csv1", "2022-08-14T00:00:00", 1400.0, "Deposit Internet Transfer", "becu.csv"),
+            row("pdf1", "2022-08-15T00:00:00", 1400.0, "DEPOSIT INTERNET TRANSFER", "becu.pdf"),
+        ]
+        with open(self.ledger, 'w') as f:
+            f.write(json.dumps(rows[0]) + '\n')
+        ingester = subprocess.Popen([sys.executable, '-c', WRITE_STATEMENT, self.ledger, json.dumps(rows[1])],
+                                    cwd=REPO_ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        try:
+            self.assertEqual(ingester.stdout.readline(), 'written\n')
+            with mock.patch.object(ledger_writer, 'LOCK_TIMEOUT', 0.2):
+                with self.assertRaises(RuntimeError):
+                    reconcile_ledger(self.ledger, self.columns_dir)
+            self.assertEqual([r['transaction_id'] for r in self.read_ledger()], ['csv1', 'pdf1'])
+            ingester.stdin.write('\n')
+            ingester.stdin.flush()
+            self.assertEqual(ingester.wait(timeout=30), 0)
+        finally:
+            ingester.kill()
+        self.assertEqual(reconcile_ledger(self.ledger, self.columns_dir)['rows_changed'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from unittest import mock
+from financial_discovery.scripts import summarize_ledger
+
+class TestSummarizeLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.ledger_file = os.path.join(self.tmp_dir, 'unified_ledger.jsonl')
+        self.columns_dir = os.path.join(self.tmp_dir, 'columns')
+        self.output_dir = os.path.join(self.tmp_dir, 'financial')
+        patcher = mock.patch.multiple(
+            summarize_ledger,
+            OUTPUT_DIR=self.output_dir,
+            STATE_FILE=os.path.join(self.tmp_dir, 'state.json'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write_rows(self, rows, status=None):
+        with open(self.ledger_file, 'a') as f:
+            for account, timestamp, amount, description in rows:
+                f.write(json.dumps({'transaction_id': f"{account}-{timestamp}-{amount}",
+                                    'account_number': account, 'timestamp': timestamp,
+                                    'amount': amount, 'description': description,
+                                    'reconciliation_status': status}) + '\n')
+
+    def summarize(self):
+        return summarize_ledger.summarize_ledger(self.ledger_file, self.columns_dir)
+
+    def load(self, account):
+        with open(summarize_ledger.summary_path(account), 'r') as f:
+            return json.load(f)
+
+    def test_flags_and_incremental_refresh(self):
+        self.write_rows([
+            ('2704', '2022-08-14T10:00:00', 15000.0, 'CASH DEPOSIT BRANCH 0042'),
+            ('2704', '2022-08-15T09:00:00', -500.0, 'Withdrawal Internet Transfer to 3009'),
+            ('3009', '2022-08-17T12:00:00', 500.0, 'Deposit Internet Transfer from 2704'),
+            ('4410', '2022-08-15T12:00:00', -500.0, 'Check 1042'),
+        ])
+        self.assertEqual(len(self.summarize()), 3)
+
+        summary = self.load('2704')
+        self.assertEqual(summary['transactions'], 2)
+        self.assertEqual(summary['net'], 14500.0)
+        self.assertEqual(summary['flags']['large_cash_deposits']['count'], 1)
+        transfers = summary['flags']['related_account_transfers']['transfers']
+        # 4410's matching outflow is also a candidate for 3009's inflow.
+        self.assertEqual([t['counterparty_account'] for t in transfers], ['3009'])
+        self.assertEqual(self.load('3009')['flags']['related_account_transfers']['count'], 2)
+
+        # Only accounts touched by new rows are rewritten.
+        self.write_rows([('5120', '2023-01-01T00:00:00', 10.0, 'Mobile Deposit')])
+        written = self.summarize()
+        self.assertEqual(written, [summarize_ledger.summary_path('5120')])
+        self.assertEqual(self.summarize(), [])
+
+    def test_overlapping_duplicates_are_not_counted(self):
+        deposit = ('2704', '2022-08-14T10:00:00', 14000.0, 'CASH DEPOSIT BRANCH 0042')
+        transfer = [('2704', '2022-08-15T09:00:00', -500.0, 'Withdrawal Internet Transfer to 3009'),
+                    ('3009', '2022-08-16T12:00:00', 500.0, 'Deposit Internet Transfer from 2704')]
+        self.write_rows([deposit] + transfer, status='new')
+        # The same statement ingested again.
+        self.write_rows([deposit] + transfer, status='overlapping')
+        self.summarize()
+
+        summary = self.load('2704')
+        self.assertEqual(summary['transactions'], 2)
+        self.assertEqual(summary['total_inflows'], 14000.0)
+        self.assertEqual(summary['total_outflows'], 500.0)
+        self.assertEqual(summary['flags']['large_cash_deposits']['count'], 1)
+        self.assertEqual(summary['flags']['related_account_transfers']['count'], 1)
+        self.assertEqual(self.load('3009')['total_inflows'], 500.0)
+
+    def test_transfers_before_the_epoch(self):
+        self.write_rows([
+            ('2704', '1969-12-31T09:00:00', -500.0, 'Withdrawal Internet Transfer to 3009'),
+            ('3009', '1970-01-02T12:00:00', 500.0, 'Deposit Internet Transfer from 2704'),
+            # Day -1 must not be packed into the key of 199.99 on day 2**20 - 1.
+            ('2704', '1969-12-31T09:00:00', -200.0, 'Check 1042'),
+            ('4410', '4840-11-25T12:00:00', 199.99, 'Mobile Deposit'),
+        ])
+        self.summarize()
+        transfers = self.load('2704')['flags']['related_account_transfers']['transfers']
+        self.assertEqual([(t['counterparty_account'], t['amount']) for t in transfers], [('3009', 500.0)])
+        self.assertEqual(self.load('4410')['flags']['related_account_transfers']['count'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
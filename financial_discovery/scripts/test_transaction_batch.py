@@ -0,0 +1,67 @@
+import unittest
+import os
+import pickle
+import shutil
+import tempfile
+from financial_discovery.scripts.csv_profiles import parse_statement, parse_statement_into
+from financial_discovery.scripts.transaction_batch import LEDGER_FIELDS, PARSED_FIELDS, TransactionBatch
+from financial_discovery.scripts.transaction_ids import transaction_id
+
+CSV = ('Date,Account Number,Amount,Currency,Description\n'
+       '2024-01-02,111,12.34,usd,"two\nlines"\n'
+       'not a date,111,1.00,USD,skipped\n'
+       '2024-01-03,111,-7,,\n'
+       '2024-01-04,,5,EUR,"café, ok"\n')
+
+class TestTransactionBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'statement.csv')
+        with open(self.path, 'w', newline='', encoding='utf-8') as f:
+            f.write(CSV)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def parse(self, fields=LEDGER_FIELDS, keep_rows=True):
+        batch = TransactionBatch('LegalCodex', self.path, fields)
+        return parse_statement_into(self.path, batch, keep_rows=keep_rows).assign_ids()
+
+    def test_rows_match_the_dicts_ingest_used_to_build(self):
+        rows = list(self.parse())
+        expected = []
+        for fields in parse_statement(self.path, keep_rows=True):
+            transaction = {
+                'transaction_id': None, 'timestamp': fields['timestamp'],
+                'account_number': fields['account_number'], 'amount': fields['amount'],
+                'currency': fields['currency'], 'description': fields['description'],
+                'source': 'LegalCodex', 'source_file': self.path, 'reconciliation_status': 'new',
+                'metadata': {'original_row': fields['row']},
+            }
+            transaction['transaction_id'] = transaction_id(transaction)
+            expected.append(transaction)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows, expected)
+        # Key order too: it decides the ledger's bytes.
+        self.assertEqual([list(row) for row in rows], [list(row) for row in expected])
+        self.assertEqual(rows[0]['metadata']['original_row']['Description'], 'two\nlines')
+        self.assertIsNone(rows[1]['description'])
+
+        parsed = list(self.parse(PARSED_FIELDS, keep_rows=False))
+        self.assertEqual(list(parsed[0]), list(PARSED_FIELDS))
+        self.assertEqual([row['transaction_id'] for row in parsed], [row['transaction_id'] for row in rows])
+
+    def test_batches_survive_pickling_for_worker_processes(self):
+        batch = self.parse()
+        self.assertEqual(list(pickle.loads(pickle.dumps(batch))), list(batch))
+
+    def test_a_changed_statement_file_is_an_error_not_lost_rows(self):
+        batch = self.parse()
+        with open(self.path, 'w') as f:
+            f.write(CSV[:CSV.index('2024-01-03')])
+        with self.assertRaises(ValueError):
+            list(batch)
+
+if __name__ == '__main__':
+    unittest.main()
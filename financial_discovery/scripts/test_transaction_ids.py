@@ -0,0 +1,135 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from unittest import mock
+from financial_discovery.scripts import ingest_csv, ingest_pdf, ledger_partitions
+from financial_discovery.scripts import transaction_ids as transaction_ids_module
+from financial_discovery.scripts.transaction_ids import migrate_ledger, transaction_id, transaction_ids
+
+def write_pdf(path, line):
+    """Writes a one-page PDF whose text layer is the single `line`."""
+    stream = f"BT /F1 9 Tf 36 756 Td ({line}) Tj ET".encode()
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>",
+               b"<< /Type /Pages /Kids [4 0 R] /Count 1 >>",
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+               b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+               b"/Resources << /Font << /F1 3 0 R >> >> /Contents 5 0 R >>",
+               f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"]
+    with open(path, 'wb') as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for n, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(f"{n} 0 obj\n".encode() + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+        f.writelines(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+        f.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+class TestTransactionIds(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_same_transaction_from_csv_and_pdf_gets_same_id(self):
+        from_csv = {"timestamp": "2022-08-14", "description": "Deposit  Transfer ", "amount": "1400.00",
+                    "currency": "usd", "source_file": "statements/raw/becu.csv"}
+        from_pdf = {"timestamp": "2022-08-14T00:00:00", "description": "Deposit Transfer", "amount": 1400.0,
+                    "currency": "USD", "source_file": "statements/raw/becu.pdf"}
+        self.assertEqual(transaction_id(from_csv), transaction_id(from_pdf))
+        self.assertEqual(transaction_ids([from_csv, from_pdf]), [transaction_id(from_csv)] * 2)
+
+    def test_same_transaction_from_csv_and_pdf_is_ingested_once(self):
+        raw = os.path.join(self.tmp_dir, 'statements/raw')
+        os.makedirs(raw)
+        ledger = os.path.join(self.tmp_dir, 'ledger/unified_ledger.jsonl')
+        for module in (ingest_csv, ingest_pdf):
+            for name, value in (('RAW_STATEMENTS_DIR', raw), ('LEDGER_FILE', ledger),
+                                ('PROCESSED_STATEMENTS_DIR', os.path.join(self.tmp_dir, 'statements/processed'))):
+                patcher = mock.patch.object(module, name, value)
+                patcher.start()
+                self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(ingest_pdf, 'PDF_TEXT_CACHE_DIR', os.path.join(self.tmp_dir, 'cache'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # The account comes from the file name on both sides.
+        with open(os.path.join(raw, 'becu_3621082978.csv'), 'w') as f:
+            f.write("date,type,amount,name,memo\n"
+                    "08/14/2022,CREDIT,1400.00,Deposit,Deposit Internet Transfer from 3621082704\n")
+        write_pdf(os.path.join(raw, 'becu_3621082978.pdf'),
+                  "08/14/2022 Deposit Internet Transfer from 3621082704 1,400.00")
+        ingest_csv.ingest_csv_files()
+        ingest_pdf.ingest_pdf_files()
+        # The same export delivered twice.
+        shutil.copy(os.path.join(self.tmp_dir, 'statements/processed/becu_3621082978.csv'),
+                    os.path.join(raw, 'becu_3621082978.csv'))
+        ingest_csv.ingest_csv_files()
+
+        with open(ledger) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([os.path.splitext(row['source_file'])[1] for row in rows], ['.csv', '.pdf', '.csv'])
+        self.assertEqual({row['account_number'] for row in rows}, {'3621082978'})
+        self.assertEqual(len({row['transaction_id'] for row in rows}), 1)
+        self.assertEqual([row['reconciliation_status'] for row in rows], ['new', 'overlapping', 'overlapping'])
+
+    def test_field_boundaries_are_unambiguous(self):
+        first = {"timestamp": "2022-08-14", "amount": 1, "description": "ab", "account_number": "1"}
+        second = {"timestamp": "2022-08-14", "amount": 1, "description": "b", "account_number": "1a"}
+        self.assertNotEqual(transaction_id(first), transaction_id(second))
+
+    def write_legacy_ledger(self, ledger):
+        rows = [
+            {"transaction_id": "old1", "timestamp": "2022-08-14", "amount": 5.0, "description": "Coffee",
+             "reconciliation_status": "new"},
+            {"transaction_id": "old2", "timestamp": "2022-08-14T00:00:00", "amount": "5.00", "description": "Coffee",
+             "reconciliation_status": "new"},
+            {"transaction_id": "old3", "timestamp": "2022-08-15", "amount": 7.0, "description": "Tea",
+             "reconciliation_status": "new"},
+        ]
+        os.makedirs(os.path.dirname(ledger), exist_ok=True)
+        with open(ledger, 'w') as f:
+            f.writelines(json.dumps(row) + '\n' for row in rows)
+
+    def test_migration_rekeys_and_reports_duplicates(self):
+        ledger = os.path.join(self.tmp_dir, 'unified_ledger.jsonl')
+        self.write_legacy_ledger(ledger)
+
+        # Streamed in chunks smaller than the ledger.
+        with mock.patch.object(transaction_ids_module, 'MIGRATE_CHUNK_ROWS', 2):
+            report = migrate_ledger(ledger)
+        self.assertEqual((report['rows'], report['rekeyed'], report['duplicate_groups'], report['newly_overlapping']),
+                         (3, 3, 1, 1))
+        self.assertEqual(report['examples'][0]['rows'], [1, 2])
+        with open(ledger) as f:
+            migrated = [json.loads(line) for line in f]
+        self.assertEqual(migrated[0]['transaction_id'], migrated[1]['transaction_id'])
+        self.assertEqual(migrated[1]['reconciliation_status'], 'overlapping')
+        self.assertEqual(migrated[2]['metadata']['legacy_transaction_id'], 'old3')
+        self.assertEqual(migrate_ledger(ledger)['rekeyed'], 0)
+
+    def test_migration_rewrites_a_partitioned_ledger_in_place(self):
+        ledger = os.path.join(self.tmp_dir, 'ledger', 'unified_ledger.jsonl')
+        self.write_legacy_ledger(ledger)
+        ledger_partitions.split_ledger(ledger)
+
+        report = migrate_ledger(ledger)
+        self.assertEqual((report['rows'], report['rekeyed'], report['duplicate_groups'], report['newly_overlapping']),
+                         (3, 3, 1, 1))
+        part = report['examples'][0]['rows'][0].rsplit(':', 1)[0]
+        self.assertEqual(report['examples'][0]['rows'], [f'{part}:1', f'{part}:2'])
+        root = os.path.dirname(ledger)
+        for migrated in ([json.loads(line) for line in ledger_partitions.iter_merged(root)],
+                         [json.loads(line) for line in open(ledger)]):
+            by_legacy = {row['metadata']['legacy_transaction_id']: row for row in migrated}
+            self.assertEqual(by_legacy['old1']['transaction_id'], by_legacy['old2']['transaction_id'])
+            self.assertEqual(by_legacy['old2']['reconciliation_status'], 'overlapping')
+        self.assertEqual(migrate_ledger(ledger)['rekeyed'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+"""Compact, column-wise storage for the transactions of one statement.
+
+A parsed statement used to be a list of dicts, each carrying its own copy of
+every key and, for ingest_statements, a second dict with the raw CSV row:
+well over a kilobyte per row before anything reaches the ledger.
+TransactionBatch keeps each field in its own array instead:
+
+- amounts as int64 cents and timestamps as int64 microseconds since the epoch;
+- account numbers and currencies as codes into small tables of distinct values;
+- descriptions UTF-8 encoded back to back in one buffer;
+- transaction IDs as 32 raw bytes each;
+- raw rows not at all, only their byte offset in the statement file, which
+  is read again, front to back, as the rows are written.
+
+Iterating a batch yields ledger rows as dicts, built one at a time, so the
+writer serializes them to JSONL without the whole statement ever existing
+as dicts.
+"""
+import hashlib
+import os
+import sys
+from array import array
+from datetime import datetime, timedelta
+from itertools import repeat
+from operator import itemgetter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from ai_bridge import metrics
+from financial_discovery.scripts.csv_profiles import iter_rows_with_spans
+from financial_discovery.scripts.transaction_ids import DEFAULT_CURRENCY, encode
+
+# --- Configuration ---
+# Key order of the ledger rows each ingester writes.
+LEDGER_FIELDS = ('transaction_id', 'timestamp', 'account_number', 'amount', 'currency', 'description',
+                 'source', 'source_file', 'reconciliation_status', 'metadata')
+PARSED_FIELDS = ('timestamp', 'account_number', 'description', 'amount', 'currency', 'source',
+                 'source_file', 'reconciliation_status', 'transaction_id')
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+ID_BYTES = 32
+
+
+def timestamp_micros(value):
+    """Microseconds since the epoch of a naive ISO 8601 timestamp."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        raise ValueError(f"Timestamp {value!r} has a timezone; batches hold naive timestamps")
+    return (parsed - EPOCH) // MICROSECOND
+
+
+def micros_timestamp(value):
+    """Inverse of timestamp_micros(): the ISO 8601 string the parsers produce."""
+    return (EPOCH + value * MICROSECOND).isoformat()
+
+
+def to_cents(amount):
+    """Whole cents, rounded as transaction_ids.normalize_amount() rounds them."""
+    return int(round(float(amount) * 100))
+
+
+class Codes:
+    """Interning table: each distinct value gets a small integer code."""
+
+    __slots__ = ('values', 'index')
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def code(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class TransactionBatch:
+    """The transactions of one statement, stored column by column.
+
+    Fields that are the same for the whole statement (source, source file,
+    status) are stored once. When rows are appended with the byte span of
+    their raw CSV row (and the batch has the file's `header`), the raw row
+    comes back as `metadata.original_row` when the batch is iterated; the
+    statement file must still be in place then. `fields` is the key order
+    of the rows it yields (LEDGER_FIELDS or PARSED_FIELDS).
+    """
+
+    __slots__ = ('source', 'source_file', 'fields', 'header', 'timestamps', 'cents', 'accounts',
+                 'account_codes', 'currencies', 'currency_codes', 'text', 'text_ends',
+                 'missing_descriptions', 'row_offsets', 'ids', '_timestamp_cache')
+
+    def __init__(self, source, source_file, fields=PARSED_FIELDS, header=None):
+        self.source = source
+        self.source_file = source_file
+        self.fields = fields
+        self.header = header
+        self.timestamps = array('q')
+        self.cents = array('q')
+        self.accounts = Codes()
+        self.account_codes = array('I')
+        self.currencies = Codes()
+        self.currency_codes = array('I')
+        self.text = bytearray()
+        self.text_ends = array('Q')
+        self.missing_descriptions = set()
+        self.row_offsets = array('Q')
+        self.ids = bytearray()
+        self._timestamp_cache = {}
+
+    def __len__(self):
+        return len(self.cents)
+
+    def append(self, timestamp, amount, description, currency, account_number, span=None):
+        """Adds one transaction; `span` is its raw row's (offset, length) in the statement file."""
+        micros = self._timestamp_cache.get(timestamp)
+        if micros is None:
+            micros = self._timestamp_cache[timestamp] = timestamp_micros(timestamp)
+        cents = to_cents(amount)
+        if description is None:
+            self.missing_descriptions.add(len(self.cents))
+        else:
+            self.text += description.encode()
+        self.timestamps.append(micros)
+        self.cents.append(cents)
+        self.account_codes.append(self.accounts.code(account_number))
+        self.currency_codes.append(self.currencies.code(currency))
+        self.text_ends.append(len(self.text))
+        if span is not None:
+            self.row_offsets.append(span[0])
+
+    def description(self, i):
+        if i in self.missing_descriptions:
+            return None
+        start = self.text_ends[i - 1] if i else 0
+        return self.text[start:self.text_ends[i]].decode()
+
+    # --- IDs ---
+
+    def assign_ids(self):
+        """Computes the canonical transaction ID of every row that has none yet.
+
+        Same IDs as transaction_ids.transaction_id() on the rows' dicts; the
+        per-account and per-currency normalization is done once per code.
+        """
+        start = len(self.ids) // ID_BYTES
+        accounts = [str(value).strip() if value is not None else '' for value in self.accounts.values]
+        currencies = [(value or DEFAULT_CURRENCY).strip().upper() for value in self.currencies.values]
+        timestamps = {}
+        sha256 = hashlib.sha256
+        with metrics.stage('hash_ids'):
+            for i in range(start, len(self)):
+                micros = self.timestamps[i]
+                timestamp = timestamps.get(micros)
+                if timestamp is None:
+                    timestamp = timestamps[micros] = micros_timestamp(micros)
+                description = self.description(i)
+                self.ids += sha256(encode((
+                    accounts[self.account_codes[i]], timestamp, str(self.cents[i]),
+                    currencies[self.currency_codes[i]],
+                    ' '.join(description.split()) if description is not None else '',
+                ))).digest()
+        metrics.count('rows_hashed', len(self) - start)
+        return self
+
+    # --- Ledger rows ---
+
+    def _raw_rows(self):
+        """Yields the raw CSV row of each transaction, as a header -> value dict.
+
+        Rows are referenced in file order, so the file is read once, front to
+        back, skipping the rows that did not parse.
+        """
+        if not self.row_offsets:
+            return
+        header = self.header
+        with open(self.source_file, 'rb') as f:
+            rows = iter_rows_with_spans(f, self.row_offsets[0])
+            for offset in self.row_offsets:
+                for row, span in rows:
+                    if span[0] == offset:
+                        yield {'original_row': dict(zip(header, row))}
+                        break
+
+    def __iter__(self):
+        with_rows = self.header is not None
+        fields = self.fields if with_rows else tuple(name for name in self.fields if name != 'metadata')
+        # Each row is built as a tuple in LEDGER_FIELDS order, then picked into `fields` order.
+        pick = itemgetter(*[LEDGER_FIELDS.index(name) for name in fields])
+        metadata = self._raw_rows() if with_rows else repeat(None)
+        accounts, currencies = self.accounts.values, self.currencies.values
+        text, missing, ids = self.text, self.missing_descriptions, self.ids
+        source, source_file = self.source, self.source_file
+        timestamps = {}
+        start = 0
+        i = -1
+        columns = zip(self.timestamps, self.cents, self.account_codes, self.currency_codes, self.text_ends, metadata)
+        for i, (micros, cents, account, currency, end, row_metadata) in enumerate(columns):
+            timestamp = timestamps.get(micros)
+            if timestamp is None:
+                timestamp = timestamps[micros] = micros_timestamp(micros)
+            description = None if i in missing else text[start:end].decode()
+            start = end
+            yield dict(zip(fields, pick((
+                ids[i * ID_BYTES:(i + 1) * ID_BYTES].hex() if ids else None,
+                timestamp, accounts[account], cents / 100, currencies[currency], description,
+                source, source_file, 'new', row_metadata,
+            ))))
+        if i + 1 != len(self):
+            # The raw rows ran out: the statement file changed after parsing.
+            raise ValueError(f"{source_file} no longer holds the rows parsed from it")
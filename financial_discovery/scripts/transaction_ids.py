@@ -0,0 +1,234 @@
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+from datetime import datetime
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from ai_bridge import metrics
+from financial_discovery.scripts.ledger_index import discard_index
+from financial_discovery.scripts.ledger_writer import LedgerLock, _fsync_directory, recover_ledger
+
+# --- Configuration ---
+LEDGER_FILE = "financial_discovery/ledger/unified_ledger.jsonl"
+# The fields that identify a transaction, in encoding order. The source file
+# is deliberately not one of them, so the same transaction read from a CSV
+# and from a PDF statement gets the same ID.
+ID_FIELDS = ('account_number', 'timestamp', 'amount', 'currency', 'description')
+# Leading byte of every encoded record; bump it if normalization changes.
+ID_VERSION = b'\x01'
+DEFAULT_CURRENCY = 'USD'
+# Duplicate groups listed in the migration report.
+REPORT_EXAMPLES = 20
+# Rows re-keyed at a time by migrate_ledger().
+MIGRATE_CHUNK_ROWS = 100000
+
+_LENGTHS = struct.Struct('>' + 'I' * len(ID_FIELDS))
+
+
+# --- Normalization ---
+
+def normalize_timestamp(value, cache=None):
+    """Returns an ISO 8601 timestamp with time, e.g. '2022-08-14T00:00:00'."""
+    if value is None:
+        return ''
+    if cache is not None and value in cache:
+        return cache[value]
+    text = str(value).strip()
+    try:
+        normalized = datetime.fromisoformat(text).isoformat()
+    except ValueError:
+        normalized = text
+    if cache is not None:
+        cache[value] = normalized
+    return normalized
+
+
+def normalize_amount(value):
+    """Returns the amount in whole cents as a string ('-0.00' becomes '0')."""
+    try:
+        return str(int(round(float(value) * 100)))
+    except (TypeError, ValueError):
+        return ''
+
+
+def normalize(transaction, timestamp_cache=None):
+    """Returns the canonical (account, timestamp, cents, currency, description) strings."""
+    account = transaction.get('account_number')
+    description = transaction.get('description')
+    return (
+        str(account).strip() if account is not None else '',
+        normalize_timestamp(transaction.get('timestamp'), timestamp_cache),
+        normalize_amount(transaction.get('amount')),
+        (transaction.get('currency') or DEFAULT_CURRENCY).strip().upper(),
+        ' '.join(str(description).split()) if description is not None else '',
+    )
+
+
+def encode(fields):
+    """Encodes normalized fields as ID_VERSION, their UTF-8 lengths, then their bytes.
+
+    Length prefixes keep field boundaries unambiguous, unlike concatenating
+    the values.
+    """
+    data = [field.encode() for field in fields]
+    return ID_VERSION + _LENGTHS.pack(*map(len, data)) + b''.join(data)
+
+
+# --- Hashing ---
+
+def transaction_id(transaction):
+    """Returns the canonical SHA-256 hex ID of one transaction."""
+    return hashlib.sha256(encode(normalize(transaction))).hexdigest()
+
+
+def transaction_ids(transactions):
+    """Returns the canonical IDs of a list of transactions.
+
+    Same result as calling transaction_id() on each, with the per-row
+    overhead hoisted out of the loop and each distinct timestamp normalized
+    once. Ingesters already hash in their parse worker processes, so this
+    runs single-threaded: hashlib only releases the GIL for inputs of 2 KiB
+    and up, and encoded transactions are around 100 bytes.
+    """
+    sha256 = hashlib.sha256
+    timestamp_cache = {}
+    return [sha256(encode(normalize(transaction, timestamp_cache))).hexdigest()
+            for transaction in transactions]
+
+
+def assign_ids(transactions):
+    """Sets `transaction_id` on each transaction in place and returns the list."""
+    with metrics.stage('hash_ids'):
+        for transaction, new_id in zip(transactions, transaction_ids(transactions)):
+            transaction['transaction_id'] = new_id
+    metrics.count('rows_hashed', len(transactions))
+    return transactions
+
+
+# --- Migration ---
+
+class _Migration:
+    """Re-keys rows a chunk at a time and tallies the report.
+
+    Only the ID of each transaction seen so far is kept, not the rows.
+    """
+
+    def __init__(self):
+        self.first_row = {}
+        self.groups = {}
+        self.duplicate_groups = set()
+        self.rows = self.rekeyed = self.newly_overlapping = 0
+
+    def rekey(self, rows, labels=None):
+        """Re-keys `rows` in place; `labels` name them in the report (default: row number)."""
+        for i, (row, new_id) in enumerate(zip(rows, transaction_ids(rows))):
+            self.rows += 1
+            label = labels[i] if labels else self.rows
+            old_id = row.get('transaction_id')
+            if old_id != new_id:
+                self.rekeyed += 1
+                metadata = row.setdefault('metadata', {})
+                metadata.setdefault('legacy_transaction_id', old_id)
+                row['transaction_id'] = new_id
+            if new_id in self.first_row:
+                self.duplicate_groups.add(new_id)
+                if new_id in self.groups or len(self.groups) < REPORT_EXAMPLES:
+                    self.groups.setdefault(new_id, [self.first_row[new_id]]).append(label)
+                if row.get('reconciliation_status') != 'overlapping':
+                    row['reconciliation_status'] = 'overlapping'
+                    self.newly_overlapping += 1
+            else:
+                self.first_row[new_id] = label
+
+    def report(self):
+        return {
+            'rows': self.rows,
+            'rekeyed': self.rekeyed,
+            'unique_transactions': len(self.first_row),
+            'duplicate_groups': len(self.duplicate_groups),
+            'newly_overlapping': self.newly_overlapping,
+            'examples': [{'transaction_id': new_id, 'rows': labels} for new_id, labels in self.groups.items()],
+        }
+
+
+def migrate_ledger(ledger_path=LEDGER_FILE):
+    """Re-keys every ledger row with its canonical ID and returns a report.
+
+    A row's previous ID is kept as `metadata.legacy_transaction_id`. Rows that
+    now share an ID with an earlier row are marked `overlapping`, as ingestion
+    does for duplicates. Rows are streamed MIGRATE_CHUNK_ROWS at a time into a
+    temporary file that replaces the ledger, and its ID index is removed so it
+    is rebuilt. A partitioned ledger is re-keyed in its part files instead
+    (see _migrate_partitions). Running it again changes nothing. Ingesters
+    wait on the LedgerLock while it runs.
+    """
+    # Imported here: ledger_partitions imports this module.
+    from financial_discovery.scripts.ledger_partitions import is_partitioned
+
+    migration = _Migration()
+    with LedgerLock(ledger_path):
+        if is_partitioned(ledger_path):
+            _migrate_partitions(ledger_path, migration)
+            return migration.report()
+        recover_ledger(ledger_path)
+        tmp_path = ledger_path + '.migrate.tmp'
+        with open(ledger_path, 'r') as source, open(tmp_path, 'w') as target:
+            for lines in iter(lambda: list(islice(source, MIGRATE_CHUNK_ROWS)), []):
+                rows = [json.loads(line) for line in lines if line.strip()]
+                migration.rekey(rows)
+                target.writelines(json.dumps(row) + '\n' for row in rows)
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(tmp_path, ledger_path)
+        _fsync_directory(ledger_path)
+        discard_index(ledger_path)
+    return migration.report()
+
+
+def _migrate_partitions(ledger_path, migration):
+    """Re-keys a partitioned ledger one partition at a time.
+
+    Re-keying never moves a row to another partition, since the partition is
+    made of ID fields, and duplicates always share a partition. So only one
+    partition's rows are held at once. Each writer's parts are rewritten
+    under its lease (see ledger_partitions.rewrite_parts), and rows listed
+    in the report are named `<part>:<line>`. The caller holds the
+    LedgerLock.
+    """
+    from financial_discovery.scripts import ledger_partitions
+
+    root = ledger_partitions.partition_root(ledger_path)
+    manifest = ledger_partitions.load_manifest(root)
+    by_partition = {}
+    for relpath in sorted(manifest):
+        by_partition.setdefault(os.path.dirname(relpath), []).append(relpath)
+    for relpaths in by_partition.values():
+        replacements = {}
+        for relpath in relpaths:
+            rows = [json.loads(line) for line in ledger_partitions.iter_part_lines(root, relpath, manifest[relpath])]
+            migration.rekey(rows, [f"{relpath}:{n}" for n in range(1, len(rows) + 1)])
+            replacements[relpath] = iter([(json.dumps(row) + '\n').encode() for row in rows])
+
+        def rewrite(relpath, line):
+            # Rows committed since the partition was read are kept as they are.
+            return next(replacements[relpath], None)
+
+        by_writer = {}
+        for relpath in relpaths:
+            by_writer.setdefault(manifest[relpath]['writer'], []).append(relpath)
+        for writer_id, writer_relpaths in sorted(by_writer.items()):
+            ledger_partitions.rewrite_parts(root, writer_id, writer_relpaths, rewrite)
+    ledger_partitions.sync_view(ledger_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-key the ledger with canonical transaction IDs.")
+    parser.add_argument("--ledger", default=LEDGER_FILE)
+    args = parser.parse_args()
+
+    report = migrate_ledger(args.ledger)
+    print(json.dumps(report, indent=2))
@@ -2,23 +2,26 @@
 
 # A simple runner script to demonstrate the execution of the bridge maintenance scripts.
 
-# --- Run summarize_activity.py ---
-# This script is intended to be run periodically (e.g., via a cron job).
+# --- Run the activity summarizer ---
+# This is intended to be run periodically (e.g., via a cron job). With a
+# long-lived `python3 -m bridge worker` running, cron can use
+# `python3 -m bridge --worker summarize` instead and skip interpreter startup.
 # For demonstration purposes, we will just run it once.
 echo "Running the activity summarizer..."
-python3 ai_bridge/summarize_activity.py
+python3 -m bridge summarize
 
-# --- Run index_cloud_discovery.py ---
-# This script is intended to be run as a background process.
-# We will start it in the background and then kill it after a short period.
-echo "Starting the cloud discovery indexer in the background..."
-python3 ai_bridge/index_cloud_discovery.py &
-INDEXER_PID=$!
+# --- Run router.py ---
+# The router handles new messages, LegalCodex updates and cloud discovery
+# summaries in one background process.
+# We will start it in the background and then stop it after a short period.
+echo "Starting the bridge router in the background..."
+python3 ai_bridge/router.py &
+ROUTER_PID=$!
 
-# Let the indexer run for a bit
+# Let the router run for a bit
 sleep 15
 
-echo "Stopping the cloud discovery indexer..."
-kill $INDEXER_PID
+echo "Stopping the bridge router..."
+kill -INT $ROUTER_PID
 
 echo "Maintenance script demonstration complete."
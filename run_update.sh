@@ -1,2 +1,4 @@
 #!/bin/bash
-python3 ai_bridge/scripts/update_legal_codex.py
+# Watches to_codex/ and pushes responses into LegalCodex. For cron, use
+# `python3 -m bridge update --once` (add --worker if a bridge worker is running).
+python3 -m bridge update